@@ -0,0 +1,54 @@
+"""Add metric_baselines table for incremental HRV / resting HR baselines
+
+Revision ID: 002_metric_baselines
+Revises: 001_initial
+Create Date: 2026-10-19 09:00:00.000000
+
+Existing users get their baseline state on the next health sync (the first
+update for a user without state performs a full rebuild from history).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '002_metric_baselines'
+down_revision: Union[str, None] = '001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create metric_baselines."""
+    op.create_table(
+        'metric_baselines',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('metric', sa.String(), nullable=False),
+        sa.Column('last_date', sa.Date(), nullable=True),
+        sa.Column('ewma', sa.Float(), nullable=True),
+        sa.Column('mean_7d', sa.Float(), nullable=True),
+        sa.Column('std_7d', sa.Float(), nullable=True),
+        sa.Column('count_7d', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('mean_28d', sa.Float(), nullable=True),
+        sa.Column('std_28d', sa.Float(), nullable=True),
+        sa.Column('count_28d', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('mean_60d', sa.Float(), nullable=True),
+        sa.Column('std_60d', sa.Float(), nullable=True),
+        sa.Column('count_60d', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('window', sa.JSON(), nullable=False),
+        sa.Column('anchor_date', sa.Date(), nullable=True),
+        sa.Column('anchor_ewma', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('user_id', 'metric', name='uix_user_metric_baseline'),
+    )
+    op.create_index('ix_metric_baselines_id', 'metric_baselines', ['id'])
+    op.create_index('ix_metric_baselines_user_id', 'metric_baselines', ['user_id'])
+
+
+def downgrade() -> None:
+    """Drop metric_baselines."""
+    op.drop_index('ix_metric_baselines_user_id', table_name='metric_baselines')
+    op.drop_index('ix_metric_baselines_id', table_name='metric_baselines')
+    op.drop_table('metric_baselines')
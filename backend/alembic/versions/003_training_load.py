@@ -0,0 +1,46 @@
+"""Add workout training stress score and training_load_days series
+
+Revision ID: 003_training_load
+Revises: 002_metric_baselines
+Create Date: 2026-10-19 10:00:00.000000
+
+Existing workouts are scored and the daily series rebuilt per user with
+TrainingLoadService.process_workouts() / rebuild().
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '003_training_load'
+down_revision: Union[str, None] = '002_metric_baselines'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add workouts.training_stress_score and create training_load_days."""
+    op.add_column('workouts', sa.Column('training_stress_score', sa.Float(), nullable=True))
+
+    op.create_table(
+        'training_load_days',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('load', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('ctl', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('atl', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('tsb', sa.Float(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('user_id', 'date', name='uix_user_date_training_load'),
+    )
+    op.create_index('ix_training_load_days_id', 'training_load_days', ['id'])
+    op.create_index('ix_training_load_days_user_id', 'training_load_days', ['user_id'])
+
+
+def downgrade() -> None:
+    """Drop training_load_days and workouts.training_stress_score."""
+    op.drop_index('ix_training_load_days_user_id', table_name='training_load_days')
+    op.drop_index('ix_training_load_days_id', table_name='training_load_days')
+    op.drop_table('training_load_days')
+    op.drop_column('workouts', 'training_stress_score')
@@ -0,0 +1,51 @@
+"""Add daily_snapshots table and health_metrics.updated_at
+
+Revision ID: 004_daily_snapshots
+Revises: 003_training_load
+Create Date: 2026-10-19 11:00:00.000000
+
+History is filled by the nightly snapshot task (users without snapshots are
+backfilled on their first run) or app.tasks.backfill_user_snapshots.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '004_daily_snapshots'
+down_revision: Union[str, None] = '003_training_load'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create daily_snapshots and add health_metrics.updated_at."""
+    op.add_column('health_metrics', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.create_table(
+        'daily_snapshots',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('readiness_score', sa.Integer(), nullable=True),
+        sa.Column('readiness_confidence', sa.String(), nullable=True),
+        sa.Column('readiness', sa.JSON(), nullable=True),
+        sa.Column('hrv_status', sa.JSON(), nullable=True),
+        sa.Column('overtraining_risk_score', sa.Float(), nullable=True),
+        sa.Column('overtraining_status', sa.String(), nullable=True),
+        sa.Column('overtraining', sa.JSON(), nullable=True),
+        sa.Column('data_version', sa.String(), nullable=True),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('user_id', 'date', name='uix_user_date_snapshot'),
+    )
+    op.create_index('ix_daily_snapshots_id', 'daily_snapshots', ['id'])
+    op.create_index('ix_daily_snapshots_user_id', 'daily_snapshots', ['user_id'])
+
+
+def downgrade() -> None:
+    """Drop daily_snapshots and health_metrics.updated_at."""
+    op.drop_index('ix_daily_snapshots_user_id', table_name='daily_snapshots')
+    op.drop_index('ix_daily_snapshots_id', table_name='daily_snapshots')
+    op.drop_table('daily_snapshots')
+    op.drop_column('health_metrics', 'updated_at')
@@ -0,0 +1,70 @@
+"""Add workout_streams and best_efforts tables
+
+Revision ID: 005_workout_streams_best_efforts
+Revises: 004_daily_snapshots
+Create Date: 2026-10-19 12:00:00.000000
+
+Both tables are filled at ingest; workouts stored before this revision keep
+using the whole-workout fallback in race predictions until re-imported.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '005_workout_streams_best_efforts'
+down_revision: Union[str, None] = '004_daily_snapshots'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create workout_streams and best_efforts."""
+    op.create_table(
+        'workout_streams',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column(
+            'workout_id', sa.Integer(),
+            sa.ForeignKey('workouts.id', ondelete='CASCADE'),
+            nullable=False, unique=True,
+        ),
+        sa.Column('sample_count', sa.Integer(), nullable=False),
+        sa.Column('channels', sa.JSON(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_workout_streams_id', 'workout_streams', ['id'])
+
+    op.create_table(
+        'best_efforts',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column(
+            'workout_id', sa.Integer(),
+            sa.ForeignKey('workouts.id', ondelete='CASCADE'),
+            nullable=False,
+        ),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('distance_meters', sa.Float(), nullable=False),
+        sa.Column('elapsed_seconds', sa.Float(), nullable=False),
+        sa.Column('start_offset_seconds', sa.Float(), nullable=False),
+        sa.Column('achieved_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_best_efforts_id', 'best_efforts', ['id'])
+    op.create_index('ix_best_efforts_workout_id', 'best_efforts', ['workout_id'])
+    op.create_index(
+        'ix_best_efforts_user_distance_elapsed',
+        'best_efforts',
+        ['user_id', 'distance_meters', 'elapsed_seconds'],
+    )
+
+
+def downgrade() -> None:
+    """Drop best_efforts and workout_streams."""
+    op.drop_index('ix_best_efforts_user_distance_elapsed', table_name='best_efforts')
+    op.drop_index('ix_best_efforts_workout_id', table_name='best_efforts')
+    op.drop_index('ix_best_efforts_id', table_name='best_efforts')
+    op.drop_table('best_efforts')
+    op.drop_index('ix_workout_streams_id', table_name='workout_streams')
+    op.drop_table('workout_streams')
@@ -0,0 +1,29 @@
+"""Add workouts.time_in_zones
+
+Revision ID: 006_workout_time_in_zones
+Revises: 005_workout_streams_best_efforts
+Create Date: 2026-10-19 13:00:00.000000
+
+Filled at ingest from workout streams and refreshed in bulk when a user's
+zones change (zone_time_service.recompute_for_user).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '006_workout_time_in_zones'
+down_revision: Union[str, None] = '005_workout_streams_best_efforts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add workouts.time_in_zones."""
+    op.add_column('workouts', sa.Column('time_in_zones', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop workouts.time_in_zones."""
+    op.drop_column('workouts', 'time_in_zones')
@@ -0,0 +1,29 @@
+"""Add workouts.splits
+
+Revision ID: 007_workout_splits
+Revises: 006_workout_time_in_zones
+Create Date: 2026-10-19 14:00:00.000000
+
+Per-km, per-mile and per-lap splits computed at ingest from the workout
+streams (workout_split_service).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '007_workout_splits'
+down_revision: Union[str, None] = '006_workout_time_in_zones'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add workouts.splits."""
+    op.add_column('workouts', sa.Column('splits', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop workouts.splits."""
+    op.drop_column('workouts', 'splits')
@@ -0,0 +1,35 @@
+"""Add grade-adjusted pace columns
+
+Revision ID: 008_grade_adjusted_pace
+Revises: 007_workout_splits
+Create Date: 2026-10-19 15:00:00.000000
+
+Workouts gain smoothed elevation gain, graded distance and GAP; best efforts
+gain a flat-equivalent time (grade_service).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '008_grade_adjusted_pace'
+down_revision: Union[str, None] = '007_workout_splits'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add GAP columns to workouts and best_efforts."""
+    op.add_column('workouts', sa.Column('smoothed_elevation_gain', sa.Float(), nullable=True))
+    op.add_column('workouts', sa.Column('graded_distance_meters', sa.Float(), nullable=True))
+    op.add_column('workouts', sa.Column('grade_adjusted_pace', sa.Float(), nullable=True))
+    op.add_column('best_efforts', sa.Column('graded_elapsed_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop GAP columns."""
+    op.drop_column('best_efforts', 'graded_elapsed_seconds')
+    op.drop_column('workouts', 'grade_adjusted_pace')
+    op.drop_column('workouts', 'graded_distance_meters')
+    op.drop_column('workouts', 'smoothed_elevation_gain')
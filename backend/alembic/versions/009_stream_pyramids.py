@@ -0,0 +1,29 @@
+"""Add downsampled chart pyramids to workout streams
+
+Revision ID: 009_stream_pyramids
+Revises: 008_grade_adjusted_pace
+Create Date: 2026-10-19 16:00:00.000000
+
+Each stream row gains an LTTB pyramid (stream_pyramid_service) served by
+GET /workouts/{id}/streams. Existing rows are filled lazily on first read.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '009_stream_pyramids'
+down_revision: Union[str, None] = '008_grade_adjusted_pace'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add pyramid column to workout_streams."""
+    op.add_column('workout_streams', sa.Column('pyramid', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop pyramid column."""
+    op.drop_column('workout_streams', 'pyramid')
@@ -0,0 +1,57 @@
+"""Add GPS tracks and workout bounding boxes
+
+Revision ID: 010_workout_tracks
+Revises: 009_stream_pyramids
+Create Date: 2026-10-19 17:00:00.000000
+
+Tracks are stored as encoded polylines (full resolution plus one
+simplification per map zoom); workouts get an indexed bounding box for
+area queries (track_service).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '010_workout_tracks'
+down_revision: Union[str, None] = '009_stream_pyramids'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create workout_tracks and add bounding box columns to workouts."""
+    op.create_table(
+        'workout_tracks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('workout_id', sa.Integer(), nullable=False),
+        sa.Column('point_count', sa.Integer(), nullable=False),
+        sa.Column('polyline', sa.Text(), nullable=False),
+        sa.Column('simplified', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['workout_id'], ['workouts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('workout_id'),
+    )
+    op.create_index('ix_workout_tracks_id', 'workout_tracks', ['id'])
+
+    op.add_column('workouts', sa.Column('min_lat', sa.Float(), nullable=True))
+    op.add_column('workouts', sa.Column('min_lon', sa.Float(), nullable=True))
+    op.add_column('workouts', sa.Column('max_lat', sa.Float(), nullable=True))
+    op.add_column('workouts', sa.Column('max_lon', sa.Float(), nullable=True))
+    op.create_index(
+        'ix_workouts_user_id_bbox', 'workouts',
+        ['user_id', 'min_lat', 'max_lat', 'min_lon', 'max_lon'],
+    )
+
+
+def downgrade() -> None:
+    """Drop bounding box columns and workout_tracks."""
+    op.drop_index('ix_workouts_user_id_bbox', table_name='workouts')
+    op.drop_column('workouts', 'max_lon')
+    op.drop_column('workouts', 'max_lat')
+    op.drop_column('workouts', 'min_lon')
+    op.drop_column('workouts', 'min_lat')
+    op.drop_index('ix_workout_tracks_id', table_name='workout_tracks')
+    op.drop_table('workout_tracks')
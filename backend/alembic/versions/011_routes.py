@@ -0,0 +1,57 @@
+"""Add repeated routes
+
+Revision ID: 011_routes
+Revises: 010_workout_tracks
+Create Date: 2026-10-19 18:00:00.000000
+
+Routes hold a GPS track fingerprint (geohash start cell plus visited cells);
+workouts on the same route point to it (route_service).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '011_routes'
+down_revision: Union[str, None] = '010_workout_tracks'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create routes and add workouts.route_id."""
+    op.create_table(
+        'routes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('start_cell', sa.String(length=12), nullable=False),
+        sa.Column('distance_meters', sa.Float(), nullable=False),
+        sa.Column('cells', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_routes_id', 'routes', ['id'])
+    op.create_index(
+        'ix_routes_user_id_start_cell', 'routes',
+        ['user_id', 'start_cell', 'distance_meters'],
+    )
+
+    with op.batch_alter_table('workouts') as batch_op:
+        batch_op.add_column(sa.Column('route_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_workouts_route_id', 'routes', ['route_id'], ['id'], ondelete='SET NULL'
+        )
+        batch_op.create_index('ix_workouts_route_id', ['route_id'])
+
+
+def downgrade() -> None:
+    """Drop workouts.route_id and routes."""
+    with op.batch_alter_table('workouts') as batch_op:
+        batch_op.drop_index('ix_workouts_route_id')
+        batch_op.drop_constraint('fk_workouts_route_id', type_='foreignkey')
+        batch_op.drop_column('route_id')
+    op.drop_index('ix_routes_user_id_start_cell', table_name='routes')
+    op.drop_index('ix_routes_id', table_name='routes')
+    op.drop_table('routes')
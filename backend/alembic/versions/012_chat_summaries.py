@@ -0,0 +1,42 @@
+"""Add rolling chat summaries
+
+Revision ID: 012_chat_summaries
+Revises: 011_routes
+Create Date: 2026-10-19 19:00:00.000000
+
+Older coach conversation turns are folded into one summary per user so
+chat prompts stay within a token budget (coach_context_service).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '012_chat_summaries'
+down_revision: Union[str, None] = '011_routes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create chat_summaries."""
+    op.create_table(
+        'chat_summaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('last_message_id', sa.Integer(), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id'),
+    )
+    op.create_index('ix_chat_summaries_id', 'chat_summaries', ['id'])
+
+
+def downgrade() -> None:
+    """Drop chat_summaries."""
+    op.drop_index('ix_chat_summaries_id', table_name='chat_summaries')
+    op.drop_table('chat_summaries')
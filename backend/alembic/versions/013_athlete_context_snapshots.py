@@ -0,0 +1,51 @@
+"""Add athlete context snapshots
+
+Revision ID: 013_athlete_context_snapshots
+Revises: 012_chat_summaries
+Create Date: 2026-10-19 20:00:00.000000
+
+Coach prompts reuse one pre-formatted athlete context per user, rebuilt
+when users.context_version moves past the snapshot's version
+(athlete_context_service).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '013_athlete_context_snapshots'
+down_revision: Union[str, None] = '012_chat_summaries'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add users.context_version and create athlete_context_snapshots."""
+    op.add_column(
+        'users',
+        sa.Column('context_version', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'athlete_context_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('context', sa.Text(), nullable=False),
+        sa.Column('profile_lines', sa.JSON(), nullable=False),
+        sa.Column('training_lines', sa.JSON(), nullable=False),
+        sa.Column('training_stats', sa.JSON(), nullable=False),
+        sa.Column('built_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id'),
+    )
+    op.create_index('ix_athlete_context_snapshots_id', 'athlete_context_snapshots', ['id'])
+
+
+def downgrade() -> None:
+    """Drop athlete_context_snapshots and users.context_version."""
+    op.drop_index('ix_athlete_context_snapshots_id', table_name='athlete_context_snapshots')
+    op.drop_table('athlete_context_snapshots')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('context_version')
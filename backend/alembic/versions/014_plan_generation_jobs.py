@@ -0,0 +1,55 @@
+"""Add plan generation jobs
+
+Revision ID: 014_plan_generation_jobs
+Revises: 013_athlete_context_snapshots
+Create Date: 2026-10-19 22:00:00.000000
+
+Training plans are generated by a Celery worker; the API returns a job id
+to poll (plan_job_service).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '014_plan_generation_jobs'
+down_revision: Union[str, None] = '013_athlete_context_snapshots'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create plan_generation_jobs."""
+    op.create_table(
+        'plan_generation_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('active_key', sa.String(length=80), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('progress', sa.Integer(), nullable=False),
+        sa.Column('goal', sa.JSON(), nullable=False),
+        sa.Column('weeks', sa.Integer(), nullable=False),
+        sa.Column('provisional_plan', sa.JSON(), nullable=False),
+        sa.Column('plan_id', sa.String(length=50), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('active_key'),
+    )
+    op.create_index('ix_plan_generation_jobs_id', 'plan_generation_jobs', ['id'])
+    op.create_index(
+        'ix_plan_generation_jobs_user_hash', 'plan_generation_jobs', ['user_id', 'request_hash']
+    )
+
+
+def downgrade() -> None:
+    """Drop plan_generation_jobs."""
+    op.drop_index('ix_plan_generation_jobs_user_hash', table_name='plan_generation_jobs')
+    op.drop_index('ix_plan_generation_jobs_id', table_name='plan_generation_jobs')
+    op.drop_table('plan_generation_jobs')
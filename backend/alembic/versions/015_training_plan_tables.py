@@ -0,0 +1,377 @@
+"""Move training plans to their own tables
+
+Revision ID: 015_training_plan_tables
+Revises: 014_plan_generation_jobs
+Create Date: 2026-10-19 23:00:00.000000
+
+Plans move from users.preferences["training_plans"] to training_plans,
+training_plan_weeks and planned_workouts (plan_store_service). Existing
+JSON plans are converted and the key is removed from preferences;
+downgrade writes them back. The conversion is a frozen copy of
+plan_store_service's as of this revision, so later changes to the app
+don't alter what this migration does.
+"""
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '015_training_plan_tables'
+down_revision: Union[str, None] = '014_plan_generation_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+users = sa.table(
+    'users',
+    sa.column('id', sa.Integer()),
+    sa.column('preferences', sa.JSON()),
+)
+
+
+# ===== Plan JSON <-> rows (frozen copy of plan_store_service) =====
+
+LAYOUT_WORKOUTS = 'workouts'
+LAYOUT_DAYS = 'days'
+
+LAYOUT_KEYS = {
+    LAYOUT_WORKOUTS: ('week', 'workouts'),
+    LAYOUT_DAYS: ('week_number', 'days'),
+}
+
+WEEKDAYS = (
+    ('lunes', 'monday'), ('martes', 'tuesday'), ('miercoles', 'wednesday'),
+    ('jueves', 'thursday'), ('viernes', 'friday'), ('sabado', 'saturday'),
+    ('domingo', 'sunday'),
+)
+
+
+def _text(value: Any) -> Optional[str]:
+    return value if isinstance(value, str) and value else None
+
+
+def _int(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def _float(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _plain(value: Optional[float]) -> Any:
+    return int(value) if value is not None and value.is_integer() else value
+
+
+def _pop(data: Dict[str, Any], key: str, convert: Callable[[Any], Any]) -> Any:
+    value = convert(data.get(key))
+    if value is not None:
+        del data[key]
+    return value
+
+
+def _weekday_number(label: str) -> Optional[int]:
+    folded = unicodedata.normalize('NFKD', label.lower()).encode('ascii', 'ignore').decode()
+    for number, names in enumerate(WEEKDAYS, start=1):
+        if any(name in folded for name in names):
+            return number
+    return None
+
+
+def _new_plan_id() -> str:
+    now = datetime.utcnow()
+    return f"plan_{now:%Y%m%d_%H%M%S}_{now.microsecond // 1000}"
+
+
+def plan_rows(plan: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(plan header, week rows, session rows) of a JSON plan, without ids."""
+    details = {key: value for key, value in plan.items() if key != 'weeks'}
+    weeks = [w for w in (plan.get('weeks') or []) if isinstance(w, dict)]
+    layout = LAYOUT_DAYS if any('days' in w or 'week_number' in w for w in weeks) else LAYOUT_WORKOUTS
+    week_key, sessions_key = LAYOUT_KEYS[layout]
+    goal = details.get('goal') if isinstance(details.get('goal'), dict) else {}
+
+    header = {
+        'external_id': _pop(details, 'plan_id', _text) or _text(details.get('id')),
+        'name': _pop(details, 'plan_name', _text) or _text(details.get('name')) or 'Training Plan',
+        'layout': layout,
+        'status': _pop(details, 'status', _text) or 'active',
+        'goal_type': _pop(details, 'goal_type', _text) or _text(goal.get('type')),
+        'goal_date': _pop(details, 'goal_date', _datetime) or _datetime(goal.get('date')),
+        'total_weeks': _pop(details, 'total_weeks', _int) or len(weeks),
+        'current_week': _pop(details, 'current_week', _int) or 1,
+        'start_date': _pop(details, 'start_date', _datetime),
+        'adaptation_count': _pop(details, 'adaptation_count', _int) or 0,
+        'created_at': _pop(details, 'created_at', _datetime) or datetime.utcnow(),
+        'adapted_at': _pop(details, 'adapted_at', _datetime),
+        'status_updated_at': _pop(details, 'status_updated_at', _datetime),
+        'details': details,
+    }
+
+    week_rows, session_rows = [], []
+    for number, week in enumerate(weeks, start=1):
+        week_details = dict(week)
+        week_details.pop(week_key, None)
+        sessions = week_details.pop(sessions_key, None)
+        week_rows.append({
+            'week': number,
+            'focus': _pop(week_details, 'focus', _text),
+            'total_km': _pop(week_details, 'total_km', _float),
+            'details': week_details,
+        })
+
+        for position, session in enumerate(s for s in (sessions or []) if isinstance(s, dict)):
+            session_details = dict(session)
+            raw_day = session_details.pop('day', None)
+            day = _int(raw_day)
+            label = None
+            if day is None and isinstance(raw_day, str):
+                label = raw_day
+                day = _weekday_number(raw_day)
+            session_rows.append({
+                'week': number,
+                'day': day or position + 1,
+                'position': position,
+                'day_label': label,
+                'workout_type': _pop(session_details, 'type', _text),
+                'name': _pop(session_details, 'name', _text),
+                'distance_km': _pop(session_details, 'distance_km', _float),
+                'duration_minutes': _pop(session_details, 'duration_minutes', _float),
+                'pace_target': _pop(session_details, 'pace_target', _text),
+                'details': session_details,
+            })
+
+    return header, week_rows, session_rows
+
+
+def _session_dict(session: Any) -> Dict[str, Any]:
+    item = dict(session.details or {})
+    item['day'] = session.day_label if session.day_label is not None else session.day
+    for key, value in (
+        ('type', session.workout_type),
+        ('name', session.name),
+        ('distance_km', _plain(session.distance_km)),
+        ('duration_minutes', _plain(session.duration_minutes)),
+        ('pace_target', session.pace_target),
+    ):
+        if value is not None:
+            item[key] = value
+    return item
+
+
+def plan_dict(plan: Any, weeks: Iterable[Any], sessions: Iterable[Any]) -> Dict[str, Any]:
+    """JSON plan, in its original layout, rebuilt from its rows."""
+    week_key, sessions_key = LAYOUT_KEYS.get(plan.layout, LAYOUT_KEYS[LAYOUT_WORKOUTS])
+    by_week: Dict[int, List[Any]] = {}
+    for session in sessions:
+        by_week.setdefault(session.week, []).append(session)
+
+    weeks_out = []
+    for week in sorted(weeks, key=lambda w: w.week):
+        item = dict(week.details or {})
+        item[week_key] = week.week
+        if week.focus is not None:
+            item['focus'] = week.focus
+        if week.total_km is not None:
+            item['total_km'] = _plain(week.total_km)
+        item[sessions_key] = [
+            _session_dict(s) for s in sorted(by_week.get(week.week, []), key=lambda s: s.position)
+        ]
+        weeks_out.append(item)
+
+    result = dict(plan.details or {})
+    result.update(
+        plan_id=plan.external_id,
+        plan_name=plan.name,
+        status=plan.status,
+        total_weeks=plan.total_weeks,
+        current_week=plan.current_week,
+        adaptation_count=plan.adaptation_count,
+        created_at=plan.created_at.isoformat(),
+    )
+    for key in ('goal_type', 'goal_date', 'start_date', 'adapted_at', 'status_updated_at'):
+        value = getattr(plan, key)
+        if value is not None:
+            result[key] = value.isoformat() if isinstance(value, datetime) else value
+    result['weeks'] = weeks_out
+    return result
+
+
+def upgrade() -> None:
+    """Create the plan tables and move JSON plans into them."""
+    plans = op.create_table(
+        'training_plans',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('external_id', sa.String(length=50), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('layout', sa.String(length=10), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('goal_type', sa.String(), nullable=True),
+        sa.Column('goal_date', sa.DateTime(), nullable=True),
+        sa.Column('total_weeks', sa.Integer(), nullable=False),
+        sa.Column('current_week', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.DateTime(), nullable=True),
+        sa.Column('adaptation_count', sa.Integer(), nullable=False),
+        sa.Column('details', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('adapted_at', sa.DateTime(), nullable=True),
+        sa.Column('status_updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'external_id', name='uix_user_training_plan'),
+    )
+    op.create_index('ix_training_plans_id', 'training_plans', ['id'])
+    op.create_index('ix_training_plans_user_status', 'training_plans', ['user_id', 'status'])
+
+    weeks = op.create_table(
+        'training_plan_weeks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('plan_id', sa.Integer(), nullable=False),
+        sa.Column('week', sa.Integer(), nullable=False),
+        sa.Column('focus', sa.String(), nullable=True),
+        sa.Column('total_km', sa.Float(), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(['plan_id'], ['training_plans.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('plan_id', 'week', name='uix_plan_week'),
+    )
+    op.create_index('ix_training_plan_weeks_id', 'training_plan_weeks', ['id'])
+
+    sessions = op.create_table(
+        'planned_workouts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('plan_id', sa.Integer(), nullable=False),
+        sa.Column('week', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('day_label', sa.String(), nullable=True),
+        sa.Column('workout_type', sa.String(), nullable=True),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('distance_km', sa.Float(), nullable=True),
+        sa.Column('duration_minutes', sa.Float(), nullable=True),
+        sa.Column('pace_target', sa.String(), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(['plan_id'], ['training_plans.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_planned_workouts_id', 'planned_workouts', ['id'])
+    op.create_index('ix_planned_workouts_plan_week_day', 'planned_workouts', ['plan_id', 'week', 'day'])
+
+    conn = op.get_bind()
+    for user_id, preferences in conn.execute(sa.select(users.c.id, users.c.preferences)).all():
+        if not isinstance(preferences, dict) or 'training_plans' not in preferences:
+            continue
+        seen = set()
+        for plan in preferences['training_plans'] or []:
+            if not isinstance(plan, dict):
+                continue
+            header, week_rows, session_rows = plan_rows(plan)
+            if not header['external_id'] or header['external_id'] in seen:
+                header['external_id'] = f"{_new_plan_id()}_{len(seen)}"
+            seen.add(header['external_id'])
+
+            plan_id = conn.execute(
+                plans.insert().values(user_id=user_id, **header)
+            ).inserted_primary_key[0]
+            if week_rows:
+                conn.execute(weeks.insert(), [dict(row, plan_id=plan_id) for row in week_rows])
+            if session_rows:
+                conn.execute(sessions.insert(), [dict(row, plan_id=plan_id) for row in session_rows])
+
+        preferences = {k: v for k, v in preferences.items() if k != 'training_plans'}
+        conn.execute(users.update().where(users.c.id == user_id).values(preferences=preferences))
+
+
+def downgrade() -> None:
+    """Write plans back to users.preferences and drop the plan tables."""
+    conn = op.get_bind()
+    plans = sa.table(
+        'training_plans',
+        sa.column('id', sa.Integer()),
+        sa.column('external_id', sa.String()),
+        sa.column('user_id', sa.Integer()),
+        sa.column('name', sa.String()),
+        sa.column('layout', sa.String()),
+        sa.column('status', sa.String()),
+        sa.column('goal_type', sa.String()),
+        sa.column('goal_date', sa.DateTime()),
+        sa.column('total_weeks', sa.Integer()),
+        sa.column('current_week', sa.Integer()),
+        sa.column('start_date', sa.DateTime()),
+        sa.column('adaptation_count', sa.Integer()),
+        sa.column('details', sa.JSON()),
+        sa.column('created_at', sa.DateTime()),
+        sa.column('adapted_at', sa.DateTime()),
+        sa.column('status_updated_at', sa.DateTime()),
+    )
+    weeks = sa.table(
+        'training_plan_weeks',
+        sa.column('plan_id', sa.Integer()),
+        sa.column('week', sa.Integer()),
+        sa.column('focus', sa.String()),
+        sa.column('total_km', sa.Float()),
+        sa.column('details', sa.JSON()),
+    )
+    sessions = sa.table(
+        'planned_workouts',
+        sa.column('plan_id', sa.Integer()),
+        sa.column('week', sa.Integer()),
+        sa.column('day', sa.Integer()),
+        sa.column('position', sa.Integer()),
+        sa.column('day_label', sa.String()),
+        sa.column('workout_type', sa.String()),
+        sa.column('name', sa.String()),
+        sa.column('distance_km', sa.Float()),
+        sa.column('duration_minutes', sa.Float()),
+        sa.column('pace_target', sa.String()),
+        sa.column('details', sa.JSON()),
+    )
+
+    by_user = {}
+    for plan in conn.execute(sa.select(plans).order_by(plans.c.id)).all():
+        plan_weeks = conn.execute(sa.select(weeks).where(weeks.c.plan_id == plan.id)).all()
+        plan_sessions = conn.execute(sa.select(sessions).where(sessions.c.plan_id == plan.id)).all()
+        by_user.setdefault(plan.user_id, []).append(plan_dict(plan, plan_weeks, plan_sessions))
+
+    for user_id, user_plans in by_user.items():
+        preferences = conn.execute(
+            sa.select(users.c.preferences).where(users.c.id == user_id)
+        ).scalar() or {}
+        preferences = dict(preferences, training_plans=user_plans)
+        conn.execute(users.update().where(users.c.id == user_id).values(preferences=preferences))
+
+    op.drop_index('ix_planned_workouts_plan_week_day', table_name='planned_workouts')
+    op.drop_index('ix_planned_workouts_id', table_name='planned_workouts')
+    op.drop_table('planned_workouts')
+    op.drop_index('ix_training_plan_weeks_id', table_name='training_plan_weeks')
+    op.drop_table('training_plan_weeks')
+    op.drop_index('ix_training_plans_user_status', table_name='training_plans')
+    op.drop_index('ix_training_plans_id', table_name='training_plans')
+    op.drop_table('training_plans')
@@ -0,0 +1,53 @@
+"""Add plan compliance columns
+
+Revision ID: 016_plan_compliance
+Revises: 015_training_plan_tables
+Create Date: 2026-10-20 00:30:00.000000
+
+Per-week compliance on training_plan_weeks and the matched workout on
+planned_workouts (plan_compliance_service). Existing weeks start with
+compliance_updated_at NULL and are computed on first read.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '016_plan_compliance'
+down_revision: Union[str, None] = '015_training_plan_tables'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add compliance columns to plan weeks and the matched workout to sessions."""
+    op.add_column('training_plan_weeks', sa.Column('planned_sessions', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('training_plan_weeks', sa.Column('completed_sessions', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('training_plan_weeks', sa.Column('planned_km', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('training_plan_weeks', sa.Column('actual_km', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('training_plan_weeks', sa.Column('actual_runs', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('training_plan_weeks', sa.Column('intensity_delta', sa.Float(), nullable=True))
+    op.add_column('training_plan_weeks', sa.Column('compliance_updated_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('planned_workouts') as batch_op:
+        batch_op.add_column(sa.Column('workout_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_planned_workouts_workout_id', 'workouts', ['workout_id'], ['id'], ondelete='SET NULL'
+        )
+
+
+def downgrade() -> None:
+    """Remove the compliance columns."""
+    with op.batch_alter_table('planned_workouts') as batch_op:
+        batch_op.drop_constraint('fk_planned_workouts_workout_id', type_='foreignkey')
+        batch_op.drop_column('workout_id')
+
+    with op.batch_alter_table('training_plan_weeks') as batch_op:
+        batch_op.drop_column('compliance_updated_at')
+        batch_op.drop_column('intensity_delta')
+        batch_op.drop_column('actual_runs')
+        batch_op.drop_column('actual_km')
+        batch_op.drop_column('planned_km')
+        batch_op.drop_column('completed_sessions')
+        batch_op.drop_column('planned_sessions')
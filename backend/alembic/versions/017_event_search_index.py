@@ -0,0 +1,101 @@
+"""Add folded event search columns and text indexes
+
+Revision ID: 017_event_search_index
+Revises: 016_plan_compliance
+Create Date: 2026-10-20 01:00:00.000000
+
+events.search_text / search_location hold accent-folded, lowercased text
+(Event.refresh_search_columns, maintained on write). Existing rows are
+backfilled, then the dialect's substring index is created: pg_trgm GIN
+indexes on PostgreSQL, the events_fts FTS5 trigram table and its sync
+triggers on SQLite (models.EVENT_SEARCH_DDL). The folding function and the
+DDL are frozen copies of the app's as of this revision.
+"""
+import unicodedata
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '017_event_search_index'
+down_revision: Union[str, None] = '016_plan_compliance'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_DDL = {
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_events_search_text_trgm ON events USING gin (search_text gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_events_search_location_trgm ON events USING gin (search_location gin_trgm_ops)",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+        "search_text, search_location, content='events', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS events_fts_ai AFTER INSERT ON events BEGIN "
+        "INSERT INTO events_fts(rowid, search_text, search_location) "
+        "VALUES (new.id, new.search_text, new.search_location); END",
+        "CREATE TRIGGER IF NOT EXISTS events_fts_ad AFTER DELETE ON events BEGIN "
+        "INSERT INTO events_fts(events_fts, rowid, search_text, search_location) "
+        "VALUES ('delete', old.id, old.search_text, old.search_location); END",
+        "CREATE TRIGGER IF NOT EXISTS events_fts_au AFTER UPDATE ON events BEGIN "
+        "INSERT INTO events_fts(events_fts, rowid, search_text, search_location) "
+        "VALUES ('delete', old.id, old.search_text, old.search_location); "
+        "INSERT INTO events_fts(rowid, search_text, search_location) "
+        "VALUES (new.id, new.search_text, new.search_location); END",
+    ],
+}
+
+
+def _fold(text: Optional[str]) -> str:
+    """Accent-folded, lowercased, trimmed text."""
+    nfd = unicodedata.normalize('NFD', text or '')
+    return ''.join(char for char in nfd if unicodedata.category(char) != 'Mn').lower().strip()
+
+
+def upgrade() -> None:
+    """Add and backfill the search columns, then build the text index."""
+    op.add_column('events', sa.Column('search_text', sa.String(), nullable=True))
+    op.add_column('events', sa.Column('search_location', sa.String(), nullable=True))
+
+    events = sa.table(
+        'events',
+        sa.column('id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('location', sa.String),
+        sa.column('region', sa.String),
+        sa.column('search_text', sa.String),
+        sa.column('search_location', sa.String),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(events.c.id, events.c.name, events.c.location, events.c.region)).all()
+    for row in rows:
+        conn.execute(
+            events.update().where(events.c.id == row.id).values(
+                search_text=" | ".join(_fold(part) for part in (row.name, row.location, row.region)),
+                search_location=" | ".join(_fold(part) for part in (row.location, row.region)),
+            )
+        )
+
+    dialect = conn.dialect.name
+    for statement in SEARCH_DDL.get(dialect, []):
+        op.execute(statement)
+    if dialect == 'sqlite':
+        op.execute("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Drop the text index and the search columns."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_events_search_location_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_events_search_text_trgm")
+    elif dialect == 'sqlite':
+        for trigger in ('events_fts_au', 'events_fts_ad', 'events_fts_ai'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS events_fts")
+
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.drop_column('search_location')
+        batch_op.drop_column('search_text')
@@ -0,0 +1,40 @@
+"""Add event coordinates and the geo_cell grid index
+
+Revision ID: 018_event_coordinates
+Revises: 017_event_search_index
+Create Date: 2026-10-20 02:00:00.000000
+
+events.latitude / longitude locate the venue (given by the event, else
+resolved from the bundled gazetteer) and events.geo_cell is their geohash,
+indexed with date for radius searches (event_geo_service). Existing rows
+are left NULL here: run backfill_event_coordinates.py after upgrading to
+resolve them from the gazetteer with the current app code.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '018_event_coordinates'
+down_revision: Union[str, None] = '017_event_search_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the coordinate columns and index the grid cell."""
+    op.add_column('events', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('events', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('events', sa.Column('geo_cell', sa.String(length=12), nullable=True))
+
+    op.create_index('ix_events_geo_cell_date', 'events', ['geo_cell', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the grid index and the coordinate columns."""
+    op.drop_index('ix_events_geo_cell_date', table_name='events')
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.drop_column('geo_cell')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
@@ -0,0 +1,31 @@
+"""Add the worker heartbeat of plan generation jobs
+
+Revision ID: 019_plan_job_heartbeat
+Revises: 018_event_coordinates
+Create Date: 2026-10-20 03:00:00.000000
+
+plan_generation_jobs.heartbeat_at is stamped by the worker at each step;
+only running jobs without a recent heartbeat are timed out
+(plan_job_service).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '019_plan_job_heartbeat'
+down_revision: Union[str, None] = '018_event_coordinates'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add plan_generation_jobs.heartbeat_at."""
+    op.add_column('plan_generation_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop plan_generation_jobs.heartbeat_at."""
+    with op.batch_alter_table('plan_generation_jobs') as batch_op:
+        batch_op.drop_column('heartbeat_at')
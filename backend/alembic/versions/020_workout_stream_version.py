@@ -0,0 +1,34 @@
+"""Add a version to workout streams
+
+Revision ID: 020_workout_stream_version
+Revises: 019_plan_job_heartbeat
+Create Date: 2026-10-20 04:00:00.000000
+
+workout_streams.version is bumped whenever the samples are replaced
+(workout_stream_service.save) and is part of the streams endpoint ETag.
+Existing rows start at 1.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '020_workout_stream_version'
+down_revision: Union[str, None] = '019_plan_job_heartbeat'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add workout_streams.version."""
+    op.add_column(
+        'workout_streams',
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+    )
+
+
+def downgrade() -> None:
+    """Drop workout_streams.version."""
+    with op.batch_alter_table('workout_streams') as batch_op:
+        batch_op.drop_column('version')
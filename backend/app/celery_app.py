@@ -39,4 +39,9 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.sync_all_users_garmin_health",
         "schedule": crontab(hour=20, minute=0),  # Daily at 8:00 PM (after workout data)
     },
+    # Precompute readiness / overtraining / HRV snapshots after the morning sync
+    "compute-daily-snapshots": {
+        "task": "app.tasks.compute_daily_snapshots",
+        "schedule": crontab(hour=7, minute=30),  # Daily at 7:30 AM
+    },
 }
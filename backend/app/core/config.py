@@ -39,6 +39,19 @@ class Settings(BaseSettings):
     anthropic_api_key: Optional[str] = None
     groq_api_key: Optional[str] = None  # Groq AI for coaching
 
+    # LLM scheduler (see llm_scheduler_service). Concurrency and tokens per
+    # minute are the Groq quota shared by all processes; each process gets
+    # 1/llm_processes of them.
+    llm_model: str = "llama-3.3-70b-versatile"
+    llm_fallback_model: str = "llama-3.1-8b-instant"  # used when the queue is deep
+    llm_max_concurrency: int = 4
+    llm_max_concurrency_per_user: int = 2
+    llm_tokens_per_minute: int = 12000
+    llm_fallback_tokens_per_minute: int = 6000
+    llm_fallback_queue_depth: int = 6
+    llm_queue_timeout_seconds: float = 30.0
+    llm_processes: int = 2  # processes calling Groq (API workers + Celery worker processes)
+
     # Strava Integration
     strava_client_id: Optional[str] = None
     strava_client_secret: Optional[str] = None
@@ -1,6 +1,10 @@
 from sqlalchemy.orm import Session, joinedload
 from . import models, security, schemas
-from typing import List
+from .services.athlete_context_service import athlete_context_service
+from .services.plan_compliance_service import plan_compliance_service
+from .services.training_load_service import training_load_service
+from .services.workout_ingest_service import workout_ingest_service
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
@@ -67,7 +71,10 @@ def create_user(db: Session, user_data: dict) -> models.User:
 
 
 def create_workout(
-    db: Session, user_id: int, workout_data: schemas.WorkoutCreate
+    db: Session,
+    user_id: int,
+    workout_data: schemas.WorkoutCreate,
+    streams: Optional[Dict] = None,
 ) -> models.Workout:
     """Create a new workout record in the database.
 
@@ -75,6 +82,7 @@ def create_workout(
         db: Database session
         user_id: User ID who owns this workout
         workout_data: Pydantic schema with workout details
+        streams: Optional per-sample channels (see workout_stream_service)
 
     Returns:
         Created Workout object with ID assigned
@@ -103,12 +111,28 @@ def create_workout(
     )
 
     db.add(db_workout)
+    workout_ingest_service.process_workout(db, db_workout, streams)
     db.commit()
     db.refresh(db_workout)
 
     return db_workout
 
 
+def delete_workout(db: Session, workout: models.Workout) -> None:
+    """Delete a workout, remove its load from the training load series and
+    re-match the plan week it was counted in.
+
+    Args:
+        db: Database session
+        workout: Workout to delete
+    """
+    user_id, day = workout.user_id, workout.start_time.date()
+    training_load_service.remove_workout(db, workout)
+    athlete_context_service.invalidate(db, user_id)
+    plan_compliance_service.record_workouts(db, user_id, [day])
+    db.commit()
+
+
 def get_workout_by_id(db: Session, workout_id: int) -> models.Workout | None:
     """Get workout by ID.
 
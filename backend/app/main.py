@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.security import HTTPBearer
 from fastapi.exceptions import RequestValidationError
@@ -14,10 +15,12 @@ from slowapi.errors import RateLimitExceeded
 logger = logging.getLogger(__name__)
 
 from . import models
-from .database import engine
+from .database import engine, SessionLocal
 from .routers import auth, workouts, garmin, profile, coach, strava, upload, training_plans, predictions, health, onboarding, integrations, events, overtraining, hrv, race_prediction_enhanced, training_recommendations
 from .core.config import settings
 from .middleware.cors import VercelCORSMiddleware
+from .services.llm_scheduler_service import LLMOverloadedError
+from .services.race_autocomplete_service import race_autocomplete_service
 from .utils.rate_limiter import limiter
 
 # Security validation: SECRET_KEY is validated in config.py during Settings initialization
@@ -93,8 +96,24 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
 
 security = HTTPBearer()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup: warm the in-memory race autocomplete index."""
+    db = SessionLocal()
+    try:
+        race_autocomplete_service.load(db)
+    except Exception as e:
+        # Built lazily on the first suggestion instead (e.g. migrations pending)
+        logger.warning(f"Race autocomplete index not loaded at startup: {e}")
+    finally:
+        db.close()
+    yield
+
+
 # Create FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="RunCoach AI API",
     description="AI-powered sports coaching platform",
     version="0.1.0",
@@ -170,6 +189,16 @@ def health_check() -> dict[str, str]:
     }
 
 
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_handler(request, exc: LLMOverloadedError):
+    """Coach LLM queue full or rate-limited upstream: ask the client to retry."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "AI coach is busy, please retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # Global exception handler for validation errors
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
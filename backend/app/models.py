@@ -8,14 +8,34 @@ from sqlalchemy import (
     ForeignKey,
     JSON,
     Date,
+    LargeBinary,
+    Text,
     UniqueConstraint,
     Index,
+    DDL,
+    event,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
+from typing import Dict, Optional
+import unicodedata
 from .database import Base
 
 
+def fold_text(text: Optional[str]) -> str:
+    """Accent-folded, lowercased, trimmed text (search normalization)."""
+    nfd = unicodedata.normalize("NFD", text or "")
+    return "".join(char for char in nfd if unicodedata.category(char) != "Mn").lower().strip()
+
+
+def event_search_columns(name: Optional[str], location: Optional[str], region: Optional[str]) -> Dict[str, str]:
+    """Event.search_text / search_location for the given fields (also for core inserts)."""
+    return {
+        "search_text": " | ".join(fold_text(part) for part in (name, location, region)),
+        "search_location": " | ".join(fold_text(part) for part in (location, region)),
+    }
+
+
 class User(Base):
     """User model representing registered users in the system.
 
@@ -37,6 +57,8 @@ class User(Base):
         coaching_style: Preferred coaching style (motivator/technical/balanced/custom)
         injuries: JSON array of injury history with dates and descriptions
         preferences: JSON object with training preferences (music, pace, time_of_day, etc)
+        context_version: Bumped when the coach context inputs change (workouts,
+            profile, goals); see AthleteContextSnapshot
     """
 
     __tablename__ = "users"
@@ -88,6 +110,7 @@ class User(Base):
     preferences = Column(
         JSON, nullable=True, default=dict
     )  # {"music": true, "preferred_pace_range": [5, 6], "time_of_day": "evening"}
+    context_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Strava integration fields
     strava_athlete_id = Column(Integer, nullable=True, unique=True)
@@ -170,6 +193,9 @@ class Workout(Base):
         avg_leg_spring_stiffness: Average leg spring stiffness (optional)
         left_right_balance: Left/right foot strike balance % (optional)
 
+        training_stress_score: Training stress (hrTSS, or pace-based rTSS when
+            no heart rate is available); 1 hour at threshold ~= 100
+
         file_name: Original FIT file name
         created_at: When record was created
     """
@@ -206,6 +232,31 @@ class Workout(Base):
         String, nullable=True, default="high"
     )  # high (FIT), medium (GPX with HR), basic (GPX minimal)
 
+    # Training load (see training_load_service)
+    training_stress_score = Column(Float, nullable=True)
+
+    # Elevation and grade from the streams (see grade_service)
+    smoothed_elevation_gain = Column(Float, nullable=True)  # meters
+    graded_distance_meters = Column(Float, nullable=True)  # flat-equivalent distance
+    grade_adjusted_pace = Column(Float, nullable=True)  # seconds per km
+
+    # Seconds per zone from the streams (see zone_time_service)
+    # JSON: {"heart_rate": {"1": 812.0, ...}, "pace": {...}, "power": {...}}
+    time_in_zones = Column(JSON, nullable=True)
+
+    # Columnar per-km / per-mile / per-lap splits (see workout_split_service),
+    # deferred so workout lists don't load them
+    splits = deferred(Column(JSON, nullable=True))
+
+    # GPS bounding box (see track_service); NULL for workouts without GPS
+    min_lat = Column(Float, nullable=True)
+    min_lon = Column(Float, nullable=True)
+    max_lat = Column(Float, nullable=True)
+    max_lon = Column(Float, nullable=True)
+
+    # Repeated route this workout follows (see route_service)
+    route_id = Column(Integer, ForeignKey("routes.id", ondelete="SET NULL"), nullable=True, index=True)
+
     file_name = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -215,10 +266,167 @@ class Workout(Base):
     __table_args__ = (
         Index('ix_workouts_user_id_start_time', 'user_id', 'start_time'),
         Index('ix_workouts_start_time', 'start_time'),
+        # Bounding-box overlap queries ("runs in this area")
+        Index('ix_workouts_user_id_bbox', 'user_id', 'min_lat', 'max_lat', 'min_lon', 'max_lon'),
     )
 
     # Relationships
     user = relationship("User", back_populates="workouts")
+    stream = relationship(
+        "WorkoutStream", back_populates="workout", uselist=False,
+        cascade="all, delete-orphan",
+    )
+    best_efforts = relationship(
+        "BestEffort", back_populates="workout", cascade="all, delete-orphan"
+    )
+    track = relationship(
+        "WorkoutTrack", back_populates="workout", uselist=False,
+        cascade="all, delete-orphan",
+    )
+    route = relationship("Route", back_populates="workouts")
+
+
+class WorkoutStream(Base):
+    """Per-sample time series recorded during a workout.
+
+    Channels are stored together as a compressed NumPy archive (see
+    workout_stream_service) so a workout's samples are one row and one read.
+
+    Attributes:
+        id: Unique identifier (primary key)
+        workout_id: Foreign key to Workout (one stream per workout)
+        sample_count: Number of samples per channel
+        channels: Channel names present in data (time, distance, heart_rate, ...)
+        data: np.savez_compressed archive with one array per channel
+        pyramid: LTTB-downsampled chart series at several resolutions
+            (see stream_pyramid_service)
+        version: Incremented each time the samples are replaced (ETag of
+            the streams endpoint)
+        created_at: When the stream was stored
+
+    data and pyramid are deferred so cache checks and metadata reads don't
+    load the arrays.
+    """
+
+    __tablename__ = "workout_streams"
+
+    id = Column(Integer, primary_key=True, index=True)
+    workout_id = Column(
+        Integer, ForeignKey("workouts.id", ondelete="CASCADE"),
+        nullable=False, unique=True,
+    )
+    sample_count = Column(Integer, nullable=False)
+    channels = Column(JSON, nullable=False, default=list)
+    data = deferred(Column(LargeBinary, nullable=False))
+    pyramid = deferred(Column(LargeBinary, nullable=True))
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    workout = relationship("Workout", back_populates="stream")
+
+
+class WorkoutTrack(Base):
+    """GPS track of a workout as Google encoded polylines.
+
+    Attributes:
+        id: Unique identifier (primary key)
+        workout_id: Foreign key to Workout (one track per workout)
+        point_count: GPS fixes in the full-resolution polyline
+        polyline: Full-resolution encoded polyline
+        simplified: Douglas-Peucker simplified polylines by map zoom,
+            {"16": "...", "13": "...", "10": "..."} (see track_service)
+        created_at: When the track was stored
+    """
+
+    __tablename__ = "workout_tracks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    workout_id = Column(
+        Integer, ForeignKey("workouts.id", ondelete="CASCADE"),
+        nullable=False, unique=True,
+    )
+    point_count = Column(Integer, nullable=False)
+    polyline = deferred(Column(Text, nullable=False))
+    simplified = Column(JSON, nullable=False, default=dict)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    workout = relationship("Workout", back_populates="track")
+
+
+class Route(Base):
+    """A route the user has run more than once (or may run again).
+
+    Fingerprint of the first workout on it (see route_service); later
+    workouts with a matching fingerprint point here via Workout.route_id.
+
+    Attributes:
+        id: Unique identifier (primary key)
+        user_id: Foreign key to User
+        start_cell: Geohash (precision 6) of the start point, lookup key
+        distance_meters: Route length
+        cells: Sorted geohash cells (precision 7) the route passes through
+        created_at: When the route was first seen
+    """
+
+    __tablename__ = "routes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    start_cell = Column(String(12), nullable=False)
+    distance_meters = Column(Float, nullable=False)
+    cells = Column(JSON, nullable=False, default=list)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_routes_user_id_start_cell', 'user_id', 'start_cell', 'distance_meters'),
+    )
+
+    workouts = relationship("Workout", back_populates="route")
+
+
+class BestEffort(Base):
+    """Fastest segment of a standard distance inside a workout.
+
+    Computed at ingest from the distance/time stream, so predictions and
+    personal bests are an indexed lookup instead of a scan over workouts.
+
+    Attributes:
+        id: Unique identifier (primary key)
+        user_id: Foreign key to User
+        workout_id: Foreign key to Workout containing the segment
+        name: Distance label (400m, 1K, 5K, 10K, Half Marathon, Marathon)
+        distance_meters: Segment distance
+        elapsed_seconds: Fastest elapsed time over the distance
+        graded_elapsed_seconds: Flat-equivalent time for the same segment
+            (elapsed * distance / graded distance), None without altitude
+        start_offset_seconds: Segment start, seconds after the workout start
+        achieved_at: Workout start time (for recency filters)
+    """
+
+    __tablename__ = "best_efforts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    workout_id = Column(
+        Integer, ForeignKey("workouts.id", ondelete="CASCADE"),
+        nullable=False, index=True,
+    )
+    name = Column(String, nullable=False)
+    distance_meters = Column(Float, nullable=False)
+    elapsed_seconds = Column(Float, nullable=False)
+    graded_elapsed_seconds = Column(Float, nullable=True)
+    start_offset_seconds = Column(Float, nullable=False)
+    achieved_at = Column(DateTime, nullable=False)
+
+    # Index (user_id, distance_meters, elapsed_seconds) for fastest-per-distance lookups
+    __table_args__ = (
+        Index(
+            'ix_best_efforts_user_distance_elapsed',
+            'user_id', 'distance_meters', 'elapsed_seconds',
+        ),
+    )
+
+    workout = relationship("Workout", back_populates="best_efforts")
 
 
 class ChatMessage(Base):
@@ -251,6 +459,246 @@ class ChatMessage(Base):
     )
 
 
+class ChatSummary(Base):
+    """Rolling summary of a user's older coach conversation.
+
+    Chat prompts send recent messages verbatim and everything up to
+    last_message_id only through this summary (see coach_context_service).
+
+    Attributes:
+        id: Unique identifier (primary key)
+        user_id: Foreign key to User (one summary per user)
+        content: One line per folded turn, oldest first
+        last_message_id: Newest ChatMessage folded into the summary
+        message_count: Number of messages folded so far
+        updated_at: Last time turns were folded
+    """
+
+    __tablename__ = "chat_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True)
+    content = Column(Text, nullable=False, default="")
+    last_message_id = Column(Integer, nullable=False, default=0)
+    message_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class AthleteContextSnapshot(Base):
+    """Pre-formatted athlete context reused by every coach prompt.
+
+    Valid while version matches User.context_version; rebuilt lazily on the
+    next coach request after it changes (see athlete_context_service).
+
+    Attributes:
+        id: Unique identifier (primary key)
+        user_id: Foreign key to User (one snapshot per user)
+        version: User.context_version the snapshot was built from
+        context: Full athlete context text (analysis and plan prompts)
+        profile_lines: Compact profile lines, most important first (chat)
+        training_lines: Compact recent training lines (chat)
+        training_stats: Aggregates of recent training used by plan generation
+        built_at: When the snapshot was built
+    """
+
+    __tablename__ = "athlete_context_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True)
+    version = Column(Integer, nullable=False)
+    context = Column(Text, nullable=False)
+    profile_lines = Column(JSON, nullable=False)
+    training_lines = Column(JSON, nullable=False)
+    training_stats = Column(JSON, nullable=False)
+    built_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class TrainingPlan(Base):
+    """A multi-week training plan (header row; weeks and sessions in their own tables).
+
+    Plans come from two generators with different JSON shapes, recorded in
+    layout so the API returns them as they were created (plan_store_service):
+    "workouts" (week / workouts / numeric day, /training-plans) and "days"
+    (week_number / days / weekday name, /coach/plan).
+
+    Attributes:
+        id: Unique identifier (primary key)
+        external_id: Public plan id used by the API ("plan_20261019_...")
+        user_id: Foreign key to User
+        name: Plan name
+        layout: JSON shape of the plan, "workouts" or "days"
+        status: active / paused / completed
+        goal_type: Goal (5k, 10k, half_marathon, marathon, ...)
+        goal_date: Target date of the goal
+        total_weeks: Number of weeks
+        current_week: Week the athlete is on
+        start_date: First day of week 1
+        adaptation_count: Times the plan was adapted
+        details: Remaining generator output (goal, tips, summary, ...)
+        created_at: When the plan was created
+        adapted_at: Last adaptation
+        status_updated_at: Last status change
+    """
+
+    __tablename__ = "training_plans"
+
+    id = Column(Integer, primary_key=True, index=True)
+    external_id = Column(String(50), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String, nullable=False)
+    layout = Column(String(10), nullable=False, default="workouts")
+    status = Column(String(20), nullable=False, default="active")
+    goal_type = Column(String, nullable=True)
+    goal_date = Column(DateTime, nullable=True)
+    total_weeks = Column(Integer, nullable=False)
+    current_week = Column(Integer, nullable=False, default=1)
+    start_date = Column(DateTime, nullable=True)
+    adaptation_count = Column(Integer, nullable=False, default=0)
+    details = Column(JSON, nullable=False, default=dict)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    adapted_at = Column(DateTime, nullable=True)
+    status_updated_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "external_id", name="uix_user_training_plan"),
+        Index("ix_training_plans_user_status", "user_id", "status"),
+    )
+
+
+class TrainingPlanWeek(Base):
+    """One week of a TrainingPlan.
+
+    Attributes:
+        id: Unique identifier (primary key)
+        plan_id: Foreign key to TrainingPlan
+        week: 1-based week number (position in the plan)
+        focus: Focus of the week ("Base aeróbica", ...)
+        total_km: Planned volume (km) as stated by the generator
+        details: Remaining keys of the generated week
+        planned_sessions: Training sessions planned (rest days excluded)
+        completed_sessions: Planned sessions matched to a workout
+        planned_km: Sum of the planned session distances
+        actual_km: Distance of all runs in the week
+        actual_runs: Number of runs in the week
+        intensity_delta: Mean relative pace delta of matched sessions with a
+            pace target (> 0 = faster than planned), None without targets
+        compliance_updated_at: Last compliance refresh (None = never computed)
+    """
+
+    __tablename__ = "training_plan_weeks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    plan_id = Column(Integer, ForeignKey("training_plans.id", ondelete="CASCADE"), nullable=False)
+    week = Column(Integer, nullable=False)
+    focus = Column(String, nullable=True)
+    total_km = Column(Float, nullable=True)
+    details = Column(JSON, nullable=False, default=dict)
+
+    # Compliance (plan_compliance_service)
+    planned_sessions = Column(Integer, nullable=False, default=0)
+    completed_sessions = Column(Integer, nullable=False, default=0)
+    planned_km = Column(Float, nullable=False, default=0.0)
+    actual_km = Column(Float, nullable=False, default=0.0)
+    actual_runs = Column(Integer, nullable=False, default=0)
+    intensity_delta = Column(Float, nullable=True)
+    compliance_updated_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("plan_id", "week", name="uix_plan_week"),
+    )
+
+
+class PlannedWorkout(Base):
+    """A session of a TrainingPlan week.
+
+    Attributes:
+        id: Unique identifier (primary key)
+        plan_id: Foreign key to TrainingPlan
+        week: 1-based week number
+        day: 1-based day of the week (Monday = 1 for weekday names)
+        position: Order of the session within its week
+        day_label: Original day value when not a number ("Lunes")
+        workout_type: easy_run, tempo_run, long_run, ...
+        name: Session name
+        distance_km: Planned distance (km)
+        duration_minutes: Planned duration (minutes)
+        pace_target: Pace target text ("5:30-6:00 min/km")
+        details: Remaining keys of the generated session (notes, zones, ...)
+        workout_id: Workout matched to the session (plan_compliance_service)
+    """
+
+    __tablename__ = "planned_workouts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    plan_id = Column(Integer, ForeignKey("training_plans.id", ondelete="CASCADE"), nullable=False)
+    week = Column(Integer, nullable=False)
+    day = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+    day_label = Column(String, nullable=True)
+    workout_type = Column(String, nullable=True)
+    name = Column(String, nullable=True)
+    distance_km = Column(Float, nullable=True)
+    duration_minutes = Column(Float, nullable=True)
+    pace_target = Column(String, nullable=True)
+    details = Column(JSON, nullable=False, default=dict)
+    workout_id = Column(Integer, ForeignKey("workouts.id", ondelete="SET NULL"), nullable=True)
+
+    __table_args__ = (
+        Index("ix_planned_workouts_plan_week_day", "plan_id", "week", "day"),
+    )
+
+
+class PlanGenerationJob(Base):
+    """Background generation of an AI training plan (plan_job_service).
+
+    A job is created per POST /training-plans/generate and run by a Celery
+    worker. While queued or running, active_key holds "<user_id>:<request_hash>"
+    so identical requests attach to the same job; it is cleared when the job
+    finishes.
+
+    Attributes:
+        id: Unique identifier (primary key), the job id returned to clients
+        user_id: Foreign key to User
+        request_hash: SHA-256 of the normalized goal and weeks
+        active_key: Dedup key while queued/running, None once finished
+        status: queued / running / succeeded / failed
+        progress: 0-100
+        goal: Goal dict passed to the plan generator
+        weeks: Plan length in weeks
+        provisional_plan: Deterministic template plan served while generating
+        plan_id: Id of the stored AI plan (succeeded jobs)
+        error: Failure reason (failed jobs)
+        attempts: Generation attempts (retried when the LLM is overloaded)
+        created_at: When the job was submitted
+        started_at: When a worker first picked it up
+        heartbeat_at: Last sign of life from the worker running it
+        finished_at: When it succeeded or failed
+    """
+
+    __tablename__ = "plan_generation_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    active_key = Column(String(80), nullable=True, unique=True)
+    status = Column(String(20), nullable=False, default="queued")
+    progress = Column(Integer, nullable=False, default=0)
+    goal = Column(JSON, nullable=False)
+    weeks = Column(Integer, nullable=False)
+    provisional_plan = Column(JSON, nullable=False)
+    plan_id = Column(String(50), nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_plan_generation_jobs_user_hash", "user_id", "request_hash"),
+    )
+
+
 class HealthMetric(Base):
     """Daily health and wellness metrics from various sources.
 
@@ -302,6 +750,7 @@ class HealthMetric(Base):
         source: Data source (garmin, apple_health, google_fit, strava, polar, whoop, oura, manual)
         data_quality: Quality indicator (high, medium, basic)
         created_at: Timestamp when record was created
+        updated_at: Timestamp of the last change (drives snapshot freshness)
     """
 
     __tablename__ = "health_metrics"
@@ -351,6 +800,9 @@ class HealthMetric(Base):
     source = Column(String, nullable=False, default="manual")
     data_quality = Column(String, nullable=False, default="basic")
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True
+    )
 
     # Composite indexes for common query patterns
     # UniqueConstraint already creates an index on (user_id, date), but we add explicit indexes
@@ -361,6 +813,135 @@ class HealthMetric(Base):
     )
 
 
+class MetricBaseline(Base):
+    """Incrementally maintained baseline state for a recovery metric.
+
+    One row per user and metric (hrv_ms, resting_hr_bpm). Updated whenever a
+    HealthMetric row carrying that metric is inserted or updated, so analyzers
+    can read baselines with a single indexed lookup instead of re-scanning history.
+
+    Attributes:
+        id: Unique identifier (primary key)
+        user_id: Foreign key to User
+        metric: HealthMetric column name this baseline tracks
+        last_date: Date of the most recent observation
+        ewma: Exponentially weighted moving average including last_date
+        mean_7d / std_7d / count_7d: Rolling 7-day statistics ending at last_date
+        mean_28d / std_28d / count_28d: Rolling 28-day statistics ending at last_date
+        mean_60d / std_60d / count_60d: Rolling 60-day statistics ending at last_date,
+            excluding its last 7 days (the 7-day window)
+        window: Last 60 days of observations {"YYYY-MM-DD": [value, ewma]}
+        anchor_date: Date of the newest observation evicted from the window
+        anchor_ewma: EWMA value at anchor_date (seed for replaying the window)
+        updated_at: When the state last changed
+    """
+
+    __tablename__ = "metric_baselines"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    metric = Column(String, nullable=False)
+    last_date = Column(Date, nullable=True)
+    ewma = Column(Float, nullable=True)
+
+    mean_7d = Column(Float, nullable=True)
+    std_7d = Column(Float, nullable=True)
+    count_7d = Column(Integer, nullable=False, default=0)
+    mean_28d = Column(Float, nullable=True)
+    std_28d = Column(Float, nullable=True)
+    count_28d = Column(Integer, nullable=False, default=0)
+    mean_60d = Column(Float, nullable=True)
+    std_60d = Column(Float, nullable=True)
+    count_60d = Column(Integer, nullable=False, default=0)
+
+    window = Column(JSON, nullable=False, default=dict)
+    anchor_date = Column(Date, nullable=True)
+    anchor_ewma = Column(Float, nullable=True)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "metric", name="uix_user_metric_baseline"),
+    )
+
+
+class TrainingLoadDay(Base):
+    """Daily fitness/fatigue/form series derived from workout stress scores.
+
+    One dense row per user and day from the first workout onwards, maintained
+    incrementally by training_load_service when workouts are added or removed.
+
+    Attributes:
+        id: Unique identifier (primary key)
+        user_id: Foreign key to User
+        date: Calendar day
+        load: Sum of training_stress_score for workouts on this day
+        ctl: Chronic training load (fitness, 42-day EWMA of load)
+        atl: Acute training load (fatigue, 7-day EWMA of load)
+        tsb: Training stress balance (form, previous day's ctl - atl)
+    """
+
+    __tablename__ = "training_load_days"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    date = Column(Date, nullable=False)
+    load = Column(Float, nullable=False, default=0.0)
+    ctl = Column(Float, nullable=False, default=0.0)
+    atl = Column(Float, nullable=False, default=0.0)
+    tsb = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "date", name="uix_user_date_training_load"),
+    )
+
+
+class DailySnapshot(Base):
+    """Precomputed daily readiness, overtraining risk and HRV status.
+
+    Written nightly for every active user (Celery beat) and refreshed on read
+    when the user's data changed since it was computed. Historical rows are
+    backfilled from HealthMetric in one vectorized pass and carry readiness
+    and HRV ratio status only.
+
+    Attributes:
+        id: Unique identifier (primary key)
+        user_id: Foreign key to User
+        date: Day the snapshot describes
+        readiness_score: 0-100 readiness score
+        readiness_confidence: low / medium / high
+        readiness: Full readiness payload (factors, recommendation)
+        hrv_status: HRV status summary (None if not enough HRV data)
+        overtraining_risk_score: 0-100 risk from the 30-day assessment
+        overtraining_status: healthy / caution / warning / critical
+        overtraining: Full assessments keyed by analysis days {"14": {...}, "30": {...}}
+        data_version: Fingerprint of the inputs; None for backfilled history
+        computed_at: When the snapshot was computed
+    """
+
+    __tablename__ = "daily_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    date = Column(Date, nullable=False)
+
+    readiness_score = Column(Integer, nullable=True)
+    readiness_confidence = Column(String, nullable=True)
+    readiness = Column(JSON, nullable=True)
+    hrv_status = Column(JSON, nullable=True)
+    overtraining_risk_score = Column(Float, nullable=True)
+    overtraining_status = Column(String, nullable=True)
+    overtraining = Column(JSON, nullable=True)
+
+    data_version = Column(String, nullable=True)
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "date", name="uix_user_date_snapshot"),
+    )
+
+
 class Event(Base):
     """Event model representing running races and events.
 
@@ -381,6 +962,11 @@ class Event(Base):
         price_eur: Registration price in euros (optional)
         source: Data source (official/api/manual/user_submitted)
         verified: Whether the event is verified (admin-approved)
+        search_text: Folded name | location | region (maintained on write)
+        search_location: Folded location | region (maintained on write)
+        latitude: Latitude of the venue (given, or resolved from the gazetteer)
+        longitude: Longitude of the venue
+        geo_cell: Geohash cell of the coordinates (radius search index)
         created_at: When the event was added
         updated_at: Last update timestamp
     """
@@ -403,6 +989,11 @@ class Event(Base):
     price_eur = Column(Float, nullable=True)
     source = Column(String, nullable=False, default="official")
     verified = Column(Boolean, nullable=False, default=True)
+    search_text = Column(String, nullable=True)
+    search_location = Column(String, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geo_cell = Column(String(12), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
@@ -411,7 +1002,53 @@ class Event(Base):
     # Composite indexes for common query patterns
     # Index (date, verified) for queries filtering future verified events
     # Index (country, date) for location-based searches
+    # Index (geo_cell, date) for radius searches within a date window
+    # Text indexes on the search columns are dialect specific (EVENT_SEARCH_DDL)
     __table_args__ = (
         Index('ix_events_date_verified', 'date', 'verified'),
         Index('ix_events_country_date', 'country', 'date'),
+        Index('ix_events_geo_cell_date', 'geo_cell', 'date'),
     )
+
+    def refresh_search_columns(self) -> None:
+        """Recompute the folded search columns from name, location and region."""
+        for column, value in event_search_columns(self.name, self.location, self.region).items():
+            setattr(self, column, value)
+
+
+@event.listens_for(Event, "before_insert")
+@event.listens_for(Event, "before_update")
+def _event_search_columns(mapper, connection, target: Event) -> None:
+    target.refresh_search_columns()
+
+
+# Substring indexes over the search columns: pg_trgm GIN indexes on
+# PostgreSQL, an external-content FTS5 trigram table kept in sync by
+# triggers on SQLite (rowid = events.id). Migration 017 runs a frozen copy.
+EVENT_SEARCH_DDL = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_events_search_text_trgm ON events USING gin (search_text gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_events_search_location_trgm ON events USING gin (search_location gin_trgm_ops)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+        "search_text, search_location, content='events', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS events_fts_ai AFTER INSERT ON events BEGIN "
+        "INSERT INTO events_fts(rowid, search_text, search_location) "
+        "VALUES (new.id, new.search_text, new.search_location); END",
+        "CREATE TRIGGER IF NOT EXISTS events_fts_ad AFTER DELETE ON events BEGIN "
+        "INSERT INTO events_fts(events_fts, rowid, search_text, search_location) "
+        "VALUES ('delete', old.id, old.search_text, old.search_location); END",
+        "CREATE TRIGGER IF NOT EXISTS events_fts_au AFTER UPDATE ON events BEGIN "
+        "INSERT INTO events_fts(events_fts, rowid, search_text, search_location) "
+        "VALUES ('delete', old.id, old.search_text, old.search_location); "
+        "INSERT INTO events_fts(rowid, search_text, search_location) "
+        "VALUES (new.id, new.search_text, new.search_location); END",
+    ],
+}
+
+for _dialect, _statements in EVENT_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Event.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+event.listen(Event.__table__, "after_drop", DDL("DROP TABLE IF EXISTS events_fts").execute_if(dialect="sqlite"))
@@ -10,7 +10,11 @@ from datetime import datetime
 from app import models, security, schemas
 from app.database import get_db
 from app.core.config import settings
+from app.services.athlete_context_service import athlete_context_service
+from app.services.coach_context_service import coach_context_service
 from app.services.coach_service import get_coach_service
+from app.services.llm_scheduler_service import LLMOverloadedError
+from app.services.plan_store_service import plan_store_service
 from app.utils.rate_limiter import limiter
 from app.dependencies.auth import get_current_user
 
@@ -65,34 +69,26 @@ def analyze_workout(
             detail="Workout not found"
         )
     
-    # Get recent workouts for context (last 10)
-    # Use eager loading to prevent potential N+1 queries if workout.user is accessed
-    recent_workouts = (
-        db.query(models.Workout)
-        .filter(models.Workout.user_id == current_user.id)
-        .options(joinedload(models.Workout.user))  # Eager load user relationship
-        .order_by(models.Workout.start_time.desc())
-        .limit(10)
-        .all()
-    )
-    
     # Ensure user has max_heart_rate for zone calculation
     if not current_user.max_heart_rate and workout.max_heart_rate:
         # Auto-set max HR from workout if not configured
         current_user.max_heart_rate = workout.max_heart_rate
+        athlete_context_service.invalidate(db, current_user.id)
         db.commit()
     
     try:
-        # Call AI coach service
+        # Call AI coach service (recent training comes from the athlete
+        # context snapshot)
         analysis_result = _get_coach_service().analyze_workout(
             workout=workout,
             user=current_user,
-            recent_workouts=recent_workouts,
             db=db
         )
         
         return analysis_result
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -162,25 +158,12 @@ def generate_training_plan(
         Dict with complete training plan organized by weeks and days
     """
     try:
-        # Get recent workouts for context with eager loading to prevent N+1 queries
-        recent_workouts = db.query(models.Workout).filter(
-            models.Workout.user_id == current_user.id
-        ).options(joinedload(models.Workout.user)).order_by(models.Workout.start_time.desc()).limit(20).all()
-        
         plan = _get_coach_service().generate_personalized_training_plan(
             user=current_user,
-            recent_workouts=recent_workouts,
             plan_request=request,
             db=db
         )
         
-        # SAVE PLAN to user preferences
-        if not current_user.preferences:
-            current_user.preferences = {}
-        
-        if "training_plans" not in current_user.preferences:
-            current_user.preferences["training_plans"] = []
-        
         # Add metadata with ISO strings for JSON serialization
         from datetime import datetime
         plan["plan_id"] = plan.get("id", f"plan_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
@@ -190,13 +173,16 @@ def generate_training_plan(
         plan["created_at"] = datetime.now().isoformat()
         plan["status"] = "active"
         
-        current_user.preferences["training_plans"].append(plan)
+        # SAVE PLAN
+        plan_store_service.create(db, current_user.id, plan)
         db.commit()
         
         logger.info(f"✅ Training plan saved for user {current_user.id}")
         
         return {"plan": plan, "success": True, "message": "Plan created and saved successfully"}
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         logger.error(f"❌ Error generating plan: {str(e)}")
         raise HTTPException(
@@ -215,9 +201,7 @@ def list_training_plans(
     db: Session = Depends(get_db)
 ):
     """List all training plans for the current user."""
-    plans = []
-    if current_user.preferences and "training_plans" in current_user.preferences:
-        plans = current_user.preferences["training_plans"]
+    plans = plan_store_service.serialize(db, plan_store_service.list_plans(db, current_user.id))
     
     return {
         "plans": plans,
@@ -232,13 +216,7 @@ def get_training_plan(
     db: Session = Depends(get_db)
 ):
     """Get a specific training plan by ID."""
-    if not current_user.preferences or "training_plans" not in current_user.preferences:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No training plans found"
-        )
-    
-    plan = next((p for p in current_user.preferences["training_plans"] if p.get("id") == plan_id), None)
+    plan = plan_store_service.get_plan(db, current_user.id, plan_id)
     if not plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -246,7 +224,7 @@ def get_training_plan(
         )
     
     return {
-        "plan": plan,
+        "plan": plan_store_service.to_dict(db, plan),
         "success": True
     }
 
@@ -331,32 +309,14 @@ def chat_with_coach(
     Returns:
         ChatResponse with assistant reply and conversation metadata
     """
-    # Get conversation history (last 20 messages for context)
-    conversation_history = db.query(models.ChatMessage).filter(
-        models.ChatMessage.user_id == current_user.id
-    ).order_by(models.ChatMessage.created_at.desc()).limit(20).all()
-    
-    # Reverse to chronological order
-    conversation_history = list(reversed(conversation_history))
-    
-    # Get recent workouts for context
-    # Use eager loading to prevent potential N+1 queries if workout.user is accessed
-    recent_workouts = (
-        db.query(models.Workout)
-        .filter(models.Workout.user_id == current_user.id)
-        .options(joinedload(models.Workout.user))  # Eager load user relationship
-        .order_by(models.Workout.start_time.desc())
-        .limit(10)
-        .all()
-    )
-    
+    # Conversation history is read by the context assembler (only messages
+    # newer than the rolling summary); profile and recent training come from
+    # the athlete context snapshot
     try:
         # Get AI response
         chat_result = _get_coach_service().chat_with_coach(
             user=current_user,
             user_message=message.message,
-            conversation_history=conversation_history,
-            recent_workouts=recent_workouts,
             db=db
         )
         
@@ -400,6 +360,9 @@ def chat_with_coach(
             conversation_length=chat_result["conversation_length"]
         )
         
+    except LLMOverloadedError:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -453,6 +416,7 @@ def clear_chat_history(
     db.query(models.ChatMessage).filter(
         models.ChatMessage.user_id == current_user.id
     ).delete()
+    coach_context_service.clear(db, current_user.id)
     db.commit()
     
     return None
@@ -497,6 +461,8 @@ def analyze_workout_deep(
             workout=workout
         )
         return analysis
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -2,19 +2,25 @@
 events.py - Endpoints for running events and races
 """
 
-from fastapi import APIRouter, Depends, Query, HTTPException, status, Response
+from fastapi import APIRouter, Depends, Query, HTTPException, status, Response, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional, List
-from datetime import datetime
+from datetime import date, datetime
 
 from app import models, schemas
 from app import security
 from app.database import get_db
 from app.services.events_service import EventsService
+from app.services.event_geo_service import event_geo_service
+from app.services.event_import_service import MAX_IMPORT_BYTES, event_import_service, parse_calendar
+from app.services.race_autocomplete_service import race_autocomplete_service
 from app.dependencies.auth import get_current_user
 
 router = APIRouter(prefix="/api/v1/events", tags=["Events"])
 
+# Largest radius accepted by /races/nearby
+MAX_NEARBY_RADIUS_KM = 300
+
 
 @router.get("/races/search", response_model=Dict[str, Any])
 def search_races(
@@ -68,6 +74,102 @@ def search_races(
         )
 
 
+@router.get("/races/suggest", response_model=Dict[str, Any])
+def suggest_races(
+    q: str = Query(..., min_length=1, max_length=100, description="Typed prefix (name, location, region)"),
+    limit: int = Query(8, ge=1, le=20, description="Max suggestions"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Autocomplete upcoming races as the user types.
+
+    Served from an in-memory prefix index (no DB query per keystroke).
+    Matches the start of any word of the name, location or region, ignoring
+    accents and case; ranked by popularity and date.
+    """
+    try:
+        races = race_autocomplete_service.suggest(db, q, limit=limit)
+        return {"success": True, "query": q, "count": len(races), "races": races}
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error suggesting races: {str(e)}",
+        )
+
+
+@router.get("/races/nearby", response_model=Dict[str, Any])
+def search_nearby_races(
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitude of the center"),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Longitude of the center"),
+    near: Optional[str] = Query(None, max_length=100, description="Place name instead of lat/lon"),
+    radius_km: float = Query(50, gt=0, le=MAX_NEARBY_RADIUS_KM, description="Search radius in km"),
+    date_from: Optional[date] = Query(None, description="From date (default today)"),
+    date_to: Optional[date] = Query(None, description="To date"),
+    min_distance: Optional[float] = Query(None, description="Minimum distance in km"),
+    max_distance: Optional[float] = Query(None, description="Maximum distance in km"),
+    limit: int = Query(20, ge=1, le=100, description="Max results"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Find upcoming races within a radius, nearest first.
+
+    The center is given as lat/lon or as a place name (`near=Getafe`),
+    resolved with the bundled gazetteer. Races without known coordinates
+    are not included.
+    """
+    if (lat is None) != (lon is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="lat and lon must be given together",
+        )
+    if lat is None:
+        if not near:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Give lat and lon, or near",
+            )
+        center = event_geo_service.resolve(near)
+        if center is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Unknown place: {near}",
+            )
+        lat, lon = center
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_to must not be before date_from",
+        )
+
+    try:
+        events_service = EventsService(db)
+        races = events_service.search_nearby(
+            latitude=lat,
+            longitude=lon,
+            radius_km=radius_km,
+            date_from=date_from,
+            date_to=date_to,
+            min_distance=min_distance,
+            max_distance=max_distance,
+            limit=limit,
+        )
+
+        return {
+            "success": True,
+            "center": {"latitude": lat, "longitude": lon},
+            "radius_km": radius_km,
+            "count": len(races),
+            "races": races,
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching nearby races: {str(e)}",
+        )
+
+
 @router.get("/races/upcoming", response_model=Dict[str, Any])
 def get_upcoming_races(
     weeks: int = Query(12, ge=1, le=52, description="Weeks ahead to search"),
@@ -192,6 +294,49 @@ def create_race(
         )
 
 
+@router.post("/admin/races/import", response_model=Dict[str, Any])
+def import_races(
+    file: UploadFile = File(..., description="Race calendar (.csv with a header row, or .json)"),
+    verified: Optional[bool] = Query(None, description="Force the verified flag of every row"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Bulk import a race calendar, upserting on external_id (admin only).
+
+    Columns / keys are those of a single race (external_id, name, location,
+    date, distance_km, ...). Re-importing the same file changes nothing.
+    Files over MAX_IMPORT_BYTES are rejected with 413.
+    Returns inserted / updated / unchanged / skipped counts and row errors.
+    """
+    security.require_admin(current_user)
+    too_large = HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"Calendar file exceeds {MAX_IMPORT_BYTES // (1024 * 1024)} MB",
+    )
+    if file.size is not None and file.size > MAX_IMPORT_BYTES:
+        raise too_large
+    # The size may be unknown (chunked upload): never read past the limit
+    content = file.file.read(MAX_IMPORT_BYTES + 1)
+    if len(content) > MAX_IMPORT_BYTES:
+        raise too_large
+
+    filename = (file.filename or "").lower()
+    file_format = "json" if filename.endswith(".json") or file.content_type == "application/json" else "csv"
+    try:
+        rows = parse_calendar(content, file_format)
+        report = event_import_service.import_rows(db, rows, verified=verified)
+        return {"success": True, **report}
+
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error importing races: {str(e)}",
+        )
+
+
 @router.get("/admin/races", response_model=List[schemas.EventOut])
 def list_all_races(
     skip: int = Query(0, ge=0),
@@ -2,7 +2,7 @@
 Health Metrics Router
 Endpoints for syncing and managing health/wellness data
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, datetime, timedelta
@@ -14,6 +14,8 @@ from ..services.garmin_health_service import garmin_health_service
 from ..services.google_fit_service import google_fit_service
 from ..services.apple_health_service import apple_health_service
 from ..services.coach_service import get_coach_service
+from ..services.baseline_service import baseline_service
+from ..services.daily_snapshot_service import daily_snapshot_service
 from ..dependencies.auth import get_current_user
 
 
@@ -68,6 +70,16 @@ class ReadinessResponse(BaseModel):
     should_train_hard: Optional[bool]
 
 
+class ReadinessHistoryPoint(BaseModel):
+    """Daily readiness snapshot."""
+    date: date
+    readiness_score: Optional[int]
+    confidence: Optional[str]
+    hrv_recovery_status: Optional[str]
+    overtraining_risk_score: Optional[float]
+    overtraining_status: Optional[str]
+
+
 class WorkoutRecommendationResponse(BaseModel):
     """Complete workout recommendation with health context."""
     readiness: ReadinessResponse
@@ -142,6 +154,7 @@ async def create_manual_health_metric(
         for key, value in data.dict(exclude_unset=True).items():
             if key != "date":
                 setattr(existing, key, value)
+        baseline_service.update_for_metrics(db, current_user.id, [existing])
         db.commit()
         db.refresh(existing)
         return existing
@@ -155,6 +168,7 @@ async def create_manual_health_metric(
     )
     
     db.add(metric)
+    baseline_service.update_for_metrics(db, current_user.id, [metric])
     db.commit()
     db.refresh(metric)
     
@@ -171,17 +185,39 @@ async def get_readiness_score(
     
     Calculates a 0-100 score based on HRV, sleep, stress, and other health metrics.
     """
-    # Get today's health metrics
-    health = db.query(models.HealthMetric).filter(
-        models.HealthMetric.user_id == current_user.id,
-        models.HealthMetric.date == date.today()
-    ).first()
+    # Served from today's snapshot; recomputed only when new data arrived
+    snapshot = daily_snapshot_service.get_current(db, current_user)
     
-    # Calculate readiness
-    coach_service = get_coach_service()
-    readiness = coach_service.calculate_readiness_score(health, current_user)
+    return snapshot.readiness
+
+
+@router.get("/readiness/history", response_model=List[ReadinessHistoryPoint])
+async def get_readiness_history(
+    days: int = Query(30, ge=1, le=365, description="Days of history"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get daily readiness history from precomputed snapshots.
     
-    return readiness
+    Historical days carry readiness and HRV status; overtraining risk is
+    available from the day nightly snapshots started.
+    """
+    end_date = date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    snapshots = daily_snapshot_service.get_history(db, current_user.id, start_date, end_date)
+    
+    return [
+        ReadinessHistoryPoint(
+            date=s.date,
+            readiness_score=s.readiness_score,
+            confidence=s.readiness_confidence,
+            hrv_recovery_status=(s.hrv_status or {}).get("recovery_status"),
+            overtraining_risk_score=s.overtraining_risk_score,
+            overtraining_status=s.overtraining_status,
+        )
+        for s in snapshots
+    ]
 
 
 @router.get("/recommendation", response_model=WorkoutRecommendationResponse)
@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models
 from app.services.hrv_analysis_service import hrv_analysis_service
+from app.services.daily_snapshot_service import daily_snapshot_service
 from app.dependencies.auth import get_current_user
 
 
@@ -157,40 +158,13 @@ def get_hrv_status(
     **Requires authentication**
     """
     try:
-        full_analysis = hrv_analysis_service.analyze_hrv_trends(
-            user_id=current_user.id,
-            db=db,
-            analysis_days=14
-        )
+        # Served from today's snapshot; recomputed only when new data arrived
+        snapshot = daily_snapshot_service.get_current(db, current_user)
         
-        if full_analysis.get("status") != "analyzed":
+        if snapshot.hrv_status is None:
             raise ValueError("Insufficient HRV data available")
         
-        recovery_status = full_analysis["current_status"]["recovery_status"]
-        vs_baseline = full_analysis["current_status"]["vs_baseline_percentage"]
-        trend = full_analysis["trend_analysis"]["direction"]
-        fatigue_score = full_analysis["current_status"]["fatigue_score"]
-        
-        # Map fatigue score to 1-10 scale
-        fatigue_level = max(1, min(10, int((fatigue_score / 100) * 10)))
-        
-        # Action recommendations
-        actions = {
-            "excellent": "✅ Ready for hard training",
-            "good": "✅ Ready for normal training",
-            "adequate": "⚠️ Moderate intensity only",
-            "compromised": "⚠️ Recovery day recommended",
-            "critical": "🛑 Rest or very light activity"
-        }
-        
-        return {
-            "recovery_status": recovery_status,
-            "vs_baseline_percent": vs_baseline,
-            "trend": trend,
-            "fatigue_level": fatigue_level,  # 1-10
-            "action": actions.get(recovery_status, "Consult full analysis"),
-            "full_analysis_recommended": fatigue_level >= 7
-        }
+        return snapshot.hrv_status
         
     except Exception as e:
         raise HTTPException(
@@ -10,6 +10,10 @@ from typing import Optional
 from app.database import get_db
 from app import models
 from app.services.overtraining_detector_service import overtraining_detector
+from app.services.daily_snapshot_service import (
+    daily_snapshot_service,
+    OVERTRAINING_ANALYSIS_DAYS,
+)
 from app.dependencies.auth import get_current_user
 
 
@@ -89,6 +93,11 @@ def get_overtraining_risk(
     **Requires authentication**
     """
     try:
+        # Standard windows are served from today's snapshot
+        if days in OVERTRAINING_ANALYSIS_DAYS:
+            snapshot = daily_snapshot_service.get_current(db, current_user)
+            return snapshot.overtraining[str(days)]
+        
         result = overtraining_detector.detect_overtraining_risk(
             user_id=current_user.id,
             db=db,
@@ -127,11 +136,8 @@ def get_recovery_status(
     **Requires authentication**
     """
     try:
-        full_assessment = overtraining_detector.detect_overtraining_risk(
-            user_id=current_user.id,
-            db=db,
-            analysis_days=14  # Shorter window for daily checks
-        )
+        snapshot = daily_snapshot_service.get_current(db, current_user)
+        full_assessment = snapshot.overtraining["14"]  # Shorter window for daily checks
         
         risk_score = full_assessment["risk_score"]
         
@@ -190,11 +196,8 @@ def get_daily_alert(
     **Requires authentication**
     """
     try:
-        assessment = overtraining_detector.detect_overtraining_risk(
-            user_id=current_user.id,
-            db=db,
-            analysis_days=14
-        )
+        snapshot = daily_snapshot_service.get_current(db, current_user)
+        assessment = snapshot.overtraining["14"]
         
         status_val = assessment["status"]
         
@@ -1,22 +1,24 @@
 """
 Race Predictions Router
 
-Endpoints for predicting race times using VDOT and Riegel formulas.
+Endpoints for predicting race times using Jack Daniels VDOT tables.
 Also provides training pace zones based on current fitness.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 from app.database import get_db
 from app import models
-from app.services.race_predictor_service import RacePredictorService
+from app.services.race_predictor_service import race_predictor_service
 from app.dependencies.auth import get_current_user
 
 router = APIRouter(prefix="/api/v1/predictions", tags=["predictions"])
-race_predictor_service = RacePredictorService()
+
+# Most VDOTs per batch request
+MAX_BATCH_VDOTS = 500
 
 
 # ==================== Schemas ====================
@@ -128,6 +130,7 @@ class VDOTResponse(BaseModel):
     vdot: float
     vo2max_equivalent: float
     fitness_level: str  # beginner, intermediate, advanced, competitive, elite
+    equivalent_times_minutes: dict[str, float]  # Same VDOT over each standard distance
 
 
 class VDOTCalculateRequest(BaseModel):
@@ -137,6 +140,60 @@ class VDOTCalculateRequest(BaseModel):
     time_seconds: float = Field(..., ge=1.0, le=36000.0, description="Time in seconds")
 
 
+class BatchPredictionsRequest(BaseModel):
+    """Request schema for batch VDOT predictions."""
+    
+    vdots: List[float] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BATCH_VDOTS,
+        description="VDOT scores (clamped to 30-85)"
+    )
+
+
+class BatchPredictionsResponse(BaseModel):
+    """Race times and training paces for many VDOTs, lists aligned with vdots."""
+    
+    success: bool
+    vdots: List[float]
+    times_minutes: dict[str, List[float]]
+    training_paces_min_km: dict[str, List[float]]
+
+
+def _vdot_response(distance_km: float, time_minutes: float) -> VDOTResponse:
+    """VDOT, fitness level and equivalent times of one performance."""
+    vdot = race_predictor_service._calculate_vdot(
+        distance_km=distance_km,
+        time_minutes=time_minutes
+    )
+    
+    # Determine fitness level
+    if vdot < 35:
+        fitness_level = "beginner"
+    elif vdot < 45:
+        fitness_level = "intermediate"
+    elif vdot < 55:
+        fitness_level = "advanced"
+    elif vdot < 65:
+        fitness_level = "competitive"
+    else:
+        fitness_level = "elite"
+    
+    # VO2max approximation (VDOT ≈ VO2max for most runners)
+    vo2max = vdot * 1.05  # Slight adjustment for typical running economy
+    
+    return VDOTResponse(
+        success=True,
+        vdot=round(vdot, 1),
+        vo2max_equivalent=round(vo2max, 1),
+        fitness_level=fitness_level,
+        equivalent_times_minutes={
+            name: round(race_predictor_service.equivalent_time(vdot, name), 2)
+            for name in race_predictor_service.RACE_DISTANCES
+        }
+    )
+
+
 # ==================== Endpoints ====================
 
 @router.post("/vdot", response_model=VDOTResponse)
@@ -162,35 +219,7 @@ def calculate_vdot_post(
     """
     try:
         # Convert meters to km and seconds to minutes
-        distance_km = request.distance / 1000.0
-        time_minutes = request.time_seconds / 60.0
-        
-        vdot = race_predictor_service._calculate_vdot(
-            distance_km=distance_km,
-            time_minutes=time_minutes
-        )
-        
-        # Determine fitness level
-        if vdot < 35:
-            fitness_level = "beginner"
-        elif vdot < 45:
-            fitness_level = "intermediate"
-        elif vdot < 55:
-            fitness_level = "advanced"
-        elif vdot < 65:
-            fitness_level = "competitive"
-        else:
-            fitness_level = "elite"
-        
-        # VO2max approximation (VDOT ≈ VO2max for most runners)
-        vo2max = vdot * 1.05
-        
-        return VDOTResponse(
-            success=True,
-            vdot=round(vdot, 1),
-            vo2max_equivalent=round(vo2max, 1),
-            fitness_level=fitness_level
-        )
+        return _vdot_response(request.distance / 1000.0, request.time_seconds / 60.0)
         
     except Exception as e:
         raise HTTPException(
@@ -199,7 +228,7 @@ def calculate_vdot_post(
         )
 
 
-@router.get("/vdot", response_model=VDOTResponse)
+@router.post("/race-times", response_model=PredictionsResponse)
 def predict_race_times(
     request: PredictRacesRequest = None,
     current_user: models.User = Depends(get_current_user),
@@ -208,14 +237,15 @@ def predict_race_times(
     """
     Predict race times for 5K, 10K, 15K, Half Marathon, and Marathon.
     
-    Uses scientifically proven formulas:
-    - **VDOT** (Jack Daniels): VO2max-based fitness indicator
-    - **Riegel Formula**: Race time prediction with 1.06 fatigue factor
+    Uses Jack Daniels' VDOT (VO2max-based fitness indicator): each time is
+    the equivalent time of your VDOT over that distance, the same values as
+    `/vdot` and `/batch` return.
     
     ## Input Options:
     
     1. **Automatic** (no parameters):
-       - Uses your best recent performance (last 60 days)
+       - Uses your fastest indexed effort of the last 90 days
+         (5K, 10K, half or marathon segment inside any run)
        - Ideal for regular runners with consistent training
     
     2. **Manual** (provide both parameters):
@@ -256,10 +286,9 @@ def predict_race_times(
         
         # Get predictions
         result = race_predictor_service.predict_race_times(
+            db=db,
             user_id=current_user.id,
-            base_distance_km=base_distance,
-            base_time_minutes=base_time,
-            db=db
+            base_race=(base_distance * 1000, base_time) if base_distance else None
         )
         
         return PredictionsResponse(
@@ -272,6 +301,8 @@ def predict_race_times(
             training_paces=result["training_paces"]
         )
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -312,32 +343,7 @@ def calculate_vdot(
     **Requires authentication**
     """
     try:
-        distance_meters = distance_km * 1000
-        time_seconds = time_minutes * 60
-        
-        vdot = race_predictor_service._calculate_vdot(distance_meters, time_seconds)
-        
-        # Determine fitness level
-        if vdot < 35:
-            fitness_level = "beginner"
-        elif vdot < 45:
-            fitness_level = "intermediate"
-        elif vdot < 55:
-            fitness_level = "advanced"
-        elif vdot < 65:
-            fitness_level = "competitive"
-        else:
-            fitness_level = "elite"
-        
-        # VO2max approximation (VDOT ≈ VO2max for most runners)
-        vo2max = vdot * 1.05  # Slight adjustment for typical running economy
-        
-        return VDOTResponse(
-            success=True,
-            vdot=round(vdot, 1),
-            vo2max_equivalent=round(vo2max, 1),
-            fitness_level=fitness_level
-        )
+        return _vdot_response(distance_km, time_minutes)
         
     except Exception as e:
         raise HTTPException(
@@ -346,10 +352,34 @@ def calculate_vdot(
         )
 
 
+@router.post("/batch", response_model=BatchPredictionsResponse)
+def predict_batch(
+    request: BatchPredictionsRequest,
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Equivalent race times and training paces for many VDOTs at once.
+    
+    Times are read from precomputed VDOT -> time tables for the standard
+    distances (interpolated between 0.1 VDOT steps), so a whole pace chart
+    costs one request.
+    
+    **Requires authentication**
+    """
+    return BatchPredictionsResponse(
+        success=True,
+        **race_predictor_service.predict_for_vdots(request.vdots)
+    )
+
+
 @router.get("/training-paces", response_model=TrainingPaces)
 def get_training_paces(
-    vdot: float = Query(..., ge=20.0, le=90.0, description="VDOT score (use /vdot endpoint to calculate)"),
-    current_user: models.User = Depends(get_current_user)
+    vdot: Optional[float] = Query(
+        None, ge=20.0, le=90.0,
+        description="VDOT score (defaults to the VDOT of your best recent effort)"
+    ),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
     Get training pace zones based on VDOT.
@@ -378,8 +408,16 @@ def get_training_paces(
     
     **Requires authentication**
     """
+    if vdot is None:
+        vdot = race_predictor_service.get_current_vdot(db, current_user.id)
+        if vdot is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No recent performances to derive VDOT from; pass ?vdot="
+            )
+    
     try:
-        paces = race_predictor_service.get_training_paces(vdot)
+        paces = race_predictor_service.format_training_paces(vdot)
         
         return TrainingPaces(**paces)
         
@@ -10,6 +10,7 @@ import json
 from app import models, schemas
 from app.database import get_db
 from app.dependencies.auth import get_current_user
+from app.services.athlete_context_service import athlete_context_service
 
 router = APIRouter(prefix="/api/v1/profile", tags=["Athlete Profile"])
 
@@ -66,6 +67,7 @@ def update_athlete_profile(
     if profile_update.preferences is not None:
         current_user.preferences = profile_update.preferences.model_dump()
 
+    athlete_context_service.invalidate(db, current_user.id)
     db.commit()
     db.refresh(current_user)
 
@@ -117,6 +119,7 @@ def create_goal(
 
     # Update user
     current_user.goals = goals
+    athlete_context_service.invalidate(db, current_user.id)
     db.commit()
     db.refresh(current_user)
 
@@ -166,6 +169,7 @@ def update_goal(
     # Update in DB
     goals[goal_index] = goal
     current_user.goals = goals
+    athlete_context_service.invalidate(db, current_user.id)
     db.commit()
     db.refresh(current_user)
 
@@ -190,6 +194,7 @@ def delete_goal(
 
     # Update in DB
     current_user.goals = goals
+    athlete_context_service.invalidate(db, current_user.id)
     db.commit()
 
     return None
@@ -3,8 +3,9 @@ Enhanced Race Prediction API Router
 Endpoints for race prediction with environmental factors
 """
 from fastapi import APIRouter, Depends, Query, HTTPException, status
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 from app.database import get_db
@@ -21,10 +22,23 @@ router = APIRouter(prefix="/api/v1/race", tags=["race-predictions"])
 race_service = RacePredictionEnhancedService()
 
 
+class ScenarioGridRequest(BaseModel):
+    """Grid of race conditions; every combination is predicted."""
+    base_distance_km: Optional[float] = Field(None, gt=0, le=50)
+    base_time_minutes: Optional[float] = Field(None, gt=0, le=600)
+    distances_km: List[float] = Field([5, 10, 21.0975, 42.195], min_length=1, max_length=20)
+    temperatures_c: List[float] = Field([5, 10, 15, 20, 25, 30], min_length=1, max_length=50)
+    humidities_pct: List[float] = Field([40, 60, 80], min_length=1, max_length=50)
+    altitudes_m: List[int] = Field([0], min_length=1, max_length=20)
+    terrains: List[TerrainType] = Field([TerrainType.FLAT, TerrainType.ROLLING, TerrainType.HILLY], min_length=1)
+    wind_kmh: float = Field(0, ge=0, le=80)
+    weather_condition: Optional[WeatherCondition] = None
+
+
 @router.post("/predict-with-conditions")
 async def predict_race_with_conditions(
-    base_distance_km: float = Query(..., gt=0, le=50),
-    base_time_minutes: float = Query(..., gt=0, le=600),
+    base_distance_km: Optional[float] = Query(None, gt=0, le=50),
+    base_time_minutes: Optional[float] = Query(None, gt=0, le=600),
     target_distance_km: float = Query(..., gt=0, le=50),
     terrain: TerrainType = Query(TerrainType.ROLLING),
     altitude_m: int = Query(0, ge=0, le=5000),
@@ -41,6 +55,7 @@ async def predict_race_with_conditions(
     **Parameters:**
     - `base_distance_km`: Your recent race/test distance (3-42 km)
     - `base_time_minutes`: Time for base race
+      (omit both to use your best recent effort, grade-adjusted)
     - `target_distance_km`: Target race distance
     - `terrain`: Track type (flat/rolling/hilly/mountain)
     - `altitude_m`: Race altitude above sea level
@@ -272,6 +287,8 @@ async def compare_race_scenarios(
     - Realistic scenario (average conditions)
     - Range of possible outcomes
     
+    The three condition sets are evaluated in one prediction-grid pass.
+    
     **Example:**
     ```
     Comparing Marathon predictions:
@@ -282,94 +299,56 @@ async def compare_race_scenarios(
     ```
     """
     try:
-        # Best case: ideal conditions
-        best_case = race_service.predict_with_conditions(
+        return race_service.compare_scenarios(
             db=db,
             user_id=current_user.id,
             base_time_minutes=base_time_minutes,
             base_distance_km=base_distance_km,
             target_distance_km=target_distance_km,
-            weather={
-                "temp_c": 12,
-                "humidity_pct": 50,
-                "wind_kmh": 0,
-                "condition": "ideal",
-            },
-            terrain=TerrainType.FLAT,
-            altitude_m=0,
         )
-        
-        # Realistic case: typical conditions
-        realistic_case = race_service.predict_with_conditions(
-            db=db,
-            user_id=current_user.id,
-            base_time_minutes=base_time_minutes,
-            base_distance_km=base_distance_km,
-            target_distance_km=target_distance_km,
-            weather={
-                "temp_c": 15,
-                "humidity_pct": 55,
-                "wind_kmh": 10,
-                "condition": "good",
-            },
-            terrain=TerrainType.ROLLING,
-            altitude_m=0,
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Scenario comparison failed: {str(e)}"
         )
-        
-        # Worst case: challenging conditions
-        worst_case = race_service.predict_with_conditions(
+
+
+@router.post("/scenario-grid")
+async def predict_scenario_grid(
+    request: ScenarioGridRequest,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> dict:
+    """
+    Predict race times over a grid of conditions (heatmaps).
+    
+    Every combination of distance, temperature, humidity, altitude and
+    terrain is evaluated in one vectorized pass over a single base
+    performance (omit the base race to use your best recent effort).
+    
+    **Response:**
+    - `axes` / `dims` / `shape`: grid axes in index order
+    - `minutes`, `confidence`: nested lists indexed
+      [distance][temperature][humidity][altitude][terrain]
+    - `factors`: weather (temperature x humidity), altitude and terrain factors
+    - `range_by_distance`: best and worst time per distance
+    """
+    try:
+        return race_service.predict_grid(
             db=db,
             user_id=current_user.id,
-            base_time_minutes=base_time_minutes,
-            base_distance_km=base_distance_km,
-            target_distance_km=target_distance_km,
-            weather={
-                "temp_c": 25,
-                "humidity_pct": 80,
-                "wind_kmh": 20,
-                "condition": "poor",
-            },
-            terrain=TerrainType.HILLY,
-            altitude_m=500,
+            base_time_minutes=request.base_time_minutes,
+            base_distance_km=request.base_distance_km,
+            distances_km=request.distances_km,
+            temperatures_c=request.temperatures_c,
+            humidities_pct=request.humidities_pct,
+            altitudes_m=request.altitudes_m,
+            terrains=request.terrains,
+            wind_kmh=request.wind_kmh,
+            condition=request.weather_condition.value if request.weather_condition else None,
         )
-        
-        return {
-            "scenarios": {
-                "best_case": {
-                    "prediction_minutes": best_case["prediction"]["adjusted_prediction_minutes"],
-                    "formatted_time": best_case["prediction"]["formatted_time"],
-                    "conditions": best_case["conditions"],
-                },
-                "realistic_case": {
-                    "prediction_minutes": realistic_case["prediction"]["adjusted_prediction_minutes"],
-                    "formatted_time": realistic_case["prediction"]["formatted_time"],
-                    "conditions": realistic_case["conditions"],
-                },
-                "worst_case": {
-                    "prediction_minutes": worst_case["prediction"]["adjusted_prediction_minutes"],
-                    "formatted_time": worst_case["prediction"]["formatted_time"],
-                    "conditions": worst_case["conditions"],
-                },
-            },
-            "range": {
-                "min_minutes": best_case["prediction"]["adjusted_prediction_minutes"],
-                "max_minutes": worst_case["prediction"]["adjusted_prediction_minutes"],
-                "difference_minutes": worst_case["prediction"]["adjusted_prediction_minutes"] - best_case["prediction"]["adjusted_prediction_minutes"],
-                "time_variance_percentage": round(
-                    (worst_case["prediction"]["adjusted_prediction_minutes"] - best_case["prediction"]["adjusted_prediction_minutes"]) / 
-                    realistic_case["prediction"]["adjusted_prediction_minutes"] * 100,
-                    1
-                ),
-            },
-            "average_confidence": (
-                best_case["confidence"]["score"] + 
-                realistic_case["confidence"]["score"] + 
-                worst_case["confidence"]["score"]
-            ) / 3,
-        }
-        
-    except Exception as e:
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Scenario comparison failed: {str(e)}"
+            detail=f"Scenario grid failed: {str(e)}"
         )
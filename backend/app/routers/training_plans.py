@@ -5,7 +5,7 @@ Endpoints for AI-generated personalized training plans.
 Supports multi-week plan generation, adaptation, and tracking.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Response, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
@@ -13,6 +13,11 @@ from pydantic import BaseModel, Field
 
 from app.database import get_db
 from app.models import User
+from app.services.llm_scheduler_service import LLMOverloadedError
+from app.services.plan_compliance_service import plan_compliance_service
+from app.services.plan_job_service import plan_job_service
+from app.services.plan_risk_service import plan_risk_service
+from app.services.plan_store_service import plan_store_service
 from app.services.training_plan_service import get_training_plan_service
 from app.utils.rate_limiter import limiter
 from app.dependencies.auth import get_current_user
@@ -104,6 +109,19 @@ class PlanResponse(BaseModel):
         }
 
 
+class PlanJobResponse(BaseModel):
+    """Status of a background plan generation job."""
+    
+    job_id: int
+    status: str  # queued, running, succeeded, failed
+    progress: int  # 0-100
+    plan_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    provisional_plan: Optional[dict] = None
+
+
 class PlanSummary(BaseModel):
     """Summary of a training plan."""
     
@@ -119,16 +137,22 @@ class PlanSummary(BaseModel):
 
 # ==================== Endpoints ====================
 
-@router.post("/generate", response_model=PlanResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/generate", response_model=PlanJobResponse, status_code=status.HTTP_202_ACCEPTED)
 @limiter.limit("10/hour")
 def generate_training_plan(
     request: Request,
     plan_request: GeneratePlanRequest,
+    background_tasks: BackgroundTasks,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Generate a personalized AI training plan.
+    Start generating a personalized AI training plan.
+
+    Returns a job id to poll (GET /jobs/{job_id}) and a provisional plan to
+    show meanwhile. An identical request joins the job already in progress
+    (200 instead of 202).
     """
     try:
         # Log validated request
@@ -146,7 +170,6 @@ def generate_training_plan(
         
         # Validate goal date is in the future
         # Handle both naive and aware datetime objects
-        from datetime import timezone
         now = datetime.now(timezone.utc)
         goal_date = plan_request.goal_date
         
@@ -169,7 +192,6 @@ def generate_training_plan(
                 detail=f"Cannot create {plan_request.weeks}-week plan for goal {weeks_until_goal_floor} weeks away (days_left: {(goal_date - now).days})"
             )
         
-        # Generate plan
         goal = {
             "type": plan_request.goal_type,
             "date": plan_request.goal_date.isoformat(),  # Convert to ISO string for JSON serialization
@@ -177,59 +199,19 @@ def generate_training_plan(
             "notes": plan_request.notes
         }
         
-        plan = _get_training_plan_service().generate_plan(
-            db=db,
-            user=current_user,
-            goal=goal,
-            weeks=plan_request.weeks
-        )
-        
-        # Store plan in user preferences
-        if not current_user.preferences:
-            current_user.preferences = {}
-        
-        if "training_plans" not in current_user.preferences:
-            current_user.preferences["training_plans"] = []
-        
-        # Add metadata - ensure all datetime objects are ISO strings
-        plan["status"] = "active"
-        plan["current_week"] = 1
-        plan["start_date"] = datetime.now(timezone.utc).isoformat()  # Plan starts today
-        
-        logger.debug(
-            "Storing training plan in database",
-            extra={
-                "user_id": current_user.id,
-                "plan_id": plan.get("plan_id"),
-                "plan_name": plan.get("plan_name"),
-            }
+        job, created = plan_job_service.submit(
+            db,
+            current_user,
+            goal,
+            plan_request.weeks,
+            _get_training_plan_service()
         )
+        if created:
+            plan_job_service.dispatch(job.id, background_tasks)
+        else:
+            response.status_code = status.HTTP_200_OK
         
-        current_user.preferences["training_plans"].append(plan)
-        
-        # CRITICAL: Tell SQLAlchemy that the JSON column has changed
-        from sqlalchemy.orm.attributes import flag_modified
-        flag_modified(current_user, "preferences")
-        
-        db.commit()
-        
-        # CRITICAL: Refresh the user object from database to see what was actually persisted
-        db.refresh(current_user)
-        
-        logger.info(
-            "Training plan stored successfully",
-            extra={
-                "user_id": current_user.id,
-                "plan_id": plan.get("plan_id"),
-                "total_plans": len(current_user.preferences.get("training_plans", [])),
-            }
-        )
-        
-        return PlanResponse(
-            success=True,
-            message=f"Training plan '{plan.get('plan_name', 'Training Plan')}' generated successfully",
-            plan=plan
-        )
+        return _job_response(job, include_provisional=True)
         
     except HTTPException:
         # Re-raise HTTPExceptions as-is (they already have the correct status code)
@@ -240,18 +222,87 @@ def generate_training_plan(
             detail=str(e)
         )
     except Exception as e:
-        error_msg = f"Failed to generate training plan: {str(e)}"
         logger.error(
-            "Failed to generate training plan",
+            "Failed to queue training plan generation",
             extra={"user_id": current_user.id, "error": str(e)},
             exc_info=True
         )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=error_msg
+            detail=f"Failed to generate training plan: {str(e)}"
         )
 
 
+@router.get("/jobs/{job_id}", response_model=PlanJobResponse)
+def get_plan_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Status and progress of a plan generation job.
+    """
+    job = plan_job_service.get(db, current_user.id, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan generation job not found")
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}/result", response_model=PlanResponse)
+def get_plan_job_result(
+    job_id: int,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Plan produced by a job.
+
+    200 with the stored AI plan once the job succeeded, 202 with the
+    provisional plan while it is still generating, 409 if it failed.
+    """
+    job = plan_job_service.get(db, current_user.id, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan generation job not found")
+    
+    if job.status == "failed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Plan generation failed: {job.error}"
+        )
+    if job.status != "succeeded":
+        response.status_code = status.HTTP_202_ACCEPTED
+        return PlanResponse(
+            success=False,
+            message="Training plan is still generating; showing a provisional plan",
+            plan=job.provisional_plan
+        )
+    
+    stored = plan_store_service.get_plan(db, current_user.id, job.plan_id)
+    if not stored:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Training plan not found")
+    plan = plan_store_service.to_dict(db, stored)
+    
+    return PlanResponse(
+        success=True,
+        message=f"Training plan '{plan.get('plan_name', 'Training Plan')}' generated successfully",
+        plan=plan
+    )
+
+
+def _job_response(job, include_provisional: bool = False) -> "PlanJobResponse":
+    return PlanJobResponse(
+        job_id=job.id,
+        status=job.status,
+        progress=job.progress,
+        plan_id=job.plan_id,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        provisional_plan=job.provisional_plan if include_provisional else None,
+    )
+
+
 @router.post("/duration/with-target-race", response_model=dict, status_code=status.HTTP_200_OK)
 def calculate_plan_duration_with_target_race(
     request: schemas.DurationCalculationRequest,
@@ -345,51 +396,21 @@ def list_training_plans(
     **Requires authentication**
     """
     try:
-        if not current_user.preferences or "training_plans" not in current_user.preferences:
-            return []
-        
-        plans = current_user.preferences["training_plans"]
-        if not isinstance(plans, list):
-            return []
-        
         summaries = []
-        for plan in plans:
-            # Validate required fields exist
-            if not isinstance(plan, dict) or "plan_id" not in plan:
-                continue  # Skip invalid plans
+        for plan in plan_store_service.list_plans(db, current_user.id):
+            if plan.goal_date is None:
+                continue  # Summaries need a goal date
             
-            try:
-                # Safe parsing with defaults
-                goal_date = plan.get("goal_date")
-                if isinstance(goal_date, str):
-                    goal_date = datetime.fromisoformat(goal_date)
-                elif not isinstance(goal_date, datetime):
-                    continue  # Skip if invalid date
-                
-                created_at = plan.get("created_at")
-                if isinstance(created_at, str):
-                    created_at = datetime.fromisoformat(created_at)
-                elif not isinstance(created_at, datetime):
-                    created_at = datetime.now()  # Default to now if invalid
-                
-                summaries.append(PlanSummary(
-                    plan_id=plan["plan_id"],
-                    plan_name=plan.get("plan_name", "Unnamed Plan"),
-                    goal_type=plan.get("goal_type", "fitness"),
-                    goal_date=goal_date,
-                    total_weeks=plan.get("total_weeks", 12),
-                    current_week=plan.get("current_week", 1),
-                    created_at=created_at,
-                    status=plan.get("status", "active")
-                ))
-            except (ValueError, KeyError, TypeError) as e:
-                # Log and skip malformed plan
-                logger.warning(
-                    "Skipping malformed training plan",
-                    extra={"user_id": current_user.id, "error": str(e)},
-                    exc_info=True
-                )
-                continue
+            summaries.append(PlanSummary(
+                plan_id=plan.external_id,
+                plan_name=plan.name,
+                goal_type=plan.goal_type or "fitness",
+                goal_date=plan.goal_date,
+                total_weeks=plan.total_weeks,
+                current_week=plan.current_week,
+                created_at=plan.created_at,
+                status=plan.status
+            ))
         
         return summaries
     except Exception as e:
@@ -429,53 +450,34 @@ def adapt_training_plan(
     """
     try:
         # Find the plan
-        if not current_user.preferences or "training_plans" not in current_user.preferences:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No training plans found"
-            )
-        
-        plans = current_user.preferences["training_plans"]
-        plan_index = next((i for i, p in enumerate(plans) if isinstance(p, dict) and p.get("plan_id") == plan_id), None)
-        
-        if plan_index is None:
+        plan = plan_store_service.get_plan(db, current_user.id, plan_id)
+        if not plan:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Training plan '{plan_id}' not found"
             )
         
-        original_plan = plans[plan_index]
-        
-        # Get actual workouts since plan start
-        from sqlalchemy import select
-        from app.models import Workout
-        
-        plan_start = datetime.fromisoformat(original_plan["created_at"]) if isinstance(original_plan["created_at"], str) else original_plan["created_at"]
-        
-        from app.models import Workout
-        from sqlalchemy.orm import joinedload
-        actual_workouts = db.query(Workout).filter(
-            Workout.user_id == current_user.id,
-            Workout.start_time >= plan_start
-        ).options(joinedload(Workout.user)).order_by(Workout.start_time.desc()).all()
+        # Per-week compliance is kept up to date as workouts are ingested
+        compliance = plan_compliance_service.summary(db, plan)
+        original_plan = plan_store_service.to_dict(db, plan)
         
         # Adapt the plan
-        adapted_plan = _get_training_plan_service().adapt_plan(
+        adapted = _get_training_plan_service().adapt_plan(
+            db=db,
             user=current_user,
-            plan_id=plan_id,
-            actual_workouts=actual_workouts,
-            feedback=request.feedback,
-            db=db
+            plan_data=original_plan,
+            compliance=compliance,
+            feedback=request.feedback
         )
         
-        # Update metadata
-        adapted_plan["adapted_at"] = datetime.now().isoformat()
-        adapted_plan["adaptation_count"] = original_plan.get("adaptation_count", 0) + 1
+        # Updated weeks replace the plan's; id, goal and dates are kept
+        adapted_plan = {**original_plan, **adapted}
+        adapted_plan["adapted_at"] = datetime.now(timezone.utc).isoformat()
+        adapted_plan["adaptation_count"] = plan.adaptation_count + 1
         
-        # Replace in user preferences
-        plans[plan_index] = adapted_plan
-        current_user.preferences["training_plans"] = plans
+        plan_store_service.replace(db, plan, adapted_plan)
         db.commit()
+        adapted_plan = plan_store_service.to_dict(db, plan)
         
         return PlanResponse(
             success=True,
@@ -483,7 +485,7 @@ def adapt_training_plan(
             plan=adapted_plan
         )
         
-    except HTTPException:
+    except (HTTPException, LLMOverloadedError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -505,26 +507,73 @@ def get_training_plan(
     
     **Requires authentication**
     """
-    if not current_user.preferences or "training_plans" not in current_user.preferences:
+    plan = plan_store_service.get_plan(db, current_user.id, plan_id)
+    if not plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="No training plans found"
+            detail=f"Training plan '{plan_id}' not found"
         )
     
-    plans = current_user.preferences["training_plans"]
-    plan = next((p for p in plans if isinstance(p, dict) and p.get("plan_id") == plan_id), None)
+    return PlanResponse(
+        success=True,
+        message="Training plan retrieved successfully",
+        plan=plan_store_service.to_dict(db, plan)
+    )
+
+
+@router.get("/{plan_id}/progress", response_model=dict)
+def get_training_plan_progress(
+    plan_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get plan compliance week by week.
     
+    For every week that has started: completed vs planned sessions
+    (adherence), actual vs planned km (volume delta) and pace vs target
+    (intensity delta, positive = faster than planned).
+    
+    **Requires authentication**
+    """
+    plan = plan_store_service.get_plan(db, current_user.id, plan_id)
     if not plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Training plan '{plan_id}' not found"
         )
     
-    return PlanResponse(
-        success=True,
-        message="Training plan retrieved successfully",
-        plan=plan
-    )
+    return plan_compliance_service.summary(db, plan)
+
+
+@router.get("/{plan_id}/risk", response_model=dict)
+def get_training_plan_risk(
+    plan_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Simulate the plan's injury / overreaching risk.
+    
+    Plays the plan forward from your current fitness and fatigue under
+    thousands of adherence scenarios (missed, crammed and harder/easier
+    sessions). Per week: percentiles of the peak acute:chronic ratio, the
+    lowest form (TSB) and the end-of-week fitness, and the share of
+    scenarios above ACWR 1.5 or below TSB -30.
+    
+    Uses your adherence on this plan's finished weeks when there are any.
+    
+    **Requires authentication**
+    """
+    plan = plan_store_service.get_plan(db, current_user.id, plan_id)
+    if not plan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Training plan '{plan_id}' not found"
+        )
+    
+    adherence = plan_compliance_service.summary(db, plan)["totals"]["finished_weeks_adherence"]
+    return plan_risk_service.assess_plan(db, current_user, plan, adherence=adherence, seed=plan.id)
 
 
 @router.put("/{plan_id}/status")
@@ -544,29 +593,25 @@ def update_plan_status(
     
     **Requires authentication**
     """
+    # The `status` parameter shadows fastapi.status in this function
     if status not in ["active", "completed", "paused"]:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=400,
             detail="Status must be one of: active, completed, paused"
         )
     
-    if not current_user.preferences or "training_plans" not in current_user.preferences:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No training plans found"
-        )
-    
-    plans = current_user.preferences["training_plans"]
-    plan = next((p for p in plans if isinstance(p, dict) and p.get("plan_id") == plan_id), None)
-    
+    plan = plan_store_service.get_plan(db, current_user.id, plan_id)
     if not plan:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
+            status_code=404,
             detail=f"Training plan '{plan_id}' not found"
         )
     
-    plan["status"] = status
-    plan["status_updated_at"] = datetime.now().isoformat()
+    plan.status = status
+    plan.status_updated_at = datetime.utcnow()
+    if status == "active":
+        # Compliance is only tracked for active plans; catch up on resume
+        plan_compliance_service.rebuild(db, plan)
     
     db.commit()
     
@@ -592,24 +637,14 @@ def delete_training_plan(
     
     **Requires authentication**
     """
-    if not current_user.preferences or "training_plans" not in current_user.preferences:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No training plans found"
-        )
-    
-    plans = current_user.preferences["training_plans"]
-    plan_index = next((i for i, p in enumerate(plans) if isinstance(p, dict) and p.get("plan_id") == plan_id), None)
-    
-    if plan_index is None:
+    plan = plan_store_service.get_plan(db, current_user.id, plan_id)
+    if not plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Training plan '{plan_id}' not found"
         )
     
-    # Remove plan
-    del plans[plan_index]
-    current_user.preferences["training_plans"] = plans
+    plan_store_service.delete(db, plan)
     db.commit()
     
     return None  # 204 No Content
@@ -630,33 +665,21 @@ def export_workout_tcx(
     
     **Requires authentication**
     """
-    if not current_user.preferences or "training_plans" not in current_user.preferences:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No training plans found"
-        )
-    
-    plans = current_user.preferences["training_plans"]
-    plan = next((p for p in plans if isinstance(p, dict) and p.get("plan_id") == plan_id), None)
-    
+    plan = plan_store_service.get_plan(db, current_user.id, plan_id)
     if not plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Training plan '{plan_id}' not found"
         )
     
-    weeks = plan.get("weeks", [])
-    if week_num < 1 or week_num > len(weeks):
+    if not plan_store_service.has_week(db, plan, week_num):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Week {week_num} not found in plan"
         )
     
-    week = weeks[week_num - 1]
-    workouts = week.get("workouts", [])
-    
     # Find workout by day number
-    workout = next((w for w in workouts if w.get("day") == day_num), None)
+    workout = plan_store_service.get_session(db, plan, week_num, day_num)
     if not workout:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -664,7 +687,7 @@ def export_workout_tcx(
         )
     
     # Generate TCX
-    tcx_content = _generate_tcx(plan, week_num, workout)
+    tcx_content = _generate_tcx(plan.start_date, week_num, workout)
     
     return Response(
         content=tcx_content,
@@ -675,7 +698,7 @@ def export_workout_tcx(
     )
 
 
-def _generate_tcx(plan: dict, week_num: int, workout: dict) -> str:
+def _generate_tcx(start_date: Optional[datetime], week_num: int, workout: dict) -> str:
     """
     Generate TCX file content for a workout.
     
@@ -696,8 +719,7 @@ def _generate_tcx(plan: dict, week_num: int, workout: dict) -> str:
     total_time_seconds = int(distance_m / 1000 * pace_min_per_km * 60)
     
     # Start time (use plan's start_date if available, otherwise today)
-    start_date_str = plan.get("start_date", datetime.now(timezone.utc).isoformat())
-    start_date = datetime.fromisoformat(start_date_str.replace("Z", "+00:00"))
+    start_date = start_date or datetime.utcnow()
     
     # Adjust to actual workout date (week + day)
     # Assuming weeks start on Monday
@@ -780,33 +802,21 @@ def get_adapted_workout(
     
     **Requires authentication**
     """
-    if not current_user.preferences or "training_plans" not in current_user.preferences:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No training plans found"
-        )
-    
-    plans = current_user.preferences["training_plans"]
-    plan = next((p for p in plans if isinstance(p, dict) and p.get("plan_id") == plan_id), None)
-    
+    plan = plan_store_service.get_plan(db, current_user.id, plan_id)
     if not plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Training plan '{plan_id}' not found"
         )
     
-    weeks = plan.get("weeks", [])
-    if week_num < 1 or week_num > len(weeks):
+    if not plan_store_service.has_week(db, plan, week_num):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Week {week_num} not found in plan"
         )
     
-    week = weeks[week_num - 1]
-    workouts = week.get("workouts", [])
-    
     # Find original workout
-    original_workout = next((w for w in workouts if w.get("day") == day_num), None)
+    original_workout = plan_store_service.get_session(db, plan, week_num, day_num)
     if not original_workout:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -868,7 +878,8 @@ def check_training_readiness(
     """
     Check if user is ready for training and get recovery recommendations.
     
-    Returns detailed analysis of current state and suggestions.
+    Returns detailed analysis of current state and suggestions, with the
+    plan's compliance so far when the plan exists.
     
     **Requires authentication**
     """
@@ -886,6 +897,9 @@ def check_training_readiness(
     recommendations = coaching_service.get_recovery_recommendation(health_data)
     adjustment_factor = coaching_service._calculate_adjustment_factor(health_data)
     
+    plan = plan_store_service.get_plan(db, current_user.id, plan_id)
+    compliance = plan_compliance_service.summary(db, plan) if plan else None
+    
     return {
         "is_ready_for_training": not should_rest,
         "adjustment_factor": adjustment_factor,  # 0.7 = 30% intensity reduction
@@ -895,5 +909,10 @@ def check_training_readiness(
             "readiness": "Good" if metrics.readiness_score > 0.7 else "Fair" if metrics.readiness_score > 0.4 else "Poor",
             "sleep": "Good" if 7 <= metrics.sleep_hours <= 9 else "Poor",
             "fatigue": "Low" if metrics.fatigue_level < 0.3 else "Moderate" if metrics.fatigue_level < 0.7 else "High",
-        }
+        },
+        "plan_compliance": {
+            "current_week": compliance["current_week"],
+            **compliance["totals"],
+            "this_week": compliance["weeks"][-1] if compliance["weeks"] else None,
+        } if compliance else None,
     }
@@ -2,23 +2,37 @@
 routers/workouts.py - Endpoints para gestionar entrenamientos y FIT files
 """
 
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, status
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Query, status
+from fastapi import Header, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import fitparse
+import logging
 from io import BytesIO
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 from .. import crud, schemas, models
 from ..database import get_db
+from ..services.route_service import route_service
+from ..services.similar_workout_service import similar_workout_service
+from ..services.stream_pyramid_service import CHART_CHANNELS, stream_pyramid_service
+from ..services.track_service import track_service
+from ..services.training_load_service import training_load_service
+from ..services.workout_split_service import workout_split_service
+from ..services.workout_stream_service import workout_stream_service
 from ..utils.permissions import verify_resource_ownership
 from ..dependencies.auth import get_current_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/api/v1/workouts",
     tags=["Workouts"],
 )
 
+# Máximo rango de la serie de carga (~5 años)
+MAX_TRAINING_LOAD_DAYS = 366 * 5
+
 
 @router.post(
     "/upload", response_model=schemas.WorkoutOut, status_code=status.HTTP_201_CREATED
@@ -67,11 +81,19 @@ async def upload_fit_file(
             status_code=400, detail=f"Failed to parse FIT file: {str(e)}"
         )
 
+    # Series por muestra (opcionales: un fallo no bloquea la subida)
+    try:
+        streams = workout_stream_service.extract_fit(fit_file)
+    except Exception:
+        logger.warning(f"[UPLOAD] Could not extract streams from {file.filename}", exc_info=True)
+        streams = None
+
     # Crear workout en BD
     workout = crud.create_workout(
         db,
         current_user.id,
         workout_data,
+        streams=streams,
     )
 
     return schemas.WorkoutOut.model_validate(workout)
@@ -166,6 +188,85 @@ def get_stats(
     return crud.get_user_workout_stats(db, current_user.id)
 
 
+@router.get("/training-load", response_model=List[schemas.TrainingLoadPoint])
+def get_training_load(
+    start_date: Optional[date] = Query(None, description="Inicio (default: hace 90 días)"),
+    end_date: Optional[date] = Query(None, description="Fin (default: hoy)"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> List[schemas.TrainingLoadPoint]:
+    """
+    Obtener la serie diaria de carga de entrenamiento.
+
+    Por día:
+        - load: training stress score total
+        - ctl: fitness (carga crónica, 42 días)
+        - atl: fatiga (carga aguda, 7 días)
+        - tsb: forma (ctl - atl del día anterior)
+
+    Args:
+        start_date: Fecha inicial (inclusive)
+        end_date: Fecha final (inclusive)
+        db: Database session
+        current_user: Usuario autenticado
+
+    Returns:
+        Lista de puntos diarios
+
+    Raises:
+        HTTPException 400: Si el rango es inválido o supera MAX_TRAINING_LOAD_DAYS
+    """
+    end_date = end_date or datetime.utcnow().date()
+    start_date = start_date or end_date - timedelta(days=89)
+
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    if (end_date - start_date).days >= MAX_TRAINING_LOAD_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too large (max {MAX_TRAINING_LOAD_DAYS} days)",
+        )
+
+    return training_load_service.get_series(db, current_user.id, start_date, end_date)
+
+
+@router.get("/in-area", response_model=List[schemas.WorkoutOut])
+def get_workouts_in_area(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> List[schemas.WorkoutOut]:
+    """
+    Obtener los entrenamientos cuyo recorrido pasa por un área.
+
+    Compara la caja GPS de cada entrenamiento (indexada) con el área pedida;
+    no lee los recorridos. Entrenamientos sin GPS no aparecen.
+
+    Args:
+        min_lat, min_lon, max_lat, max_lon: Área (grados)
+        limit: Máximo de resultados
+        db: Database session
+        current_user: Usuario autenticado
+
+    Returns:
+        Entrenamientos ordenados por fecha descendente
+
+    Raises:
+        HTTPException 400: Si el área es inválida
+    """
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="min_lat/min_lon must not exceed max_lat/max_lon")
+
+    workouts = track_service.in_area(
+        db, current_user.id, min_lat, min_lon, max_lat, max_lon, limit=limit
+    )
+    return [schemas.WorkoutOut.model_validate(w) for w in workouts]
+
+
 @router.get("/{workout_id}", response_model=schemas.WorkoutOut)
 def get_workout(
     workout_id: int,
@@ -192,6 +293,278 @@ def get_workout(
     return schemas.WorkoutOut.model_validate(workout)
 
 
+@router.get("/{workout_id}/splits", response_model=schemas.WorkoutSplits)
+def get_workout_splits(
+    workout_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> schemas.WorkoutSplits:
+    """
+    Obtener los parciales por km, por milla y por vuelta de un entrenamiento.
+
+    Se calculan al importar el entrenamiento; esta lectura no toca las series
+    por muestra. Entrenamientos sin series devuelven listas vacías.
+
+    Args:
+        workout_id: ID del entrenamiento
+        db: Database session
+        current_user: Usuario autenticado
+
+    Returns:
+        Parciales por tipo
+
+    Raises:
+        HTTPException 404: Si el entrenamiento no existe o no pertenece al usuario
+    """
+    workout = crud.get_workout_by_id(db, workout_id)
+    verify_resource_ownership(workout, current_user.id, "Workout")
+
+    return schemas.WorkoutSplits(
+        workout_id=workout.id,
+        **{
+            kind: workout_split_service.as_rows(workout.splits, kind)
+            for kind in ("km", "mile", "laps")
+        },
+    )
+
+
+@router.get("/{workout_id}/streams", response_model=schemas.WorkoutStreamsOut)
+def get_workout_streams(
+    workout_id: int,
+    response: Response,
+    channels: str = Query("hr,pace,alt", description="Series separadas por comas"),
+    points: int = Query(1000, ge=10, le=5000, description="Máximo de puntos por serie"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Obtener series por muestra reducidas para gráficas (LTTB).
+
+    Lee la pirámide precalculada al importar (200 / 1000 / 5000 puntos) y
+    solo reduce el nivel más pequeño que cubra `points`; nunca carga las
+    series completas. La respuesta lleva ETag (con la versión de las series,
+    que cambia al reemplazarlas) y Cache-Control, y responde 304 si el
+    cliente ya la tiene.
+
+    Args:
+        workout_id: ID del entrenamiento
+        channels: Series pedidas (hr, pace, speed, alt, cad, power)
+        points: Máximo de puntos por serie
+        if_none_match: ETag de una respuesta anterior
+        db: Database session
+        current_user: Usuario autenticado
+
+    Returns:
+        Series en columnas paralelas; las que no tienen datos se omiten
+
+    Raises:
+        HTTPException 400: Si se pide una serie desconocida
+        HTTPException 404: Si el entrenamiento no existe, no pertenece al
+            usuario o no tiene series
+    """
+    workout = crud.get_workout_by_id(db, workout_id)
+    verify_resource_ownership(workout, current_user.id, "Workout")
+
+    requested = [name.strip() for name in channels.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in CHART_CHANNELS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown channels: {', '.join(unknown)}",
+        )
+
+    stream = workout.stream
+    if stream is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Workout has no stream data",
+        )
+
+    etag = (
+        f'"{workout.id}-{stream.id}-v{stream.version}'
+        f'-{"+".join(requested)}-{points}"'
+    )
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return schemas.WorkoutStreamsOut(
+        workout_id=workout.id,
+        points=points,
+        source_samples=stream.sample_count,
+        channels=stream_pyramid_service.get_series(db, stream, requested, points),
+    )
+
+
+@router.get("/{workout_id}/track", response_model=schemas.WorkoutTrackOut)
+def get_workout_track(
+    workout_id: int,
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Zoom del mapa (omitir = resolución completa)"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> schemas.WorkoutTrackOut:
+    """
+    Obtener el recorrido GPS de un entrenamiento como polyline codificada.
+
+    Con `zoom` se devuelve la versión simplificada (Douglas-Peucker) más
+    ligera que no se distingue de la completa a ese zoom.
+
+    Args:
+        workout_id: ID del entrenamiento
+        zoom: Zoom del mapa
+        db: Database session
+        current_user: Usuario autenticado
+
+    Returns:
+        Polyline, zoom usado y caja GPS
+
+    Raises:
+        HTTPException 404: Si el entrenamiento no existe, no pertenece al
+            usuario o no tiene GPS
+    """
+    workout = crud.get_workout_by_id(db, workout_id)
+    verify_resource_ownership(workout, current_user.id, "Workout")
+
+    if workout.track is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Workout has no GPS track",
+        )
+
+    polyline, level = track_service.polyline_for_zoom(workout.track, zoom)
+    return schemas.WorkoutTrackOut(
+        workout_id=workout.id,
+        polyline=polyline,
+        zoom=level,
+        point_count=workout.track.point_count,
+        bbox=[workout.min_lat, workout.min_lon, workout.max_lat, workout.max_lon],
+    )
+
+
+@router.get("/{workout_id}/route-efforts", response_model=schemas.RouteEffortsOut)
+def get_route_efforts(
+    workout_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> schemas.RouteEffortsOut:
+    """
+    Obtener todos los esfuerzos del usuario sobre la misma ruta que un entrenamiento.
+
+    Las rutas se detectan al importar comparando la huella GPS del recorrido
+    (celdas geohash); esta lectura es una consulta indexada por route_id.
+
+    Args:
+        workout_id: ID del entrenamiento
+        db: Database session
+        current_user: Usuario autenticado
+
+    Returns:
+        Ruta y esfuerzos ordenados por fecha, con su posición por ritmo
+
+    Raises:
+        HTTPException 404: Si el entrenamiento no existe, no pertenece al
+            usuario o no tiene ruta (sin GPS)
+    """
+    workout = crud.get_workout_by_id(db, workout_id)
+    verify_resource_ownership(workout, current_user.id, "Workout")
+
+    if workout.route is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Workout has no route",
+        )
+
+    efforts = route_service.efforts(db, workout.route_id)
+    paces = {
+        w.id: w.duration_seconds / (w.distance_meters / 1000) if w.distance_meters else None
+        for w in efforts
+    }
+    ranked = sorted((p, wid) for wid, p in paces.items() if p is not None)
+    ranks = {wid: i for i, (_, wid) in enumerate(ranked, 1)}
+
+    return schemas.RouteEffortsOut(
+        route_id=workout.route_id,
+        distance_meters=workout.route.distance_meters,
+        efforts=[
+            schemas.RouteEffort(
+                workout_id=w.id,
+                start_time=w.start_time,
+                duration_seconds=w.duration_seconds,
+                distance_meters=w.distance_meters,
+                pace_seconds_per_km=round(paces[w.id], 1) if paces[w.id] else None,
+                grade_adjusted_pace=w.grade_adjusted_pace,
+                avg_heart_rate=w.avg_heart_rate,
+                rank=ranks.get(w.id, len(efforts)),
+            )
+            for w in efforts
+        ],
+    )
+
+
+@router.get("/{workout_id}/similar", response_model=List[schemas.SimilarWorkout])
+def get_similar_workouts(
+    workout_id: int,
+    k: int = Query(5, ge=1, le=50, description="Número de entrenamientos"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> List[schemas.SimilarWorkout]:
+    """
+    Obtener los entrenamientos más comparables a uno dado.
+
+    Vecinos más cercanos por distancia, duración, ritmo, FC, desnivel y
+    tiempo en zonas (índice KD-tree por usuario y deporte); los de la misma
+    ruta se priorizan.
+
+    Args:
+        workout_id: ID del entrenamiento
+        k: Número de entrenamientos a devolver
+        db: Database session
+        current_user: Usuario autenticado
+
+    Returns:
+        Entrenamientos ordenados de más a menos parecido
+
+    Raises:
+        HTTPException 404: Si el entrenamiento no existe o no pertenece al usuario
+    """
+    workout = crud.get_workout_by_id(db, workout_id)
+    verify_resource_ownership(workout, current_user.id, "Workout")
+
+    return [
+        schemas.SimilarWorkout(
+            workout=schemas.WorkoutOut.model_validate(w),
+            distance=distance,
+            same_route=workout.route_id is not None and w.route_id == workout.route_id,
+        )
+        for w, distance in similar_workout_service.similar(db, workout, k=k)
+    ]
+
+
+@router.delete("/{workout_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_workout(
+    workout_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> None:
+    """
+    Eliminar un entrenamiento y recalcular la carga de entrenamiento.
+
+    Args:
+        workout_id: ID del entrenamiento
+        db: Database session
+        current_user: Usuario autenticado
+
+    Raises:
+        HTTPException 404: Si el entrenamiento no existe o no pertenece al usuario
+    """
+    workout = crud.get_workout_by_id(db, workout_id)
+    verify_resource_ownership(workout, current_user.id, "Workout")
+
+    crud.delete_workout(db, workout)
+
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
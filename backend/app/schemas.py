@@ -4,7 +4,7 @@ schemas.py - Pydantic models para validación y serialización
 
 from pydantic import BaseModel, EmailStr, Field, validator
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import date as date_type, datetime
 from enum import Enum
 
 
@@ -117,6 +117,17 @@ class WorkoutOut(BaseModel):
     avg_stride_length: Optional[float] = None
     avg_leg_spring_stiffness: Optional[float] = None
     left_right_balance: Optional[float] = None
+    training_stress_score: Optional[float] = None
+    smoothed_elevation_gain: Optional[float] = None  # metros, perfil suavizado
+    graded_distance_meters: Optional[float] = None  # distancia equivalente en llano
+    grade_adjusted_pace: Optional[float] = None  # segundos por km (GAP)
+    time_in_zones: Optional[dict] = None  # {"heart_rate": {"1": segundos, ...}, ...}
+    # Caja GPS (null sin GPS)
+    min_lat: Optional[float] = None
+    min_lon: Optional[float] = None
+    max_lat: Optional[float] = None
+    max_lon: Optional[float] = None
+    route_id: Optional[int] = None  # ruta repetida (mismo recorrido)
     file_name: Optional[str] = None
     created_at: datetime
 
@@ -136,6 +147,93 @@ class WorkoutStats(BaseModel):
     sports_breakdown: dict  # {"running": 10, "cycling": 5, ...}
 
 
+class TrainingLoadPoint(BaseModel):
+    """Schema para un día de la serie de carga (fitness/fatiga/forma)."""
+
+    date: date_type
+    load: float  # suma de training stress score del día
+    ctl: float  # chronic training load (fitness)
+    atl: float  # acute training load (fatiga)
+    tsb: float  # training stress balance (forma)
+
+
+class WorkoutSplit(BaseModel):
+    """Schema para un parcial (km, milla o vuelta del dispositivo)."""
+
+    index: int  # 1-based
+    distance_meters: Optional[float] = None
+    elapsed_seconds: Optional[float] = None
+    pace_seconds_per_km: Optional[float] = None
+    avg_heart_rate: Optional[float] = None
+    avg_cadence: Optional[float] = None
+    elevation_gain: Optional[float] = None
+    elevation_loss: Optional[float] = None
+
+
+class WorkoutSplits(BaseModel):
+    """Schema para los parciales de un workout."""
+
+    workout_id: int
+    km: List[WorkoutSplit] = []
+    mile: List[WorkoutSplit] = []
+    laps: List[WorkoutSplit] = []
+
+
+class WorkoutStreamSeries(BaseModel):
+    """Schema para una serie reducida (columnas paralelas t / v)."""
+
+    t: List[float]  # segundos desde el inicio
+    v: List[Optional[float]]  # null = sin dato (p. ej. ritmo parado)
+
+
+class WorkoutStreamsOut(BaseModel):
+    """Schema para las series de un workout reducidas para gráficas."""
+
+    workout_id: int
+    points: int  # máximo de puntos por serie
+    source_samples: int  # muestras originales
+    channels: Dict[str, WorkoutStreamSeries] = {}
+
+
+class WorkoutTrackOut(BaseModel):
+    """Schema para el recorrido GPS de un workout (polyline codificada)."""
+
+    workout_id: int
+    polyline: str  # formato Google encoded polyline, precisión 5
+    zoom: Optional[int] = None  # nivel simplificado usado; null = resolución completa
+    point_count: int  # puntos GPS originales
+    bbox: List[float]  # [min_lat, min_lon, max_lat, max_lon]
+
+
+class RouteEffort(BaseModel):
+    """Schema para un esfuerzo sobre una ruta repetida."""
+
+    workout_id: int
+    start_time: datetime
+    duration_seconds: int
+    distance_meters: float
+    pace_seconds_per_km: Optional[float] = None
+    grade_adjusted_pace: Optional[float] = None  # segundos por km
+    avg_heart_rate: Optional[int] = None
+    rank: int  # 1 = el más rápido (por ritmo)
+
+
+class SimilarWorkout(BaseModel):
+    """Schema para un entrenamiento comparable (vecino más cercano)."""
+
+    workout: WorkoutOut
+    distance: float  # diferencia en unidades de FEATURE_SCALES (menor = más parecido)
+    same_route: bool = False
+
+
+class RouteEffortsOut(BaseModel):
+    """Schema para todos los esfuerzos sobre la ruta de un workout."""
+
+    route_id: int
+    distance_meters: float
+    efforts: List[RouteEffort] = []  # ordenados por fecha
+
+
 # ============================================================================
 # ATHLETE PROFILE SCHEMAS
 # ============================================================================
@@ -629,6 +727,8 @@ class EventBase(BaseModel):
     website_url: Optional[str] = None
     description: Optional[str] = None
     price_eur: Optional[float] = Field(None, ge=0)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 
 class EventCreate(EventBase):
@@ -654,6 +754,8 @@ class EventUpdate(BaseModel):
     website_url: Optional[str] = None
     description: Optional[str] = None
     price_eur: Optional[float] = Field(None, ge=0)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
     verified: Optional[bool] = None
 
 
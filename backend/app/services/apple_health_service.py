@@ -8,6 +8,7 @@ from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 
 from .. import models
+from .baseline_service import baseline_service
 
 
 class AppleHealthService:
@@ -201,6 +202,7 @@ class AppleHealthService:
                 imported_metrics.append(metric)
                 print(f"[APPLE HEALTH] Imported {metric_date}")
         
+        baseline_service.update_for_metrics(db, user_id, imported_metrics)
         db.commit()
         
         # Update user's last sync
@@ -0,0 +1,141 @@
+"""
+athlete_context_service.py - Versioned athlete-context snapshot per user
+
+Every coach prompt starts from the same athlete context: profile, goals,
+injuries, preferences and recent training. Instead of querying the recent
+workouts and formatting them on each request, the formatted context is
+stored once per user (AthleteContextSnapshot) and reused.
+
+- invalidate(): bumps User.context_version; called on workout inserts and
+  deletions, profile edits and goal changes (one UPDATE, no rebuild)
+- get(): returns the stored snapshot while its version matches the user's,
+  otherwise rebuilds it (lazily, on the next coach request) and stores it
+
+The counter is bumped with an atomic SQL increment, so a snapshot built
+from data read before a concurrent change is stored with the old version
+and rebuilt on the following request.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+# Recent workouts read per rebuild (training stats for plan generation)
+STATS_WORKOUTS = 20
+
+# Newest workouts included in the formatted context
+CONTEXT_WORKOUTS = 10
+
+
+def training_stats(recent_workouts: List[models.Workout]) -> Dict[str, Any]:
+    """
+    Aggregates of recent training (newest first) used to personalize plans.
+
+    Returns:
+        Dict with workout_count, hr_share (fraction of workouts with heart
+        rate) and weekly_km (distance of the last CONTEXT_WORKOUTS over the
+        number of distinct weeks trained)
+    """
+    count = len(recent_workouts)
+    with_hr = sum(1 for w in recent_workouts if w.avg_heart_rate)
+    recent_km = sum(w.distance_meters / 1000 for w in recent_workouts[:CONTEXT_WORKOUTS])
+    weeks = min(len({w.start_time.isocalendar()[:2] for w in recent_workouts}), 10) or 1
+    return {
+        "workout_count": count,
+        "hr_share": round(with_hr / count, 3) if count else 0.0,
+        "weekly_km": round(recent_km / weeks, 2),
+    }
+
+
+class AthleteContextService:
+    """Stores and serves per-user athlete-context snapshots."""
+
+    # ===== Read path =====
+
+    def get(self, db: Session, user: models.User, formatter: Any) -> models.AthleteContextSnapshot:
+        """
+        The user's athlete context, rebuilt only if it changed since last built.
+
+        Args:
+            db: Database session
+            user: Athlete
+            formatter: CoachService providing the context formatting
+                (build_athlete_context / build_compact_profile / build_compact_training)
+
+        Returns:
+            Up-to-date AthleteContextSnapshot
+        """
+        snapshot = self._get(db, user.id)
+        version = user.context_version or 0
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        return self.rebuild(db, user, formatter, version=version, snapshot=snapshot)
+
+    # ===== Write path =====
+
+    def invalidate(self, db: Session, user_id: int) -> None:
+        """Mark a user's snapshot stale. Does not commit."""
+        db.query(models.User).filter(models.User.id == user_id).update(
+            {models.User.context_version: models.User.context_version + 1},
+            synchronize_session="evaluate",
+        )
+
+    def rebuild(
+        self,
+        db: Session,
+        user: models.User,
+        formatter: Any,
+        version: Optional[int] = None,
+        snapshot: Optional[models.AthleteContextSnapshot] = None,
+    ) -> models.AthleteContextSnapshot:
+        """Format and store the snapshot for the user's current data. Commits."""
+        if version is None:
+            version = user.context_version or 0
+        recent = (
+            db.query(models.Workout)
+            .filter(models.Workout.user_id == user.id)
+            .order_by(models.Workout.start_time.desc())
+            .limit(STATS_WORKOUTS)
+            .all()
+        )
+        context_workouts = recent[:CONTEXT_WORKOUTS]
+
+        if snapshot is None:
+            snapshot = models.AthleteContextSnapshot(user_id=user.id)
+            db.add(snapshot)
+        snapshot.version = version
+        snapshot.context = formatter.build_athlete_context(user, context_workouts, user.goals or [])
+        snapshot.profile_lines = formatter.build_compact_profile(user)
+        snapshot.training_lines = formatter.build_compact_training(context_workouts)
+        snapshot.training_stats = training_stats(recent)
+        snapshot.built_at = datetime.utcnow()
+
+        try:
+            db.commit()
+        except IntegrityError:
+            # Built concurrently by another request/worker; keep theirs
+            db.rollback()
+            return self._get(db, user.id)
+
+        logger.debug(f"[CONTEXT] Rebuilt athlete context for user {user.id} (v{version})")
+        return snapshot
+
+    # ===== Internals =====
+
+    def _get(self, db: Session, user_id: int) -> Optional[models.AthleteContextSnapshot]:
+        return (
+            db.query(models.AthleteContextSnapshot)
+            .filter(models.AthleteContextSnapshot.user_id == user_id)
+            .first()
+        )
+
+
+# Singleton
+athlete_context_service = AthleteContextService()
@@ -0,0 +1,342 @@
+"""
+baseline_service.py - Incremental rolling baselines for recovery metrics
+
+Keeps one MetricBaseline row per user and metric (HRV, resting HR) up to date
+whenever HealthMetric rows are inserted or updated:
+- EWMA (span 7) over daily observations
+- Rolling 7/28/60-day mean and standard deviation; the 60-day baseline leaves
+  out the last 7 days, so the recent week is compared against what came before
+
+The state row holds the last 60 days of observations together with the EWMA
+after each of them, so an insert/update only replays that bounded window.
+Changes older than the window trigger a full rebuild, which is a single ordered
+pass over the user's history (first sync / historical backfill).
+
+Analyzers read baselines with `get_baseline()`, a single indexed lookup. Users
+whose history predates the baselines have no state row until their next sync;
+`get_baseline()` rebuilds it from history on the first miss.
+"""
+import logging
+import statistics
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+# HealthMetric column -> per-row baseline column written back on each update
+TRACKED_METRICS = {
+    "hrv_ms": "hrv_baseline_ms",
+    "resting_hr_bpm": "resting_hr_baseline_bpm",
+}
+WINDOWS = (7, 28, 60)
+EWMA_SPAN = 7
+# Most recent days left out of a window (the 60-day baseline excludes the 7-day one)
+WINDOW_GAPS = {60: 7}
+
+
+class BaselineService:
+    """Maintains rolling baselines for HealthMetric recovery columns."""
+
+    ALPHA = 2 / (EWMA_SPAN + 1)
+    MAX_WINDOW = max(WINDOWS)
+
+    # ===== Write path =====
+
+    def update_for_metrics(
+        self,
+        db: Session,
+        user_id: int,
+        metrics: Iterable[models.HealthMetric],
+    ) -> Dict[str, models.MetricBaseline]:
+        """
+        Apply inserted/updated HealthMetric rows to the user's baseline state.
+
+        Call this after adding or modifying rows and before committing. The
+        caller owns the transaction.
+
+        Args:
+            db: Database session
+            user_id: Owner of the metrics
+            metrics: HealthMetric rows that were inserted or updated
+
+        Returns:
+            Dict of metric name -> updated MetricBaseline
+        """
+        metrics = [m for m in metrics if m is not None and m.date is not None]
+        if not metrics:
+            return {}
+
+        # SessionLocal uses autoflush=False; rebuilds must see pending rows
+        db.flush()
+
+        updated: Dict[str, models.MetricBaseline] = {}
+        for metric_name in TRACKED_METRICS:
+            changes = self._collect_changes(metrics, metric_name)
+            state = self._get_state(db, user_id, metric_name)
+
+            if state is None:
+                if all(value is None for _, value in changes):
+                    continue
+                state = self.rebuild(db, user_id, metric_name)
+            elif not self._apply_changes(state, changes):
+                logger.info(
+                    f"[BASELINE] Change older than window for user {user_id} "
+                    f"({metric_name}), rebuilding"
+                )
+                state = self.rebuild(db, user_id, metric_name)
+
+            if state is not None:
+                updated[metric_name] = state
+
+        self._write_row_baselines(metrics, updated)
+        db.flush()
+        return updated
+
+    def rebuild(
+        self, db: Session, user_id: int, metric_name: str
+    ) -> Optional[models.MetricBaseline]:
+        """
+        Recompute baseline state from the full history in one ordered pass.
+
+        Args:
+            db: Database session
+            user_id: User ID
+            metric_name: Tracked HealthMetric column
+
+        Returns:
+            Rebuilt MetricBaseline, or None if the user has no observations
+        """
+        column = getattr(models.HealthMetric, metric_name)
+        rows = (
+            db.query(models.HealthMetric.date, column)
+            .filter(
+                models.HealthMetric.user_id == user_id,
+                column.isnot(None),
+            )
+            .order_by(models.HealthMetric.date.asc())
+            .all()
+        )
+
+        state = self._get_state(db, user_id, metric_name)
+        if not rows and state is None:
+            return None
+
+        if state is None:
+            state = models.MetricBaseline(user_id=user_id, metric=metric_name)
+            db.add(state)
+
+        state.window = {}
+        state.anchor_date = None
+        state.anchor_ewma = None
+        state.last_date = None
+        state.ewma = None
+        self._apply_changes(state, [(row[0], row[1]) for row in rows])
+        return state
+
+    # ===== Read path =====
+
+    def get_baseline(
+        self,
+        db: Session,
+        user_id: int,
+        metric_name: str,
+        as_of: Optional[date] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read precomputed baseline values for a metric.
+
+        Without a state row (history imported before baselines existed) the
+        state is rebuilt from history and added to the session; the caller's
+        next commit persists it.
+
+        Args:
+            db: Database session
+            user_id: User ID
+            metric_name: Tracked HealthMetric column
+            as_of: Evaluate rolling windows ending at this date (default: last observation)
+
+        Returns:
+            Dict with ewma and mean/std/count per window, or None if the user
+            has no observations
+        """
+        state = self._get_state(db, user_id, metric_name)
+        if state is None:
+            state = self.rebuild(db, user_id, metric_name)
+            if state is not None:
+                logger.info(f"[BASELINE] Rebuilt missing {metric_name} baseline for user {user_id}")
+                db.flush()
+        if state is None or state.last_date is None:
+            return None
+        return self.summarize(state, as_of)
+
+    def summarize(
+        self, state: models.MetricBaseline, as_of: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Build a plain dict view of a baseline state.
+
+        When `as_of` is later than the last observation the rolling windows are
+        re-evaluated from the stored window so stale data ages out.
+        """
+        summary: Dict[str, Any] = {
+            "metric": state.metric,
+            "last_date": state.last_date,
+            "ewma": state.ewma,
+        }
+
+        if as_of is None or state.last_date is None or as_of <= state.last_date:
+            for days in WINDOWS:
+                summary[f"mean_{days}d"] = getattr(state, f"mean_{days}d")
+                summary[f"std_{days}d"] = getattr(state, f"std_{days}d")
+                summary[f"count_{days}d"] = getattr(state, f"count_{days}d") or 0
+            return summary
+
+        window = self._load_window(state)
+        for days in WINDOWS:
+            mean, std, count = self._window_stats(window, as_of, days)
+            summary[f"mean_{days}d"] = mean
+            summary[f"std_{days}d"] = std
+            summary[f"count_{days}d"] = count
+        return summary
+
+    # ===== Internals =====
+
+    def _get_state(
+        self, db: Session, user_id: int, metric_name: str
+    ) -> Optional[models.MetricBaseline]:
+        return (
+            db.query(models.MetricBaseline)
+            .filter(
+                models.MetricBaseline.user_id == user_id,
+                models.MetricBaseline.metric == metric_name,
+            )
+            .first()
+        )
+
+    @staticmethod
+    def _collect_changes(
+        metrics: List[models.HealthMetric], metric_name: str
+    ) -> List[Tuple[date, Optional[float]]]:
+        """Latest value per date for one metric, in date order."""
+        by_date: Dict[date, Optional[float]] = {}
+        for metric in metrics:
+            by_date[metric.date] = getattr(metric, metric_name)
+        return sorted(by_date.items())
+
+    @staticmethod
+    def _load_window(state: models.MetricBaseline) -> Dict[date, List[float]]:
+        return {
+            date.fromisoformat(day): list(entry)
+            for day, entry in (state.window or {}).items()
+        }
+
+    def _apply_changes(
+        self,
+        state: models.MetricBaseline,
+        changes: List[Tuple[date, Optional[float]]],
+    ) -> bool:
+        """
+        Apply (date, value) changes to the stored window and replay the EWMA.
+
+        A value of None removes that date's observation.
+
+        Returns:
+            False if a change predates the stored window (caller must rebuild)
+        """
+        window = self._load_window(state)
+        earliest_change: Optional[date] = None
+
+        for day, value in changes:
+            if state.anchor_date is not None and day <= state.anchor_date:
+                return False
+            if value is None:
+                if window.pop(day, None) is None:
+                    continue
+            else:
+                window[day] = [float(value), None]
+            if earliest_change is None or day < earliest_change:
+                earliest_change = day
+
+        if earliest_change is None:
+            return True
+
+        # Replay EWMA from the observation preceding the earliest change
+        ewma = state.anchor_ewma
+        ordered = sorted(window)
+        for day in ordered:
+            if day < earliest_change:
+                ewma = window[day][1]
+                continue
+            value = window[day][0]
+            ewma = value if ewma is None else ewma + self.ALPHA * (value - ewma)
+            window[day][1] = ewma
+
+        if ordered:
+            state.last_date = ordered[-1]
+            state.ewma = window[ordered[-1]][1]
+
+            # Evict observations that fell out of the longest window
+            cutoff = state.last_date - timedelta(days=self.MAX_WINDOW)
+            for day in ordered:
+                if day > cutoff:
+                    break
+                state.anchor_date = day
+                state.anchor_ewma = window.pop(day)[1]
+        else:
+            state.last_date = state.anchor_date
+            state.ewma = state.anchor_ewma
+
+        for days in WINDOWS:
+            if state.last_date is None:
+                mean, std, count = None, None, 0
+            else:
+                mean, std, count = self._window_stats(window, state.last_date, days)
+            setattr(state, f"mean_{days}d", mean)
+            setattr(state, f"std_{days}d", std)
+            setattr(state, f"count_{days}d", count)
+
+        # Reassign so the JSON column is flagged as modified
+        state.window = {day.isoformat(): entry for day, entry in sorted(window.items())}
+        return True
+
+    @staticmethod
+    def _window_stats(
+        window: Dict[date, List[float]], end: date, days: int
+    ) -> Tuple[Optional[float], Optional[float], int]:
+        """Mean, sample std and count of observations in (end - days, end - gap]."""
+        start = end - timedelta(days=days)
+        stop = end - timedelta(days=WINDOW_GAPS.get(days, 0))
+        values = [entry[0] for day, entry in window.items() if start < day <= stop]
+        if not values:
+            return None, None, 0
+        mean = statistics.fmean(values)
+        std = statistics.stdev(values) if len(values) > 1 else 0.0
+        return mean, std, len(values)
+
+    def _write_row_baselines(
+        self,
+        metrics: List[models.HealthMetric],
+        states: Dict[str, models.MetricBaseline],
+    ) -> None:
+        """Store the 7-day baseline as of each row's date on the row itself."""
+        for metric_name, state in states.items():
+            baseline_column = TRACKED_METRICS[metric_name]
+            window = self._load_window(state)
+            for metric in metrics:
+                if state.anchor_date is not None and metric.date <= state.anchor_date:
+                    continue
+                mean, _, count = self._window_stats(window, metric.date, 7)
+                if not count:
+                    continue
+                if baseline_column == "resting_hr_baseline_bpm":
+                    mean = int(round(mean))
+                setattr(metric, baseline_column, mean)
+
+
+# Singleton
+baseline_service = BaselineService()
@@ -0,0 +1,214 @@
+"""
+best_effort_service.py - Precomputed fastest segments per standard distance
+
+- fastest_segments(): fastest elapsed time over each distance inside one
+  distance/time stream (sliding window, vectorized)
+- index_workout(): stores a workout's best efforts in BestEffort at ingest
+- personal_bests(): indexed read path used by race predictions, VDOT and
+  training paces
+
+Each effort also stores a flat-equivalent time (elapsed scaled by the
+segment's graded distance, see grade_service) used for predictions.
+
+For every sample i, the window end is the first sample j with
+d[j] >= d[i] + D; np.searchsorted finds all window ends at once (the
+vectorized form of the two-pointer sweep) and the exact crossing time is
+linearly interpolated between samples j-1 and j.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+# Distances indexed at ingest (meters)
+BEST_EFFORT_DISTANCES = {
+    "400m": 400.0,
+    "1K": 1000.0,
+    "5K": 5000.0,
+    "10K": 10000.0,
+    "Half Marathon": 21097.5,
+    "Marathon": 42195.0,
+}
+
+# Segments faster than this are GPS glitches, not running (m/s)
+MAX_SEGMENT_SPEED = 11.0
+
+
+def is_run(sport_type: Optional[str]) -> bool:
+    """Whether a sport type is running (road, trail, treadmill...), i.e. indexed."""
+    return "run" in (sport_type or "").lower()
+
+
+def run_filter():
+    """is_run() as a filter on Workout.sport_type."""
+    return func.lower(models.Workout.sport_type).contains("run")
+
+
+def fastest_segments(
+    time: np.ndarray,
+    distance: np.ndarray,
+    distances: Dict[str, float] = BEST_EFFORT_DISTANCES,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Fastest segment per target distance in a single stream.
+
+    Args:
+        time: Seconds since workout start, ascending
+        distance: Cumulative meters (NaN samples are dropped)
+        distances: Name -> target distance in meters
+
+    Returns:
+        Name -> (elapsed_seconds, start_offset_seconds) for every distance
+        the stream covers
+    """
+    valid = np.isfinite(time) & np.isfinite(distance)
+    t = np.asarray(time, dtype=float)[valid]
+    # Cumulative distance can dip on device corrections; force it monotonic
+    d = np.maximum.accumulate(np.asarray(distance, dtype=float)[valid])
+    if len(d) < 2:
+        return {}
+
+    results = {}
+    for name, target in distances.items():
+        if d[-1] - d[0] < target:
+            continue
+
+        targets = d + target
+        ends = np.searchsorted(d, targets, side="left")
+        starts = np.nonzero(ends < len(d))[0]
+        ends = ends[starts]
+
+        # d[end - 1] < targets <= d[end], so the interpolation is well defined
+        d0, d1 = d[ends - 1], d[ends]
+        t0, t1 = t[ends - 1], t[ends]
+        crossing = t0 + (targets[starts] - d0) / (d1 - d0) * (t1 - t0)
+        elapsed = crossing - t[starts]
+
+        plausible = elapsed * MAX_SEGMENT_SPEED >= target
+        if not plausible.any():
+            continue
+        elapsed = np.where(plausible, elapsed, np.inf)
+        best = int(np.argmin(elapsed))
+        results[name] = (float(elapsed[best]), float(t[starts[best]]))
+
+    return results
+
+
+class BestEffortService:
+    """Maintains and serves the per-user best-effort index."""
+
+    # ===== Write path =====
+
+    def index_workout(
+        self,
+        db: Session,
+        workout: models.Workout,
+        streams: Optional[Dict[str, np.ndarray]],
+        graded_distance: Optional[np.ndarray] = None,
+    ) -> List[models.BestEffort]:
+        """
+        Replace a workout's best efforts from its streams. Does not commit.
+
+        Only running workouts with time and distance channels are indexed.
+
+        Args:
+            graded_distance: Cumulative flat-equivalent distance per sample
+                (grade_service); enables graded_elapsed_seconds
+
+        Returns:
+            The BestEffort rows written
+        """
+        workout.best_efforts = []
+        if (
+            not streams
+            or "time" not in streams
+            or "distance" not in streams
+            or not is_run(workout.sport_type)
+        ):
+            return []
+
+        time = streams["time"]
+        efforts = []
+        for name, (elapsed, offset) in fastest_segments(time, streams["distance"]).items():
+            target = BEST_EFFORT_DISTANCES[name]
+            graded_elapsed = None
+            if graded_distance is not None:
+                start, end = np.interp([offset, offset + elapsed], time, graded_distance)
+                if end > start:
+                    graded_elapsed = round(elapsed * target / (end - start), 1)
+            efforts.append(models.BestEffort(
+                user_id=workout.user_id,
+                name=name,
+                distance_meters=target,
+                elapsed_seconds=round(elapsed, 1),
+                graded_elapsed_seconds=graded_elapsed,
+                start_offset_seconds=round(offset, 1),
+                achieved_at=workout.start_time,
+            ))
+        workout.best_efforts = efforts
+        return efforts
+
+    # ===== Read path =====
+
+    def personal_bests(
+        self,
+        db: Session,
+        user_id: int,
+        since: Optional[datetime] = None,
+        graded: bool = False,
+    ) -> List[models.BestEffort]:
+        """
+        Fastest effort per distance, optionally only efforts since a date.
+
+        One grouped query on the (user, distance, elapsed) index plus the
+        matching rows; ties keep the most recent effort.
+
+        Args:
+            graded: Rank by flat-equivalent time (falls back to elapsed
+                for efforts without altitude data)
+        """
+        elapsed = models.BestEffort.elapsed_seconds
+        if graded:
+            elapsed = func.coalesce(models.BestEffort.graded_elapsed_seconds, elapsed)
+
+        fastest = db.query(
+            models.BestEffort.distance_meters,
+            func.min(elapsed).label("elapsed"),
+        ).filter(models.BestEffort.user_id == user_id)
+        if since is not None:
+            fastest = fastest.filter(models.BestEffort.achieved_at >= since)
+        fastest = fastest.group_by(models.BestEffort.distance_meters).subquery()
+
+        query = db.query(models.BestEffort).join(
+            fastest,
+            (models.BestEffort.distance_meters == fastest.c.distance_meters)
+            & (elapsed == fastest.c.elapsed),
+        ).filter(models.BestEffort.user_id == user_id)
+        if since is not None:
+            query = query.filter(models.BestEffort.achieved_at >= since)
+
+        bests: Dict[float, models.BestEffort] = {}
+        for effort in query.order_by(models.BestEffort.achieved_at.desc()):
+            bests.setdefault(effort.distance_meters, effort)
+        return sorted(bests.values(), key=lambda e: e.distance_meters)
+
+    def has_efforts(self, db: Session, user_id: int) -> bool:
+        """Whether the user has any indexed effort."""
+        return (
+            db.query(models.BestEffort.id)
+            .filter(models.BestEffort.user_id == user_id)
+            .first()
+            is not None
+        )
+
+
+# Singleton
+best_effort_service = BestEffortService()
@@ -0,0 +1,265 @@
+"""
+coach_context_service.py - Token-budgeted prompt assembly for the AI coach
+
+The chat prompt is split into sections with a fixed token budget each
+(CONTEXT_BUDGET). Sections arrive as lines ordered by priority and are cut
+at the first line that doesn't fit.
+
+Conversation history is kept compact with a rolling summary per user
+(ChatSummary): recent turns are sent verbatim while they fit, older ones are
+folded into the summary once (extractive: first sentence of each turn, no
+extra LLM call) and only the summary is sent from then on. Each chat turn
+therefore reads only the messages newer than the summary.
+
+Older details the summary lost are brought back on demand: the new message
+is used as a query against the user's local retrieval index (chat history
+and workouts, retrieval_service) and the best matches fill the "retrieved"
+section.
+
+Token counts are estimates (CHARS_PER_TOKEN); Groq reports the real usage.
+"""
+import logging
+import math
+import re
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.retrieval_service import retrieval_service
+
+logger = logging.getLogger(__name__)
+
+
+# Token budget per prompt section
+CONTEXT_BUDGET = {
+    "profile": 150,
+    "training": 250,
+    "retrieved": 150,
+    "summary": 200,
+    "conversation": 500,
+}
+
+# Average characters per token for Llama 3 on mixed Spanish/English text
+CHARS_PER_TOKEN = 3.5
+
+# Messages newer than the summary considered for verbatim use per turn;
+# any older ones still unsummarized are folded straight away
+MAX_UNSUMMARIZED = 40
+
+# Longest single message sent verbatim (tokens)
+MAX_MESSAGE_TOKENS = 200
+
+# Past messages / workouts retrieved per turn (before the token budget)
+RETRIEVED_ITEMS = 6
+
+# Characters kept per turn in the rolling summary
+SUMMARY_TURN_CHARS = {"user": 120, "assistant": 160}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def fit_lines(lines: List[str], budget: int) -> Tuple[List[str], int]:
+    """Leading lines that fit in a token budget, and the tokens they use."""
+    kept, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1  # newline
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return kept, used
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """Cut a text to a token budget at a word boundary."""
+    limit = int(max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def first_sentence(text: str, max_chars: int) -> str:
+    """First sentence of a message, collapsed to one line and capped."""
+    flat = re.sub(r"\s+", " ", text).strip()
+    sentence = re.split(r"(?<=[.!?])\s", flat, maxsplit=1)[0]
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars].rsplit(" ", 1)[0] + "…"
+    return sentence
+
+
+class CoachContextService:
+    """Assembles chat prompts within CONTEXT_BUDGET."""
+
+    def assemble_chat(
+        self,
+        db: Session,
+        user: models.User,
+        system_prompt: str,
+        profile_lines: List[str],
+        training_lines: List[str],
+        user_message: str,
+        instructions: str = "",
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        Messages for a chat completion, plus size statistics.
+
+        Folds turns that no longer fit into the user's rolling summary (added
+        to the session, committed by the caller with the new messages).
+
+        Args:
+            db: Database session
+            user: Athlete chatting
+            system_prompt: Coaching style prompt
+            profile_lines: Athlete profile, most important first
+            training_lines: Recent training, most important first
+            user_message: The new message
+            instructions: Fixed text appended to the system prompt
+
+        Returns:
+            (messages, stats) where stats has estimated prompt_tokens, tokens
+            per section, the number of history messages sent verbatim, the
+            number of retrieved items and the conversation length before
+            this turn
+        """
+        profile, profile_used = fit_lines(profile_lines, CONTEXT_BUDGET["profile"])
+        training, training_used = fit_lines(training_lines, CONTEXT_BUDGET["training"])
+
+        summary = self._get_summary(db, user.id)
+        history = (
+            db.query(models.ChatMessage)
+            .filter(
+                models.ChatMessage.user_id == user.id,
+                models.ChatMessage.id > summary.last_message_id,
+            )
+            .order_by(models.ChatMessage.id.desc())
+            .limit(MAX_UNSUMMARIZED)
+            .all()
+        )
+        overflow = self._overflow(db, user.id, summary, history)
+        conversation_length = (summary.message_count or 0) + len(overflow) + len(history)
+
+        # Newest turns verbatim while they fit; everything older is folded
+        budget = CONTEXT_BUDGET["conversation"] - estimate_tokens(user_message)
+        verbatim: List[Dict[str, str]] = []
+        used = 0
+        cut = len(history)
+        for position, message in enumerate(history):
+            content = truncate(message.content, MAX_MESSAGE_TOKENS)
+            cost = estimate_tokens(content) + 4  # role / message framing
+            if used + cost > budget:
+                cut = position
+                break
+            verbatim.append({"role": message.role, "content": content})
+            used += cost
+        # Keep user/assistant pairs together at the cut
+        if verbatim and verbatim[-1]["role"] == "assistant" and cut < len(history):
+            verbatim.pop()
+            cut -= 1
+        folded = overflow + list(reversed(history[cut:]))
+        if folded:
+            self._fold(summary, folded)
+
+        hits = retrieval_service.search(
+            db, user.id, user_message, k=RETRIEVED_ITEMS,
+            exclude_message_ids=[message.id for message in history[:cut]],
+        )
+        retrieved, retrieved_used = fit_lines(
+            [hit.line for hit in hits], CONTEXT_BUDGET["retrieved"]
+        )
+
+        summary_lines, summary_used = [], 0
+        if summary.content:
+            summary_lines, summary_used = fit_lines(
+                list(reversed(summary.content.splitlines())), CONTEXT_BUDGET["summary"]
+            )
+            summary_lines.reverse()
+
+        sections = [system_prompt]
+        if profile:
+            sections.append("ATLETA:\n" + "\n".join(profile))
+        if training:
+            sections.append("ENTRENAMIENTO:\n" + "\n".join(training))
+        if retrieved:
+            sections.append("RELEVANTE DEL HISTORIAL:\n" + "\n".join(retrieved))
+        if summary_lines:
+            sections.append("CONVERSACIÓN ANTERIOR (resumen):\n" + "\n".join(summary_lines))
+        if instructions:
+            sections.append(instructions)
+        system = "\n\n".join(sections)
+
+        messages = [{"role": "system", "content": system}]
+        messages += list(reversed(verbatim))
+        messages.append({"role": "user", "content": user_message})
+
+        stats = {
+            "prompt_tokens": sum(estimate_tokens(m["content"]) + 4 for m in messages),
+            "sections": {
+                "profile": profile_used,
+                "training": training_used,
+                "retrieved": retrieved_used,
+                "summary": summary_used,
+                "conversation": used,
+            },
+            "history_messages": len(verbatim),
+            "retrieved_items": len(retrieved),
+            "conversation_length": conversation_length,
+        }
+        return messages, stats
+
+    def clear(self, db: Session, user_id: int) -> None:
+        """Delete a user's rolling summary (with the chat history). Does not commit."""
+        db.query(models.ChatSummary).filter(models.ChatSummary.user_id == user_id).delete()
+
+    def _get_summary(self, db: Session, user_id: int) -> models.ChatSummary:
+        summary = (
+            db.query(models.ChatSummary)
+            .filter(models.ChatSummary.user_id == user_id)
+            .first()
+        )
+        if summary is None:
+            summary = models.ChatSummary(
+                user_id=user_id, content="", last_message_id=0, message_count=0
+            )
+            db.add(summary)
+        return summary
+
+    def _overflow(
+        self,
+        db: Session,
+        user_id: int,
+        summary: models.ChatSummary,
+        history: List[models.ChatMessage],
+    ) -> List[models.ChatMessage]:
+        """Unsummarized messages older than the MAX_UNSUMMARIZED newest (chronological)."""
+        if len(history) < MAX_UNSUMMARIZED:
+            return []
+        return (
+            db.query(models.ChatMessage)
+            .filter(
+                models.ChatMessage.user_id == user_id,
+                models.ChatMessage.id > summary.last_message_id,
+                models.ChatMessage.id < history[-1].id,
+            )
+            .order_by(models.ChatMessage.id)
+            .all()
+        )
+
+    def _fold(self, summary: models.ChatSummary, messages: List[models.ChatMessage]) -> None:
+        """Append turns (chronological) to the summary, trimming its oldest lines."""
+        lines = summary.content.splitlines() if summary.content else []
+        for message in messages:
+            who = "Atleta" if message.role == "user" else "Coach"
+            text = first_sentence(message.content, SUMMARY_TURN_CHARS.get(message.role, 120))
+            lines.append(f"- {message.created_at:%d/%m} {who}: {text}")
+        kept, _ = fit_lines(list(reversed(lines)), CONTEXT_BUDGET["summary"])
+        summary.content = "\n".join(reversed(kept))
+        summary.last_message_id = max(m.id for m in messages)
+        summary.message_count = (summary.message_count or 0) + len(messages)
+
+
+# Singleton
+coach_context_service = CoachContextService()
@@ -17,10 +17,21 @@ import logging
 
 from app import models
 from app.core.config import settings
+from app.services.athlete_context_service import athlete_context_service
+from app.services.coach_context_service import coach_context_service
+from app.services.llm_scheduler_service import LLMOverloadedError, Priority, llm_scheduler
+from app.services.similar_workout_service import similar_workout_service
+from app.services.workout_split_service import workout_split_service
 
 logger = logging.getLogger(__name__)
 
 
+# Fixed chat instructions (appended to the system prompt)
+CHAT_INSTRUCTIONS = """Eres el coach personal del usuario. Tienes acceso a su historial de entrenamientos, objetivos y progreso.
+Responde de manera conversacional, útil y personalizada: consejos de entrenamiento, técnica, motivación, workouts concretos, análisis de progreso, nutrición y recuperación.
+Mantén respuestas concisas (máximo 200 palabras) a menos que se solicite más detalle."""
+
+
 class CoachService:
     """AI Coach service for personalized training feedback."""
 
@@ -31,7 +42,11 @@ class CoachService:
             raise ValueError("GROQ_API_KEY not configured")
 
         self.client = Groq(api_key=api_key)
-        self.model = "llama-3.3-70b-versatile"
+        self.model = settings.llm_model
+
+    def _complete(self, user: models.User, priority: Priority, **kwargs) -> Any:
+        """Chat completion through the shared LLM scheduler (see llm_scheduler_service)."""
+        return llm_scheduler.complete(self.client, user.id, priority, self.model, **kwargs)
 
     # ========================================================================
     # HR ZONES CALCULATION (Scientific Karvonen Formula + Power Zones)
@@ -257,7 +272,7 @@ class CoachService:
             context_parts.append(f"- Zonas cardíacas:")
             for zone_key, zone_info in zones.items():
                 context_parts.append(
-                    f"  {zone_info['name']}: {zone_info['min_bpm']}-{zone_info['max_bpm']} bpm"
+                    f"  {zone_info['name']}: {zone_info['hr']['min_bpm']}-{zone_info['hr']['max_bpm']} bpm"
                 )
 
         # Goals
@@ -330,6 +345,79 @@ class CoachService:
 
         return "\n".join(context_parts)
 
+    def build_compact_profile(self, user: models.User) -> List[str]:
+        """Athlete profile as short lines, most important first (chat prompts).
+
+        Same facts as build_athlete_context in a denser encoding; the token
+        budget cuts from the end.
+        """
+        lines = [
+            f"{user.name}, nivel {user.running_level or 'intermediate'}"
+            + (f", FCM {user.max_heart_rate}" if user.max_heart_rate else "")
+        ]
+
+        if user.injuries:
+            active = [inj for inj in user.injuries if not inj.get("recovered")]
+            if active:
+                lines.append(
+                    "Lesiones activas: "
+                    + "; ".join(inj.get("injury_type", "N/A") for inj in active)
+                )
+
+        goals = [g for g in (user.goals or []) if not g.get("completed")]
+        for goal in goals[:3]:
+            lines.append(
+                f"Objetivo: {goal.get('name', goal.get('target', 'N/A'))}"
+                f" ({goal.get('target_value', 'N/A')}, {goal.get('deadline', 'sin fecha')})"
+            )
+
+        if user.max_heart_rate:
+            zones = self.calculate_hr_zones(user.max_heart_rate)
+            lines.append(
+                "Zonas FC: "
+                + " ".join(
+                    f"Z{i}:{z['hr']['min_bpm']}-{z['hr']['max_bpm']}"
+                    for i, z in enumerate(zones.values(), 1)
+                )
+            )
+
+        if user.preferences:
+            prefs = [
+                user.preferences.get(key)
+                for key in ("time_of_day", "terrain_preference")
+                if user.preferences.get(key)
+            ]
+            if prefs:
+                lines.append("Prefiere: " + ", ".join(prefs))
+        return lines
+
+    def build_compact_training(self, recent_workouts: List[models.Workout]) -> List[str]:
+        """Recent training as one totals line plus one line per workout (newest first)."""
+        if not recent_workouts:
+            return []
+        total_km = sum(w.distance_meters for w in recent_workouts) / 1000
+        total_h = sum(w.duration_seconds for w in recent_workouts) / 3600
+        lines = [f"{len(recent_workouts)} sesiones: {total_km:.1f} km, {total_h:.1f} h"]
+        for w in recent_workouts:
+            line = f"{w.start_time:%d/%m} {w.sport_type} {w.distance_meters / 1000:.1f}km"
+            line += f" {w.duration_seconds // 60}min"
+            if w.avg_pace:
+                line += f" {self._format_pace(w.avg_pace)}"
+            if w.avg_heart_rate:
+                line += f" FC{w.avg_heart_rate}"
+            lines.append(line)
+        return lines
+
+    def get_athlete_context(
+        self, db: Session, user: models.User
+    ) -> models.AthleteContextSnapshot:
+        """Athlete context formatted by the builders above, cached per user.
+
+        Rebuilt only after the user's workouts, profile or goals changed
+        (see athlete_context_service).
+        """
+        return athlete_context_service.get(db, user, self)
+
     # ========================================================================
     # COACHING STYLE PROMPTS
     # ========================================================================
@@ -383,7 +471,6 @@ class CoachService:
         self,
         workout: models.Workout,
         user: models.User,
-        recent_workouts: List[models.Workout],
         db: Session,
     ) -> Dict[str, Any]:
         """Analyze workout and provide AI coaching feedback.
@@ -391,15 +478,13 @@ class CoachService:
         Args:
             workout: Workout to analyze
             user: User who performed the workout
-            recent_workouts: Recent workout history
             db: Database session
 
         Returns:
             Dict with analysis, recommendations, and metrics
         """
-        # Build context
-        goals = user.goals if user.goals else []
-        athlete_context = self.build_athlete_context(user, recent_workouts, goals)
+        # Profile, goals and recent training from the cached snapshot
+        athlete_context = self.get_athlete_context(db, user).context
 
         # Prepare workout details
         workout_details = self._format_workout_details(workout, user)
@@ -429,8 +514,9 @@ Sé conciso pero útil. Máximo 200 palabras."""
 
         # Call Groq API
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
+            completion = self._complete(
+                user,
+                Priority.STANDARD,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
@@ -466,6 +552,8 @@ Sé conciso pero útil. Máximo 200 palabras."""
                 },
             }
 
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             raise Exception(f"Error calling Groq API: {str(e)}")
 
@@ -510,8 +598,26 @@ Sé conciso pero útil. Máximo 200 palabras."""
         if workout.calories:
             details.append(f"Calorías: {workout.calories:.0f} kcal")
 
+        kind = "laps" if (workout.splits or {}).get("laps") else "km"
+        splits = workout_split_service.as_rows(workout.splits, kind)
+        if splits:
+            label = "Vueltas" if kind == "laps" else "Parciales por km"
+            details.append(
+                f"{label}: "
+                + "; ".join(self._format_split(split) for split in splits)
+            )
+
         return "\n".join([f"- {d}" for d in details])
 
+    def _format_split(self, split: Dict[str, Any]) -> str:
+        """Compact split for the prompt: '3: 5:02/km, 152 bpm, +12 m'."""
+        parts = [self._format_pace(split["pace_seconds_per_km"])]
+        if split["avg_heart_rate"]:
+            parts.append(f"{split['avg_heart_rate']:.0f} bpm")
+        if split["elevation_gain"]:
+            parts.append(f"+{split['elevation_gain']:.0f} m")
+        return f"{split['index']}: " + ", ".join(parts)
+
     def _format_pace(self, pace_seconds_per_km: float) -> str:
         """Format pace from seconds per km to min:sec/km."""
         if not pace_seconds_per_km or pace_seconds_per_km <= 0:
@@ -595,8 +701,9 @@ Para cada día indica:
 Máximo 300 palabras."""
 
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
+            completion = self._complete(
+                user,
+                Priority.BACKGROUND,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
@@ -618,6 +725,8 @@ Máximo 300 palabras."""
                 "goals": [g for g in goals if not g.get("completed")],
             }
 
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             raise Exception(f"Error generating weekly plan: {str(e)}")
 
@@ -738,8 +847,9 @@ Proporciona:
 Máximo 150 palabras."""
 
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
+            completion = self._complete(
+                user,
+                Priority.STANDARD,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
@@ -760,76 +870,63 @@ Máximo 150 palabras."""
         self,
         user: models.User,
         user_message: str,
-        conversation_history: List[models.ChatMessage],
-        recent_workouts: List[models.Workout],
         db: Session,
     ) -> Dict[str, Any]:
         """Chat with AI coach maintaining conversation context.
 
+        The prompt is assembled within a token budget (see
+        coach_context_service): compact profile and training lines from the
+        athlete context snapshot, a rolling summary of older turns and the
+        most recent turns verbatim.
+
         Args:
             user: User chatting with coach
             user_message: User's message
-            conversation_history: Previous messages in conversation
-            recent_workouts: Recent workout history for context
-            db: Database session
+            db: Database session (the summary update is committed by the caller)
 
         Returns:
             Dict with assistant response and metadata
         """
-        # Build athlete context
-        goals = user.goals if user.goals else []
-        athlete_context = self.build_athlete_context(user, recent_workouts, goals)
-
         # Get coaching style
         coaching_style = user.coaching_style or "balanced"
         custom_prompt = (
             user.preferences.get("custom_prompt") if user.preferences else None
         )
         system_prompt = self.get_coaching_style_prompt(coaching_style, custom_prompt)
-
-        # Enhanced system prompt with context
-        enhanced_system_prompt = f"""{system_prompt}
-
-CONTEXTO DEL ATLETA:
-{athlete_context}
-
-Eres el coach personal del usuario. Tienes acceso a todo su historial de entrenamientos, objetivos y progreso.
-Responde de manera conversacional, útil y personalizada. Puedes:
-- Dar consejos de entrenamiento
-- Responder preguntas técnicas sobre running
-- Motivar y animar
-- Sugerir workouts específicos
-- Analizar progreso
-- Ayudar con nutrición, recuperación, etc.
-
-Mantén respuestas concisas (máximo 200 palabras) a menos que se solicite más detalle."""
-
-        # Build conversation messages for API
-        messages = [{"role": "system", "content": enhanced_system_prompt}]
-
-        # Add recent conversation history (last 10 messages for context)
-        for msg in conversation_history[-10:]:
-            messages.append({"role": msg.role, "content": msg.content})
-
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
+        snapshot = self.get_athlete_context(db, user)
+
+        messages, stats = coach_context_service.assemble_chat(
+            db,
+            user,
+            system_prompt=system_prompt,
+            profile_lines=snapshot.profile_lines,
+            training_lines=snapshot.training_lines,
+            user_message=user_message,
+            instructions=CHAT_INSTRUCTIONS,
+        )
 
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model, messages=messages, temperature=0.8, max_tokens=500
+            completion = self._complete(
+                user, Priority.INTERACTIVE, messages=messages, temperature=0.8, max_tokens=500
             )
 
             assistant_response = completion.choices[0].message.content
             tokens_used = completion.usage.total_tokens
+            logger.info(
+                f"[COACH] Chat prompt ~{stats['prompt_tokens']} tokens "
+                f"(actual {completion.usage.prompt_tokens}), sections {stats['sections']}"
+            )
 
             return {
                 "response": assistant_response,
                 "tokens_used": tokens_used,
                 "coaching_style": coaching_style,
-                "conversation_length": len(conversation_history)
+                "conversation_length": stats["conversation_length"]
                 + 2,  # +2 for new messages
             }
 
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             raise Exception(f"Error in chat: {str(e)}")
 
@@ -856,23 +953,14 @@ Mantén respuestas concisas (máximo 200 palabras) a menos que se solicite más
         Returns:
             Dict with comprehensive analysis
         """
-        # Get similar workouts (same distance range ±20%)
-        distance_min = workout.distance_meters * 0.8
-        distance_max = workout.distance_meters * 1.2
-
-        similar_workouts = (
-            db.query(models.Workout)
-            .filter(
-                models.Workout.user_id == user.id,
-                models.Workout.id != workout.id,
-                models.Workout.sport_type == workout.sport_type,
-                models.Workout.distance_meters >= distance_min,
-                models.Workout.distance_meters <= distance_max,
-            )
-            .order_by(models.Workout.start_time.desc())
-            .limit(5)
-            .all()
-        )
+        # Most comparable sessions (nearest neighbours, same route preferred)
+        similar_workouts = [
+            w for w, _ in similar_workout_service.similar(db, workout, k=5)
+        ]
+        same_route_ids = {
+            w.id for w in similar_workouts
+            if workout.route_id is not None and w.route_id == workout.route_id
+        }
 
         # Build context
         workout_context = self._build_workout_context(workout, user)
@@ -888,7 +976,8 @@ Mantén respuestas concisas (máximo 200 palabras) a menos que se solicite más
                 )
                 pace_formatted = self._format_pace(w.avg_pace) if w.avg_pace else "N/A"
                 comparison_context += f"(pace {pace_formatted}, "
-                comparison_context += f"FC {w.avg_heart_rate or 'N/A'} bpm)\n"
+                comparison_context += f"FC {w.avg_heart_rate or 'N/A'} bpm)"
+                comparison_context += " [misma ruta]\n" if w.id in same_route_ids else "\n"
 
         # Build goals context
         goals_context = ""
@@ -940,8 +1029,9 @@ NOTA IMPORTANTE: Este es un análisis diagnóstico. Para planes de entrenamiento
 Responde en español, de manera estructurada pero natural. Sé directo y práctico."""
 
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
+            completion = self._complete(
+                user,
+                Priority.STANDARD,
                 messages=[
                     {
                         "role": "system",
@@ -964,6 +1054,8 @@ Responde en español, de manera estructurada pero natural. Sé directo y prácti
                 "analyzed_at": datetime.utcnow().isoformat(),
             }
 
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             raise Exception(f"Error in deep analysis: {str(e)}")
 
@@ -1048,209 +1140,9 @@ FC máxima: {workout.max_heart_rate or 'N/A'} bpm"""
         """
         Calculate 0-100 readiness score based on health metrics.
 
-        Args:
-            health_metric: Today's health metrics (can be None)
-            user: User model
-
-        Returns:
-            Dict with readiness_score, factors, and recommendation
+        See module-level calculate_readiness_score (usable without a Groq client).
         """
-        if not health_metric:
-            return {
-                "readiness_score": 50,
-                "confidence": "low",
-                "factors": [],
-                "recommendation": "No health data available. Train based on how you feel.",
-                "should_train_hard": None,
-            }
-
-        factors = []
-        total_weight = 0
-        weighted_sum = 0
-
-        # Factor 1: Body Battery / Readiness Score (40% weight)
-        if health_metric.body_battery is not None:
-            score = health_metric.body_battery
-            weight = 0.4
-            factors.append(
-                {
-                    "name": "Body Battery",
-                    "score": score,
-                    "weight": weight,
-                    "status": (
-                        "good" if score >= 70 else "moderate" if score >= 50 else "low"
-                    ),
-                }
-            )
-            weighted_sum += score * weight
-            total_weight += weight
-        elif health_metric.readiness_score is not None:
-            score = health_metric.readiness_score
-            weight = 0.4
-            factors.append(
-                {
-                    "name": "Readiness",
-                    "score": score,
-                    "weight": weight,
-                    "status": (
-                        "good" if score >= 70 else "moderate" if score >= 50 else "low"
-                    ),
-                }
-            )
-            weighted_sum += score * weight
-            total_weight += weight
-
-        # Factor 2: Sleep Quality (30% weight)
-        if health_metric.sleep_score is not None:
-            score = health_metric.sleep_score
-            weight = 0.3
-            factors.append(
-                {
-                    "name": "Sleep Quality",
-                    "score": score,
-                    "weight": weight,
-                    "status": (
-                        "good" if score >= 70 else "moderate" if score >= 50 else "poor"
-                    ),
-                }
-            )
-            weighted_sum += score * weight
-            total_weight += weight
-        elif health_metric.sleep_duration_minutes is not None:
-            # Convert sleep duration to score (7-9h = 100, < 6h = low)
-            hours = health_metric.sleep_duration_minutes / 60
-            if hours >= 7:
-                score = min(100, 100 * (hours / 8))
-            else:
-                score = max(0, (hours / 7) * 100)
-            weight = 0.25
-            factors.append(
-                {
-                    "name": "Sleep Duration",
-                    "score": int(score),
-                    "weight": weight,
-                    "status": (
-                        "good" if hours >= 7 else "moderate" if hours >= 6 else "poor"
-                    ),
-                }
-            )
-            weighted_sum += score * weight
-            total_weight += weight
-
-        # Factor 3: HRV vs Baseline (20% weight)
-        if health_metric.hrv_ms and health_metric.hrv_baseline_ms:
-            ratio = health_metric.hrv_ms / health_metric.hrv_baseline_ms
-            score = min(100, ratio * 100)
-            weight = 0.2
-            status = "good" if ratio >= 0.95 else "moderate" if ratio >= 0.85 else "low"
-            factors.append(
-                {
-                    "name": "HRV",
-                    "score": int(score),
-                    "weight": weight,
-                    "status": status,
-                    "detail": f"{health_metric.hrv_ms:.0f}ms (baseline: {health_metric.hrv_baseline_ms:.0f}ms)",
-                }
-            )
-            weighted_sum += score * weight
-            total_weight += weight
-
-        # Factor 4: Resting HR vs Baseline (10% weight)
-        if health_metric.resting_hr_bpm and health_metric.resting_hr_baseline_bpm:
-            # Lower resting HR is better, so invert the scale
-            diff = health_metric.resting_hr_bpm - health_metric.resting_hr_baseline_bpm
-            if diff <= 0:
-                score = 100  # Lower or equal to baseline = perfect
-            else:
-                score = max(
-                    0, 100 - (diff * 10)
-                )  # Each bpm above baseline = -10 points
-            weight = 0.1
-            status = "good" if diff <= 2 else "moderate" if diff <= 5 else "elevated"
-            factors.append(
-                {
-                    "name": "Resting HR",
-                    "score": int(score),
-                    "weight": weight,
-                    "status": status,
-                    "detail": f"{health_metric.resting_hr_bpm} bpm (baseline: {health_metric.resting_hr_baseline_bpm} bpm)",
-                }
-            )
-            weighted_sum += score * weight
-            total_weight += weight
-
-        # Factor 5: Stress Level (10% weight)
-        if health_metric.stress_level is not None:
-            # Invert stress (low stress = high score)
-            score = 100 - health_metric.stress_level
-            weight = 0.1
-            factors.append(
-                {
-                    "name": "Stress",
-                    "score": score,
-                    "weight": weight,
-                    "status": (
-                        "low"
-                        if health_metric.stress_level < 30
-                        else "moderate" if health_metric.stress_level < 60 else "high"
-                    ),
-                }
-            )
-            weighted_sum += score * weight
-            total_weight += weight
-
-        # Factor 6: Subjective Energy (if manual entry)
-        if health_metric.energy_level is not None:
-            # Convert 1-5 scale to 0-100
-            score = (health_metric.energy_level - 1) * 25
-            weight = 0.15
-            factors.append(
-                {
-                    "name": "Energy Level",
-                    "score": score,
-                    "weight": weight,
-                    "status": (
-                        "high"
-                        if health_metric.energy_level >= 4
-                        else "moderate" if health_metric.energy_level >= 3 else "low"
-                    ),
-                }
-            )
-            weighted_sum += score * weight
-            total_weight += weight
-
-        # Calculate final score
-        if total_weight == 0:
-            readiness_score = 50
-            confidence = "low"
-        else:
-            readiness_score = int(weighted_sum / total_weight)
-            confidence = (
-                "high"
-                if total_weight >= 0.6
-                else "medium" if total_weight >= 0.3 else "low"
-            )
-
-        # Generate recommendation
-        if readiness_score >= 75:
-            recommendation = "✅ Excelente estado de recuperación. Perfecto para entrenamientos intensos."
-            should_train_hard = True
-        elif readiness_score >= 60:
-            recommendation = (
-                "⚠️ Estado moderado. Entrenamientos ligeros o moderados recomendados."
-            )
-            should_train_hard = False
-        else:
-            recommendation = "🛑 Estado de recuperación bajo. Considera día de descanso o recuperación activa."
-            should_train_hard = False
-
-        return {
-            "readiness_score": readiness_score,
-            "confidence": confidence,
-            "factors": factors,
-            "recommendation": recommendation,
-            "should_train_hard": should_train_hard,
-        }
+        return calculate_readiness_score(health_metric, user)
 
     def generate_health_aware_recommendation(
         self,
@@ -1285,20 +1177,9 @@ FC máxima: {workout.max_heart_rate or 'N/A'} bpm"""
         # Calculate readiness
         readiness = self.calculate_readiness_score(health_metric, user)
 
-        # Get recent workouts for context
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_workouts = (
-            db.query(models.Workout)
-            .filter(
-                models.Workout.user_id == user.id, models.Workout.start_time >= week_ago
-            )
-            .order_by(models.Workout.start_time.desc())
-            .all()
-        )
-
         # Build context for AI
         health_context = self._build_health_context(health_metric, readiness)
-        athlete_context = self.build_athlete_context(user, recent_workouts, user.goals)
+        athlete_context = self.get_athlete_context(db, user).context
 
         # Generate AI recommendation
         prompt = f"""
@@ -1317,8 +1198,9 @@ Keep the response in Spanish, conversational, and motivating while being realist
 """
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._complete(
+                user,
+                Priority.STANDARD,
                 messages=[
                     {
                         "role": "system",
@@ -1405,15 +1287,13 @@ Keep the response in Spanish, conversational, and motivating while being realist
     def generate_personalized_training_plan(
         self,
         user: models.User,
-        recent_workouts: List[models.Workout],
         plan_request: Any,
-        db: Session = None,
+        db: Session,
     ) -> Dict[str, Any]:
         """Generate highly personalized multi-week training plan.
 
         Args:
             user: User for whom to generate plan
-            recent_workouts: Recent workout history for context
             plan_request: TrainingPlanRequest with all personalization parameters
             db: Database session
 
@@ -1423,12 +1303,12 @@ Keep the response in Spanish, conversational, and motivating while being realist
         from datetime import datetime, timedelta
 
         # Si training_method es "automatic", determinar automáticamente
+        training_stats = self.get_athlete_context(db, user).training_stats
         training_method = plan_request.training_method
         if training_method == "automatic":
             # Determinar basado en datos del usuario
             # Si tiene muchos entrenamientos con HR, usar HR-based
-            recent_with_hr = sum(1 for w in recent_workouts if w.avg_heart_rate)
-            if len(recent_workouts) > 0 and recent_with_hr / len(recent_workouts) > 0.7:
+            if training_stats["workout_count"] > 0 and training_stats["hr_share"] > 0.7:
                 training_method = "heart_rate_based"
             else:
                 training_method = "pace_based"
@@ -1482,20 +1362,7 @@ MÉTODO DE PLANIFICACIÓN:
 - Planificación por: {method_label}
 """
 
-        # Get recent data for context
-        recent_distance_km = sum(w.distance_meters / 1000 for w in recent_workouts[:10])
-        recent_weeks_with_data = (
-            min(
-                len(set(w.start_time.isocalendar()[1] for w in recent_workouts[-20:])),
-                10,
-            )
-            or 1
-        )
-        avg_weekly_km = (
-            recent_distance_km / recent_weeks_with_data
-            if recent_weeks_with_data > 0
-            else 20
-        )
+        avg_weekly_km = training_stats["weekly_km"]
 
         user_prompt = f"""Genera un plan de entrenamiento de running DETALLADO y PERSONALIZADO.
 
@@ -1514,7 +1381,7 @@ PREFERENCIAS DEL ATLETA:
 
 CONTEXTO DEL ATLETA:
 - Volumen actual: {avg_weekly_km:.1f} km/semana
-- Entrenamientos recientes: {len(recent_workouts)} en las últimas semanas
+- Entrenamientos recientes: {training_stats["workout_count"]} en las últimas semanas
 
 INSTRUCCIONES CRÍTICAS:
 1. Crea un plan de {plan_request.plan_duration_weeks} semanas, comenzando el {start_date.strftime('%d/%m/%Y')}
@@ -1558,8 +1425,9 @@ FORMATO REQUERIDO (JSON structure - ADAPTA SEGÚN EL MÉTODO):
 Retorna SOLO el JSON válido, sin explicaciones adicionales."""
 
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
+            completion = self._complete(
+                user,
+                Priority.BACKGROUND,
                 messages=[
                     {
                         "role": "system",
@@ -1586,6 +1454,8 @@ Retorna SOLO el JSON válido, sin explicaciones adicionales."""
 
             return plan_json
 
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             # Fallback: generate a basic plan structure
             logger.error(f"Error generating personalized plan: {str(e)}")
@@ -1681,6 +1551,222 @@ Retorna SOLO el JSON válido, sin explicaciones adicionales."""
         }
 
 
+# ============================================================================
+# READINESS SCORING (no LLM client required)
+# ============================================================================
+
+
+def calculate_readiness_score(
+    health_metric: Optional[models.HealthMetric], user: models.User
+) -> Dict[str, Any]:
+    """
+    Calculate 0-100 readiness score based on health metrics.
+
+    Args:
+        health_metric: Today's health metrics (can be None)
+        user: User model
+
+    Returns:
+        Dict with readiness_score, factors, and recommendation
+    """
+    if not health_metric:
+        return {
+            "readiness_score": 50,
+            "confidence": "low",
+            "factors": [],
+            "recommendation": "No health data available. Train based on how you feel.",
+            "should_train_hard": None,
+        }
+
+    factors = []
+    total_weight = 0
+    weighted_sum = 0
+
+    # Factor 1: Body Battery / Readiness Score (40% weight)
+    if health_metric.body_battery is not None:
+        score = health_metric.body_battery
+        weight = 0.4
+        factors.append(
+            {
+                "name": "Body Battery",
+                "score": score,
+                "weight": weight,
+                "status": (
+                    "good" if score >= 70 else "moderate" if score >= 50 else "low"
+                ),
+            }
+        )
+        weighted_sum += score * weight
+        total_weight += weight
+    elif health_metric.readiness_score is not None:
+        score = health_metric.readiness_score
+        weight = 0.4
+        factors.append(
+            {
+                "name": "Readiness",
+                "score": score,
+                "weight": weight,
+                "status": (
+                    "good" if score >= 70 else "moderate" if score >= 50 else "low"
+                ),
+            }
+        )
+        weighted_sum += score * weight
+        total_weight += weight
+
+    # Factor 2: Sleep Quality (30% weight)
+    if health_metric.sleep_score is not None:
+        score = health_metric.sleep_score
+        weight = 0.3
+        factors.append(
+            {
+                "name": "Sleep Quality",
+                "score": score,
+                "weight": weight,
+                "status": (
+                    "good" if score >= 70 else "moderate" if score >= 50 else "poor"
+                ),
+            }
+        )
+        weighted_sum += score * weight
+        total_weight += weight
+    elif health_metric.sleep_duration_minutes is not None:
+        # Convert sleep duration to score (7-9h = 100, < 6h = low)
+        hours = health_metric.sleep_duration_minutes / 60
+        if hours >= 7:
+            score = min(100, 100 * (hours / 8))
+        else:
+            score = max(0, (hours / 7) * 100)
+        weight = 0.25
+        factors.append(
+            {
+                "name": "Sleep Duration",
+                "score": int(score),
+                "weight": weight,
+                "status": (
+                    "good" if hours >= 7 else "moderate" if hours >= 6 else "poor"
+                ),
+            }
+        )
+        weighted_sum += score * weight
+        total_weight += weight
+
+    # Factor 3: HRV vs Baseline (20% weight)
+    if health_metric.hrv_ms and health_metric.hrv_baseline_ms:
+        ratio = health_metric.hrv_ms / health_metric.hrv_baseline_ms
+        score = min(100, ratio * 100)
+        weight = 0.2
+        status = "good" if ratio >= 0.95 else "moderate" if ratio >= 0.85 else "low"
+        factors.append(
+            {
+                "name": "HRV",
+                "score": int(score),
+                "weight": weight,
+                "status": status,
+                "detail": f"{health_metric.hrv_ms:.0f}ms (baseline: {health_metric.hrv_baseline_ms:.0f}ms)",
+            }
+        )
+        weighted_sum += score * weight
+        total_weight += weight
+
+    # Factor 4: Resting HR vs Baseline (10% weight)
+    if health_metric.resting_hr_bpm and health_metric.resting_hr_baseline_bpm:
+        # Lower resting HR is better, so invert the scale
+        diff = health_metric.resting_hr_bpm - health_metric.resting_hr_baseline_bpm
+        if diff <= 0:
+            score = 100  # Lower or equal to baseline = perfect
+        else:
+            score = max(
+                0, 100 - (diff * 10)
+            )  # Each bpm above baseline = -10 points
+        weight = 0.1
+        status = "good" if diff <= 2 else "moderate" if diff <= 5 else "elevated"
+        factors.append(
+            {
+                "name": "Resting HR",
+                "score": int(score),
+                "weight": weight,
+                "status": status,
+                "detail": f"{health_metric.resting_hr_bpm} bpm (baseline: {health_metric.resting_hr_baseline_bpm} bpm)",
+            }
+        )
+        weighted_sum += score * weight
+        total_weight += weight
+
+    # Factor 5: Stress Level (10% weight)
+    if health_metric.stress_level is not None:
+        # Invert stress (low stress = high score)
+        score = 100 - health_metric.stress_level
+        weight = 0.1
+        factors.append(
+            {
+                "name": "Stress",
+                "score": score,
+                "weight": weight,
+                "status": (
+                    "low"
+                    if health_metric.stress_level < 30
+                    else "moderate" if health_metric.stress_level < 60 else "high"
+                ),
+            }
+        )
+        weighted_sum += score * weight
+        total_weight += weight
+
+    # Factor 6: Subjective Energy (if manual entry)
+    if health_metric.energy_level is not None:
+        # Convert 1-5 scale to 0-100
+        score = (health_metric.energy_level - 1) * 25
+        weight = 0.15
+        factors.append(
+            {
+                "name": "Energy Level",
+                "score": score,
+                "weight": weight,
+                "status": (
+                    "high"
+                    if health_metric.energy_level >= 4
+                    else "moderate" if health_metric.energy_level >= 3 else "low"
+                ),
+            }
+        )
+        weighted_sum += score * weight
+        total_weight += weight
+
+    # Calculate final score
+    if total_weight == 0:
+        readiness_score = 50
+        confidence = "low"
+    else:
+        readiness_score = int(weighted_sum / total_weight)
+        confidence = (
+            "high"
+            if total_weight >= 0.6
+            else "medium" if total_weight >= 0.3 else "low"
+        )
+
+    # Generate recommendation
+    if readiness_score >= 75:
+        recommendation = "✅ Excelente estado de recuperación. Perfecto para entrenamientos intensos."
+        should_train_hard = True
+    elif readiness_score >= 60:
+        recommendation = (
+            "⚠️ Estado moderado. Entrenamientos ligeros o moderados recomendados."
+        )
+        should_train_hard = False
+    else:
+        recommendation = "🛑 Estado de recuperación bajo. Considera día de descanso o recuperación activa."
+        should_train_hard = False
+
+    return {
+        "readiness_score": readiness_score,
+        "confidence": confidence,
+        "factors": factors,
+        "recommendation": recommendation,
+        "should_train_hard": should_train_hard,
+    }
+
+
 # Lazy-loaded singleton instance (instantiated on first use)
 _coach_service_instance = None
 
@@ -0,0 +1,365 @@
+"""
+daily_snapshot_service.py - Precomputed daily readiness / overtraining / HRV snapshots
+
+- refresh(): computes today's snapshot (readiness, 14/30-day overtraining
+  assessment, HRV status) and stores it in DailySnapshot
+- get_current(): read path for the endpoints; returns the stored snapshot and
+  recomputes only if the user's data changed since it was computed
+- backfill(): historical readiness and HRV status for every day with health
+  metrics, computed column-wise with numpy in a single pass
+
+The nightly Celery task (app.tasks.compute_daily_snapshots) calls refresh()
+for every active user in batches.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.coach_service import calculate_readiness_score
+from app.services.hrv_analysis_service import hrv_analysis_service
+from app.services.overtraining_detector_service import overtraining_detector
+
+logger = logging.getLogger(__name__)
+
+
+# Overtraining analysis windows served from the snapshot (days)
+OVERTRAINING_ANALYSIS_DAYS = (14, 30)
+DEFAULT_OVERTRAINING_DAYS = 30
+
+# HealthMetric columns used by the readiness score
+READINESS_COLUMNS = (
+    "body_battery",
+    "readiness_score",
+    "sleep_score",
+    "sleep_duration_minutes",
+    "hrv_ms",
+    "hrv_baseline_ms",
+    "resting_hr_bpm",
+    "resting_hr_baseline_bpm",
+    "stress_level",
+    "energy_level",
+)
+
+
+def readiness_scores(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Vectorized equivalent of calculate_readiness_score() over many days.
+
+    Args:
+        columns: READINESS_COLUMNS -> float arrays (NaN where the value is None)
+
+    Returns:
+        Dict with "score" (int array) and "confidence" (str array)
+    """
+    def has(name: str) -> np.ndarray:
+        return ~np.isnan(columns[name])
+
+    def truthy(name: str) -> np.ndarray:
+        return has(name) & (np.nan_to_num(columns[name]) != 0)
+
+    n = len(columns["body_battery"])
+    weighted_sum = np.zeros(n)
+    total_weight = np.zeros(n)
+
+    def add(mask: np.ndarray, score: np.ndarray, weight: float) -> None:
+        np.add(weighted_sum, score * weight, out=weighted_sum, where=mask)
+        np.add(total_weight, weight, out=total_weight, where=mask)
+
+    # Body Battery, else platform readiness (40%)
+    battery = has("body_battery")
+    add(
+        battery | has("readiness_score"),
+        np.where(battery, columns["body_battery"], columns["readiness_score"]),
+        0.4,
+    )
+
+    # Sleep score (30%), else sleep duration (25%)
+    sleep_score = has("sleep_score")
+    add(sleep_score, columns["sleep_score"], 0.3)
+    hours = columns["sleep_duration_minutes"] / 60
+    with np.errstate(invalid="ignore"):
+        duration_score = np.where(
+            hours >= 7, np.minimum(100, 100 * (hours / 8)), np.maximum(0, (hours / 7) * 100)
+        )
+    add(~sleep_score & has("sleep_duration_minutes"), duration_score, 0.25)
+
+    # HRV vs baseline (20%)
+    hrv = truthy("hrv_ms") & truthy("hrv_baseline_ms")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = columns["hrv_ms"] / columns["hrv_baseline_ms"]
+    add(hrv, np.minimum(100, ratio * 100), 0.2)
+
+    # Resting HR vs baseline (10%)
+    rhr = truthy("resting_hr_bpm") & truthy("resting_hr_baseline_bpm")
+    diff = columns["resting_hr_bpm"] - columns["resting_hr_baseline_bpm"]
+    add(rhr, np.where(diff <= 0, 100, np.maximum(0, 100 - (diff * 10))), 0.1)
+
+    # Stress (10%) and subjective energy (15%)
+    add(has("stress_level"), 100 - columns["stress_level"], 0.1)
+    add(has("energy_level"), (columns["energy_level"] - 1) * 25, 0.15)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = np.where(total_weight == 0, 50, np.floor(weighted_sum / total_weight))
+    confidence = np.select(
+        [total_weight >= 0.6, total_weight >= 0.3], ["high", "medium"], default="low"
+    )
+    return {"score": score.astype(int), "confidence": confidence}
+
+
+class DailySnapshotService:
+    """Stores and serves daily readiness / risk / HRV snapshots."""
+
+    # ===== Read path =====
+
+    def get_current(self, db: Session, user: models.User) -> models.DailySnapshot:
+        """
+        Today's snapshot, recomputed only if newer data arrived.
+
+        Args:
+            db: Database session
+            user: User to read the snapshot for
+
+        Returns:
+            Up-to-date DailySnapshot for today
+        """
+        today = date.today()
+        version = self.data_version(db, user.id)
+        snapshot = self._get(db, user.id, today)
+
+        if snapshot is not None and snapshot.data_version == version:
+            return snapshot
+
+        return self.refresh(db, user, today, version=version, snapshot=snapshot)
+
+    def get_history(
+        self, db: Session, user_id: int, start_date: date, end_date: date
+    ) -> List[models.DailySnapshot]:
+        """Stored snapshots between two dates (inclusive), oldest first."""
+        return (
+            db.query(models.DailySnapshot)
+            .filter(
+                models.DailySnapshot.user_id == user_id,
+                models.DailySnapshot.date >= start_date,
+                models.DailySnapshot.date <= end_date,
+            )
+            .order_by(models.DailySnapshot.date.asc())
+            .all()
+        )
+
+    def data_version(self, db: Session, user_id: int) -> str:
+        """
+        Fingerprint of the inputs a snapshot depends on.
+
+        Changes when health metrics are inserted/updated, workouts are
+        added/removed (latest timestamps plus workout count) or the profile
+        changes (max HR, zones...: User.context_version, see
+        athlete_context_service.invalidate).
+        """
+        profile_version = (
+            db.query(models.User.context_version)
+            .filter(models.User.id == user_id)
+            .scalar()
+        )
+        health_changed = (
+            db.query(
+                func.max(
+                    func.coalesce(
+                        models.HealthMetric.updated_at, models.HealthMetric.created_at
+                    )
+                )
+            )
+            .filter(models.HealthMetric.user_id == user_id)
+            .scalar()
+        )
+        workout_created, workout_count = (
+            db.query(func.max(models.Workout.created_at), func.count(models.Workout.id))
+            .filter(models.Workout.user_id == user_id)
+            .one()
+        )
+        return f"{health_changed}|{workout_created}|{workout_count}|{profile_version}"
+
+    # ===== Write path =====
+
+    def refresh(
+        self,
+        db: Session,
+        user: models.User,
+        day: Optional[date] = None,
+        version: Optional[str] = None,
+        snapshot: Optional[models.DailySnapshot] = None,
+    ) -> models.DailySnapshot:
+        """
+        Compute and store the snapshot for `day` (default today). Commits.
+
+        Args:
+            db: Database session
+            user: User to compute for
+            day: Snapshot date
+            version: Precomputed data_version (computed if omitted)
+            snapshot: Existing row for (user, day), if already loaded
+
+        Returns:
+            Stored DailySnapshot
+        """
+        day = day or date.today()
+        version = version or self.data_version(db, user.id)
+        if snapshot is None:
+            snapshot = self._get(db, user.id, day)
+
+        health = (
+            db.query(models.HealthMetric)
+            .filter(
+                models.HealthMetric.user_id == user.id,
+                models.HealthMetric.date == day,
+            )
+            .first()
+        )
+        readiness = calculate_readiness_score(health, user)
+
+        try:
+            hrv_status = hrv_analysis_service.get_status_summary(user.id, db)
+        except ValueError:
+            hrv_status = None
+
+        overtraining = {
+            str(days): overtraining_detector.detect_overtraining_risk(
+                user_id=user.id, db=db, analysis_days=days
+            )
+            for days in OVERTRAINING_ANALYSIS_DAYS
+        }
+        main_assessment = overtraining[str(DEFAULT_OVERTRAINING_DAYS)]
+
+        if snapshot is None:
+            snapshot = models.DailySnapshot(user_id=user.id, date=day)
+            db.add(snapshot)
+
+        snapshot.readiness_score = readiness["readiness_score"]
+        snapshot.readiness_confidence = readiness["confidence"]
+        snapshot.readiness = readiness
+        snapshot.hrv_status = hrv_status
+        snapshot.overtraining_risk_score = main_assessment["risk_score"]
+        snapshot.overtraining_status = main_assessment["status"]
+        snapshot.overtraining = overtraining
+        snapshot.data_version = version
+        snapshot.computed_at = datetime.utcnow()
+
+        try:
+            db.commit()
+        except IntegrityError:
+            # Computed concurrently by another request/worker; keep theirs
+            db.rollback()
+            return self._get(db, user.id, day)
+
+        return snapshot
+
+    def backfill(self, db: Session, user_id: int, days: int = 365) -> int:
+        """
+        Historical readiness and HRV status for the last `days` days (excluding
+        today), computed column-wise in one vectorized pass. Commits.
+
+        Rows already holding a live snapshot (data_version set) are kept.
+
+        Returns:
+            Number of snapshot rows written
+        """
+        end = date.today() - timedelta(days=1)
+        start = end - timedelta(days=days - 1)
+
+        rows = (
+            db.query(
+                models.HealthMetric.date,
+                *[getattr(models.HealthMetric, name) for name in READINESS_COLUMNS],
+            )
+            .filter(
+                models.HealthMetric.user_id == user_id,
+                models.HealthMetric.date >= start,
+                models.HealthMetric.date <= end,
+            )
+            .order_by(models.HealthMetric.date.asc())
+            .all()
+        )
+        if not rows:
+            return 0
+
+        dates = [row[0] for row in rows]
+        columns = {
+            name: np.array(
+                [np.nan if row[i + 1] is None else row[i + 1] for row in rows], dtype=float
+            )
+            for i, name in enumerate(READINESS_COLUMNS)
+        }
+        readiness = readiness_scores(columns)
+
+        # HRV status: daily value vs the row's rolling baseline
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = columns["hrv_ms"] / columns["hrv_baseline_ms"]
+        has_hrv = np.isfinite(ratio) & (columns["hrv_baseline_ms"] > 0)
+        levels = hrv_analysis_service.HRV_LEVELS
+        hrv_levels = np.select(
+            [ratio >= threshold for threshold in levels.values()],
+            list(levels.keys()),
+            default="critical",
+        )
+
+        existing = {
+            snapshot.date: snapshot
+            for snapshot in self.get_history(db, user_id, start, end)
+        }
+        written = 0
+        for i, day in enumerate(dates):
+            snapshot = existing.get(day)
+            if snapshot is not None and snapshot.data_version is not None:
+                continue
+            if snapshot is None:
+                snapshot = models.DailySnapshot(user_id=user_id, date=day)
+                db.add(snapshot)
+
+            snapshot.readiness_score = int(readiness["score"][i])
+            snapshot.readiness_confidence = str(readiness["confidence"][i])
+            snapshot.hrv_status = (
+                {
+                    "recovery_status": str(hrv_levels[i]),
+                    "vs_baseline_percent": round(float(ratio[i]) * 100, 1),
+                }
+                if has_hrv[i]
+                else None
+            )
+            snapshot.computed_at = datetime.utcnow()
+            written += 1
+
+        db.commit()
+        logger.info(f"[SNAPSHOT] Backfilled {written} days for user {user_id}")
+        return written
+
+    def has_history(self, db: Session, user_id: int) -> bool:
+        """Whether any snapshot exists for the user."""
+        return (
+            db.query(models.DailySnapshot.id)
+            .filter(models.DailySnapshot.user_id == user_id)
+            .first()
+            is not None
+        )
+
+    # ===== Internals =====
+
+    def _get(
+        self, db: Session, user_id: int, day: date
+    ) -> Optional[models.DailySnapshot]:
+        return (
+            db.query(models.DailySnapshot)
+            .filter(
+                models.DailySnapshot.user_id == user_id,
+                models.DailySnapshot.date == day,
+            )
+            .first()
+        )
+
+
+# Singleton
+daily_snapshot_service = DailySnapshotService()
@@ -0,0 +1,244 @@
+"""
+event_geo_service.py - Event coordinates and the grid index for "races near me"
+
+Events only had free-text location / region, so the only location filter
+was substring matching. They now carry coordinates and a grid cell, and
+radius searches run on the plain database (no PostGIS):
+
+- Coordinates come from the event (admin form, calendar import) or are
+  resolved offline from the bundled gazetteer (app/data/gazetteer_es.csv:
+  provincial capitals and the larger running towns of Spain) by folded
+  location name; a region naming the province or community breaks ties
+- geo_cell is the geohash (route_service.geohash_encode) of the
+  coordinates at GEO_PRECISION (~39 x 20 km), indexed together with date
+- A radius query covers its bounding box with cells: an IN list at
+  GEO_PRECISION, or coarser prefixes (index range scans) when that would
+  take more than MAX_QUERY_CELLS. Exact haversine distances are then
+  computed in numpy over the candidates only
+- ORM writes fill the columns in before_insert / before_update listeners;
+  the calendar import (core statements) calls geo_columns() itself
+- Events stored before the columns existed (or placed before the
+  gazetteer knew their town) are filled by backfill(), run from
+  backfill_event_coordinates.py rather than from a migration
+"""
+import csv
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, event, inspect, or_
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.route_service import geohash_encode
+
+logger = logging.getLogger(__name__)
+
+
+GAZETTEER_PATH = Path(__file__).resolve().parent.parent / "data" / "gazetteer_es.csv"
+
+# Countries the gazetteer covers (folded)
+GAZETTEER_COUNTRIES = frozenset({"espana", "spain", "es"})
+
+# Geohash precision of Event.geo_cell (~39 km x 20 km cells)
+GEO_PRECISION = 4
+
+# Events read per backfill() round trip
+BACKFILL_CHUNK = 1000
+
+# Largest IN list a radius query uses before falling back to coarser cells
+MAX_QUERY_CELLS = 100
+
+EARTH_RADIUS_KM = 6371.0
+
+# "Madrid (Casa de Campo)", "Getafe, Madrid", "Sevilla - Triana"
+_LOCATION_PARTS = re.compile(r"[,;/()]| - ")
+
+_GEO_FIELDS = ("location", "region", "country", "latitude", "longitude")
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distances (km) from one point to many, vectorized."""
+    lat_r, lats_r = np.radians(lat), np.radians(np.asarray(lats, dtype=float))
+    dlat = lats_r - lat_r
+    dlon = np.radians(np.asarray(lons, dtype=float) - lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_r) * np.cos(lats_r) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def covering_cells(lat: float, lon: float, radius_km: float, precision: int) -> List[str]:
+    """
+    Geohash cells covering the bounding box of a circle.
+
+    The box is sampled one cell apart from edge to edge (both edges
+    included), so every cell it overlaps contains a sample.
+    """
+    total_bits = 5 * precision
+    lat_step = 180 / 2 ** (total_bits // 2)
+    lon_step = 360 / 2 ** ((total_bits + 1) // 2)
+
+    dlat = np.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    widest = max(abs(south), abs(north))
+    dlon = 180.0 if widest >= 89.0 else min(180.0, dlat / np.cos(np.radians(widest)))
+
+    lats = np.append(np.arange(south, north, lat_step), north)
+    lons = np.append(np.arange(lon - dlon, lon + dlon, lon_step), lon + dlon)
+    lons = (lons + 180) % 360 - 180
+    return sorted(set(geohash_encode(np.repeat(lats, len(lons)), np.tile(lons, len(lats)), precision)))
+
+
+class EventGeoService:
+    """Gazetteer lookups, event geo columns and radius filters."""
+
+    def __init__(self):
+        self._places: Optional[Dict[str, List[Tuple[str, str, float, float]]]] = None
+        self._lock = threading.Lock()
+
+    # ===== Read path =====
+
+    def resolve(
+        self,
+        location: Optional[str],
+        region: Optional[str] = None,
+        country: Optional[str] = None,
+    ) -> Optional[Tuple[float, float]]:
+        """
+        (latitude, longitude) of a place name from the gazetteer, or None.
+
+        The whole name is tried first, then its parts ("Getafe, Madrid").
+        """
+        if country and models.fold_text(country) not in GAZETTEER_COUNTRIES:
+            return None
+        folded = models.fold_text(location)
+        if not folded:
+            return None
+
+        places = self._gazetteer()
+        region_key = models.fold_text(region)
+        for name in [folded] + [part.strip() for part in _LOCATION_PARTS.split(folded)]:
+            candidates = places.get(name)
+            if not candidates:
+                continue
+            if region_key:
+                for province, community, lat, lon in candidates:
+                    if any(region_key in area or area in region_key for area in (province, community)):
+                        return lat, lon
+            _, _, lat, lon = candidates[0]
+            return lat, lon
+        return None
+
+    def geo_columns(
+        self,
+        location: Optional[str],
+        region: Optional[str],
+        country: Optional[str],
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Event.latitude / longitude / geo_cell for the given fields (also for
+        core inserts). Given coordinates win over the gazetteer.
+        """
+        if latitude is None or longitude is None:
+            latitude, longitude = self.resolve(location, region, country) or (None, None)
+        if latitude is None:
+            return {"latitude": None, "longitude": None, "geo_cell": None}
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "geo_cell": geohash_encode([latitude], [longitude], GEO_PRECISION)[0],
+        }
+
+    def radius_filter(self, latitude: float, longitude: float, radius_km: float):
+        """Index-backed filter on Event.geo_cell covering the circle (a superset)."""
+        for precision in range(GEO_PRECISION, 0, -1):
+            cells = covering_cells(latitude, longitude, radius_km, precision)
+            if len(cells) <= MAX_QUERY_CELLS:
+                break
+        if precision == GEO_PRECISION:
+            return models.Event.geo_cell.in_(cells)
+        # Every stored cell has GEO_PRECISION characters, so a prefix is a key range
+        return or_(*(
+            models.Event.geo_cell.between(cell.ljust(GEO_PRECISION, "0"), cell.ljust(GEO_PRECISION, "z"))
+            for cell in cells
+        ))
+
+    # ===== Write path =====
+
+    def backfill(self, db: Session) -> int:
+        """
+        Resolve coordinates of events that have none, in id-ordered chunks. Commits.
+
+        Returns:
+            Number of events that got coordinates
+        """
+        table = models.Event.__table__
+        filled, last_id = 0, 0
+        while True:
+            rows = db.execute(
+                table.select()
+                .with_only_columns(table.c.id, table.c.location, table.c.region, table.c.country)
+                .where(table.c.geo_cell.is_(None), table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(BACKFILL_CHUNK)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            updates = []
+            for row in rows:
+                geo = self.geo_columns(row.location, row.region, row.country)
+                if geo["geo_cell"] is not None:
+                    updates.append(dict({f"new_{column}": value for column, value in geo.items()}, event_id=row.id))
+            if updates:
+                db.execute(
+                    table.update()
+                    .where(table.c.id == bindparam("event_id"))
+                    .values({column: bindparam(f"new_{column}") for column in ("latitude", "longitude", "geo_cell")}),
+                    updates,
+                )
+                db.commit()
+                filled += len(updates)
+        logger.info(f"Event coordinates backfilled: {filled} events")
+        return filled
+
+    # ===== Internals =====
+
+    def _gazetteer(self) -> Dict[str, List[Tuple[str, str, float, float]]]:
+        """Folded place name -> [(province, community, lat, lon)], loaded once."""
+        with self._lock:
+            if self._places is None:
+                places: Dict[str, List[Tuple[str, str, float, float]]] = {}
+                with open(GAZETTEER_PATH, encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        places.setdefault(models.fold_text(row["name"]), []).append((
+                            models.fold_text(row["province"]),
+                            models.fold_text(row["community"]),
+                            float(row["latitude"]),
+                            float(row["longitude"]),
+                        ))
+                logger.info(f"Gazetteer loaded: {len(places)} places")
+                self._places = places
+            return self._places
+
+
+# Singleton
+event_geo_service = EventGeoService()
+
+
+@event.listens_for(models.Event, "before_insert")
+@event.listens_for(models.Event, "before_update")
+def _event_geo_columns(mapper, connection, target) -> None:
+    state = inspect(target)
+    changed = {field for field in _GEO_FIELDS if state.attrs[field].history.has_changes()}
+    if changed & {"location", "region", "country"} and not changed & {"latitude", "longitude"}:
+        # Moved without new coordinates: the old ones no longer apply
+        target.latitude = target.longitude = None
+    for column, value in event_geo_service.geo_columns(
+        target.location, target.region, target.country, target.latitude, target.longitude
+    ).items():
+        setattr(target, column, value)
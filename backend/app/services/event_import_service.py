@@ -0,0 +1,238 @@
+"""
+event_import_service.py - Bulk import of race calendars
+
+seed_events.py and the admin create endpoint added events one at a time
+with an existence check each, so loading a national calendar was slow and
+re-running it failed or duplicated work. A calendar (CSV or JSON) is now
+imported in one pass:
+
+- Every row is validated with schemas.EventCreate; invalid rows are
+  skipped and reported with their row number
+- Rows are upserted on external_id in batches of BATCH_SIZE: one query
+  reads the existing events of the batch, then a single executemany
+  INSERT ... ON CONFLICT (external_id) DO UPDATE writes the new and changed
+  ones, so a concurrent import of the same race updates instead of
+  failing. Columns missing from a row keep their stored value, and rows
+  identical to the stored event are left out (re-importing the same file
+  changes nothing)
+- A repeated external_id keeps the last row of the file
+- Core statements bypass the ORM, so the folded search columns
+  (models.event_search_columns) and the coordinates / grid cell
+  (event_geo_service.geo_columns) are filled here; on SQLite the FTS
+  triggers follow the table. The autocomplete index is invalidated once,
+  after the commit
+"""
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.services.event_geo_service import event_geo_service
+from app.services.race_autocomplete_service import race_autocomplete_service
+
+logger = logging.getLogger(__name__)
+
+
+BATCH_SIZE = 500
+MAX_IMPORT_ROWS = 50_000
+MAX_IMPORT_BYTES = 10 * 1024 * 1024
+MAX_REPORTED_ERRORS = 50
+
+# Columns an import row may set (external_id is the key)
+IMPORT_FIELDS = tuple(field for field in schemas.EventCreate.model_fields if field != "external_id")
+
+# Columns an upsert overwrites on an existing event (created_at is kept)
+UPSERT_COLUMNS = IMPORT_FIELDS + ("search_text", "search_location", "geo_cell", "updated_at")
+
+# Fields the coordinates depend on
+GEO_FIELDS = {"location", "region", "country", "latitude", "longitude"}
+
+
+def parse_calendar(content: bytes, file_format: str) -> List[Dict[str, Any]]:
+    """
+    Rows of a CSV (header row) or JSON (list, or {"events": [...]}) calendar.
+
+    Raises:
+        ValueError: Unknown format, undecodable or malformed file
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("Calendar file must be UTF-8")
+
+    if file_format == "csv":
+        rows = list(csv.DictReader(io.StringIO(text)))
+    elif file_format == "json":
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        rows = data.get("events", data.get("races")) if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError('JSON calendar must be a list of events or {"events": [...]}')
+    else:
+        raise ValueError(f"Unsupported calendar format: {file_format}")
+
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise ValueError(f"Calendar has {len(rows)} rows; the maximum is {MAX_IMPORT_ROWS}")
+    return rows
+
+
+def _clean(row: Any) -> Any:
+    """Strip strings and drop empty cells so schema defaults apply."""
+    if not isinstance(row, dict):
+        return row
+    cleaned = {}
+    for key, value in row.items():
+        if key is None:
+            continue  # CSV cells beyond the header
+        if isinstance(value, str):
+            value = value.strip()
+        if value not in ("", None):
+            cleaned[key.strip()] = value
+    return cleaned
+
+
+class EventImportService:
+    """Validates and upserts race calendars."""
+
+    # ===== Write path =====
+
+    def import_rows(
+        self,
+        db: Session,
+        rows: Iterable[Any],
+        verified: Optional[bool] = None,
+        source: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Upsert calendar rows on external_id and commit.
+
+        Args:
+            db: Database session
+            rows: Row dicts (parse_calendar() output or EVENTS_DATA-style dicts)
+            verified: Force the verified flag of every row (default: the row's,
+                else the schema default)
+            source: Force the source of every row
+
+        Returns:
+            Dict with inserted / updated / unchanged / skipped counts and the
+            first MAX_REPORTED_ERRORS row errors
+        """
+        report = {"total_rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "errors": []}
+        valid: Dict[str, tuple] = {}  # external_id -> (all values, fields given by the row)
+        row_numbers: Dict[str, int] = {}
+
+        for number, row in enumerate(rows, start=1):
+            report["total_rows"] += 1
+            try:
+                event = schemas.EventCreate.model_validate(_clean(row))
+            except ValidationError as e:
+                self._skip(report, number, row, "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+                    for error in e.errors()
+                ))
+                continue
+
+            values = event.model_dump()
+            values["date"] = values["date"].date()
+            given = set(event.model_fields_set) - {"external_id"}
+            for field, forced in (("verified", verified), ("source", source)):
+                if forced is not None:
+                    values[field] = forced
+                    given.add(field)
+
+            if event.external_id in valid:
+                self._skip(report, row_numbers[event.external_id], row, "duplicate external_id, later row kept")
+            valid[event.external_id] = (values, given)
+            row_numbers[event.external_id] = number
+
+        entries = list(valid.values())
+        for start in range(0, len(entries), BATCH_SIZE):
+            self._upsert_batch(db, entries[start:start + BATCH_SIZE], report)
+        db.commit()
+
+        if report["inserted"] or report["updated"]:
+            race_autocomplete_service.invalidate()
+        logger.info(
+            f"Calendar import: {report['inserted']} inserted, {report['updated']} updated, "
+            f"{report['unchanged']} unchanged, {report['skipped']} skipped"
+        )
+        return report
+
+    # ===== Internals =====
+
+    def _upsert_batch(self, db: Session, batch: List[tuple], report: Dict[str, Any]) -> None:
+        table = models.Event.__table__
+        columns = [table.c.external_id, table.c.geo_cell] + [table.c[field] for field in IMPORT_FIELDS]
+        existing = {
+            row.external_id: row._mapping
+            for row in db.execute(
+                table.select().with_only_columns(*columns).where(
+                    table.c.external_id.in_([values["external_id"] for values, _ in batch])
+                )
+            )
+        }
+
+        now = datetime.utcnow()
+        rows: List[Dict[str, Any]] = []
+        inserted = updated = 0
+        for values, given in batch:
+            stored = existing.get(values["external_id"])
+            if stored is None:
+                search = models.event_search_columns(values["name"], values["location"], values["region"])
+                geo = event_geo_service.geo_columns(
+                    values["location"], values["region"], values["country"], values["latitude"], values["longitude"]
+                )
+                rows.append(dict(values, **search, **geo, created_at=now, updated_at=now))
+                inserted += 1
+                continue
+
+            changed = {field: values[field] for field in given if stored[field] != values[field]}
+            if not changed:
+                report["unchanged"] += 1
+                continue
+            # The stored event with the row's changes; columns the row lacks keep their value
+            merged = dict(stored, **changed)
+            merged.update(models.event_search_columns(merged["name"], merged["location"], merged["region"]))
+            if changed.keys() & GEO_FIELDS:
+                # Coordinates of the row if it has them, else resolved again
+                coordinates = {"latitude", "longitude"} <= given
+                merged.update(event_geo_service.geo_columns(
+                    merged["location"], merged["region"], merged["country"],
+                    values["latitude"] if coordinates else None,
+                    values["longitude"] if coordinates else None,
+                ))
+            rows.append(dict(merged, created_at=now, updated_at=now))
+            updated += 1
+
+        if rows:
+            insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+            statement = insert(table)
+            db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["external_id"],
+                    set_={column: statement.excluded[column] for column in UPSERT_COLUMNS},
+                ),
+                rows,
+            )
+        report["inserted"] += inserted
+        report["updated"] += updated
+
+    @staticmethod
+    def _skip(report: Dict[str, Any], number: int, row: Any, error: str) -> None:
+        report["skipped"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            external_id = row.get("external_id") if isinstance(row, dict) else None
+            report["errors"].append({"row": number, "external_id": external_id, "error": error})
+
+
+# Singleton
+event_import_service = EventImportService()
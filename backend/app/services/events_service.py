@@ -1,19 +1,33 @@
 """
 events_service.py - Service for managing running events and races
 Uses PostgreSQL database for persistent storage
+
+Text search runs on Event.search_text / search_location, accent-folded and
+lowercased on every write, so queries need no per-row unaccent() and can
+use an index:
+- PostgreSQL: substring LIKE served by pg_trgm GIN indexes
+- SQLite: events_fts (FTS5 trigram) phrase match; queries shorter than a
+  trigram scan the folded column instead
+
+Radius search narrows candidates with the geo_cell grid index
+(event_geo_service), then ranks them by exact distance.
 """
 
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta, date
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-import unicodedata
+from sqlalchemy import Integer, and_, column, text
 
 from app import models
+from app.services.event_geo_service import event_geo_service, haversine_km
 
 logger = logging.getLogger(__name__)
 
+# Shortest query the FTS5 trigram index can answer
+FTS_MIN_LENGTH = 3
+
 
 class EventsService:
     """Service for managing running events and race searches."""
@@ -21,17 +35,21 @@ class EventsService:
     def __init__(self, db: Session = None):
         self.db = db
 
-    @staticmethod
-    def _remove_accents(text: str) -> str:
-        """Remove accents from text for fuzzy matching."""
-        nfd = unicodedata.normalize("NFD", text)
-        return "".join(char for char in nfd if unicodedata.category(char) != "Mn")
-
     @staticmethod
     def _normalize_search(text: str) -> str:
-        """Normalize search text."""
-        text = EventsService._remove_accents(text)
-        return text.lower().strip()
+        """Normalize search text (same folding as the stored search columns)."""
+        return models.fold_text(text)
+
+    def _text_filter(self, search_column, value: str):
+        """Substring filter on a folded search column, index-backed per dialect."""
+        if self.db.get_bind().dialect.name == "sqlite" and len(value) >= FTS_MIN_LENGTH:
+            phrase = '"' + value.replace('"', '""') + '"'
+            return models.Event.id.in_(
+                text("SELECT rowid FROM events_fts WHERE events_fts MATCH :match").bindparams(
+                    match=f"{search_column.key} : {phrase}"
+                ).columns(column("rowid", Integer))
+            )
+        return search_column.contains(value, autoescape=True)
 
     @staticmethod
     def event_to_dict(event: models.Event) -> Dict[str, Any]:
@@ -50,6 +68,8 @@ class EventsService:
             "website_url": event.website_url,
             "description": event.description,
             "price_eur": event.price_eur,
+            "latitude": event.latitude,
+            "longitude": event.longitude,
             "source": event.source,
         }
 
@@ -88,24 +108,18 @@ class EventsService:
         )
 
         # Text search - search in name, location, region
-        if query:
-            query_norm = self._normalize_search(query)
-            # Use SQL ILIKE for case-insensitive search
-            search_filter = or_(
-                func.lower(func.unaccent(models.Event.name)).contains(query_norm),
-                func.lower(func.unaccent(models.Event.location)).contains(query_norm),
-                func.lower(func.unaccent(models.Event.region)).contains(query_norm),
+        query_norm = self._normalize_search(query) if query else ""
+        if query_norm:
+            query_builder = query_builder.filter(
+                self._text_filter(models.Event.search_text, query_norm)
             )
-            query_builder = query_builder.filter(search_filter)
 
         # Location filter
-        if location:
-            loc_norm = self._normalize_search(location)
-            location_filter = or_(
-                func.lower(func.unaccent(models.Event.location)).contains(loc_norm),
-                func.lower(func.unaccent(models.Event.region)).contains(loc_norm),
+        loc_norm = self._normalize_search(location) if location else ""
+        if loc_norm:
+            query_builder = query_builder.filter(
+                self._text_filter(models.Event.search_location, loc_norm)
             )
-            query_builder = query_builder.filter(location_filter)
 
         # Date filters
         if date_from:
@@ -143,6 +157,81 @@ class EventsService:
         )
         return results
 
+    def search_nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        min_distance: Optional[float] = None,
+        max_distance: Optional[float] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """Upcoming races within radius_km of a point, nearest first.
+
+        Args:
+            latitude: Latitude of the center
+            longitude: Longitude of the center
+            radius_km: Search radius in km
+            date_from: Races from this date (default: today)
+            date_to: Races until this date
+            min_distance: Minimum race distance in km
+            max_distance: Maximum race distance in km
+            limit: Max results to return
+
+        Returns:
+            Matching races with distance_from_center_km, nearest first (then
+            soonest)
+        """
+        if not self.db:
+            logger.error("Database session not provided to EventsService")
+            return []
+
+        # Candidates from the grid cells covering the circle: only the
+        # columns needed to rank them
+        from_date = max(date_from or date.today(), date.today())
+        candidates = self.db.query(
+            models.Event.id, models.Event.latitude, models.Event.longitude, models.Event.date
+        ).filter(
+            event_geo_service.radius_filter(latitude, longitude, radius_km),
+            models.Event.date >= from_date,
+            models.Event.verified == True,
+        )
+        if date_to:
+            candidates = candidates.filter(models.Event.date <= date_to)
+        if min_distance:
+            candidates = candidates.filter(models.Event.distance_km >= min_distance)
+        if max_distance:
+            candidates = candidates.filter(models.Event.distance_km <= max_distance)
+        rows = candidates.all()
+        if not rows:
+            return []
+
+        ids, lats, lons, dates = zip(*rows)
+        distances = haversine_km(latitude, longitude, lats, lons)
+        inside = np.flatnonzero(distances <= radius_km)
+        # Nearest first, soonest among equally near races
+        order = inside[np.lexsort((np.array(dates, dtype="datetime64[D]")[inside], distances[inside]))][:limit]
+
+        events = {
+            event.id: event
+            for event in self.db.query(models.Event).filter(
+                models.Event.id.in_([ids[i] for i in order.tolist()])
+            )
+        }
+        results = []
+        for i in order.tolist():
+            race = self.event_to_dict(events[ids[i]])
+            race["distance_from_center_km"] = round(float(distances[i]), 1)
+            results.append(race)
+
+        logger.info(
+            f"📍 Nearby race search: ({latitude:.3f}, {longitude:.3f}) r={radius_km} km, "
+            f"candidates={len(rows)}, results={len(results)}"
+        )
+        return results
+
     def get_race_by_id(self, race_id: str) -> Optional[Dict[str, Any]]:
         """Get race details by external_id."""
         if not self.db:
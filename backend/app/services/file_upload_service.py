@@ -16,6 +16,8 @@ from sqlalchemy.orm import Session
 
 from .. import models
 from .gpx_to_fit_converter import gpx_to_fit_converter
+from .workout_ingest_service import workout_ingest_service
+from .workout_stream_service import workout_stream_service
 
 
 class FileUploadService:
@@ -453,6 +455,12 @@ class FileUploadService:
         )
         
         db.add(workout)
+        streams = workout_stream_service.extract_from_file(file_path, filename)
+        workout_ingest_service.process_workout(db, workout, streams)
+        
+        # GPS-only elevation: prefer the smoothed gain over summed raw deltas
+        if Path(filename).suffix.lower() == '.gpx' and workout.smoothed_elevation_gain is not None:
+            workout.elevation_gain = workout.smoothed_elevation_gain
         db.commit()
         db.refresh(workout)
         
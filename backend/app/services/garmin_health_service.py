@@ -13,6 +13,7 @@ from garminconnect import Garmin as GarminConnectAPI
 
 from .. import models, crud
 from ..services.garmin_service import decrypt_token
+from .baseline_service import baseline_service, WINDOWS
 
 
 class GarminHealthService:
@@ -263,37 +264,25 @@ class GarminHealthService:
         self, db: Session, user_id: int, days: int = 7
     ) -> Dict[str, float]:
         """
-        Calculate HRV and resting HR baselines from recent data.
+        Read HRV and resting HR baselines from the precomputed baseline state.
 
         Args:
             db: Database session
             user_id: User ID
-            days: Number of days to average (default 7)
+            days: Rolling window to report (7, 28 or 60; other values use the
+                smallest window that covers them)
 
         Returns:
             Dict with hrv_baseline_ms and resting_hr_baseline_bpm
         """
-        cutoff_date = date.today() - timedelta(days=days)
-
-        recent_metrics = (
-            db.query(models.HealthMetric)
-            .filter(
-                models.HealthMetric.user_id == user_id,
-                models.HealthMetric.date >= cutoff_date,
-                models.HealthMetric.hrv_ms.isnot(None),
-            )
-            .all()
-        )
-
-        if not recent_metrics:
-            return {"hrv_baseline_ms": None, "resting_hr_baseline_bpm": None}
+        window = next((w for w in WINDOWS if w >= days), WINDOWS[-1])
+        today = date.today()
 
-        # Calculate averages
-        hrv_values = [m.hrv_ms for m in recent_metrics if m.hrv_ms]
-        rhr_values = [m.resting_hr_bpm for m in recent_metrics if m.resting_hr_bpm]
+        hrv = baseline_service.get_baseline(db, user_id, "hrv_ms", as_of=today)
+        rhr = baseline_service.get_baseline(db, user_id, "resting_hr_bpm", as_of=today)
 
-        hrv_baseline = sum(hrv_values) / len(hrv_values) if hrv_values else None
-        rhr_baseline = sum(rhr_values) / len(rhr_values) if rhr_values else None
+        hrv_baseline = hrv.get(f"mean_{window}d") if hrv else None
+        rhr_baseline = rhr.get(f"mean_{window}d") if rhr else None
 
         return {
             "hrv_baseline_ms": round(hrv_baseline, 1) if hrv_baseline else None,
@@ -349,9 +338,6 @@ class GarminHealthService:
                 print(f"[GARMIN HEALTH] No data for {target_date}")
                 continue
 
-            # Calculate baselines
-            baselines = self.calculate_baselines(db, user_id)
-
             # Determine data quality
             quality = "high"
             if not data.get("hrv_ms") and not data.get("body_battery"):
@@ -365,14 +351,15 @@ class GarminHealthService:
                 date=target_date,
                 source="garmin",
                 data_quality=quality,
-                hrv_baseline_ms=baselines.get("hrv_baseline_ms"),
-                resting_hr_baseline_bpm=baselines.get("resting_hr_baseline_bpm"),
                 **data,
             )
 
             db.add(metric)
             synced_metrics.append(metric)
 
+        # Update rolling baselines once for the whole batch (also sets the
+        # per-row hrv_baseline_ms / resting_hr_baseline_bpm columns)
+        baseline_service.update_for_metrics(db, user_id, synced_metrics)
         db.commit()
 
         # Update last sync timestamp
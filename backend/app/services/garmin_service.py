@@ -20,6 +20,9 @@ from cryptography.fernet import Fernet
 
 from .. import models, crud
 from ..core.config import settings
+from .athlete_context_service import athlete_context_service
+from .workout_stream_service import workout_stream_service
+from .zone_time_service import zone_time_service
 
 logger = logging.getLogger(__name__)
 
@@ -343,6 +346,10 @@ def parse_fit_file(fit_data: bytes, activity_id: str) -> Dict[str, any]:
         "enhanced_altitude",
         "distance",
         "speed",
+        "enhanced_speed",
+        "cadence",
+        "position_lat",
+        "position_long",
     ]
     for record in fitfile.get_messages("record"):
         data = {
@@ -351,6 +358,8 @@ def parse_fit_file(fit_data: bytes, activity_id: str) -> Dict[str, any]:
         if "timestamp" in data and data["timestamp"]:
             records.append(data)
 
+    lap_starts = [lap.get_value("start_time") for lap in fitfile.get_messages("lap")]
+
     # --- Final Data Structure ---
     return {
         "sport_type": session_data.get("sport", "running"),
@@ -377,6 +386,7 @@ def parse_fit_file(fit_data: bytes, activity_id: str) -> Dict[str, any]:
         "left_right_balance": avg_gct_balance,
         # Timeseries data for charts
         "records": records,
+        "lap_starts": lap_starts,
     }
 
 
@@ -457,6 +467,7 @@ def sync_user_zones_and_profile(
                     # Store it but don't overwrite if user has a custom max HR
                     if not user.max_heart_rate:
                         user.max_heart_rate = user_data["lactateThresholdHeartRate"]
+                        athlete_context_service.invalidate(db, user.id)
                         print(
                             f"[ZONES] Updated max HR from lactate threshold: {user.max_heart_rate} bpm"
                         )
@@ -574,9 +585,10 @@ def sync_user_zones_and_profile(
                 ]
                 print(f"[ZONES] Calculated HR zones from max HR: {hr_zones}")
 
-            if hr_zones:
+            if hr_zones and hr_zones != user.hr_zones:
                 user.hr_zones = hr_zones
                 print(f"[ZONES] HR zones saved: {len(hr_zones)} zones")
+                zone_time_service.recompute_for_user(db, user)
         except Exception as e:
             print(f"[ZONES] Error fetching HR zones: {e}")
 
@@ -731,7 +743,14 @@ def sync_user_activities(
             )
 
             # Save to database
-            workout = crud.create_workout(db, user_id, workout_create)
+            workout = crud.create_workout(
+                db,
+                user_id,
+                workout_create,
+                streams=workout_stream_service.from_records(
+                    workout_data["records"], workout_data["lap_starts"]
+                ),
+            )
             created_workouts.append(workout)
 
         except Exception as e:
@@ -865,7 +884,14 @@ def sync_garmin_activities(db: Session, user_id: int) -> List[models.Workout]:
                 )
 
                 # Save to database
-                workout = crud.create_workout(db, user_id, workout_create)
+                workout = crud.create_workout(
+                    db,
+                    user_id,
+                    workout_create,
+                    streams=workout_stream_service.from_records(
+                        workout_data["records"], workout_data["lap_starts"]
+                    ),
+                )
                 created_workouts.append(workout)
 
             except Exception as e:
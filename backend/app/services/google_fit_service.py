@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 
 from .. import models, crud
 from ..core.config import settings
+from .baseline_service import baseline_service
 
 
 class GoogleFitService:
@@ -393,6 +394,7 @@ class GoogleFitService:
             db.add(metric)
             synced_metrics.append(metric)
         
+        baseline_service.update_for_metrics(db, user_id, synced_metrics)
         db.commit()
         
         # Update last sync timestamp
@@ -0,0 +1,143 @@
+"""
+grade_service.py - Elevation smoothing, grade and grade-adjusted pace (GAP)
+
+Stream pipeline (vectorized, per workout):
+1. smooth_altitude(): distance-window moving average of the altitude channel
+   (GPS elevation is noisy; summing raw deltas overstates climbing)
+2. grades(): slope of the smoothed profile around each sample interval
+3. graded distance: each step weighted by the energy cost of running at its
+   grade relative to flat ground (Minetti et al. 2002)
+
+GAP = elapsed time / graded distance. Graded distance is also used to give
+best efforts a flat-equivalent time so hilly runs don't skew predictions.
+"""
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+# Moving-average window for altitude, in meters of distance
+SMOOTHING_WINDOW_M = 50.0
+
+# Distance over which grade is measured, centered on each step (meters);
+# per-sample steps of a few meters would turn leftover noise into grade
+GRADE_WINDOW_M = 50.0
+
+# Minetti's polynomial is fitted for grades within +-45%
+MAX_GRADE = 0.45
+
+# Energy cost of running on the flat (J/kg/m), Minetti's C(0)
+FLAT_COST = 3.6
+
+
+def running_cost(grade: np.ndarray) -> np.ndarray:
+    """Energy cost of running (J/kg/m) at a grade (rise/run), Minetti et al."""
+    i = np.clip(grade, -MAX_GRADE, MAX_GRADE)
+    return 155.4 * i ** 5 - 30.4 * i ** 4 - 43.3 * i ** 3 + 46.3 * i ** 2 + 19.5 * i + FLAT_COST
+
+
+def smooth_altitude(
+    distance: np.ndarray, altitude: np.ndarray, window_m: float = SMOOTHING_WINDOW_M
+) -> np.ndarray:
+    """
+    Moving average of altitude over +-window/2 meters of distance.
+
+    Missing altitude samples are interpolated over distance first. Window
+    bounds come from np.searchsorted on the (monotonic) distance and sums
+    from a cumulative sum, so the cost is O(n log n) regardless of window.
+    """
+    valid = np.isfinite(altitude) & np.isfinite(distance)
+    if valid.sum() < 2:
+        return np.asarray(altitude, dtype=float)
+    altitude = np.interp(distance, distance[valid], altitude[valid])
+
+    half = window_m / 2
+    lo = np.searchsorted(distance, distance - half, side="left")
+    hi = np.searchsorted(distance, distance + half, side="right")
+    sums = np.concatenate(([0.0], np.cumsum(altitude)))
+    return (sums[hi] - sums[lo]) / (hi - lo)
+
+
+def grades(
+    distance: np.ndarray, altitude: np.ndarray, window_m: float = GRADE_WINDOW_M
+) -> np.ndarray:
+    """
+    Grade per sample interval (len n - 1), measured over window_m of
+    distance centered on the interval (clamped to the ends of the route).
+    """
+    middle = (distance[:-1] + distance[1:]) / 2
+    lo = np.maximum(middle - window_m / 2, distance[0])
+    hi = np.minimum(middle + window_m / 2, distance[-1])
+    rise = np.interp(hi, distance, altitude) - np.interp(lo, distance, altitude)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        grade = np.where(hi > lo, rise / (hi - lo), 0.0)
+    return np.clip(np.nan_to_num(grade), -MAX_GRADE, MAX_GRADE)
+
+
+def _monotonic_distance(distance: np.ndarray) -> np.ndarray:
+    filled = np.where(np.isfinite(distance), distance, -np.inf)
+    filled = np.maximum.accumulate(filled)
+    return np.where(np.isfinite(filled), filled, 0.0)
+
+
+class GradeService:
+    """Derives smoothed elevation and GAP for workouts with streams."""
+
+    def compute(self, streams: Dict[str, np.ndarray]) -> Optional[Dict[str, Any]]:
+        """
+        Elevation and grade summary for one workout.
+
+        Returns:
+            Dict with smoothed_altitude and cumulative_graded_distance (per
+            sample arrays), elevation_gain, elevation_loss,
+            graded_distance_meters and grade_adjusted_pace (s/km), or None
+            without distance/altitude samples
+        """
+        if not streams or "time" not in streams:
+            return None
+        if "distance" not in streams or "altitude" not in streams:
+            return None
+        if np.isfinite(streams["altitude"]).sum() < 2:
+            return None
+
+        distance = _monotonic_distance(streams["distance"])
+        altitude = smooth_altitude(distance, streams["altitude"])
+        steps = np.diff(altitude)
+        factors = running_cost(grades(distance, altitude)) / FLAT_COST
+        cumulative = np.concatenate(([0.0], np.cumsum(np.diff(distance) * factors)))
+        graded = float(cumulative[-1])
+
+        elapsed = float(streams["time"][-1] - streams["time"][0])
+        return {
+            "smoothed_altitude": altitude,
+            "cumulative_graded_distance": cumulative,
+            "elevation_gain": float(np.clip(steps, 0, None).sum()),
+            "elevation_loss": float(np.clip(-steps, 0, None).sum()),
+            "graded_distance_meters": graded,
+            "grade_adjusted_pace": elapsed / (graded / 1000) if graded > 0 else None,
+        }
+
+    def apply(
+        self, workout: models.Workout, streams: Dict[str, np.ndarray]
+    ) -> Optional[Dict[str, Any]]:
+        """Store smoothed gain, graded distance and GAP on a new workout."""
+        result = self.compute(streams)
+        if result is None:
+            return None
+        workout.smoothed_elevation_gain = round(result["elevation_gain"], 1)
+        workout.graded_distance_meters = round(result["graded_distance_meters"], 1)
+        workout.grade_adjusted_pace = (
+            round(result["grade_adjusted_pace"], 1)
+            if result["grade_adjusted_pace"] is not None
+            else None
+        )
+        return result
+
+
+# Singleton
+grade_service = GradeService()
@@ -11,6 +11,7 @@ from sqlalchemy.orm import Session
 
 from .. import models
 from ..core.config import settings
+from .baseline_service import baseline_service
 
 logger = logging.getLogger(__name__)
 
@@ -321,9 +322,10 @@ def sync_health_metrics(
             synced_metrics.append(new_metric)
             print(f"[HEALTH] Created new metrics for {date_str}")
 
-    # Calculate baselines (7-day averages)
+    # Update rolling HRV / resting HR baselines incrementally
     if synced_metrics:
-        _calculate_baselines(user_id, db)
+        baseline_service.update_for_metrics(db, user_id, synced_metrics)
+        db.commit()
 
     print(
         f"[HEALTH] Completed health metrics sync: {len(synced_metrics)} days processed"
@@ -331,50 +333,6 @@ def sync_health_metrics(
     return synced_metrics
 
 
-def _calculate_baselines(user_id: int, db: Session):
-    """Calculate 7-day baseline averages for HRV and resting HR."""
-    print("[HEALTH] Calculating 7-day baselines...")
-
-    # Get last 7 days of metrics
-    seven_days_ago = date.today() - timedelta(days=7)
-    recent_metrics = (
-        db.query(models.HealthMetric)
-        .filter(
-            models.HealthMetric.user_id == user_id,
-            models.HealthMetric.date >= seven_days_ago,
-        )
-        .all()
-    )
-
-    if not recent_metrics:
-        return
-
-    # Calculate HRV baseline
-    hrv_values = [m.hrv_ms for m in recent_metrics if m.hrv_ms is not None]
-    if hrv_values:
-        hrv_baseline = sum(hrv_values) / len(hrv_values)
-        print(f"[HEALTH] HRV baseline (7-day avg): {hrv_baseline:.1f} ms")
-
-        # Update all recent metrics with this baseline
-        for metric in recent_metrics:
-            metric.hrv_baseline_ms = hrv_baseline
-
-    # Calculate resting HR baseline
-    hr_values = [
-        m.resting_hr_bpm for m in recent_metrics if m.resting_hr_bpm is not None
-    ]
-    if hr_values:
-        hr_baseline = sum(hr_values) / len(hr_values)
-        print(f"[HEALTH] Resting HR baseline (7-day avg): {hr_baseline:.1f} bpm")
-
-        # Update all recent metrics with this baseline
-        for metric in recent_metrics:
-            metric.resting_hr_baseline_bpm = hr_baseline
-
-    db.commit()
-    print("[HEALTH] Baselines updated")
-
-
 def get_latest_health_metric(
     user_id: int, db: Session
 ) -> Optional[models.HealthMetric]:
@@ -12,11 +12,17 @@ Zones (5-zone model):
 - Zone 3: 70-80% (Tempo)
 - Zone 4: 80-90% (Threshold)
 - Zone 5: 90-100% (VO2 Max)
+
+Time in zone is computed with numpy over whole sample arrays
+(time_in_zones_array); per-workout results are persisted by zone_time_service.
 """
+import numpy as np
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 
+from app.services.athlete_context_service import athlete_context_service
+
 def calculate_max_hr_from_workouts(db: Session, user_id: int, days: int = 90) -> Optional[int]:
     """
     Calculate max HR from recent workout history.
@@ -107,8 +113,16 @@ def auto_calculate_and_save_zones(db: Session, user_id: int, user_age: Optional[
     
     # Save to user profile
     user = crud.get_user_by_id(db, user_id)
+    zones_changed = user.hr_zones != zones
+    if user.max_heart_rate != max_hr:
+        athlete_context_service.invalidate(db, user_id)
     user.max_heart_rate = max_hr
     user.hr_zones = zones
+    
+    # Stored time-in-zone depends on the zones: recompute the whole history
+    if zones_changed:
+        from app.services.zone_time_service import zone_time_service
+        zone_time_service.recompute_for_user(db, user)
     db.commit()
     
     print(f"[HR ZONES] Generated for user {user_id}: Max HR {max_hr} ({source})")
@@ -132,6 +146,47 @@ def get_zone_for_hr(hr: int, zones: List[Dict]) -> Optional[int]:
     return None
 
 
+def time_in_zones_array(time: np.ndarray, values: np.ndarray, zones: List[Dict]) -> Dict[int, float]:
+    """
+    Vectorized time in zone over sample arrays.
+    
+    Each interval between consecutive samples is credited to the zone of its
+    closing sample (same convention as calculate_time_in_zones). A value on a
+    shared boundary belongs to the lower zone, like get_zone_for_hr.
+    
+    Args:
+        time: Sample times in seconds, ascending
+        values: HR (or pace/power) per sample; NaN or 0 means no reading
+        zones: Zone definitions with 'zone', 'min' and 'max'
+        
+    Returns:
+        Dict mapping zone number to seconds spent
+    """
+    ordered = sorted(zones, key=lambda z: z['max'])
+    result = {zone['zone']: 0.0 for zone in ordered}
+    time = np.asarray(time, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if len(time) < 2 or not ordered:
+        return result
+    
+    mins = np.array([zone['min'] for zone in ordered], dtype=float)
+    maxs = np.array([zone['max'] for zone in ordered], dtype=float)
+    numbers = np.array([zone['zone'] for zone in ordered])
+    
+    current = values[1:]
+    deltas = np.diff(time)
+    # First zone whose upper bound reaches the value, if the value is above its lower bound
+    index = np.searchsorted(maxs, current, side='left')
+    in_range = (index < len(maxs)) & np.isfinite(current) & (current != 0)
+    index = np.minimum(index, len(maxs) - 1)
+    in_range &= current >= mins[index]
+    
+    seconds = np.bincount(index[in_range], weights=deltas[in_range], minlength=len(ordered))
+    for number, total in zip(numbers, seconds):
+        result[int(number)] = float(total)
+    return result
+
+
 def calculate_time_in_zones(workout_records: List[Dict], zones: List[Dict]) -> Dict[int, int]:
     """
     Calculate time spent in each HR zone during workout.
@@ -144,20 +199,12 @@ def calculate_time_in_zones(workout_records: List[Dict], zones: List[Dict]) -> D
         Dict mapping zone number to seconds spent
     """
     time_in_zones = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+    if len(workout_records) < 2:
+        return time_in_zones
     
-    for i in range(1, len(workout_records)):
-        prev = workout_records[i-1]
-        curr = workout_records[i]
-        
-        if 'heart_rate' not in curr or not curr['heart_rate']:
-            continue
-        
-        # Calculate time delta
-        time_delta = (curr['timestamp'] - prev['timestamp']).total_seconds()
-        
-        # Determine zone
-        zone = get_zone_for_hr(curr['heart_rate'], zones)
-        if zone:
-            time_in_zones[zone] += time_delta
+    start = workout_records[0]['timestamp']
+    time = np.array([(r['timestamp'] - start).total_seconds() for r in workout_records])
+    hr = np.array([r.get('heart_rate') or np.nan for r in workout_records], dtype=float)
     
+    time_in_zones.update(time_in_zones_array(time, hr, zones))
     return time_in_zones
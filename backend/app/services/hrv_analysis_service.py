@@ -20,6 +20,7 @@ import logging
 import statistics
 
 from app import models
+from app.services.baseline_service import baseline_service
 
 logger = logging.getLogger(__name__)
 
@@ -79,12 +80,19 @@ class HRVAnalysisService:
         hrv_values = [m.hrv_ms for m in metrics]
         dates = [m.date for m in metrics]
         
-        # Calculate baselines
-        baseline_metrics = metrics[:7] if len(metrics) >= 7 else metrics
-        baseline_hrv = sum(m.hrv_ms for m in baseline_metrics) / len(baseline_metrics)
-        
-        recent_metrics = metrics[-7:] if len(metrics) >= 7 else metrics
-        recent_hrv = sum(m.hrv_ms for m in recent_metrics) / len(recent_metrics)
+        # Baselines: precomputed 60-day baseline vs 7-day rolling mean
+        baseline = baseline_service.get_baseline(
+            db, user_id, "hrv_ms", as_of=datetime.utcnow().date()
+        )
+        if baseline and baseline["count_7d"] and baseline["mean_60d"]:
+            baseline_hrv = baseline["mean_60d"]
+            recent_hrv = baseline["mean_7d"]
+        else:
+            baseline_metrics = metrics[:7] if len(metrics) >= 7 else metrics
+            baseline_hrv = sum(m.hrv_ms for m in baseline_metrics) / len(baseline_metrics)
+            
+            recent_metrics = metrics[-7:] if len(metrics) >= 7 else metrics
+            recent_hrv = sum(m.hrv_ms for m in recent_metrics) / len(recent_metrics)
         
         # Calculate statistics
         min_hrv = min(hrv_values)
@@ -164,6 +172,48 @@ class HRVAnalysisService:
             "generated_at": datetime.utcnow().isoformat()
         }
     
+    def get_status_summary(self, user_id: int, db: Session) -> Dict[str, Any]:
+        """
+        Quick HRV status summary (14-day analysis).
+        
+        Raises:
+            ValueError: If there is not enough HRV data
+        """
+        full_analysis = self.analyze_hrv_trends(
+            user_id=user_id,
+            db=db,
+            analysis_days=14
+        )
+        
+        if full_analysis.get("status") != "analyzed":
+            raise ValueError("Insufficient HRV data available")
+        
+        recovery_status = full_analysis["current_status"]["recovery_status"]
+        vs_baseline = full_analysis["current_status"]["vs_baseline_percentage"]
+        trend = full_analysis["trend_analysis"]["direction"]
+        fatigue_score = full_analysis["current_status"]["fatigue_score"]
+        
+        # Map fatigue score to 1-10 scale
+        fatigue_level = max(1, min(10, int((fatigue_score / 100) * 10)))
+        
+        # Action recommendations
+        actions = {
+            "excellent": "✅ Ready for hard training",
+            "good": "✅ Ready for normal training",
+            "adequate": "⚠️ Moderate intensity only",
+            "compromised": "⚠️ Recovery day recommended",
+            "critical": "🛑 Rest or very light activity"
+        }
+        
+        return {
+            "recovery_status": recovery_status,
+            "vs_baseline_percent": vs_baseline,
+            "trend": trend,
+            "fatigue_level": fatigue_level,  # 1-10
+            "action": actions.get(recovery_status, "Consult full analysis"),
+            "full_analysis_recommended": fatigue_level >= 7
+        }
+    
     def _calculate_trend(self, values: List[float]) -> str:
         """Calculate trend direction (up, down, stable)."""
         if len(values) < 3:
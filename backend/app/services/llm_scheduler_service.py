@@ -0,0 +1,301 @@
+"""
+llm_scheduler_service.py - Admission control and scheduling for Groq requests
+
+Every coach LLM call goes through llm_scheduler.complete(), which enforces:
+- a global and a per-user concurrency cap
+- a tokens-per-minute budget per model (prompt estimate + max_tokens is
+  reserved at start and corrected with the reported usage)
+- priority classes: interactive chat first, then on-demand analyses, then
+  background plan generation
+- backpressure: a request that would queue behind too many others of equal
+  or higher priority (MAX_QUEUE_DEPTH) is rejected at once with
+  LLMOverloadedError, mapped to 429 + Retry-After by the API
+- model fallback: requests admitted behind a deep queue (or whose model's
+  token budget is spent) run on the smaller fallback model
+
+Upstream 429s from Groq are surfaced the same way. Endpoints run in the
+FastAPI threadpool, so waiting uses a threading.Condition.
+
+The scheduler is per process: every API worker and every Celery worker
+process (plan generation) has its own caps and token budget, while all of
+them share one Groq quota. The settings describe that shared quota and the
+singleton takes a 1/llm_processes share of the global concurrency cap and of
+each token budget, so llm_processes must count every process that calls Groq.
+"""
+import bisect
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.coach_context_service import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Scheduling class (lower runs first)."""
+
+    INTERACTIVE = 0  # chat
+    STANDARD = 1  # on-demand analyses and recommendations
+    BACKGROUND = 2  # plan generation
+
+
+# Requests allowed to wait ahead of a new one, per class, before rejecting it
+MAX_QUEUE_DEPTH = {
+    Priority.INTERACTIVE: 24,
+    Priority.STANDARD: 12,
+    Priority.BACKGROUND: 4,
+}
+
+# Initial latency estimate for Retry-After (seconds), then an EWMA
+INITIAL_LATENCY = 4.0
+LATENCY_SMOOTHING = 0.2
+
+
+class LLMOverloadedError(Exception):
+    """The LLM queue is full or Groq rate-limited us; retry after a delay."""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(f"LLM overloaded ({reason}), retry after {retry_after}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+@dataclass(order=True)
+class _Ticket:
+    priority: int
+    seq: int
+    user_id: int = field(compare=False)
+    tokens: int = field(compare=False)
+    model: str = field(compare=False)
+    reservation: Optional[List[float]] = field(default=None, compare=False)
+
+
+class LLMScheduler:
+    """Global scheduler for chat completion requests."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_per_user: int,
+        tokens_per_minute: Dict[str, int],
+        fallback_model: Optional[str] = None,
+        fallback_queue_depth: int = 8,
+        queue_timeout: float = 30.0,
+        window_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.tokens_per_minute = tokens_per_minute
+        self.fallback_model = fallback_model
+        self.fallback_queue_depth = fallback_queue_depth
+        self.queue_timeout = queue_timeout
+        self.window_seconds = window_seconds
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting: List[_Ticket] = []  # sorted by (priority, seq)
+        self._active = 0
+        self._per_user: Dict[int, int] = {}
+        self._usage: Dict[str, Deque[List[float]]] = {}  # model -> [[time, tokens]]
+        self._latency = INITIAL_LATENCY
+
+    # ===== Public API =====
+
+    def complete(
+        self,
+        client: Any,
+        user_id: int,
+        priority: Priority,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Run client.chat.completions.create() once a slot and token budget are free.
+
+        Args:
+            client: Groq client
+            user_id: Requesting user (per-user cap)
+            priority: Scheduling class
+            model: Preferred model (may be swapped for the fallback model)
+            messages: Chat messages
+            max_tokens: Completion token limit (counted against the budget)
+            **kwargs: Passed through (temperature, ...)
+
+        Returns:
+            The completion
+
+        Raises:
+            LLMOverloadedError: Queue too deep, wait timed out or Groq returned 429
+        """
+        estimate = sum(estimate_tokens(m["content"]) + 4 for m in messages) + max_tokens
+        ticket = self._admit(user_id, priority, model, estimate)
+        self._wait_turn(ticket)
+
+        start = self.clock()
+        used = None
+        try:
+            completion = client.chat.completions.create(
+                model=ticket.model, messages=messages, max_tokens=max_tokens, **kwargs
+            )
+            usage = getattr(completion, "usage", None)
+            used = getattr(usage, "total_tokens", None)
+            return completion
+        except Exception as e:
+            if getattr(e, "status_code", None) == 429:
+                raise LLMOverloadedError(self._upstream_retry_after(e), "upstream rate limit") from e
+            raise
+        finally:
+            self._release(ticket, used, self.clock() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current queue and budget state (monitoring / load tests)."""
+        with self._cond:
+            now = self.clock()
+            return {
+                "active": self._active,
+                "queued": {p.name.lower(): sum(t.priority == p for t in self._waiting) for p in Priority},
+                "tokens_in_window": {m: self._window_tokens(m, now) for m in self._usage},
+                "avg_latency_s": round(self._latency, 2),
+            }
+
+    # ===== Internals =====
+
+    def _admit(self, user_id: int, priority: Priority, model: str, tokens: int) -> _Ticket:
+        """Queue a ticket or reject it; picks the model."""
+        with self._cond:
+            ahead = sum(1 for t in self._waiting if t.priority <= priority)
+            if ahead >= MAX_QUEUE_DEPTH[priority]:
+                retry_after = self._retry_after(ahead)
+                logger.warning(
+                    f"[LLM] Rejecting {priority.name} request of user {user_id}: "
+                    f"{ahead} ahead, retry after {retry_after}s"
+                )
+                raise LLMOverloadedError(retry_after, "queue full")
+
+            if self.fallback_model and self.fallback_model != model:
+                budget_spent = self._window_tokens(model, self.clock()) + tokens > self._budget(model)
+                if ahead >= self.fallback_queue_depth or budget_spent:
+                    model = self.fallback_model
+
+            ticket = _Ticket(priority, next(self._seq), user_id, tokens, model)
+            bisect.insort(self._waiting, ticket)
+            return ticket
+
+    def _wait_turn(self, ticket: _Ticket) -> None:
+        """Block until the ticket may start, then take a slot and reserve tokens."""
+        deadline = self.clock() + self.queue_timeout
+        with self._cond:
+            while True:
+                now = self.clock()
+                if self._is_next(ticket, now) and self._tokens_available(ticket, now):
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+                    raise LLMOverloadedError(self._retry_after(len(self._waiting)), "queue timeout")
+                self._cond.wait(timeout=min(remaining, self._next_budget_release(ticket.model, now)))
+
+            self._waiting.remove(ticket)
+            self._active += 1
+            self._per_user[ticket.user_id] = self._per_user.get(ticket.user_id, 0) + 1
+            ticket.reservation = [now, float(ticket.tokens)]
+            self._usage.setdefault(ticket.model, deque()).append(ticket.reservation)
+            # Another waiter may be able to start too
+            self._cond.notify_all()
+
+    def _release(self, ticket: _Ticket, used: Optional[int], latency: float) -> None:
+        with self._cond:
+            self._active -= 1
+            self._per_user[ticket.user_id] -= 1
+            if not self._per_user[ticket.user_id]:
+                del self._per_user[ticket.user_id]
+            if used is not None:
+                ticket.reservation[1] = float(used)
+            self._latency += LATENCY_SMOOTHING * (latency - self._latency)
+            self._cond.notify_all()
+
+    def _can_run_now(self) -> bool:
+        return self._active < self.max_concurrency
+
+    def _is_next(self, ticket: _Ticket, now: float) -> bool:
+        """
+        Whether the ticket is the first waiter that could start.
+
+        Waiters whose user is at the cap, or that wait for another model's
+        token budget, don't hold up the rest.
+        """
+        if not self._can_run_now():
+            return False
+        for waiter in self._waiting:
+            if self._per_user.get(waiter.user_id, 0) >= self.max_per_user:
+                continue
+            if waiter.model != ticket.model and not self._tokens_available(waiter, now):
+                continue
+            return waiter is ticket
+        return False
+
+    def _budget(self, model: str) -> int:
+        return self.tokens_per_minute.get(model) or math.inf
+
+    def _window_tokens(self, model: str, now: float) -> float:
+        usage = self._usage.get(model)
+        if not usage:
+            return 0.0
+        while usage and usage[0][0] <= now - self.window_seconds:
+            usage.popleft()
+        return sum(tokens for _, tokens in usage)
+
+    def _tokens_available(self, ticket: _Ticket, now: float) -> bool:
+        used = self._window_tokens(ticket.model, now)
+        # A request larger than the whole budget runs alone
+        return used == 0 or used + ticket.tokens <= self._budget(ticket.model)
+
+    def _next_budget_release(self, model: str, now: float) -> float:
+        usage = self._usage.get(model)
+        if not usage:
+            return self.queue_timeout
+        return max(usage[0][0] + self.window_seconds - now, 0.01)
+
+    def _retry_after(self, ahead: int) -> int:
+        """Seconds until a request with `ahead` requests in front would likely finish."""
+        return max(1, math.ceil((ahead + 1) / self.max_concurrency * self._latency))
+
+    def _upstream_retry_after(self, error: Exception) -> int:
+        response = getattr(error, "response", None)
+        header = response.headers.get("retry-after") if response is not None else None
+        try:
+            return max(1, math.ceil(float(header)))
+        except (TypeError, ValueError):
+            return self._retry_after(0)
+
+
+def _process_share(limit: int) -> int:
+    """This process's part of a quota shared by settings.llm_processes processes."""
+    return max(1, limit // max(1, settings.llm_processes))
+
+
+# Singleton
+llm_scheduler = LLMScheduler(
+    max_concurrency=_process_share(settings.llm_max_concurrency),
+    max_per_user=settings.llm_max_concurrency_per_user,
+    tokens_per_minute={
+        settings.llm_model: _process_share(settings.llm_tokens_per_minute),
+        settings.llm_fallback_model: _process_share(settings.llm_fallback_tokens_per_minute),
+    },
+    fallback_model=settings.llm_fallback_model,
+    fallback_queue_depth=settings.llm_fallback_queue_depth,
+    queue_timeout=settings.llm_queue_timeout_seconds,
+)
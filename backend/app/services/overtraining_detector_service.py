@@ -16,9 +16,13 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 import logging
+import math
 from enum import Enum
 
 from app import models
+from app.services.baseline_service import baseline_service
+from app.services.training_load_service import training_load_service
+from app.services.zone_time_service import sum_zone_times
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +48,7 @@ class OvertreaningDetectorService:
         "readiness_low_threshold": 50,              # Readiness score < 50 = concern
         "consecutive_low_readiness_days": 3,        # 3+ days low readiness = warning
         "sleep_debt_hours": 5,                      # Sleep deficit vs baseline
+        "acute_chronic_ratio_limit": 1.5,           # ATL/CTL above 1.5 = load spike
     }
     
     def __init__(self):
@@ -62,7 +67,9 @@ class OvertreaningDetectorService:
         Args:
             user_id: User to analyze
             db: Database session
-            analysis_days: Number of days to analyze (default 30)
+            analysis_days: Number of days to analyze (default 30). Resting HR
+                and HRV are not bounded by it: they compare the last 7 days
+                with the 60-day rolling baseline ending today
             
         Returns:
             Dict with overall risk level, contributing factors, and recommendations
@@ -72,8 +79,8 @@ class OvertreaningDetectorService:
         cutoff_date = datetime.utcnow() - timedelta(days=analysis_days)
         
         # Gather all analysis components
-        rhr_analysis = self._analyze_resting_hr_trend(user_id, db, cutoff_date)
-        hrv_analysis = self._analyze_hrv_trend(user_id, db, cutoff_date)
+        rhr_analysis = self._analyze_resting_hr_trend(user_id, db)
+        hrv_analysis = self._analyze_hrv_trend(user_id, db)
         recovery_analysis = self._analyze_recovery_patterns(user_id, db, cutoff_date)
         intensity_analysis = self._analyze_intensity_distribution(user_id, db, cutoff_date)
         readiness_analysis = self._analyze_readiness_trends(user_id, db, cutoff_date)
@@ -132,35 +139,28 @@ class OvertreaningDetectorService:
     def _analyze_resting_hr_trend(
         self,
         user_id: int,
-        db: Session,
-        cutoff_date: datetime
+        db: Session
     ) -> Dict[str, Any]:
         """
         Analyze resting heart rate trend.
         
         Elevated resting HR is a key indicator of central fatigue.
-        Concern: 5%+ increase from baseline over 2-3 weeks.
+        Concern: 5%+ increase of the 7-day mean over the 60-day baseline.
+        Reads the precomputed rolling baselines (see baseline_service).
         """
-        metrics = db.query(models.HealthMetric).filter(
-            models.HealthMetric.user_id == user_id,
-            models.HealthMetric.date >= cutoff_date,
-            models.HealthMetric.resting_hr_bpm.isnot(None)
-        ).order_by(models.HealthMetric.date.asc()).all()
+        baseline = baseline_service.get_baseline(
+            db, user_id, "resting_hr_bpm", as_of=datetime.utcnow().date()
+        )
         
-        if len(metrics) < 7:
+        if not baseline or baseline["count_60d"] < 7 or not baseline["count_7d"]:
             return {
                 "status": "insufficient_data",
                 "risk_factor": 0,
                 "message": "Insufficient resting HR data (need 7+ days)"
             }
         
-        # Get baseline (first week)
-        baseline_metrics = metrics[:7]
-        baseline_rhr = sum(m.resting_hr_bpm for m in baseline_metrics) / len(baseline_metrics)
-        
-        # Get recent (last week)
-        recent_metrics = metrics[-7:]
-        recent_rhr = sum(m.resting_hr_bpm for m in recent_metrics) / len(recent_metrics)
+        baseline_rhr = baseline["mean_60d"]
+        recent_rhr = baseline["mean_7d"]
         
         # Calculate increase percentage
         rhr_increase_pct = (recent_rhr - baseline_rhr) / baseline_rhr
@@ -192,35 +192,29 @@ class OvertreaningDetectorService:
     def _analyze_hrv_trend(
         self,
         user_id: int,
-        db: Session,
-        cutoff_date: datetime
+        db: Session
     ) -> Dict[str, Any]:
         """
         Analyze Heart Rate Variability (HRV) trend.
         
         HRV is measured in milliseconds. Low HRV = sympathetic overactivity = fatigue.
-        Concern: 15%+ decline from baseline indicates insufficient parasympathetic recovery.
+        Concern: 15%+ decline of the 7-day mean below the 60-day baseline indicates
+        insufficient parasympathetic recovery.
+        Reads the precomputed rolling baselines (see baseline_service).
         """
-        metrics = db.query(models.HealthMetric).filter(
-            models.HealthMetric.user_id == user_id,
-            models.HealthMetric.date >= cutoff_date,
-            models.HealthMetric.hrv_ms.isnot(None)
-        ).order_by(models.HealthMetric.date.asc()).all()
+        baseline = baseline_service.get_baseline(
+            db, user_id, "hrv_ms", as_of=datetime.utcnow().date()
+        )
         
-        if len(metrics) < 7:
+        if not baseline or baseline["count_60d"] < 7 or not baseline["count_7d"]:
             return {
                 "status": "insufficient_data",
                 "risk_factor": 0,
                 "message": "Insufficient HRV data (need 7+ days)"
             }
         
-        # Get baseline (first week)
-        baseline_metrics = metrics[:7]
-        baseline_hrv = sum(m.hrv_ms for m in baseline_metrics) / len(baseline_metrics)
-        
-        # Get recent (last week)
-        recent_metrics = metrics[-7:]
-        recent_hrv = sum(m.hrv_ms for m in recent_metrics) / len(recent_metrics)
+        baseline_hrv = baseline["mean_60d"]
+        recent_hrv = baseline["mean_7d"]
         
         # Calculate decline percentage
         hrv_decline_pct = (baseline_hrv - recent_hrv) / baseline_hrv
@@ -325,6 +319,10 @@ class OvertreaningDetectorService:
         - More than 3 high-intensity workouts per week
         - More than 2 consecutive intense days
         - Insufficient low-intensity volume (base training)
+        - Acute load spiking above chronic load (training_load_service)
+        
+        The low-intensity share is time in HR zones 1-2 when workouts have
+        stored time in zone, otherwise the share of low-intensity workouts.
         """
         workouts = db.query(models.Workout).filter(
             models.Workout.user_id == user_id,
@@ -338,7 +336,7 @@ class OvertreaningDetectorService:
                 "message": "No workout data available"
             }
         
-        # Classify intensity based on HR zones (assume max HR = 190)
+        # Classify intensity from stress score (or HR when unscored)
         high_intensity_count = 0
         moderate_intensity_count = 0
         low_intensity_count = 0
@@ -346,17 +344,14 @@ class OvertreaningDetectorService:
         max_consecutive_intense = 0
         
         for workout in workouts:
-            if not workout.avg_heart_rate or not workout.max_heart_rate:
+            intensity = self._classify_intensity(workout)
+            if intensity is None:
                 continue
             
-            # Simple classification (would be better with user's max HR)
-            max_hr_estimate = workout.max_heart_rate or 190
-            intensity_pct = (workout.avg_heart_rate / max_hr_estimate) * 100
-            
-            if intensity_pct > 85:  # High intensity (threshold+)
+            if intensity == "high":  # Threshold+
                 high_intensity_count += 1
                 consecutive_intense += 1
-            elif intensity_pct > 75:  # Moderate
+            elif intensity == "moderate":
                 moderate_intensity_count += 1
                 consecutive_intense = 0
             else:  # Low
@@ -369,6 +364,19 @@ class OvertreaningDetectorService:
         high_intensity_pct = (high_intensity_count / total_workouts * 100) if total_workouts > 0 else 0
         low_intensity_pct = (low_intensity_count / total_workouts * 100) if total_workouts > 0 else 0
         
+        # Time in HR zone (stored per workout at ingest): base share by time, Z1-Z2
+        zone_seconds = sum_zone_times(workouts, "heart_rate")
+        zone_total = sum(zone_seconds.values())
+        hr_zone_distribution = None
+        if zone_total > 0:
+            hr_zone_distribution = {
+                zone: round(seconds / zone_total * 100, 1)
+                for zone, seconds in sorted(zone_seconds.items())
+            }
+            low_intensity_pct = (
+                zone_seconds.get("1", 0.0) + zone_seconds.get("2", 0.0)
+            ) / zone_total * 100
+        
         # Risk calculation based on polarized training principle
         # Ideal: 80% low intensity, 20% high intensity
         risk_factor = 0
@@ -385,6 +393,12 @@ class OvertreaningDetectorService:
         if low_intensity_pct < 60:
             risk_factor += 20
         
+        # Acute load spike relative to chronic load?
+        load = training_load_service.get_current(db, user_id)
+        acwr = load["acute_chronic_ratio"]
+        if acwr is not None and acwr > self.config["acute_chronic_ratio_limit"]:
+            risk_factor += 20
+        
         interpretation_notes = []
         if high_intensity_pct > 25:
             interpretation_notes.append(f"High-intensity workouts at {high_intensity_pct:.0f}% (ideal: 15-25%)")
@@ -392,6 +406,8 @@ class OvertreaningDetectorService:
             interpretation_notes.append(f"{max_consecutive_intense} consecutive intense days (max recommended: 3)")
         if low_intensity_pct < 65:
             interpretation_notes.append(f"Base training at {low_intensity_pct:.0f}% (ideal: 70-80%)")
+        if acwr is not None and acwr > self.config["acute_chronic_ratio_limit"]:
+            interpretation_notes.append(f"Acute:chronic load ratio {acwr:.2f} (keep below {self.config['acute_chronic_ratio_limit']})")
         
         if not interpretation_notes:
             interpretation_notes.append("Training distribution appears balanced")
@@ -405,10 +421,41 @@ class OvertreaningDetectorService:
             "low_intensity_count": low_intensity_count,
             "low_intensity_percentage": round(low_intensity_pct, 1),
             "max_consecutive_intense_days": max_consecutive_intense,
+            "hr_zone_distribution": hr_zone_distribution,
+            "fitness_ctl": load["ctl"],
+            "fatigue_atl": load["atl"],
+            "form_tsb": load["tsb"],
+            "acute_chronic_ratio": acwr,
             "risk_factor": min(risk_factor, 75),
             "interpretation": " | ".join(interpretation_notes)
         }
     
+    def _classify_intensity(self, workout: models.Workout) -> Optional[str]:
+        """
+        Classify a workout as high / moderate / low intensity.
+        
+        Uses the intensity factor implied by the training stress score
+        (TSS = hours * IF^2 * 100); falls back to avg/max HR of the workout.
+        """
+        if workout.training_stress_score and workout.duration_seconds:
+            hours = workout.duration_seconds / 3600
+            intensity_factor = math.sqrt(workout.training_stress_score / hours / 100)
+            if intensity_factor > 0.88:
+                return "high"
+            if intensity_factor > 0.75:
+                return "moderate"
+            return "low"
+        
+        if workout.avg_heart_rate and workout.max_heart_rate:
+            intensity_pct = (workout.avg_heart_rate / workout.max_heart_rate) * 100
+            if intensity_pct > 85:
+                return "high"
+            if intensity_pct > 75:
+                return "moderate"
+            return "low"
+        
+        return None
+    
     def _analyze_readiness_trends(
         self,
         user_id: int,
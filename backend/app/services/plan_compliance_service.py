@@ -0,0 +1,261 @@
+"""
+plan_compliance_service.py - Planned sessions matched to actual workouts
+
+Adapting a plan used to load every workout since the plan was created and
+hand the whole list to the LLM prompt, which only counted it. Compliance is
+now kept per plan week (TrainingPlanWeek) and refreshed incrementally: when
+a workout is ingested or deleted, only the week of each active plan that
+contains its date is re-matched.
+
+- Each training session (rest days excluded) is matched to at most one run:
+  same day first, then the day before/after (moved sessions), closest
+  distance first. PlannedWorkout.workout_id records the match
+- Per week: completed vs planned sessions (adherence), actual vs planned km
+  (volume delta, every run of the week counts) and the mean relative pace
+  delta of matched sessions with a pace target (intensity delta, > 0 =
+  faster than planned)
+- Weeks never computed (migrated or adapted plans) are built on first read
+- Week N covers the 7 days from the plan's start date + (N-1) weeks
+"""
+import logging
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+# Sessions matched to a run on a neighbouring day (moved sessions)
+MATCH_DAY_OFFSETS = (0, -1, 1)
+
+REST_WORDS = ("rest", "descanso")
+
+_PACE_RE = re.compile(r"(\d{1,2}):(\d{2})")
+
+
+def week_start(plan: Any, week: int) -> date:
+    """First day of a plan week."""
+    start = plan.start_date or plan.created_at
+    return start.date() + timedelta(weeks=week - 1)
+
+
+def is_training(session: Any) -> bool:
+    """Whether a planned session is a workout (not a rest day)."""
+    label = f"{session.workout_type or ''} {session.name or ''}".lower()
+    return not any(word in label for word in REST_WORDS)
+
+
+def target_pace(session: Any) -> Optional[float]:
+    """
+    Pace target of a session in seconds/km, or None.
+
+    "5:30-6:00 min/km" -> midpoint of the range; coach plans store
+    details["pace_min_per_km"] (decimal minutes) instead.
+    """
+    if session.pace_target:
+        paces = [int(m) * 60 + int(s) for m, s in _PACE_RE.findall(session.pace_target)]
+        if paces:
+            return sum(paces) / len(paces)
+    minutes = (session.details or {}).get("pace_min_per_km")
+    if isinstance(minutes, (int, float)) and not isinstance(minutes, bool) and minutes > 0:
+        return float(minutes) * 60
+    return None
+
+
+def _ratio(actual: float, planned: float) -> Optional[float]:
+    return round(actual / planned, 3) if planned else None
+
+
+def _delta(actual: float, planned: float) -> Optional[float]:
+    return round((actual - planned) / planned, 3) if planned else None
+
+
+class PlanComplianceService:
+    """Keeps per-week plan compliance up to date."""
+
+    # ===== Read path =====
+
+    def summary(self, db: Session, plan: models.TrainingPlan, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Compliance of every week that has started. Commits when weeks that
+        were never computed had to be built.
+
+        Returns:
+            Dict with the plan id, current week, totals over started weeks
+            and one entry per started week
+        """
+        today = today or datetime.utcnow().date()
+        weeks = (
+            db.query(models.TrainingPlanWeek)
+            .filter(models.TrainingPlanWeek.plan_id == plan.id)
+            .order_by(models.TrainingPlanWeek.week)
+            .all()
+        )
+        started = [week for week in weeks if week_start(plan, week.week) <= today]
+
+        missing = [week for week in started if week.compliance_updated_at is None]
+        for week in missing:
+            self._refresh_week(db, plan, week)
+        if missing:
+            db.commit()
+
+        entries = [self._week_entry(plan, week, today) for week in started]
+        planned_sessions = sum(week.planned_sessions for week in started)
+        completed_sessions = sum(week.completed_sessions for week in started)
+        planned_km = sum(week.planned_km for week in started)
+        actual_km = sum(week.actual_km for week in started)
+        intensities = [week.intensity_delta for week in started if week.intensity_delta is not None]
+        finished = [entry for entry in entries if not entry["in_progress"]]
+
+        return {
+            "plan_id": plan.external_id,
+            "current_week": entries[-1]["week"] if entries else None,
+            "total_weeks": len(weeks),
+            "totals": {
+                "planned_sessions": planned_sessions,
+                "completed_sessions": completed_sessions,
+                "adherence": _ratio(completed_sessions, planned_sessions),
+                "planned_km": round(planned_km, 2),
+                "actual_km": round(actual_km, 2),
+                "volume_delta": _delta(actual_km, planned_km),
+                "intensity_delta": (
+                    round(sum(intensities) / len(intensities), 3) if intensities else None
+                ),
+                # Finished weeks only: sessions later in the current week aren't due yet
+                "finished_weeks_adherence": _ratio(
+                    sum(entry["completed_sessions"] for entry in finished),
+                    sum(entry["planned_sessions"] for entry in finished),
+                ),
+            },
+            "weeks": entries,
+        }
+
+    # ===== Write path =====
+
+    def record_workouts(self, db: Session, user_id: int, days: Iterable[date]) -> None:
+        """
+        Re-match the weeks of the user's active plans that contain any of
+        the given workout dates (workouts added or deleted). Does not commit.
+        """
+        days = set(days)
+        if not days:
+            return
+        plans = (
+            db.query(models.TrainingPlan)
+            .filter(models.TrainingPlan.user_id == user_id, models.TrainingPlan.status == "active")
+            .all()
+        )
+        db.flush()  # Make the new / deleted workouts visible to the window queries
+
+        for plan in plans:
+            first = week_start(plan, 1)
+            numbers = {(day - first).days // 7 + 1 for day in days if day >= first}
+            if not numbers:
+                continue
+            weeks = (
+                db.query(models.TrainingPlanWeek)
+                .filter(
+                    models.TrainingPlanWeek.plan_id == plan.id,
+                    models.TrainingPlanWeek.week.in_(numbers),
+                )
+                .all()
+            )
+            for week in weeks:
+                self._refresh_week(db, plan, week)
+
+    def rebuild(self, db: Session, plan: models.TrainingPlan) -> None:
+        """Recompute every week of a plan. Does not commit."""
+        db.flush()
+        weeks = db.query(models.TrainingPlanWeek).filter(models.TrainingPlanWeek.plan_id == plan.id).all()
+        for week in weeks:
+            self._refresh_week(db, plan, week)
+
+    # ===== Internals =====
+
+    def _refresh_week(self, db: Session, plan: models.TrainingPlan, week: models.TrainingPlanWeek) -> None:
+        """Match the week's sessions to the runs in its window and store the totals."""
+        start = week_start(plan, week.week)
+        window_start = datetime.combine(start, datetime.min.time())
+        Workout = models.Workout
+        runs = (
+            db.query(Workout.id, Workout.start_time, Workout.distance_meters, Workout.duration_seconds)
+            .filter(
+                Workout.user_id == plan.user_id,
+                Workout.start_time >= window_start,
+                Workout.start_time < window_start + timedelta(weeks=1),
+                Workout.sport_type.ilike("%run%"),
+            )
+            .order_by(Workout.start_time)
+            .all()
+        )
+        sessions = (
+            db.query(models.PlannedWorkout)
+            .filter(models.PlannedWorkout.plan_id == plan.id, models.PlannedWorkout.week == week.week)
+            .order_by(models.PlannedWorkout.day, models.PlannedWorkout.position)
+            .all()
+        )
+
+        training = [session for session in sessions if is_training(session)]
+        for session in sessions:
+            session.workout_id = None
+        matched = self._match(start, training, runs)
+
+        intensities = []
+        for session, run in matched:
+            pace = target_pace(session)
+            if pace and run.distance_meters and run.duration_seconds:
+                actual = run.duration_seconds / (run.distance_meters / 1000)
+                intensities.append((pace - actual) / pace)
+
+        week.planned_sessions = len(training)
+        week.completed_sessions = len(matched)
+        week.planned_km = round(sum(session.distance_km or 0 for session in training), 2)
+        week.actual_km = round(sum(run.distance_meters or 0 for run in runs) / 1000, 2)
+        week.actual_runs = len(runs)
+        week.intensity_delta = round(sum(intensities) / len(intensities), 3) if intensities else None
+        week.compliance_updated_at = datetime.utcnow()
+
+    def _match(self, start: date, sessions: List[models.PlannedWorkout], runs: List[Any]) -> List[tuple]:
+        """Greedy session -> run matching; sets session.workout_id."""
+        available = {run.id: run for run in runs}
+        matched = []
+        for offset in MATCH_DAY_OFFSETS:
+            for session in sessions:
+                if session.workout_id is not None:
+                    continue
+                day = start + timedelta(days=session.day - 1 + offset)
+                candidates = [run for run in available.values() if run.start_time.date() == day]
+                if not candidates:
+                    continue
+                run = min(
+                    candidates,
+                    key=lambda r: abs((r.distance_meters or 0) / 1000 - (session.distance_km or 0)),
+                )
+                session.workout_id = run.id
+                del available[run.id]
+                matched.append((session, run))
+        return matched
+
+    def _week_entry(self, plan: models.TrainingPlan, week: models.TrainingPlanWeek, today: date) -> Dict[str, Any]:
+        start = week_start(plan, week.week)
+        return {
+            "week": week.week,
+            "start_date": start.isoformat(),
+            "in_progress": today < start + timedelta(weeks=1),
+            "planned_sessions": week.planned_sessions,
+            "completed_sessions": week.completed_sessions,
+            "adherence": _ratio(week.completed_sessions, week.planned_sessions),
+            "planned_km": week.planned_km,
+            "actual_km": week.actual_km,
+            "actual_runs": week.actual_runs,
+            "volume_delta": _delta(week.actual_km, week.planned_km),
+            "intensity_delta": week.intensity_delta,
+        }
+
+
+# Singleton
+plan_compliance_service = PlanComplianceService()
@@ -0,0 +1,262 @@
+"""
+plan_job_service.py - Background training-plan generation jobs
+
+POST /training-plans/generate used to call the LLM inline, holding the
+request (and a worker) for the whole multi-week plan. It now stores a
+PlanGenerationJob and answers at once with the job id and a provisional
+plan (TrainingPlanService's deterministic template); a Celery worker
+generates the AI plan and stores it (plan_store_service).
+
+- submit(): identical requests (same goal and weeks) attach to the job
+  already queued/running, or to one that succeeded in the last DEDUP_WINDOW
+- run(): worker side; progress 0 -> 10 (generating) -> 90 (storing) -> 100.
+  An overloaded LLM requeues the job (up to MAX_ATTEMPTS), any other
+  error fails it. The worker stamps heartbeat_at at each step; a running
+  job silent for STALE_AFTER is assumed lost and failed on the next
+  identical submit (queued jobs are never timed out, they may be waiting
+  out a retry)
+- dispatch(): enqueues on Celery, or runs the job in-process after the
+  response when the broker is unreachable (local dev without Redis)
+"""
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import BackgroundTasks
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.llm_scheduler_service import LLMOverloadedError
+from app.services.plan_store_service import plan_store_service
+
+logger = logging.getLogger(__name__)
+
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# A finished identical request within this window returns the same job
+DEDUP_WINDOW = timedelta(minutes=10)
+
+# Running jobs without a worker heartbeat for this long are assumed lost
+# (worker died) and failed
+STALE_AFTER = timedelta(minutes=15)
+
+# Generation attempts before an overloaded LLM fails the job
+MAX_ATTEMPTS = 3
+
+# After a failed enqueue, run jobs in-process for this long before retrying
+# the broker (a refused Redis connection takes seconds to fail)
+BROKER_RECHECK_SECONDS = 60
+
+PROGRESS_GENERATING = 10
+PROGRESS_STORING = 90
+
+
+def request_hash(goal: Dict[str, Any], weeks: int) -> str:
+    """Fingerprint of a generation request (dedup key)."""
+    payload = json.dumps({"goal": goal, "weeks": weeks}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PlanJobService:
+    """Creates, runs and serves plan generation jobs."""
+
+    def __init__(self):
+        self._broker_down_until = 0.0
+
+    # ===== Read path =====
+
+    def get(self, db: Session, user_id: int, job_id: int) -> Optional[models.PlanGenerationJob]:
+        """A user's job, or None if it doesn't exist or belongs to someone else."""
+        return (
+            db.query(models.PlanGenerationJob)
+            .filter(
+                models.PlanGenerationJob.id == job_id,
+                models.PlanGenerationJob.user_id == user_id,
+            )
+            .first()
+        )
+
+    # ===== Write path =====
+
+    def submit(
+        self,
+        db: Session,
+        user: models.User,
+        goal: Dict[str, Any],
+        weeks: int,
+        planner: Any,
+    ) -> Tuple[models.PlanGenerationJob, bool]:
+        """
+        Create a generation job unless an identical one can be reused. Commits.
+
+        Args:
+            db: Database session
+            user: Athlete
+            goal: Goal dict for TrainingPlanService.generate_plan
+            weeks: Plan length
+            planner: TrainingPlanService (provisional plan)
+
+        Returns:
+            (job, created) - created is False when an existing job was reused
+        """
+        digest = request_hash(goal, weeks)
+        existing = self._find_duplicate(db, user.id, digest)
+        if existing is not None:
+            return existing, False
+
+        job = models.PlanGenerationJob(
+            user_id=user.id,
+            request_hash=digest,
+            active_key=f"{user.id}:{digest}",
+            status=QUEUED,
+            progress=0,
+            goal=goal,
+            weeks=weeks,
+            provisional_plan=planner.create_provisional_plan(user, goal, weeks),
+        )
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Identical request submitted concurrently; join that job
+            db.rollback()
+            existing = self._find_duplicate(db, user.id, digest)
+            if existing is None:
+                raise
+            return existing, False
+
+        logger.info(f"[PLAN JOB] Queued job {job.id} for user {user.id} ({weeks} weeks)")
+        return job, True
+
+    def run(self, db: Session, job_id: int, planner: Any) -> Optional[int]:
+        """
+        Generate and store the AI plan of a job (worker side). Commits.
+
+        Args:
+            db: Database session
+            job_id: Job to run
+            planner: TrainingPlanService
+
+        Returns:
+            Seconds to wait before running the job again (LLM overloaded),
+            otherwise None
+        """
+        job = db.get(models.PlanGenerationJob, job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            # Deleted, or already handled by a duplicate delivery
+            return None
+        user = db.get(models.User, job.user_id)
+
+        job.status = RUNNING
+        job.progress = PROGRESS_GENERATING
+        job.attempts += 1
+        job.started_at = job.started_at or datetime.utcnow()
+        job.heartbeat_at = datetime.utcnow()
+        db.commit()
+
+        try:
+            plan = planner.generate_plan(db=db, user=user, goal=job.goal, weeks=job.weeks)
+        except LLMOverloadedError as e:
+            if job.attempts < MAX_ATTEMPTS:
+                logger.warning(f"[PLAN JOB] LLM overloaded for job {job.id}, retrying in {e.retry_after}s")
+                job.status = QUEUED
+                job.progress = 0
+                db.commit()
+                return e.retry_after
+            self._finish(db, job, FAILED, error="AI coach is busy, please retry later")
+            return None
+        except Exception as e:
+            logger.error(f"[PLAN JOB] Job {job.id} failed: {e}", exc_info=True)
+            db.rollback()
+            self._finish(db, job, FAILED, error=str(e))
+            return None
+
+        job.progress = PROGRESS_STORING
+        job.heartbeat_at = datetime.utcnow()
+        db.commit()
+
+        self._store_plan(db, user, plan)
+        job.plan_id = plan["plan_id"]
+        self._finish(db, job, SUCCEEDED)
+        logger.info(f"[PLAN JOB] Job {job.id} stored plan {job.plan_id} for user {user.id}")
+        return None
+
+    def run_in_process(self, job_id: int) -> None:
+        """Run a job to completion in this process, waiting out LLM overload."""
+        from app.database import SessionLocal
+        from app.services.training_plan_service import get_training_plan_service
+
+        db = SessionLocal()
+        try:
+            while (retry_in := self.run(db, job_id, get_training_plan_service())) is not None:
+                time.sleep(retry_in)
+        finally:
+            db.close()
+
+    def dispatch(self, job_id: int, background_tasks: BackgroundTasks) -> None:
+        """Enqueue a job on Celery, falling back to running it after the response."""
+        from app.tasks import generate_training_plan_job
+
+        if time.monotonic() >= self._broker_down_until:
+            try:
+                generate_training_plan_job.apply_async((job_id,), retry=False)
+                return
+            except Exception as e:
+                logger.warning(f"[PLAN JOB] Celery unavailable ({e}), running jobs in-process")
+                self._broker_down_until = time.monotonic() + BROKER_RECHECK_SECONDS
+        background_tasks.add_task(self.run_in_process, job_id)
+
+    # ===== Internals =====
+
+    def _find_duplicate(self, db: Session, user_id: int, digest: str) -> Optional[models.PlanGenerationJob]:
+        """Active job for the same request, or one that succeeded recently."""
+        Job = models.PlanGenerationJob
+        active = db.query(Job).filter(Job.active_key == f"{user_id}:{digest}").first()
+        if active is not None:
+            if active.status != RUNNING or self._last_seen(active) >= datetime.utcnow() - STALE_AFTER:
+                return active
+            logger.warning(f"[PLAN JOB] Job {active.id} is stale, failing it")
+            self._finish(db, active, FAILED, error="Plan generation timed out")
+
+        return (
+            db.query(Job)
+            .filter(
+                Job.user_id == user_id,
+                Job.request_hash == digest,
+                Job.status == SUCCEEDED,
+                Job.finished_at >= datetime.utcnow() - DEDUP_WINDOW,
+            )
+            .order_by(Job.id.desc())
+            .first()
+        )
+
+    @staticmethod
+    def _last_seen(job: models.PlanGenerationJob) -> datetime:
+        """Last worker heartbeat of a running job (started_at for older rows)."""
+        return job.heartbeat_at or job.started_at or job.created_at
+
+    def _store_plan(self, db: Session, user: models.User, plan: Dict[str, Any]) -> None:
+        """Store the plan as the user's new active plan. Does not commit."""
+        plan["status"] = "active"
+        plan["current_week"] = 1
+        plan["start_date"] = datetime.now(timezone.utc).isoformat()  # Plan starts today
+        plan_store_service.create(db, user.id, plan)
+
+    def _finish(self, db: Session, job: models.PlanGenerationJob, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.error = error
+        job.active_key = None
+        job.finished_at = datetime.utcnow()
+        if status == SUCCEEDED:
+            job.progress = 100
+        db.commit()
+
+
+# Singleton
+plan_job_service = PlanJobService()
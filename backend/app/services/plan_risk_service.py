@@ -0,0 +1,258 @@
+"""
+plan_risk_service.py - Monte Carlo injury / overreaching risk of a plan
+
+Generated plans (TrainingPlanService, TrainingRecommendationsService) had
+no quantitative check of the load they prescribe. The plan is turned into
+a daily stress (TSS) series and played forward from the athlete's current
+CTL/ATL (training_load_service) under thousands of sampled scenarios:
+
+- Adherence: each scenario draws its own completion rate (Beta around the
+  athlete's adherence), then each session is done or missed
+- Missed sessions are sometimes crammed into the next day
+- Completed sessions deviate from the prescribed load (log-normal noise)
+
+All scenarios run as one (scenarios x days) array through the same
+vectorized EWMA as the stored series. Per week the result reports
+percentiles of the peak acute:chronic ratio (ACWR), the lowest form (TSB)
+and the end-of-week fitness, plus the share of scenarios that cross the
+ACWR and TSB danger thresholds.
+"""
+import logging
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.plan_compliance_service import is_training, target_pace, week_start
+from app.services.training_load_service import ewma, training_load_service
+
+logger = logging.getLogger(__name__)
+
+
+SCENARIOS = 2000
+DEFAULT_ADHERENCE = 0.85
+ADHERENCE_CONCENTRATION = 20.0  # Beta a + b: spread of adherence between scenarios
+CATCH_UP_PROBABILITY = 0.25  # Missed session done the next day on top of that day's
+LOAD_NOISE_SIGMA = 0.15  # Log-normal spread of a completed session's load
+
+# Danger thresholds
+ACWR_DANGER = 1.5
+TSB_OVERREACHING = -30.0
+ACWR_MIN_CTL = 10.0  # Floor of the chronic load so a near-zero CTL doesn't explode the ratio
+
+PERCENTILES = (10, 50, 90)
+
+DEFAULT_SESSION_MINUTES = 45.0
+DEFAULT_EASY_PACE = 360.0  # seconds per km, sessions with distance but no pace
+
+# Intensity factor (fraction of threshold) by session type keyword, first match wins
+TYPE_INTENSITY = (
+    ("recovery", 0.65), ("recuperacion", 0.65),
+    ("interval", 1.0), ("series", 1.0), ("race", 1.0), ("carrera", 1.0),
+    ("threshold", 0.95), ("umbral", 0.95),
+    ("tempo", 0.88), ("fartlek", 0.85),
+    ("long", 0.78), ("larga", 0.78),
+    ("easy", 0.75), ("suave", 0.75), ("rodaje", 0.75),
+)
+DEFAULT_INTENSITY = 0.8
+
+
+def session_stress(session: Any, threshold_speed: float) -> float:
+    """
+    Planned TSS of one session (hours x IF^2 x 100, as rTSS).
+
+    The intensity comes from the pace target when there is one (relative to
+    threshold speed), otherwise from the session type.
+    """
+    if not is_training(session):
+        return 0.0
+
+    pace = target_pace(session)
+    if pace:
+        intensity = (1000 / pace) / threshold_speed
+    else:
+        label = f"{session.workout_type or ''} {session.name or ''}".lower()
+        intensity = next((value for word, value in TYPE_INTENSITY if word in label), DEFAULT_INTENSITY)
+
+    if session.duration_minutes:
+        hours = session.duration_minutes / 60
+    elif session.distance_km:
+        hours = session.distance_km * (pace or DEFAULT_EASY_PACE) / 3600
+    else:
+        hours = DEFAULT_SESSION_MINUTES / 60
+    return hours * intensity ** 2 * 100
+
+
+def session_namespaces(rows: Iterable[Dict[str, Any]]) -> List[SimpleNamespace]:
+    """Session dicts (plan_rows() values, weekly-plan workouts) as assess() input."""
+    fields = ("week", "day", "workout_type", "name", "distance_km", "duration_minutes", "pace_target")
+    return [
+        SimpleNamespace(**{field: row.get(field) for field in fields}, details=row.get("details") or {})
+        for row in rows
+    ]
+
+
+class PlanRiskService:
+    """Simulates plans against the CTL/ATL model."""
+
+    CTL_ALPHA = training_load_service.CTL_ALPHA
+    ATL_ALPHA = training_load_service.ATL_ALPHA
+
+    # ===== Read path =====
+
+    def assess_plan(
+        self,
+        db: Session,
+        user: models.User,
+        plan: models.TrainingPlan,
+        adherence: Optional[float] = None,
+        seed: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Risk of a stored plan, from its start date."""
+        sessions = db.query(models.PlannedWorkout).filter(models.PlannedWorkout.plan_id == plan.id).all()
+        return self.assess(db, user, sessions, week_start(plan, 1), adherence=adherence, seed=seed)
+
+    def assess(
+        self,
+        db: Session,
+        user: models.User,
+        sessions: Iterable[Any],
+        start: date,
+        adherence: Optional[float] = None,
+        seed: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Risk of a list of planned sessions starting on `start`.
+
+        Args:
+            db: Database session
+            user: Athlete (threshold pace and current CTL/ATL)
+            sessions: Objects with week, day, workout_type, name,
+                distance_km, duration_minutes, pace_target and details
+                (PlannedWorkout rows, or session_namespaces())
+            start: Date of week 1 day 1
+            adherence: Expected share of sessions completed (default 0.85)
+            seed: Random seed (reproducible results)
+        """
+        loads = self.daily_loads(sessions, training_load_service.threshold_speed(user))
+        state = training_load_service.get_series(db, user.id, start - timedelta(days=1), start - timedelta(days=1))[0]
+        result = self.simulate(
+            loads,
+            ctl=state["ctl"],
+            atl=state["atl"],
+            adherence=DEFAULT_ADHERENCE if adherence is None else adherence,
+            seed=seed,
+        )
+        result["start_date"] = start.isoformat()
+        return result
+
+    def daily_loads(self, sessions: Iterable[Any], threshold_speed: float) -> np.ndarray:
+        """Planned TSS per day (whole weeks; week 1 day 1 = index 0)."""
+        stresses = [
+            ((session.week - 1) * 7 + (session.day - 1), session_stress(session, threshold_speed))
+            for session in sessions
+            if session.week and session.week > 0 and session.day and 1 <= session.day <= 7
+        ]
+        weeks = max((index // 7 + 1 for index, _ in stresses), default=0)
+        loads = np.zeros(weeks * 7)
+        for index, stress in stresses:
+            loads[index] += stress
+        return loads
+
+    def simulate(
+        self,
+        loads: np.ndarray,
+        ctl: float,
+        atl: float,
+        adherence: float = DEFAULT_ADHERENCE,
+        scenarios: int = SCENARIOS,
+        seed: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Play a daily load plan forward under sampled scenarios.
+
+        Args:
+            loads: Planned TSS per day (whole weeks)
+            ctl: Fitness on the day before the plan starts
+            atl: Fatigue on the day before the plan starts
+            adherence: Mean share of sessions completed
+            scenarios: Number of simulated scenarios
+            seed: Random seed
+
+        Returns:
+            Dict with per-week percentiles and danger probabilities, and
+            plan-wide danger probabilities
+        """
+        rng = np.random.default_rng(seed)
+        weeks = len(loads) // 7
+        loads = np.asarray(loads[:weeks * 7], dtype=float)
+        days = len(loads)
+        if weeks == 0:
+            return {"scenarios": scenarios, "weeks": [], "overall": None}
+
+        mean = min(max(adherence, 0.01), 0.99)
+        completion = rng.beta(
+            mean * ADHERENCE_CONCENTRATION, (1 - mean) * ADHERENCE_CONCENTRATION, size=(scenarios, 1)
+        )
+        done = rng.random((scenarios, days)) < completion
+        noise = rng.lognormal(-LOAD_NOISE_SIGMA ** 2 / 2, LOAD_NOISE_SIGMA, size=(scenarios, days))
+
+        actual = np.where(done, loads * noise, 0.0)
+        crammed = np.where(~done & (rng.random((scenarios, days)) < CATCH_UP_PROBABILITY), loads, 0.0)
+        actual[:, 1:] += crammed[:, :-1]
+
+        ctl_series = ewma(actual, self.CTL_ALPHA, ctl)
+        atl_series = ewma(actual, self.ATL_ALPHA, atl)
+        acwr = atl_series / np.maximum(ctl_series, ACWR_MIN_CTL)
+        tsb = np.empty_like(actual)
+        tsb[:, 0] = ctl - atl
+        tsb[:, 1:] = ctl_series[:, :-1] - atl_series[:, :-1]
+
+        shape = (scenarios, weeks, 7)
+        peak_acwr = acwr.reshape(shape).max(axis=2)
+        low_tsb = tsb.reshape(shape).min(axis=2)
+        end_ctl = ctl_series[:, 6::7]
+        week_load = actual.reshape(shape).sum(axis=2)
+
+        acwr_danger = peak_acwr > ACWR_DANGER
+        overreaching = low_tsb < TSB_OVERREACHING
+        acwr_p = np.percentile(peak_acwr, PERCENTILES, axis=0)
+        tsb_p = np.percentile(low_tsb, PERCENTILES, axis=0)
+        ctl_p = np.percentile(end_ctl, PERCENTILES, axis=0)
+        load_p = np.percentile(week_load, PERCENTILES, axis=0)
+        planned = loads.reshape(weeks, 7).sum(axis=1)
+
+        def row(values: np.ndarray, week: int) -> Dict[str, float]:
+            return {f"p{p}": round(float(values[i, week]), 2) for i, p in enumerate(PERCENTILES)}
+
+        return {
+            "scenarios": scenarios,
+            "adherence": round(mean, 2),
+            "initial": {"ctl": round(ctl, 2), "atl": round(atl, 2)},
+            "thresholds": {"acwr": ACWR_DANGER, "tsb": TSB_OVERREACHING},
+            "weeks": [
+                {
+                    "week": week + 1,
+                    "planned_load": round(float(planned[week]), 1),
+                    "load": row(load_p, week),
+                    "peak_acwr": row(acwr_p, week),
+                    "lowest_tsb": row(tsb_p, week),
+                    "end_ctl": row(ctl_p, week),
+                    "acwr_risk": round(float(acwr_danger[:, week].mean()), 3),
+                    "overreaching_risk": round(float(overreaching[:, week].mean()), 3),
+                }
+                for week in range(weeks)
+            ],
+            "overall": {
+                "acwr_risk": round(float(acwr_danger.any(axis=1).mean()), 3),
+                "overreaching_risk": round(float(overreaching.any(axis=1).mean()), 3),
+                "final_ctl": row(ctl_p, weeks - 1),
+            },
+        }
+
+
+# Singleton
+plan_risk_service = PlanRiskService()
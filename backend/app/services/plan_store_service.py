@@ -0,0 +1,359 @@
+"""
+plan_store_service.py - Training plans stored as plan / week / session rows
+
+Plans used to be a list in User.preferences["training_plans"]: every read
+or edit loaded and rewrote the whole blob and scanned it for the plan id,
+and concurrent edits overwrote each other. They now live in training_plans
+(header), training_plan_weeks and planned_workouts, so endpoints fetch only
+the rows they need: the plan list reads headers, a TCX export or workout
+adaptation reads one session by (plan_id, week, day), a status change
+updates one row.
+
+- plan_rows() / plan_dict(): pure conversion between a generator's plan
+  JSON and row values (migration 015 carries a frozen copy)
+- Known keys become columns; anything else the LLM produced is kept in the
+  row's details JSON, so plans come back in the layout they were created in
+"""
+import logging
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+LAYOUT_WORKOUTS = "workouts"  # week / workouts / numeric day (/training-plans)
+LAYOUT_DAYS = "days"  # week_number / days / weekday name (/coach/plan)
+
+# (week number key, sessions key) per layout
+LAYOUT_KEYS = {
+    LAYOUT_WORKOUTS: ("week", "workouts"),
+    LAYOUT_DAYS: ("week_number", "days"),
+}
+
+WEEKDAYS = (
+    ("lunes", "monday"), ("martes", "tuesday"), ("miercoles", "wednesday"),
+    ("jueves", "thursday"), ("viernes", "friday"), ("sabado", "saturday"),
+    ("domingo", "sunday"),
+)
+
+
+# ===== Conversion =====
+
+def _text(value: Any) -> Optional[str]:
+    return value if isinstance(value, str) and value else None
+
+
+def _int(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def _float(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _datetime(value: Any) -> Optional[datetime]:
+    """Naive UTC datetime from a datetime or ISO string."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _plain(value: Optional[float]) -> Any:
+    """Float column value as written by the generator (6 rather than 6.0)."""
+    return int(value) if value is not None and value.is_integer() else value
+
+
+def _pop(data: Dict[str, Any], key: str, convert: Callable[[Any], Any]) -> Any:
+    """Move data[key] to a column: remove and return it converted, or keep it if it doesn't convert."""
+    value = convert(data.get(key))
+    if value is not None:
+        del data[key]
+    return value
+
+
+def weekday_number(label: str) -> Optional[int]:
+    """1 (Monday) to 7 for a Spanish or English weekday name, else None."""
+    folded = unicodedata.normalize("NFKD", label.lower()).encode("ascii", "ignore").decode()
+    for number, names in enumerate(WEEKDAYS, start=1):
+        if any(name in folded for name in names):
+            return number
+    return None
+
+
+def plan_rows(plan: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split a plan dict into row values.
+
+    Weeks are numbered by position (as the API always addressed them).
+
+    Returns:
+        (TrainingPlan values, TrainingPlanWeek values, PlannedWorkout values);
+        week and session values lack plan_id, header values lack user_id and
+        external_id may be None
+    """
+    details = {key: value for key, value in plan.items() if key != "weeks"}
+    weeks = [w for w in (plan.get("weeks") or []) if isinstance(w, dict)]
+    layout = LAYOUT_DAYS if any("days" in w or "week_number" in w for w in weeks) else LAYOUT_WORKOUTS
+    week_key, sessions_key = LAYOUT_KEYS[layout]
+    goal = details.get("goal") if isinstance(details.get("goal"), dict) else {}
+
+    header = {
+        "external_id": _pop(details, "plan_id", _text) or _text(details.get("id")),
+        "name": _pop(details, "plan_name", _text) or _text(details.get("name")) or "Training Plan",
+        "layout": layout,
+        "status": _pop(details, "status", _text) or "active",
+        "goal_type": _pop(details, "goal_type", _text) or _text(goal.get("type")),
+        "goal_date": _pop(details, "goal_date", _datetime) or _datetime(goal.get("date")),
+        "total_weeks": _pop(details, "total_weeks", _int) or len(weeks),
+        "current_week": _pop(details, "current_week", _int) or 1,
+        "start_date": _pop(details, "start_date", _datetime),
+        "adaptation_count": _pop(details, "adaptation_count", _int) or 0,
+        "created_at": _pop(details, "created_at", _datetime) or datetime.utcnow(),
+        "adapted_at": _pop(details, "adapted_at", _datetime),
+        "status_updated_at": _pop(details, "status_updated_at", _datetime),
+        "details": details,
+    }
+
+    week_rows, session_rows = [], []
+    for number, week in enumerate(weeks, start=1):
+        week_details = dict(week)
+        week_details.pop(week_key, None)
+        sessions = week_details.pop(sessions_key, None)
+        week_rows.append({
+            "week": number,
+            "focus": _pop(week_details, "focus", _text),
+            "total_km": _pop(week_details, "total_km", _float),
+            "details": week_details,
+        })
+
+        for position, session in enumerate(s for s in (sessions or []) if isinstance(s, dict)):
+            session_details = dict(session)
+            raw_day = session_details.pop("day", None)
+            day = _int(raw_day)
+            label = None
+            if day is None and isinstance(raw_day, str):
+                label = raw_day
+                day = weekday_number(raw_day)
+            session_rows.append({
+                "week": number,
+                "day": day or position + 1,
+                "position": position,
+                "day_label": label,
+                "workout_type": _pop(session_details, "type", _text),
+                "name": _pop(session_details, "name", _text),
+                "distance_km": _pop(session_details, "distance_km", _float),
+                "duration_minutes": _pop(session_details, "duration_minutes", _float),
+                "pace_target": _pop(session_details, "pace_target", _text),
+                "details": session_details,
+            })
+
+    return header, week_rows, session_rows
+
+
+def session_dict(session: Any) -> Dict[str, Any]:
+    """PlannedWorkout (or row with the same attributes) as a plan session dict."""
+    item = dict(session.details or {})
+    item["day"] = session.day_label if session.day_label is not None else session.day
+    for key, value in (
+        ("type", session.workout_type),
+        ("name", session.name),
+        ("distance_km", _plain(session.distance_km)),
+        ("duration_minutes", _plain(session.duration_minutes)),
+        ("pace_target", session.pace_target),
+    ):
+        if value is not None:
+            item[key] = value
+    return item
+
+
+def plan_dict(plan: Any, weeks: Iterable[Any], sessions: Iterable[Any]) -> Dict[str, Any]:
+    """Rebuild a plan dict, in its original layout, from its rows."""
+    week_key, sessions_key = LAYOUT_KEYS.get(plan.layout, LAYOUT_KEYS[LAYOUT_WORKOUTS])
+    by_week: Dict[int, List[Any]] = {}
+    for session in sessions:
+        by_week.setdefault(session.week, []).append(session)
+
+    weeks_out = []
+    for week in sorted(weeks, key=lambda w: w.week):
+        item = dict(week.details or {})
+        item[week_key] = week.week
+        if week.focus is not None:
+            item["focus"] = week.focus
+        if week.total_km is not None:
+            item["total_km"] = _plain(week.total_km)
+        item[sessions_key] = [
+            session_dict(s) for s in sorted(by_week.get(week.week, []), key=lambda s: s.position)
+        ]
+        weeks_out.append(item)
+
+    result = dict(plan.details or {})
+    result.update(
+        plan_id=plan.external_id,
+        plan_name=plan.name,
+        status=plan.status,
+        total_weeks=plan.total_weeks,
+        current_week=plan.current_week,
+        adaptation_count=plan.adaptation_count,
+        created_at=plan.created_at.isoformat(),
+    )
+    for key in ("goal_type", "goal_date", "start_date", "adapted_at", "status_updated_at"):
+        value = getattr(plan, key)
+        if value is not None:
+            result[key] = value.isoformat() if isinstance(value, datetime) else value
+    result["weeks"] = weeks_out
+    return result
+
+
+def new_plan_id() -> str:
+    """Public id for a plan created without one."""
+    now = datetime.utcnow()
+    return f"plan_{now:%Y%m%d_%H%M%S}_{now.microsecond // 1000}"
+
+
+class PlanStoreService:
+    """Reads and writes training plans as rows."""
+
+    # ===== Read path =====
+
+    def list_plans(self, db: Session, user_id: int) -> List[models.TrainingPlan]:
+        """Plan headers of a user in creation order (no weeks or sessions)."""
+        return (
+            db.query(models.TrainingPlan)
+            .filter(models.TrainingPlan.user_id == user_id)
+            .order_by(models.TrainingPlan.id)
+            .all()
+        )
+
+    def get_plan(self, db: Session, user_id: int, external_id: str) -> Optional[models.TrainingPlan]:
+        """A user's plan header by public id."""
+        return (
+            db.query(models.TrainingPlan)
+            .filter(
+                models.TrainingPlan.user_id == user_id,
+                models.TrainingPlan.external_id == external_id,
+            )
+            .first()
+        )
+
+    def serialize(self, db: Session, plans: List[models.TrainingPlan]) -> List[Dict[str, Any]]:
+        """Full plan dicts (weeks and sessions loaded in two queries)."""
+        if not plans:
+            return []
+        ids = [plan.id for plan in plans]
+        weeks: Dict[int, List[models.TrainingPlanWeek]] = {}
+        for week in db.query(models.TrainingPlanWeek).filter(models.TrainingPlanWeek.plan_id.in_(ids)):
+            weeks.setdefault(week.plan_id, []).append(week)
+        sessions: Dict[int, List[models.PlannedWorkout]] = {}
+        for session in db.query(models.PlannedWorkout).filter(models.PlannedWorkout.plan_id.in_(ids)):
+            sessions.setdefault(session.plan_id, []).append(session)
+        return [plan_dict(plan, weeks.get(plan.id, []), sessions.get(plan.id, [])) for plan in plans]
+
+    def to_dict(self, db: Session, plan: models.TrainingPlan) -> Dict[str, Any]:
+        """Full plan dict of one plan."""
+        return self.serialize(db, [plan])[0]
+
+    def has_week(self, db: Session, plan: models.TrainingPlan, week: int) -> bool:
+        return (
+            db.query(models.TrainingPlanWeek.id)
+            .filter(models.TrainingPlanWeek.plan_id == plan.id, models.TrainingPlanWeek.week == week)
+            .first()
+            is not None
+        )
+
+    def get_session(
+        self, db: Session, plan: models.TrainingPlan, week: int, day: int
+    ) -> Optional[Dict[str, Any]]:
+        """First session planned on a day of a week, as a dict."""
+        session = (
+            db.query(models.PlannedWorkout)
+            .filter(
+                models.PlannedWorkout.plan_id == plan.id,
+                models.PlannedWorkout.week == week,
+                models.PlannedWorkout.day == day,
+            )
+            .order_by(models.PlannedWorkout.position)
+            .first()
+        )
+        return session_dict(session) if session is not None else None
+
+    # ===== Write path =====
+
+    def create(self, db: Session, user_id: int, plan: Dict[str, Any]) -> models.TrainingPlan:
+        """
+        Store a generated plan. Does not commit.
+
+        A missing or already used plan id (LLMs echo template ids) is
+        replaced; plan["plan_id"] is set to the stored id.
+        """
+        header, week_rows, session_rows = plan_rows(plan)
+        external_id = header["external_id"]
+        if not external_id or self.get_plan(db, user_id, external_id) is not None:
+            header["external_id"] = new_plan_id()
+        plan["plan_id"] = header["external_id"]
+        row = models.TrainingPlan(user_id=user_id, **header)
+        db.add(row)
+        db.flush()
+        self._add_rows(db, row, week_rows, session_rows)
+        return row
+
+    def replace(self, db: Session, plan: models.TrainingPlan, data: Dict[str, Any]) -> models.TrainingPlan:
+        """Rewrite a plan (header, weeks and sessions) from a dict; keeps its id. Does not commit."""
+        header, week_rows, session_rows = plan_rows(data)
+        header.pop("external_id")
+        for key, value in header.items():
+            setattr(plan, key, value)
+        self._delete_rows(db, plan)
+        self._add_rows(db, plan, week_rows, session_rows)
+        return plan
+
+    def delete(self, db: Session, plan: models.TrainingPlan) -> None:
+        """Delete a plan with its weeks and sessions. Does not commit."""
+        self._delete_rows(db, plan)
+        db.delete(plan)
+
+    # ===== Internals =====
+
+    def _add_rows(
+        self,
+        db: Session,
+        plan: models.TrainingPlan,
+        week_rows: List[Dict[str, Any]],
+        session_rows: List[Dict[str, Any]],
+    ) -> None:
+        db.add_all(models.TrainingPlanWeek(plan_id=plan.id, **values) for values in week_rows)
+        db.add_all(models.PlannedWorkout(plan_id=plan.id, **values) for values in session_rows)
+
+    def _delete_rows(self, db: Session, plan: models.TrainingPlan) -> None:
+        db.query(models.PlannedWorkout).filter(models.PlannedWorkout.plan_id == plan.id).delete(
+            synchronize_session=False
+        )
+        db.query(models.TrainingPlanWeek).filter(models.TrainingPlanWeek.plan_id == plan.id).delete(
+            synchronize_session=False
+        )
+
+
+# Singleton
+plan_store_service = PlanStoreService()
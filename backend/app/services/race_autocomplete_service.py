@@ -0,0 +1,215 @@
+"""
+race_autocomplete_service.py - In-memory prefix index for race autocomplete
+
+The race search box used to hit /events/races/search (a DB query) on every
+keystroke. Suggestions now come from an in-process index of the upcoming
+verified races:
+
+- Keys are the folded (models.fold_text) name, location and region, plus
+  every suffix starting at a later word ("san silvestre vallecana" is also
+  found by "vallecana"); suffixes starting with a stop word are skipped
+- Races are ranked once at build time, by popularity (participants) and
+  date: a race ten times bigger ranks like one DAYS_PER_POPULARITY_DECADE
+  days sooner. Keys live in one sorted array, so a prefix is a bisect
+  range and its top k is an argpartition over the races' ranks
+- The index is loaded at startup and rebuilt on the next lookup after an
+  Event is inserted, updated or deleted through the ORM in this process,
+  after the day rolls over (past races drop out), or when the events
+  table's (count, last update) changed in another worker, checked at most
+  every CHECK_SECONDS
+"""
+import bisect
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+# Ranking: log10(1 + participants) - days ahead / DAYS_PER_POPULARITY_DECADE
+DAYS_PER_POPULARITY_DECADE = 90.0
+
+# Keys indexed per race (name suffixes first); bounds the top-k over-fetch
+MAX_KEYS_PER_RACE = 12
+
+# Words a key suffix may not start with
+STOP_WORDS = frozenset({"de", "del", "la", "las", "el", "los", "y", "en", "a", "-", "|"})
+
+# How often the events table is checked for changes made by other workers
+CHECK_SECONDS = 60.0
+
+DEFAULT_LIMIT = 8
+
+# Bumped by every Event insert/update/delete in this process
+_events_changes = 0
+
+_INDEX_COLUMNS = (
+    models.Event.external_id,
+    models.Event.name,
+    models.Event.location,
+    models.Event.region,
+    models.Event.date,
+    models.Event.distance_km,
+    models.Event.participants_estimate,
+)
+
+
+def race_keys(name: Optional[str], location: Optional[str], region: Optional[str]) -> List[str]:
+    """Prefix-index keys of one race, name suffixes first."""
+    keys: List[str] = []
+    for text in (name, location, region):
+        words = models.fold_text(text).split()
+        for start, word in enumerate(words):
+            if start and word in STOP_WORDS:
+                continue
+            key = " ".join(words[start:])
+            if key not in keys:
+                keys.append(key)
+    return keys[:MAX_KEYS_PER_RACE]
+
+
+@dataclass
+class _Index:
+    """Sorted keys, the rank of each key's race, and the ranked races."""
+
+    keys: List[str]
+    ranks: np.ndarray
+    races: List[Dict[str, Any]]
+    day: date
+    changes: int
+    signature: Tuple[int, Any]
+    checked_at: float
+
+
+class RaceAutocompleteService:
+    """Top-k race suggestions for a typed prefix."""
+
+    def __init__(self):
+        self._index: Optional[_Index] = None
+        self._lock = threading.Lock()
+
+    # ===== Read path =====
+
+    def suggest(self, db: Session, query: str, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Upcoming races whose name, location or region has a word starting
+        with the query (accents and case ignored), best ranked first.
+        """
+        prefix = " ".join(models.fold_text(query).split())
+        if not prefix or limit < 1:
+            return []
+        index = self._sync(db)
+
+        start = bisect.bisect_left(index.keys, prefix)
+        end = bisect.bisect_left(index.keys, prefix + "\uffff", start)
+        ranks = index.ranks[start:end]
+
+        # A race has at most MAX_KEYS_PER_RACE keys, so its best k races are
+        # among the limit * MAX_KEYS_PER_RACE smallest ranks of the range
+        fetch = limit * MAX_KEYS_PER_RACE
+        if len(ranks) > fetch:
+            ranks = ranks[np.argpartition(ranks, fetch)[:fetch]]
+        return [index.races[rank] for rank in np.unique(ranks)[:limit].tolist()]
+
+    # ===== Write path =====
+
+    def load(self, db: Session) -> int:
+        """Build the index now (startup). Returns the number of races."""
+        with self._lock:
+            self._index = self._build(db)
+            return len(self._index.races)
+
+    def invalidate(self) -> None:
+        """Rebuild on the next lookup (events changed outside the ORM)."""
+        with self._lock:
+            self._index = None
+
+    # ===== Internals =====
+
+    def _sync(self, db: Session) -> _Index:
+        """Current index, rebuilt if events changed or the day rolled over."""
+        with self._lock:
+            index = self._index
+            if index is None or index.changes != _events_changes or index.day != date.today():
+                index = self._index = self._build(db)
+            elif time.monotonic() - index.checked_at > CHECK_SECONDS:
+                if self._signature(db) != index.signature:
+                    index = self._index = self._build(db)
+                else:
+                    index.checked_at = time.monotonic()
+            return index
+
+    @staticmethod
+    def _signature(db: Session) -> Tuple[int, Any]:
+        count, updated = db.query(func.count(models.Event.id), func.max(models.Event.updated_at)).one()
+        return count, updated
+
+    def _build(self, db: Session) -> _Index:
+        changes = _events_changes
+        started = time.perf_counter()
+        today = date.today()
+        signature = self._signature(db)
+        rows = (
+            db.query(*_INDEX_COLUMNS)
+            .filter(models.Event.date >= today, models.Event.verified == True)
+            .all()
+        )
+
+        def score(row) -> float:
+            days_ahead = (row.date - today).days
+            return math.log10(1 + (row.participants_estimate or 0)) - days_ahead / DAYS_PER_POPULARITY_DECADE
+
+        rows.sort(key=lambda row: (-score(row), row.date, row.name))
+        races = [
+            {
+                "id": row.external_id,
+                "name": row.name,
+                "location": row.location,
+                "region": row.region,
+                "date": row.date.strftime("%Y-%m-%d"),
+                "distance_km": row.distance_km,
+                "participants_estimate": row.participants_estimate,
+            }
+            for row in rows
+        ]
+        entries = sorted(
+            (key, rank)
+            for rank, row in enumerate(rows)
+            for key in race_keys(row.name, row.location, row.region)
+        )
+
+        logger.info(
+            f"Race autocomplete index: {len(races)} races, {len(entries)} keys "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return _Index(
+            keys=[key for key, _ in entries],
+            ranks=np.array([rank for _, rank in entries], dtype=np.int64),
+            races=races,
+            day=today,
+            changes=changes,
+            signature=signature,
+            checked_at=time.monotonic(),
+        )
+
+
+# Singleton
+race_autocomplete_service = RaceAutocompleteService()
+
+
+@event.listens_for(models.Event, "after_insert")
+@event.listens_for(models.Event, "after_update")
+@event.listens_for(models.Event, "after_delete")
+def _events_changed(mapper, connection, target) -> None:
+    global _events_changes
+    _events_changes += 1
@@ -2,14 +2,20 @@
 Enhanced Race Prediction Service
 Refines race predictions with weather, terrain, and altitude adjustments
 Plus confidence scoring and advanced analysis
+Without an explicit base race, uses the grade-adjusted best recent effort
+Factors are computed on numpy arrays, so a whole grid of conditions is one
+vectorized pass over a single base performance (predict_grid)
 """
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, Optional, Tuple, List, Sequence
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 import math
 from enum import Enum
 
+import numpy as np
+
 from .. import models
+from .race_predictor_service import race_predictor_service
 
 
 class TerrainType(str, Enum):
@@ -62,12 +68,22 @@ class RacePredictionEnhancedService:
     # Wind adjustment (km/h)
     WIND_THRESHOLD = 15  # km/h headwind becomes significant
     
+    # Largest condition grid evaluated in one request
+    MAX_GRID_CELLS = 50_000
+    
+    # Condition sets compared by compare_scenarios (still air, no condition override)
+    SCENARIOS = {
+        "best_case": {"temp_c": 12, "humidity_pct": 50, "altitude_m": 0, "terrain": TerrainType.FLAT},
+        "realistic_case": {"temp_c": 15, "humidity_pct": 55, "altitude_m": 0, "terrain": TerrainType.ROLLING},
+        "worst_case": {"temp_c": 25, "humidity_pct": 80, "altitude_m": 500, "terrain": TerrainType.HILLY},
+    }
+    
     def predict_with_conditions(
         self,
         db: Session,
         user_id: int,
-        base_time_minutes: float,
-        base_distance_km: float,
+        base_time_minutes: Optional[float],
+        base_distance_km: Optional[float],
         target_distance_km: float,
         weather: Optional[Dict[str, Any]] = None,
         terrain: TerrainType = TerrainType.ROLLING,
@@ -79,8 +95,9 @@ class RacePredictionEnhancedService:
         Args:
             db: Database session
             user_id: User ID
-            base_time_minutes: Time for base race (in minutes)
-            base_distance_km: Distance of base race
+            base_time_minutes: Time for base race (in minutes); None uses
+                the best recent effort (flat-equivalent time)
+            base_distance_km: Distance of base race (None: best recent effort)
             target_distance_km: Target race distance
             weather: Dict with temp_c, humidity_pct, wind_kmh, condition
             terrain: Terrain type
@@ -89,6 +106,10 @@ class RacePredictionEnhancedService:
         Returns:
             Dict with prediction, adjustments, and confidence
         """
+        base_distance_km, base_time_minutes, base_source = self._base_performance(
+            db, user_id, base_distance_km, base_time_minutes
+        )
+        
         # Base prediction using Riegel formula
         base_prediction = self._riegel_prediction(
             base_distance_km,
@@ -106,13 +127,13 @@ class RacePredictionEnhancedService:
         adjusted_prediction = base_prediction * total_adjustment
         
         # Calculate confidence score (0-100)
-        confidence = self._calculate_advanced_confidence(
+        confidence = float(self._calculate_advanced_confidence(
             base_distance_km,
             target_distance_km,
             weather_factor,
             terrain_factor,
             altitude_factor
-        )
+        ))
         
         # Generate recommendations
         recommendations = self._generate_race_recommendations(
@@ -137,6 +158,11 @@ class RacePredictionEnhancedService:
                 "total_adjustment": round(total_adjustment, 4),
                 "adjustment_percentage": round((total_adjustment - 1) * 100, 2),
             },
+            "base_performance": {
+                "distance_km": round(base_distance_km, 3),
+                "time_minutes": round(base_time_minutes, 2),
+                "source": base_source,
+            },
             "conditions": {
                 "weather": weather or {},
                 "terrain": terrain.value,
@@ -155,6 +181,190 @@ class RacePredictionEnhancedService:
             "generated_at": datetime.utcnow().isoformat(),
         }
     
+    def predict_grid(
+        self,
+        db: Session,
+        user_id: int,
+        base_time_minutes: Optional[float],
+        base_distance_km: Optional[float],
+        distances_km: Sequence[float],
+        temperatures_c: Sequence[float],
+        humidities_pct: Sequence[float],
+        altitudes_m: Sequence[int],
+        terrains: Sequence[TerrainType],
+        wind_kmh: float = 0,
+        condition: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Predict race times over a grid of conditions in one vectorized pass.
+        
+        The base performance is resolved once and every axis factor is
+        computed once; the grid is their broadcast product.
+        
+        Args:
+            db: Database session
+            user_id: User ID
+            base_time_minutes: Time for base race (None: best recent effort)
+            base_distance_km: Distance of base race (None: best recent effort)
+            distances_km: Target distances (grid axis)
+            temperatures_c: Temperatures (grid axis)
+            humidities_pct: Humidities (grid axis)
+            altitudes_m: Altitudes (grid axis)
+            terrains: Terrain types (grid axis)
+            wind_kmh: Headwind applied to every cell
+            condition: Overall weather condition applied to every cell
+            
+        Returns:
+            Dict with the axes, the predicted minutes and confidence as nested
+            lists indexed [distance][temperature][humidity][altitude][terrain],
+            per-axis factors and the best/worst time per distance
+        """
+        axes = {
+            "distance_km": np.asarray(distances_km, dtype=float),
+            "temperature_c": np.asarray(temperatures_c, dtype=float),
+            "humidity_pct": np.asarray(humidities_pct, dtype=float),
+            "altitude_m": np.asarray(altitudes_m, dtype=float),
+        }
+        shape = tuple(len(values) for values in axes.values()) + (len(terrains),)
+        if 0 in shape:
+            raise ValueError("Every grid axis needs at least one value")
+        cells = math.prod(shape)
+        if cells > self.MAX_GRID_CELLS:
+            raise ValueError(f"Grid has {cells} cells; the maximum is {self.MAX_GRID_CELLS}")
+        
+        base_distance_km, base_time_minutes, base_source = self._base_performance(
+            db, user_id, base_distance_km, base_time_minutes
+        )
+        
+        distances = axes["distance_km"]
+        base_predictions = self._riegel_prediction(base_distance_km, base_time_minutes, distances)
+        weather = self._weather_factors(
+            axes["temperature_c"][:, None], axes["humidity_pct"][None, :], wind_kmh, condition
+        )
+        altitude = self._altitude_factors(axes["altitude_m"])
+        terrain = self._terrain_factors(terrains)
+        
+        # (distance, temperature, humidity, altitude, terrain)
+        adjustment = weather[:, :, None, None] * altitude[None, None, :, None] * terrain[None, None, None, :]
+        minutes = base_predictions[:, None, None, None, None] * adjustment[None]
+        confidence = self._calculate_advanced_confidence(
+            base_distance_km,
+            distances[:, None, None, None, None],
+            weather[None, :, :, None, None],
+            terrain[None, None, None, None, :],
+            altitude[None, None, None, :, None],
+        )
+        flat = minutes.reshape(len(distances), -1)
+        
+        return {
+            "axes": {
+                **{name: values.tolist() for name, values in axes.items()},
+                "terrain": [TerrainType(t).value for t in terrains],
+            },
+            "dims": ["distance_km", "temperature_c", "humidity_pct", "altitude_m", "terrain"],
+            "shape": list(shape),
+            "minutes": np.round(minutes, 2).tolist(),
+            "confidence": np.round(np.broadcast_to(confidence, shape), 1).tolist(),
+            "factors": {
+                "weather": np.round(weather, 4).tolist(),
+                "altitude": np.round(altitude, 4).tolist(),
+                "terrain": np.round(terrain, 4).tolist(),
+            },
+            "base_predictions_minutes": np.round(base_predictions, 2).tolist(),
+            "range_by_distance": [
+                {
+                    "distance_km": float(distance),
+                    "min_minutes": round(float(low), 2),
+                    "max_minutes": round(float(high), 2),
+                }
+                for distance, low, high in zip(distances, flat.min(axis=1), flat.max(axis=1))
+            ],
+            "base_performance": {
+                "distance_km": round(base_distance_km, 3),
+                "time_minutes": round(base_time_minutes, 2),
+                "source": base_source,
+            },
+            "conditions": {"wind_kmh": wind_kmh, "condition": condition},
+            "generated_at": datetime.utcnow().isoformat(),
+        }
+    
+    def compare_scenarios(
+        self,
+        db: Session,
+        user_id: int,
+        base_time_minutes: Optional[float],
+        base_distance_km: Optional[float],
+        target_distance_km: float,
+    ) -> Dict[str, Any]:
+        """
+        Predict the best, realistic and worst case (SCENARIOS) in one grid pass.
+        
+        Scenario i sits at index i of every condition axis, so its time is
+        the grid cell [0][i][i][i][i].
+        
+        Returns:
+            Dict with each scenario's time and conditions, the range between
+            best and worst case and the average confidence
+        """
+        scenarios = list(self.SCENARIOS.items())
+        grid = self.predict_grid(
+            db=db,
+            user_id=user_id,
+            base_time_minutes=base_time_minutes,
+            base_distance_km=base_distance_km,
+            distances_km=[target_distance_km],
+            temperatures_c=[conditions["temp_c"] for _, conditions in scenarios],
+            humidities_pct=[conditions["humidity_pct"] for _, conditions in scenarios],
+            altitudes_m=[conditions["altitude_m"] for _, conditions in scenarios],
+            terrains=[conditions["terrain"] for _, conditions in scenarios],
+        )
+        minutes = [grid["minutes"][0][i][i][i][i] for i in range(len(scenarios))]
+        confidence = [grid["confidence"][0][i][i][i][i] for i in range(len(scenarios))]
+        best, realistic, worst = minutes
+        
+        return {
+            "scenarios": {
+                name: {
+                    "prediction_minutes": scenario_minutes,
+                    "formatted_time": self._format_time(scenario_minutes),
+                    "conditions": {
+                        "weather": {
+                            "temp_c": conditions["temp_c"],
+                            "humidity_pct": conditions["humidity_pct"],
+                        },
+                        "terrain": conditions["terrain"].value,
+                        "altitude_m": conditions["altitude_m"],
+                    },
+                }
+                for (name, conditions), scenario_minutes in zip(scenarios, minutes)
+            },
+            "range": {
+                "min_minutes": best,
+                "max_minutes": worst,
+                "difference_minutes": round(worst - best, 2),
+                "time_variance_percentage": round((worst - best) / realistic * 100, 1),
+            },
+            "average_confidence": round(sum(confidence) / len(confidence), 1),
+            "base_performance": grid["base_performance"],
+        }
+    
+    def _base_performance(
+        self,
+        db: Session,
+        user_id: int,
+        base_distance_km: Optional[float],
+        base_time_minutes: Optional[float],
+    ) -> Tuple[float, float, str]:
+        """Provided base race, or the best recent effort when either value is missing."""
+        if base_time_minutes is not None and base_distance_km is not None:
+            return base_distance_km, base_time_minutes, "provided"
+        best = race_predictor_service.best_performance(db, user_id)
+        if not best:
+            raise ValueError(
+                "No recent performances; provide base_distance_km and base_time_minutes"
+            )
+        return best[0] / 1000, best[1], "best_recent_effort"
+    
     def _calculate_weather_factor(
         self,
         weather: Optional[Dict[str, Any]]
@@ -163,38 +373,52 @@ class RacePredictionEnhancedService:
         if not weather:
             return 1.0  # Neutral if no data
         
-        factor = 1.0
+        return float(self._weather_factors(
+            weather.get("temp_c", 12.5),  # Assume neutral
+            weather.get("humidity_pct", 50),  # Assume neutral
+            weather.get("wind_kmh", 0),
+            weather.get("condition"),
+        ))
+    
+    def _weather_factors(
+        self,
+        temp_c: Any,
+        humidity_pct: Any,
+        wind_kmh: Any,
+        condition: Optional[str],
+    ) -> np.ndarray:
+        """Weather impact for broadcastable arrays of temperature, humidity and wind."""
+        temp = np.asarray(temp_c, dtype=float)
+        humidity = np.asarray(humidity_pct, dtype=float)
+        wind = np.asarray(wind_kmh, dtype=float)
         
         # Temperature adjustment
-        temp = weather.get("temp_c", 12.5)  # Assume neutral
-        if temp < self.TEMP_OPTIMAL_MIN:
+        factor = np.where(
+            temp < self.TEMP_OPTIMAL_MIN,
             # Too cold: 1% slower per 2°C below optimal
-            factor *= (1 + (self.TEMP_OPTIMAL_MIN - temp) * 0.005)
-        elif temp > self.TEMP_OPTIMAL_MAX:
+            1 + (self.TEMP_OPTIMAL_MIN - temp) * 0.005,
             # Too hot: 2% slower per °C above optimal
-            factor *= (1 + (temp - self.TEMP_OPTIMAL_MAX) * 0.02)
+            np.where(temp > self.TEMP_OPTIMAL_MAX, 1 + (temp - self.TEMP_OPTIMAL_MAX) * 0.02, 1.0),
+        )
         
-        # Humidity adjustment
-        humidity = weather.get("humidity_pct", 50)  # Assume neutral
-        if humidity < self.HUMIDITY_OPTIMAL_MIN:
-            # Too dry: minimal impact
-            factor *= 1.005
-        elif humidity > self.HUMIDITY_OPTIMAL_MAX:
-            # Too humid: increases effort
-            factor *= (1 + (humidity - self.HUMIDITY_OPTIMAL_MAX) * 0.005)
+        # Humidity adjustment: too dry has minimal impact, too humid increases effort
+        factor = factor * np.where(
+            humidity < self.HUMIDITY_OPTIMAL_MIN,
+            1.005,
+            np.where(
+                humidity > self.HUMIDITY_OPTIMAL_MAX,
+                1 + (humidity - self.HUMIDITY_OPTIMAL_MAX) * 0.005,
+                1.0,
+            ),
+        )
         
         # Wind adjustment (assume headwind)
-        wind = weather.get("wind_kmh", 0)
-        if wind > self.WIND_THRESHOLD:
-            # Significant headwind impact
-            # Approximately 1% slower per km/h above threshold
-            factor *= (1 + (wind - self.WIND_THRESHOLD) * 0.01)
+        # Approximately 1% slower per km/h above threshold
+        factor = factor * np.where(wind > self.WIND_THRESHOLD, 1 + (wind - self.WIND_THRESHOLD) * 0.01, 1.0)
         
         # Condition override
-        condition = weather.get("condition")
         if condition and condition in [c.value for c in WeatherCondition]:
-            condition_enum = WeatherCondition(condition)
-            factor *= self.WEATHER_ADJUSTMENTS[condition_enum]
+            factor = factor * self.WEATHER_ADJUSTMENTS[WeatherCondition(condition)]
         
         return factor
     
@@ -202,6 +426,9 @@ class RacePredictionEnhancedService:
         """Calculate terrain impact on performance."""
         return self.TERRAIN_ADJUSTMENTS.get(terrain, 1.0)
     
+    def _terrain_factors(self, terrains: Sequence[TerrainType]) -> np.ndarray:
+        return np.array([self._calculate_terrain_factor(TerrainType(t)) for t in terrains], dtype=float)
+    
     def _calculate_altitude_factor(self, altitude_m: int) -> float:
         """
         Calculate altitude impact on performance.
@@ -209,14 +436,14 @@ class RacePredictionEnhancedService:
         Performance decreases significantly above 1500m.
         Formula: impact ≈ (altitude - threshold) * 0.0001 + 1
         """
-        if altitude_m <= self.ALTITUDE_THRESHOLD:
-            return 1.0  # No impact below threshold
-        
+        return float(self._altitude_factors(altitude_m))
+    
+    def _altitude_factors(self, altitude_m: Any) -> np.ndarray:
+        """Altitude impact for an array of altitudes (no impact below threshold, capped at 15%)."""
+        altitude = np.asarray(altitude_m, dtype=float)
         # Linear approximation for altitude impact
-        excess_altitude = altitude_m - self.ALTITUDE_THRESHOLD
-        factor = 1 + (excess_altitude * 0.0001)
-        
-        return min(factor, 1.15)  # Cap at 15% slower
+        excess_altitude = np.maximum(altitude - self.ALTITUDE_THRESHOLD, 0)
+        return np.minimum(1 + excess_altitude * 0.0001, 1.15)
     
     def _riegel_prediction(
         self,
@@ -241,9 +468,9 @@ class RacePredictionEnhancedService:
         weather_factor: float,
         terrain_factor: float,
         altitude_factor: float,
-    ) -> float:
+    ) -> Any:
         """
-        Calculate confidence score (0-100).
+        Calculate confidence score (0-100), elementwise for arrays.
         
         Higher when:
         - Base and target distances are closer
@@ -251,20 +478,21 @@ class RacePredictionEnhancedService:
         - Environmental factors are optimal
         """
         # Distance similarity confidence (0-40 points)
-        distance_ratio = target_distance_km / base_distance_km
-        if 0.8 <= distance_ratio <= 1.2:
-            distance_confidence = 40
-        else:
-            distance_confidence = max(0, 40 - (abs(distance_ratio - 1) * 20))
+        distance_ratio = np.asarray(target_distance_km, dtype=float) / base_distance_km
+        distance_confidence = np.where(
+            (distance_ratio >= 0.8) & (distance_ratio <= 1.2),
+            40,
+            np.maximum(0, 40 - (np.abs(distance_ratio - 1) * 20)),
+        )
         
         # Conditions confidence (0-60 points)
         # Optimal conditions = high confidence
-        weather_confidence = (1 - min(abs(weather_factor - 1), 0.1) / 0.1) * 20
-        terrain_confidence = (1 - min(abs(terrain_factor - 1), 0.1) / 0.1) * 20
-        altitude_confidence = (1 - min(abs(altitude_factor - 1), 0.1) / 0.1) * 20
+        weather_confidence = (1 - np.minimum(np.abs(np.asarray(weather_factor) - 1), 0.1) / 0.1) * 20
+        terrain_confidence = (1 - np.minimum(np.abs(np.asarray(terrain_factor) - 1), 0.1) / 0.1) * 20
+        altitude_confidence = (1 - np.minimum(np.abs(np.asarray(altitude_factor) - 1), 0.1) / 0.1) * 20
         
         total = distance_confidence + weather_confidence + terrain_confidence + altitude_confidence
-        return min(total, 100)
+        return np.minimum(total, 100)
     
     def _confidence_level(self, confidence: float) -> str:
         """Convert confidence score to level."""
@@ -1,14 +1,93 @@
 """
 Race Time Predictor
 Predicts race times based on recent training and race results
-Uses Riegel formula, Jack Daniels VDOT, and AI analysis
+Uses Jack Daniels VDOT and AI analysis
+Base performances come from the best-effort index (best_effort_service)
+
+VDOT from a performance is closed form; the inverse (equivalent race time
+for a VDOT) needs a root search, so it is tabulated once per standard
+distance on a 0.1 VDOT grid and read by interpolation. Formulas take numpy
+arrays, so many VDOTs / distances are evaluated in one pass. Every
+prediction (race times, /vdot equivalent times, batch) reads the same
+tables, so one VDOT gives the same times everywhere.
+
+A user's best recent performance is cached per process (LRU, under a lock),
+keyed by the day (the RECENT_DAYS window) and a signature of the user's
+running workouts (best_effort_service.run_filter, the sports the effort
+index covers): count, newest id and newest created_at, which change on
+every insert or delete (and when a deleted id is reused) but not on profile
+edits.
 """
-from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime, timedelta
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-import math
+
+import numpy as np
 
 from .. import models
+from .best_effort_service import best_effort_service, run_filter
+
+
+# VDOT range (predictions are clamped to it) and lookup table resolution
+VDOT_MIN = 30.0
+VDOT_MAX = 85.0
+VDOT_STEP = 0.1
+
+# Training zones: (name, effort, fraction of VDOT velocity, purpose)
+TRAINING_ZONES = (
+    ("Easy", "60-70%", 0.65, "Recuperación, rodajes suaves"),
+    ("Marathon", "75-80%", 0.78, "Ritmo de maratón, rodajes largos"),
+    ("Threshold", "85-90%", 0.88, "Tempo runs, umbral anaeróbico"),
+    ("Interval", "95-100%", 0.98, "Series, VO2max"),
+    ("Repetition", "105-110%", 1.08, "Repeticiones cortas, velocidad"),
+)
+
+# Users whose best performance is kept in memory
+BEST_PERFORMANCE_CACHE_SIZE = 1024
+
+
+def vdot_values(distance_km: Any, time_minutes: Any) -> np.ndarray:
+    """Unclamped Daniels VDOT for arrays of performances."""
+    distance_km = np.asarray(distance_km, dtype=float)
+    time_minutes = np.asarray(time_minutes, dtype=float)
+    velocity_m_min = distance_km * 1000 / time_minutes
+    
+    # Oxygen cost estimation
+    percent_vo2max = (
+        0.8
+        + 0.1894393 * np.exp(-0.012778 * time_minutes)
+        + 0.2989558 * np.exp(-0.1932605 * time_minutes)
+    )
+    
+    # VO2 calculation
+    vo2 = -4.60 + 0.182258 * velocity_m_min + 0.000104 * velocity_m_min ** 2
+    return vo2 / percent_vo2max
+
+
+def vdot_velocity(vdot: Any) -> np.ndarray:
+    """Velocity at VDOT (m/min), base of the training paces."""
+    vdot = np.asarray(vdot, dtype=float)
+    return 29.54 + 5.000663 * vdot - 0.007546 * vdot ** 2
+
+
+def equivalent_times(vdots: np.ndarray, distance_km: float, iterations: int = 50) -> np.ndarray:
+    """
+    Race time (minutes) at which a distance yields each VDOT.
+    
+    VDOT decreases monotonically with time over race durations, so a
+    vectorized bisection solves all VDOTs at once.
+    """
+    vdots = np.asarray(vdots, dtype=float)
+    low = np.full(vdots.shape, distance_km * 1.0)  # 60 km/h
+    high = np.full(vdots.shape, distance_km * 20.0)  # 3 km/h
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        too_fast = vdot_values(distance_km, middle) > vdots
+        low = np.where(too_fast, middle, low)
+        high = np.where(too_fast, high, middle)
+    return (low + high) / 2
 
 
 class RacePredictorService:
@@ -23,14 +102,25 @@ class RacePredictorService:
         "Marathon": 42195
     }
     
-    # Riegel formula exponent (1.06 is standard)
-    FATIGUE_FACTOR = 1.06
+    # Window for "recent" performances
+    RECENT_DAYS = 90
+    
+    # Shortest indexed effort used as a prediction base (meters)
+    MIN_BASE_DISTANCE = 5000
+    
+    def __init__(self):
+        # VDOT grid and equivalent times per RACE_DISTANCES column, built on first use
+        self._vdot_grid: Optional[np.ndarray] = None
+        self._time_table: Optional[np.ndarray] = None
+        # user_id -> ((workout signature, day), best performance), oldest used first
+        self._best_cache: Dict[int, Tuple[Tuple[Any, date], Any]] = {}
+        self._best_lock = threading.Lock()
     
     def predict_race_times(
         self,
         db: Session,
         user_id: int,
-        base_race: Optional[Tuple[float, float]] = None  # (distance_km, time_minutes)
+        base_race: Optional[Tuple[float, float]] = None  # (distance_m, time_minutes)
     ) -> Dict[str, Any]:
         """
         Predict race times for standard distances.
@@ -38,14 +128,18 @@ class RacePredictorService:
         Args:
             db: Database session
             user_id: User ID
-            base_race: Optional tuple of (distance_km, time_minutes) for base calculation
+            base_race: Optional tuple of (distance_meters, time_minutes) for base calculation
             
         Returns:
             Dict with predictions for all distances
         """
+        base_date = None
+        
         # If no base race provided, find best recent performance
         if not base_race:
-            base_race = self._find_best_performance(db, user_id)
+            best = self.best_performance(db, user_id)
+            if best:
+                base_race, base_date = best[:2], best[2]
         
         if not base_race:
             raise ValueError("No training data available for predictions")
@@ -55,20 +149,10 @@ class RacePredictorService:
         # Calculate VDOT
         vdot = self._calculate_vdot(base_distance_m / 1000, base_time_min)
         
-        # Predict all distances
+        # Equivalent times of the VDOT, from the same tables as /vdot and /batch
         predictions = {}
         for race_name, distance_m in self.RACE_DISTANCES.items():
-            # Riegel formula
-            predicted_time = self._riegel_prediction(
-                base_distance_m, base_time_min, distance_m
-            )
-            
-            # VDOT-based prediction
-            vdot_time = self._vdot_prediction(vdot, distance_m / 1000)
-            
-            # Average both methods
-            final_time = (predicted_time + vdot_time) / 2
-            
+            final_time = self.equivalent_time(vdot, race_name)
             predictions[race_name] = {
                 "distance_km": distance_m / 1000,
                 "predicted_time_minutes": round(final_time, 2),
@@ -84,29 +168,149 @@ class RacePredictorService:
                 "distance_km": base_distance_m / 1000,
                 "time_minutes": base_time_min,
                 "time_formatted": self._format_time(base_time_min),
-                "pace": self._format_pace(base_time_min / (base_distance_m / 1000))
+                "pace": self._format_pace(base_time_min / (base_distance_m / 1000)),
+                "date": base_date.date().isoformat() if base_date else ""
             },
+            "training_paces": self.format_training_paces(vdot),
             "generated_at": datetime.utcnow().isoformat()
         }
     
+    def get_current_vdot(self, db: Session, user_id: int) -> Optional[float]:
+        """
+        VDOT from the best recent performance, or None without data.
+        """
+        best = self.best_performance(db, user_id)
+        if not best:
+            return None
+        distance_m, time_min, _ = best
+        return round(self._calculate_vdot(distance_m / 1000, time_min), 1)
+    
+    def best_performance(
+        self,
+        db: Session,
+        user_id: int
+    ) -> Optional[Tuple[float, float, Optional[datetime]]]:
+        """
+        _find_best_performance(), cached until the user's running workouts
+        change or the day rolls over.
+        """
+        signature = tuple(
+            db.query(
+                func.count(models.Workout.id), func.max(models.Workout.id), func.max(models.Workout.created_at)
+            ).filter(
+                models.Workout.user_id == user_id,
+                run_filter(),
+            ).one()
+        )
+        key = (signature, date.today())
+        with self._best_lock:
+            cached = self._best_cache.pop(user_id, None)
+            if cached is not None and cached[0] == key:
+                self._best_cache[user_id] = cached  # Most recently used
+                return cached[1]
+        
+        best = self._find_best_performance(db, user_id)
+        with self._best_lock:
+            self._best_cache.pop(user_id, None)
+            while len(self._best_cache) >= BEST_PERFORMANCE_CACHE_SIZE:
+                self._best_cache.pop(next(iter(self._best_cache)))  # Least recently used
+            self._best_cache[user_id] = (key, best)
+        return best
+    
+    def predict_for_vdots(self, vdots: Sequence[float]) -> Dict[str, Any]:
+        """
+        Equivalent race times and training paces for many VDOTs at once.
+        
+        Times come from the precomputed VDOT -> time tables (interpolated);
+        VDOTs are clamped to [VDOT_MIN, VDOT_MAX] like _calculate_vdot.
+        
+        Returns:
+            Dict with the VDOTs, times in minutes per distance and training
+            paces in min/km per zone, each a list aligned with the VDOTs
+        """
+        vdots = np.clip(np.asarray(vdots, dtype=float), VDOT_MIN, VDOT_MAX)
+        grid, table = self._tables()
+        times = np.column_stack([np.interp(vdots, grid, column) for column in table.T]) if len(vdots) else np.empty((0, len(self.RACE_DISTANCES)))
+        paces = 1000 / (vdot_velocity(vdots)[:, None] * np.array([zone[2] for zone in TRAINING_ZONES]))
+        
+        return {
+            "vdots": np.round(vdots, 1).tolist(),
+            "times_minutes": {
+                name: np.round(times[:, i], 2).tolist() for i, name in enumerate(self.RACE_DISTANCES)
+            },
+            "training_paces_min_km": {
+                zone[0].lower(): np.round(paces[:, i], 3).tolist() for i, zone in enumerate(TRAINING_ZONES)
+            },
+        }
+    
+    def equivalent_time(self, vdot: float, race_name: str) -> float:
+        """Equivalent time (minutes) of a VDOT over a standard distance."""
+        grid, table = self._tables()
+        column = list(self.RACE_DISTANCES).index(race_name)
+        return float(np.interp(min(max(vdot, VDOT_MIN), VDOT_MAX), grid, table[:, column]))
+    
+    def _tables(self) -> Tuple[np.ndarray, np.ndarray]:
+        """VDOT grid and (grid x RACE_DISTANCES) equivalent-time table."""
+        if self._time_table is None:
+            grid = np.round(np.arange(VDOT_MIN, VDOT_MAX + VDOT_STEP / 2, VDOT_STEP), 1)
+            self._time_table = np.column_stack([
+                equivalent_times(grid, distance_m / 1000) for distance_m in self.RACE_DISTANCES.values()
+            ])
+            self._vdot_grid = grid
+        return self._vdot_grid, self._time_table
+    
     def _find_best_performance(
         self,
         db: Session,
         user_id: int
-    ) -> Optional[Tuple[float, float]]:
+    ) -> Optional[Tuple[float, float, Optional[datetime]]]:
         """
         Find best recent performance for predictions.
         
+        Uses the indexed best efforts of the last RECENT_DAYS (the one with
+        the highest VDOT, preferring >= 5K), timed on their flat-equivalent
+        (grade-adjusted) duration; users without streams fall back to
+        whole-workout averages.
+        
         Returns:
-            Tuple of (distance_meters, time_minutes) or None
+            Tuple of (distance_meters, time_minutes, date) or None
+        """
+        three_months_ago = datetime.utcnow() - timedelta(days=self.RECENT_DAYS)
+        
+        efforts = best_effort_service.personal_bests(
+            db, user_id, since=three_months_ago, graded=True
+        )
+        candidates = [
+            e for e in efforts if e.distance_meters >= self.MIN_BASE_DISTANCE
+        ] or [e for e in efforts if e.distance_meters >= 1000]
+        if candidates:
+            def flat_minutes(effort: models.BestEffort) -> float:
+                return (effort.graded_elapsed_seconds or effort.elapsed_seconds) / 60
+            
+            best = max(
+                candidates,
+                key=lambda e: self._calculate_vdot(e.distance_meters / 1000, flat_minutes(e))
+            )
+            return (best.distance_meters, flat_minutes(best), best.achieved_at)
+        
+        return self._find_best_workout(db, user_id, three_months_ago)
+    
+    def _find_best_workout(
+        self,
+        db: Session,
+        user_id: int,
+        since: datetime
+    ) -> Optional[Tuple[float, float, Optional[datetime]]]:
         """
-        # Look for workouts in last 3 months
-        three_months_ago = datetime.utcnow() - timedelta(days=90)
+        Fallback for workouts without streams: fastest whole workout > 5km.
         
+        Returns:
+            Tuple of (distance_meters, time_minutes, date) or None
+        """
         workouts = db.query(models.Workout).filter(
             models.Workout.user_id == user_id,
-            models.Workout.sport_type == 'running',
-            models.Workout.start_time >= three_months_ago,
+            run_filter(),
+            models.Workout.start_time >= since,
             models.Workout.distance_meters >= 3000,  # At least 3km
             models.Workout.avg_pace.isnot(None)
         ).order_by(models.Workout.start_time.desc()).limit(50).all()
@@ -122,9 +326,9 @@ class RacePredictorService:
             if workout.distance_meters < 5000:
                 continue
             
-            # Calculate average speed (m/s)
+            # Calculate average speed (m/s), grade-adjusted when available
             if workout.duration_seconds > 0:
-                speed = workout.distance_meters / workout.duration_seconds
+                speed = self._flat_distance(workout) / workout.duration_seconds
                 
                 if speed > best_speed:
                     best_speed = speed
@@ -133,27 +337,18 @@ class RacePredictorService:
         if best_workout:
             return (
                 best_workout.distance_meters,
-                best_workout.duration_seconds / 60
+                best_workout.distance_meters / best_speed / 60,
+                best_workout.start_time
             )
         
         # Fallback: use most recent long run
         longest = max(workouts, key=lambda w: w.distance_meters)
-        return (longest.distance_meters, longest.duration_seconds / 60)
+        return (longest.distance_meters, longest.duration_seconds / 60, longest.start_time)
     
-    def _riegel_prediction(
-        self,
-        base_distance_m: float,
-        base_time_min: float,
-        target_distance_m: float
-    ) -> float:
-        """
-        Riegel formula: T2 = T1 * (D2/D1)^1.06
-        
-        Returns:
-            Predicted time in minutes
-        """
-        distance_ratio = target_distance_m / base_distance_m
-        return base_time_min * (distance_ratio ** self.FATIGUE_FACTOR)
+    @staticmethod
+    def _flat_distance(workout: models.Workout) -> float:
+        """Graded (flat-equivalent) distance if computed, else raw distance."""
+        return workout.graded_distance_meters or workout.distance_meters
     
     def _calculate_vdot(self, distance_km: float, time_minutes: float) -> float:
         """
@@ -161,38 +356,8 @@ class RacePredictorService:
         
         Simplified formula based on race performance.
         """
-        velocity_m_min = (distance_km * 1000) / time_minutes
-        
-        # Oxygen cost estimation
-        percent_vo2max = 0.8 + 0.1894393 * math.exp(-0.012778 * time_minutes) + \
-                         0.2989558 * math.exp(-0.1932605 * time_minutes)
-        
-        # VO2 calculation
-        vo2 = -4.60 + 0.182258 * velocity_m_min + 0.000104 * velocity_m_min ** 2
-        
-        # VDOT
-        vdot = vo2 / percent_vo2max
-        
-        return max(30, min(85, vdot))  # Clamp to reasonable range
-    
-    def _vdot_prediction(self, vdot: float, distance_km: float) -> float:
-        """
-        Predict race time from VDOT for given distance.
-        
-        Returns:
-            Time in minutes
-        """
-        # Training velocity at race pace
-        velocity_m_min = 29.54 + 5.000663 * vdot - 0.007546 * vdot ** 2
-        
-        # Adjust for distance (shorter = faster relative pace)
-        if distance_km <= 5:
-            velocity_m_min *= 1.03
-        elif distance_km >= 21:
-            velocity_m_min *= 0.98
-        
-        time_minutes = (distance_km * 1000) / velocity_m_min
-        return time_minutes
+        vdot = float(vdot_values(distance_km, time_minutes))
+        return max(VDOT_MIN, min(VDOT_MAX, vdot))  # Clamp to reasonable range
     
     def _calculate_confidence(
         self,
@@ -245,34 +410,15 @@ class RacePredictorService:
             Dict with pace zones for different training types
         """
         # Base velocity
-        base_velocity = 29.54 + 5.000663 * vdot - 0.007546 * vdot ** 2  # m/min
+        base_velocity = float(vdot_velocity(vdot))  # m/min
         
         zones = {
-            "Easy": {
-                "percent_effort": "60-70%",
-                "pace_min_km": 1000 / (base_velocity * 0.65),
-                "purpose": "Recuperación, rodajes suaves"
-            },
-            "Marathon": {
-                "percent_effort": "75-80%",
-                "pace_min_km": 1000 / (base_velocity * 0.78),
-                "purpose": "Ritmo de maratón, rodajes largos"
-            },
-            "Threshold": {
-                "percent_effort": "85-90%",
-                "pace_min_km": 1000 / (base_velocity * 0.88),
-                "purpose": "Tempo runs, umbral anaeróbico"
-            },
-            "Interval": {
-                "percent_effort": "95-100%",
-                "pace_min_km": 1000 / (base_velocity * 0.98),
-                "purpose": "Series, VO2max"
-            },
-            "Repetition": {
-                "percent_effort": "105-110%",
-                "pace_min_km": 1000 / (base_velocity * 1.08),
-                "purpose": "Repeticiones cortas, velocidad"
+            name: {
+                "percent_effort": effort,
+                "pace_min_km": 1000 / (base_velocity * fraction),
+                "purpose": purpose
             }
+            for name, effort, fraction, purpose in TRAINING_ZONES
         }
         
         # Format paces
@@ -281,6 +427,18 @@ class RacePredictorService:
             zone_data['pace_formatted'] = self._format_pace(pace)
         
         return zones
+    
+    def format_training_paces(self, vdot: float) -> Dict[str, str]:
+        """
+        Training paces as display strings keyed by lowercase zone name.
+        
+        Returns:
+            Dict like {"easy": "6:00/km", "marathon": "5:21/km", ...}
+        """
+        return {
+            zone_name.lower(): zone_data["pace_formatted"]
+            for zone_name, zone_data in self.get_training_paces(vdot).items()
+        }
 
 
 # Singleton
@@ -0,0 +1,318 @@
+"""
+retrieval_service.py - Local BM25 retrieval over chat history and workouts
+
+Grounds coach answers about the past ("how did my March long runs go?")
+without sending the whole history: past chat messages and one summary
+document per workout are indexed per user, and only the best matches for
+the new message go into the prompt (coach_context_service).
+
+- Tokens are accent-folded, lowercased words minus stopwords, with a plural
+  "s" trimmed; workout documents add month names, sport synonyms and a
+  long-run tag so natural questions match numeric rows
+- Terms are hashed into N_FEATURES buckets (no vocabulary is stored) and
+  scored with BM25 over per-bucket posting lists
+- Indexes live in memory and are incremental like similar_workout_service:
+  each search appends messages and workouts newer than the last ones seen
+  and rebuilds only when rows were deleted (e.g. chat history cleared)
+- Each user's index has its own lock, held only to append or score; the DB
+  reads happen outside any lock, so one user's rebuild never blocks
+  another's chat. At most MAX_CACHED_USERS indexes are kept (LRU)
+
+Everything runs in-process; no embedding API is called.
+"""
+import logging
+import math
+import re
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+# Hash buckets for terms (power of two)
+N_FEATURES = 2 ** 20
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Characters of a chat message shown in the prompt
+SNIPPET_CHARS = 220
+
+# Workouts at least this long are tagged as long runs (meters)
+LONG_RUN_METERS = 15000
+
+# User indexes kept in memory; the least recently searched is dropped first
+MAX_CACHED_USERS = 256
+
+MONTHS = (
+    ("enero", "january"), ("febrero", "february"), ("marzo", "march"),
+    ("abril", "april"), ("mayo", "may"), ("junio", "june"),
+    ("julio", "july"), ("agosto", "august"), ("septiembre", "september"),
+    ("octubre", "october"), ("noviembre", "november"), ("diciembre", "december"),
+)
+
+SPORT_TERMS = {
+    "running": "running run correr carrera rodaje",
+    "cycling": "cycling bike ride bici ciclismo",
+    "swimming": "swimming swim natacion nadar",
+    "walking": "walking walk caminar caminata",
+}
+
+STOPWORDS = frozenset("""
+a al algo como con cual cuando de del el ella en era es esta este esto fue ha
+han hay la las le les lo los me mi mis muy mas no nos o para pero por que se
+si sin sobre su sus te tu un una uno y ya yo
+an and are as at be but by did do does for from go had has have how i in is it
+its me my of on or so that the this to was were what when which with you your
+""".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent-folded, lowercased word tokens without stopwords."""
+    folded = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+    tokens = []
+    for word in _WORD_RE.findall(folded):
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def hash_token(token: str) -> int:
+    """Hash bucket of a token (stable across processes, unlike hash())."""
+    return zlib.crc32(token.encode()) & (N_FEATURES - 1)
+
+
+def workout_document(row) -> Tuple[str, str]:
+    """
+    Index text and prompt line of a workout.
+
+    Returns:
+        (text to index, one-line summary for the prompt)
+    """
+    km = (row.distance_meters or 0) / 1000
+    line = f"- {row.start_time:%d/%m/%Y} {row.sport_type} {km:.1f}km {(row.duration_seconds or 0) // 60}min"
+    if row.avg_pace:
+        line += f" {int(row.avg_pace // 60)}:{int(row.avg_pace % 60):02d}/km"
+    if row.avg_heart_rate:
+        line += f" FC{row.avg_heart_rate}"
+
+    terms = [line, *MONTHS[row.start_time.month - 1], str(row.start_time.year)]
+    terms.append(SPORT_TERMS.get(row.sport_type, row.sport_type))
+    if (row.distance_meters or 0) >= LONG_RUN_METERS:
+        terms.append("long largo tirada larga")
+    return " ".join(terms), line
+
+
+def message_document(row) -> Tuple[str, str]:
+    """Index text and prompt line of a chat message."""
+    who = "Atleta" if row.role == "user" else "Coach"
+    flat = re.sub(r"\s+", " ", row.content).strip()
+    if len(flat) > SNIPPET_CHARS:
+        flat = flat[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+    return row.content, f"- {row.created_at:%d/%m/%Y} {who}: {flat}"
+
+
+class Hit(NamedTuple):
+    """A retrieved document."""
+
+    kind: str  # "message" or "workout"
+    ref_id: int
+    score: float
+    line: str
+
+
+@dataclass
+class _UserIndex:
+    """Posting lists and documents of one user."""
+
+    postings: Dict[int, Tuple[List[int], List[int]]] = field(default_factory=dict)
+    lengths: List[int] = field(default_factory=list)
+    docs: List[Tuple[str, int]] = field(default_factory=list)
+    lines: List[str] = field(default_factory=list)
+    max_ids: Dict[str, int] = field(default_factory=lambda: {"message": 0, "workout": 0})
+    counts: Dict[str, int] = field(default_factory=lambda: {"message": 0, "workout": 0})
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, kind: str, ref_id: int, text: str, line: str) -> None:
+        doc = len(self.docs)
+        frequencies: Dict[int, int] = {}
+        tokens = tokenize(text)
+        for token in tokens:
+            feature = hash_token(token)
+            frequencies[feature] = frequencies.get(feature, 0) + 1
+        for feature, tf in frequencies.items():
+            docs, tfs = self.postings.setdefault(feature, ([], []))
+            docs.append(doc)
+            tfs.append(tf)
+        self.lengths.append(len(tokens))
+        self.docs.append((kind, ref_id))
+        self.lines.append(line)
+        self.max_ids[kind] = max(self.max_ids[kind], ref_id)
+        self.counts[kind] += 1
+
+
+_MESSAGE_COLUMNS = (
+    models.ChatMessage.id,
+    models.ChatMessage.role,
+    models.ChatMessage.content,
+    models.ChatMessage.created_at,
+)
+
+_WORKOUT_COLUMNS = (
+    models.Workout.id,
+    models.Workout.start_time,
+    models.Workout.sport_type,
+    models.Workout.distance_meters,
+    models.Workout.duration_seconds,
+    models.Workout.avg_pace,
+    models.Workout.avg_heart_rate,
+)
+
+
+class RetrievalService:
+    """Per-user BM25 search over chat messages and workout summaries."""
+
+    def __init__(self):
+        self._indexes: "OrderedDict[int, _UserIndex]" = OrderedDict()
+        self._lock = threading.Lock()  # guards _indexes only
+
+    def search(
+        self,
+        db: Session,
+        user_id: int,
+        query: str,
+        k: int = 5,
+        exclude_message_ids: Iterable[int] = (),
+    ) -> List[Hit]:
+        """
+        The k documents that best match a query, best first.
+
+        Args:
+            db: Database session
+            user_id: Owner of the history
+            query: Free text (usually the new chat message)
+            k: Maximum number of hits
+            exclude_message_ids: Messages already in the prompt
+
+        Returns:
+            Hits with a positive BM25 score
+        """
+        features = {hash_token(token) for token in tokenize(query)}
+        if not features:
+            return []
+        index = self._sync(db, user_id)
+        # Documents are only appended, so rows below n_docs are stable
+        with index.lock:
+            n_docs = len(index.docs)
+            if n_docs == 0:
+                return []
+            lengths = np.array(index.lengths, dtype=float)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1.0))
+            scores = np.zeros(n_docs)
+            for feature in features:
+                posting = index.postings.get(feature)
+                if posting is None:
+                    continue
+                docs = np.array(posting[0])
+                tfs = np.array(posting[1], dtype=float)
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norm[docs])
+
+        excluded: Set[int] = set(exclude_message_ids)
+        hits = []
+        for doc in np.argsort(-scores, kind="stable"):
+            if scores[doc] <= 0 or len(hits) == k:
+                break
+            kind, ref_id = index.docs[doc]
+            if kind == "message" and ref_id in excluded:
+                continue
+            hits.append(Hit(kind, ref_id, round(float(scores[doc]), 3), index.lines[doc]))
+        return hits
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user's index (rebuilt on the next search)."""
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+    def _sync(self, db: Session, user_id: int) -> _UserIndex:
+        """Return the user's index after appending rows newer than it has seen."""
+        sources = {
+            "message": (models.ChatMessage, _MESSAGE_COLUMNS, message_document),
+            "workout": (models.Workout, _WORKOUT_COLUMNS, workout_document),
+        }
+        index = self._cached(user_id)
+        with index.lock:
+            seen = dict(index.max_ids)
+            counts = dict(index.counts)
+
+        totals = {}
+        for kind, (model, _, _) in sources.items():
+            total, newer = db.query(
+                func.count(model.id), func.count(model.id).filter(model.id > seen[kind])
+            ).filter(model.user_id == user_id).one()
+            totals[kind] = total
+            if counts[kind] + newer != total:
+                # Rows were deleted since the index was built: start over
+                index = self._replace(user_id)
+                seen = dict(index.max_ids)
+                counts = dict(index.counts)
+
+        new_docs = {
+            kind: [
+                (row.id, *document(row))
+                for row in db.query(*columns)
+                .filter(model.user_id == user_id, model.id > seen[kind])
+                .order_by(model.id)
+            ]
+            for kind, (model, columns, document) in sources.items()
+            if totals[kind] > counts[kind]
+        }
+
+        with index.lock:
+            for kind, docs in new_docs.items():
+                for ref_id, text, line in docs:
+                    # Another request may have appended the same rows meanwhile
+                    if ref_id > index.max_ids[kind]:
+                        index.add(kind, ref_id, text, line)
+        return index
+
+    def _cached(self, user_id: int) -> _UserIndex:
+        """The user's index (created empty if missing), marked recently used."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return self._store(user_id, _UserIndex())
+            self._indexes.move_to_end(user_id)
+            return index
+
+    def _replace(self, user_id: int) -> _UserIndex:
+        """Install an empty index for the user (rebuilt by the caller)."""
+        with self._lock:
+            return self._store(user_id, _UserIndex())
+
+    def _store(self, user_id: int, index: _UserIndex) -> _UserIndex:
+        self._indexes[user_id] = index
+        self._indexes.move_to_end(user_id)
+        while len(self._indexes) > MAX_CACHED_USERS:
+            self._indexes.popitem(last=False)
+        return index
+
+
+# Singleton
+retrieval_service = RetrievalService()
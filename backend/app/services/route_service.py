@@ -0,0 +1,187 @@
+"""
+route_service.py - Repeated-route detection from GPS track fingerprints
+
+A route fingerprint is built at ingest from the track:
+- start_cell: geohash (precision 6, ~1.2 x 0.6 km) of the first GPS fix
+- cells: set of geohash cells (precision 7, ~150 m) visited, sampled every
+  FINGERPRINT_STEP_M along the track so speed and recording rate don't matter
+- distance_meters: route length (device distance when recorded)
+
+Workouts on the same route share a Route row. Matching a new workout is an
+indexed lookup of the user's routes starting in the same or a neighbouring
+start cell with a similar distance, followed by a Jaccard comparison of the
+cell sets of those few candidates, so it does not grow with history size.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.track_service import track_points
+from app.services.workout_stream_service import cumulative_distance
+
+logger = logging.getLogger(__name__)
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Geohash precision of the start cell (candidate lookup key)
+START_PRECISION = 6
+
+# Geohash precision of the visited cells (route shape)
+CELL_PRECISION = 7
+
+# Track sampling step for the visited cells (meters)
+FINGERPRINT_STEP_M = 50.0
+
+# Candidate routes must be within this fraction of the workout's distance
+DISTANCE_TOLERANCE = 0.15
+
+# Minimum cell-set similarity (intersection / union) to be the same route
+MIN_JACCARD = 0.7
+
+# Shorter tracks are not fingerprinted (meters)
+MIN_ROUTE_DISTANCE = 500.0
+
+
+def geohash_encode(lat: np.ndarray, lon: np.ndarray, precision: int) -> List[str]:
+    """
+    Geohashes of many points at once.
+
+    Bits are produced by quantizing lat/lon to their bit depth and
+    interleaving them (longitude first), which is equivalent to the usual
+    bisection loop.
+    """
+    lat = np.atleast_1d(np.asarray(lat, dtype=float))
+    lon = np.atleast_1d(np.asarray(lon, dtype=float))
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+
+    lat_q = np.clip(((lat + 90) / 180 * 2 ** lat_bits).astype(np.int64), 0, 2 ** lat_bits - 1)
+    lon_q = np.clip(((lon + 180) / 360 * 2 ** lon_bits).astype(np.int64), 0, 2 ** lon_bits - 1)
+
+    code = np.zeros(len(lat), dtype=np.int64)
+    for bit in range(total_bits):
+        if bit % 2 == 0:
+            value = (lon_q >> (lon_bits - 1 - bit // 2)) & 1
+        else:
+            value = (lat_q >> (lat_bits - 1 - bit // 2)) & 1
+        code = (code << 1) | value
+
+    chars = (code[:, None] >> (5 * np.arange(precision - 1, -1, -1))) & 0x1F
+    alphabet = np.array(list(GEOHASH_ALPHABET))
+    return ["".join(row) for row in alphabet[chars]]
+
+
+def neighbour_cells(lat: float, lon: float, precision: int) -> List[str]:
+    """The geohash cell containing a point and its 8 neighbours."""
+    total_bits = 5 * precision
+    lat_step = 180 / 2 ** (total_bits // 2)
+    lon_step = 360 / 2 ** ((total_bits + 1) // 2)
+    offsets = np.array([-1, 0, 1])
+    lats = np.repeat(lat + offsets * lat_step, 3)
+    lons = np.tile(lon + offsets * lon_step, 3)
+    return sorted(set(geohash_encode(lats, lons, precision)))
+
+
+def jaccard(a: set, b: set) -> float:
+    """Intersection over union of two sets (0 when both are empty)."""
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+class RouteService:
+    """Fingerprints workouts and groups them into routes."""
+
+    def fingerprint(self, streams: Dict[str, np.ndarray]) -> Optional[Dict[str, Any]]:
+        """
+        Route fingerprint of a workout's GPS streams.
+
+        Returns:
+            Dict with start_cell, cells (sorted list) and distance_meters,
+            or None without a track of at least MIN_ROUTE_DISTANCE
+        """
+        points = track_points(streams)
+        if points is None:
+            return None
+        lat, lon = points
+        distance = cumulative_distance(lat, lon)
+        # Device distance is filtered; summed GPS fixes grow with jitter
+        length = distance[-1]
+        if "distance" in streams and np.isfinite(streams["distance"]).any():
+            length = float(np.nanmax(streams["distance"]))
+        if length < MIN_ROUTE_DISTANCE:
+            return None
+
+        marks = np.arange(0, distance[-1] + FINGERPRINT_STEP_M, FINGERPRINT_STEP_M)
+        sample_lat = np.interp(marks, distance, lat)
+        sample_lon = np.interp(marks, distance, lon)
+        return {
+            "start_cell": geohash_encode(lat[:1], lon[:1], START_PRECISION)[0],
+            "start": (float(lat[0]), float(lon[0])),
+            "cells": sorted(set(geohash_encode(sample_lat, sample_lon, CELL_PRECISION))),
+            "distance_meters": float(length),
+        }
+
+    def match(
+        self, db: Session, user_id: int, fingerprint: Dict[str, Any]
+    ) -> Optional[models.Route]:
+        """Most similar existing route of the user, if any passes MIN_JACCARD."""
+        distance = fingerprint["distance_meters"]
+        candidates = (
+            db.query(models.Route)
+            .filter(
+                models.Route.user_id == user_id,
+                models.Route.start_cell.in_(
+                    neighbour_cells(*fingerprint["start"], START_PRECISION)
+                ),
+                models.Route.distance_meters >= distance * (1 - DISTANCE_TOLERANCE),
+                models.Route.distance_meters <= distance * (1 + DISTANCE_TOLERANCE),
+            )
+            .all()
+        )
+        cells = set(fingerprint["cells"])
+        best, best_score = None, MIN_JACCARD
+        for route in candidates:
+            score = jaccard(cells, set(route.cells))
+            if score >= best_score:
+                best, best_score = route, score
+        return best
+
+    def apply(
+        self, db: Session, workout: models.Workout, streams: Dict[str, np.ndarray]
+    ) -> Optional[models.Route]:
+        """
+        Assign a new workout to a matching route or start a new one.
+        Does not commit.
+        """
+        fingerprint = self.fingerprint(streams)
+        if fingerprint is None:
+            return None
+        route = self.match(db, workout.user_id, fingerprint)
+        if route is None:
+            route = models.Route(
+                user_id=workout.user_id,
+                start_cell=fingerprint["start_cell"],
+                distance_meters=round(fingerprint["distance_meters"], 1),
+                cells=fingerprint["cells"],
+            )
+            db.add(route)
+        workout.route = route
+        return route
+
+    def efforts(self, db: Session, route_id: int) -> List[models.Workout]:
+        """All workouts on a route, oldest first."""
+        return (
+            db.query(models.Workout)
+            .filter(models.Workout.route_id == route_id)
+            .order_by(models.Workout.start_time)
+            .all()
+        )
+
+
+# Singleton
+route_service = RouteService()
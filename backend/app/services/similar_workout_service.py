@@ -0,0 +1,360 @@
+"""
+similar_workout_service.py - Nearest-neighbour index of comparable workouts
+
+Each workout is a feature vector (distance, duration, pace, HR, climbing and
+HR time-in-zone shares) scaled so one unit is a comparable difference in
+every dimension (FEATURE_SCALES). Per user and sport the vectors live in an
+in-memory KD-tree, so "the k most comparable sessions" is a tree descent
+over a handful of leaves instead of a SQL range scan plus Python sorting.
+
+The index is incremental: on each read it inserts workouts newer than the
+last one it has seen (one indexed query) into a small pending buffer that
+is searched alongside the tree, and rebuilds the tree only when the buffer
+grows past a fraction of it or indexed workouts changed. One aggregate query
+per read detects that: the row count must equal the indexed count plus the
+new rows (else workouts were deleted), and the latest created_at among
+indexed ids must be unchanged (else a deleted id was reused by a new row,
+as SQLite does for the highest rowid). This also keeps several API workers
+consistent without any cross-process signalling.
+
+Like retrieval_service, each index has its own lock, held only to append to
+or snapshot its pending buffer; the DB reads and tree builds happen outside
+any lock, so one user's rebuild never blocks another's lookup. At most
+MAX_CACHED_INDEXES (user, sport) indexes are kept (LRU).
+
+Same-route workouts (route_service) get their distance multiplied by
+SAME_ROUTE_FACTOR when ranking.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+# Difference counted as one unit per feature
+FEATURE_SCALES = {
+    "distance_km": 2.0,
+    "duration_min": 10.0,
+    "pace_s_per_km": 15.0,
+    "avg_heart_rate": 5.0,
+    "elevation_gain": 50.0,  # meters
+    "zone_1": 0.2,  # share of HR time in zone
+    "zone_2": 0.2,
+    "zone_3": 0.2,
+    "zone_4": 0.2,
+    "zone_5": 0.2,
+}
+
+# Ranking distance multiplier for workouts on the same route
+SAME_ROUTE_FACTOR = 0.5
+
+# Points per KD-tree leaf (scanned with one vectorized distance computation)
+LEAF_SIZE = 64
+
+# Rebuild the tree when pending inserts exceed this share of indexed points
+REBUILD_FRACTION = 0.25
+
+# (user, sport) indexes kept in memory, least recently used dropped first
+MAX_CACHED_INDEXES = 256
+
+_INDEX_COLUMNS = (
+    models.Workout.id,
+    models.Workout.distance_meters,
+    models.Workout.duration_seconds,
+    models.Workout.avg_heart_rate,
+    models.Workout.smoothed_elevation_gain,
+    models.Workout.elevation_gain,
+    models.Workout.time_in_zones,
+    models.Workout.route_id,
+    models.Workout.created_at,
+)
+
+
+def feature_vector(
+    distance_meters: Optional[float],
+    duration_seconds: Optional[int],
+    avg_heart_rate: Optional[float],
+    elevation_gain: Optional[float],
+    time_in_zones: Optional[dict],
+) -> np.ndarray:
+    """Scaled feature vector of one workout (missing values count as 0)."""
+    distance_km = (distance_meters or 0) / 1000
+    duration_min = (duration_seconds or 0) / 60
+    pace = duration_seconds / distance_km if distance_km > 0 and duration_seconds else 0.0
+
+    shares = [0.0] * 5
+    hr_zones = (time_in_zones or {}).get("heart_rate") or {}
+    total = sum(hr_zones.values())
+    if total > 0:
+        shares = [hr_zones.get(str(zone), 0.0) / total for zone in range(1, 6)]
+
+    raw = [distance_km, duration_min, pace, avg_heart_rate or 0, elevation_gain or 0, *shares]
+    return np.array(raw, dtype=float) / np.array(list(FEATURE_SCALES.values()))
+
+
+class KDTree:
+    """
+    Static KD-tree over a point array.
+
+    Nodes are stored in flat lists; points are reordered so every leaf is a
+    contiguous slice of `points`.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = LEAF_SIZE):
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(points))
+        self.points = np.asarray(points, dtype=float)
+        # Per node: split dim (-1 for leaves), split value, children, slice
+        self.dim: List[int] = []
+        self.value: List[float] = []
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.start: List[int] = []
+        self.end: List[int] = []
+        if len(points):
+            self._build(0, len(points))
+            self.points = self.points[self.order]
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _build(self, start: int, end: int) -> int:
+        node = len(self.dim)
+        self.dim.append(-1)
+        self.value.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.start.append(start)
+        self.end.append(end)
+        if end - start <= self.leaf_size:
+            return node
+
+        idx = self.order[start:end]
+        block = self.points[idx]
+        dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+        mid = (end - start) // 2
+        part = np.argpartition(block[:, dim], mid)
+        self.order[start:end] = idx[part]
+
+        self.dim[node] = dim
+        self.value[node] = float(self.points[self.order[start + mid], dim])
+        self.left[node] = self._build(start, start + mid)
+        self.right[node] = self._build(start + mid, end)
+        return node
+
+    def query(self, point: np.ndarray, k: int) -> List[Tuple[float, int]]:
+        """
+        k nearest points.
+
+        Returns:
+            (squared distance, original row index) pairs, nearest first
+        """
+        if not len(self.points):
+            return []
+        k = min(k, len(self.points))
+        best_d = np.full(k, np.inf)
+        best_i = np.full(k, -1, dtype=np.int64)
+        worst = np.inf
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound >= worst:
+                continue
+            if self.dim[node] < 0:
+                start, end = self.start[node], self.end[node]
+                dists = ((self.points[start:end] - point) ** 2).sum(axis=1)
+                merged_d = np.concatenate((best_d, dists))
+                merged_i = np.concatenate((best_i, np.arange(start, end)))
+                keep = np.argpartition(merged_d, k - 1)[:k]
+                best_d, best_i = merged_d[keep], merged_i[keep]
+                worst = best_d.max()
+                continue
+            diff = point[self.dim[node]] - self.value[node]
+            near, far = (self.left[node], self.right[node]) if diff < 0 else (self.right[node], self.left[node])
+            # Far side first in, so the near side is searched first
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+        ranked = np.argsort(best_d)
+        return [(float(best_d[j]), int(self.order[best_i[j]])) for j in ranked]
+
+
+@dataclass
+class _UserIndex:
+    """Tree plus pending inserts for one (user, sport)."""
+
+    tree: KDTree
+    ids: np.ndarray
+    route_ids: List[Optional[int]]
+    pending_points: List[np.ndarray] = field(default_factory=list)
+    pending_ids: List[int] = field(default_factory=list)
+    pending_routes: List[Optional[int]] = field(default_factory=list)
+    max_id: int = 0
+    max_created_at: Optional[datetime] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def size(self) -> int:
+        return len(self.ids) + len(self.pending_ids)
+
+
+def _row_vector(row) -> np.ndarray:
+    return feature_vector(
+        row.distance_meters,
+        row.duration_seconds,
+        row.avg_heart_rate,
+        row.smoothed_elevation_gain if row.smoothed_elevation_gain is not None else row.elevation_gain,
+        row.time_in_zones,
+    )
+
+
+class SimilarWorkoutService:
+    """Per-user nearest-neighbour lookup of comparable workouts."""
+
+    def __init__(self):
+        self._indexes: "OrderedDict[Tuple[int, str], _UserIndex]" = OrderedDict()
+        self._lock = threading.Lock()  # guards _indexes only
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user's indexes (e.g. after zones changed every workout)."""
+        with self._lock:
+            for key in [key for key in self._indexes if key[0] == user_id]:
+                del self._indexes[key]
+
+    def similar(
+        self, db: Session, workout: models.Workout, k: int = 5
+    ) -> List[Tuple[models.Workout, float]]:
+        """
+        The k workouts most comparable to one workout (same user and sport).
+
+        Returns:
+            (workout, distance) pairs, most similar first; distance is in
+            FEATURE_SCALES units, already discounted for the same route
+        """
+        index = self._sync(db, workout.user_id, workout.sport_type)
+        point = feature_vector(
+            workout.distance_meters,
+            workout.duration_seconds,
+            workout.avg_heart_rate,
+            workout.smoothed_elevation_gain
+            if workout.smoothed_elevation_gain is not None
+            else workout.elevation_gain,
+            workout.time_in_zones,
+        )
+
+        # Over-fetch so the same-route discount can reorder the shortlist
+        fetch = 3 * k + 1
+        candidates = [
+            (d, int(index.ids[i]), index.route_ids[i]) for d, i in index.tree.query(point, fetch)
+        ]
+        with index.lock:
+            pending_points = list(index.pending_points)
+            pending_ids = list(index.pending_ids)
+            pending_routes = list(index.pending_routes)
+        if pending_points:
+            pending = ((np.array(pending_points) - point) ** 2).sum(axis=1)
+            candidates += list(zip(pending.tolist(), pending_ids, pending_routes))
+
+        scored = []
+        for squared, workout_id, route_id in candidates:
+            if workout_id == workout.id:
+                continue
+            distance = float(np.sqrt(squared))
+            if workout.route_id is not None and route_id == workout.route_id:
+                distance *= SAME_ROUTE_FACTOR
+            scored.append((distance, workout_id))
+        scored = sorted(scored)[:k]
+        if not scored:
+            return []
+
+        rows = {
+            w.id: w
+            for w in db.query(models.Workout).filter(
+                models.Workout.id.in_([workout_id for _, workout_id in scored])
+            )
+        }
+        return [(rows[wid], round(dist, 3)) for dist, wid in scored if wid in rows]
+
+    def _sync(self, db: Session, user_id: int, sport_type: str) -> _UserIndex:
+        """Return the (user, sport) index, inserting or rebuilding as needed."""
+        key = (user_id, sport_type)
+        base = db.query(models.Workout).filter(
+            models.Workout.user_id == user_id,
+            models.Workout.sport_type == sport_type,
+        )
+
+        index = self._cached(key)
+        if index is None:
+            return self._store(key, self._build(base.with_entities(*_INDEX_COLUMNS).all()))
+
+        with index.lock:
+            size, max_id, max_created_at = index.size, index.max_id, index.max_created_at
+        count, new_count, indexed_created_at = base.with_entities(
+            func.count(models.Workout.id),
+            func.count(models.Workout.id).filter(models.Workout.id > max_id),
+            func.max(models.Workout.created_at).filter(models.Workout.id <= max_id),
+        ).one()
+        if size + new_count != count or indexed_created_at != max_created_at:
+            # Indexed workouts were deleted or replaced: start over
+            return self._store(key, self._build(base.with_entities(*_INDEX_COLUMNS).all()))
+        if not new_count:
+            return index
+
+        rows = base.with_entities(*_INDEX_COLUMNS).filter(
+            models.Workout.id > max_id
+        ).order_by(models.Workout.id).all()
+        with index.lock:
+            for row in rows:
+                # Another request may have appended the same rows meanwhile
+                if row.id <= index.max_id:
+                    continue
+                index.pending_points.append(_row_vector(row))
+                index.pending_ids.append(row.id)
+                index.pending_routes.append(row.route_id)
+                index.max_id = row.id
+                index.max_created_at = max(index.max_created_at or row.created_at, row.created_at)
+            rebuild = len(index.pending_ids) > REBUILD_FRACTION * len(index.ids) + LEAF_SIZE
+        if rebuild:
+            return self._store(key, self._build(base.with_entities(*_INDEX_COLUMNS).all()))
+        return index
+
+    def _cached(self, key: Tuple[int, str]) -> Optional[_UserIndex]:
+        """The (user, sport) index if present, marked recently used."""
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+            return index
+
+    def _store(self, key: Tuple[int, str], index: _UserIndex) -> _UserIndex:
+        """Install a (re)built index, dropping the least recently used beyond the cap."""
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > MAX_CACHED_INDEXES:
+                self._indexes.popitem(last=False)
+            return index
+
+    @staticmethod
+    def _build(rows) -> _UserIndex:
+        points = np.array([_row_vector(row) for row in rows]).reshape(-1, len(FEATURE_SCALES))
+        return _UserIndex(
+            tree=KDTree(points),
+            ids=np.array([row.id for row in rows], dtype=np.int64),
+            route_ids=[row.route_id for row in rows],
+            max_id=max((row.id for row in rows), default=0),
+            max_created_at=max((row.created_at for row in rows), default=None),
+        )
+
+
+# Singleton
+similar_workout_service = SimilarWorkoutService()
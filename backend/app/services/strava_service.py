@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 
 from .. import models, crud
 from ..core.config import settings
+from .workout_ingest_service import workout_ingest_service
 
 
 class StravaService:
@@ -238,6 +239,7 @@ class StravaService:
             db.add(workout)
             synced_workouts.append(workout)
         
+        workout_ingest_service.process_workouts(db, user_id, synced_workouts)
         db.commit()
         print(f"[STRAVA] Synced {len(synced_workouts)} new activities")
         return synced_workouts
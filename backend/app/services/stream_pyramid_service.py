@@ -0,0 +1,208 @@
+"""
+stream_pyramid_service.py - Downsampled chart series (LTTB resolution pyramids)
+
+- lttb(): Largest-Triangle-Three-Buckets point selection (keeps peaks and
+  the visual shape of a series with far fewer points)
+- build(): at ingest, downsamples each chart channel to every PYRAMID_LEVELS
+  resolution and stores them in WorkoutStream.pyramid
+- get_series(): read path for GET /workouts/{id}/streams; picks the smallest
+  stored level with enough points and, if needed, runs LTTB on that level
+  only, so raw 1 Hz data is never loaded for charts
+
+Chart channels (API name -> meaning): hr (bpm), pace (s/km), speed (m/s),
+alt (m, smoothed), cad (spm), power (W).
+"""
+import io
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.workout_stream_service import workout_stream_service
+
+logger = logging.getLogger(__name__)
+
+
+# Stored resolutions (points per channel)
+PYRAMID_LEVELS = (200, 1000, 5000)
+
+# API channel name -> source stream channel
+CHART_CHANNELS = {
+    "hr": "heart_rate",
+    "pace": "speed",
+    "speed": "speed",
+    "alt": "altitude",
+    "cad": "cadence",
+    "power": "power",
+}
+
+# Below this speed the athlete is stopped; pace is reported as null (m/s)
+MIN_PACE_SPEED = 0.5
+
+# Rolling window (samples) for speed derived from GPS distance
+DERIVED_SPEED_WINDOW = 5
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    Bucket averages come from cumulative sums; only the choice of the
+    previous anchor point is sequential.
+
+    Args:
+        x: Ascending x values (time)
+        y: Values (no NaN)
+        n_out: Number of points to keep
+
+    Returns:
+        Sorted indices into x/y (first and last point always included)
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:max(n_out, 0)]
+
+    # n_out - 2 buckets over the interior points 1 .. n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    sum_x = np.concatenate(([0.0], np.cumsum(x)))
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = np.maximum(np.diff(edges), 1)
+    avg_x = (sum_x[edges[1:]] - sum_x[edges[:-1]]) / sizes
+    avg_y = (sum_y[edges[1:]] - sum_y[edges[:-1]]) / sizes
+    # The bucket after the last one is the final point
+    avg_x = np.append(avg_x, x[-1])
+    avg_y = np.append(avg_y, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    anchor = 0
+    for k in range(n_out - 2):
+        lo, hi = edges[k], max(edges[k + 1], edges[k] + 1)
+        area = np.abs(
+            (x[anchor] - avg_x[k + 1]) * (y[lo:hi] - y[anchor])
+            - (x[anchor] - x[lo:hi]) * (avg_y[k + 1] - y[anchor])
+        )
+        anchor = lo + int(np.argmax(area))
+        selected[k + 1] = anchor
+    return selected
+
+
+def _downsample(time: np.ndarray, values: np.ndarray, points: int) -> Dict[str, np.ndarray]:
+    valid = np.isfinite(values) & np.isfinite(time)
+    t, v = time[valid], values[valid]
+    keep = lttb(t, v, points)
+    return {"t": t[keep], "v": v[keep]}
+
+
+def _chart_sources(
+    streams: Dict[str, np.ndarray], smoothed_altitude: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """Source arrays per stream channel used by the charts."""
+    sources = {}
+    for channel in ("heart_rate", "cadence", "power", "speed", "altitude"):
+        if channel in streams and np.isfinite(streams[channel]).any():
+            sources[channel] = streams[channel]
+    if smoothed_altitude is not None:
+        sources["altitude"] = smoothed_altitude
+    if "speed" not in sources and "distance" in streams:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            step = np.diff(streams["distance"]) / np.diff(streams["time"])
+        kernel = np.ones(DERIVED_SPEED_WINDOW) / DERIVED_SPEED_WINDOW
+        speed = np.convolve(np.nan_to_num(step), kernel, mode="same")
+        sources["speed"] = np.concatenate(([speed[0] if len(speed) else np.nan], speed))
+    return sources
+
+
+class StreamPyramidService:
+    """Builds and serves LTTB-downsampled stream pyramids."""
+
+    def build(
+        self, streams: Dict[str, np.ndarray], smoothed_altitude: Optional[np.ndarray] = None
+    ) -> Optional[bytes]:
+        """
+        Compressed archive with every chart channel at every pyramid level.
+
+        Levels above the sample count are stored once at full resolution.
+        """
+        if not streams or "time" not in streams or len(streams["time"]) < 2:
+            return None
+        time = streams["time"]
+        arrays = {}
+        for channel, values in _chart_sources(streams, smoothed_altitude).items():
+            for level in PYRAMID_LEVELS:
+                series = _downsample(time, values, level)
+                arrays[f"{level}_{channel}_t"] = series["t"].astype(np.float32)
+                arrays[f"{level}_{channel}_v"] = series["v"].astype(np.float32)
+        if not arrays:
+            return None
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
+
+    def apply(
+        self,
+        workout: models.Workout,
+        streams: Dict[str, np.ndarray],
+        smoothed_altitude: Optional[np.ndarray] = None,
+    ) -> None:
+        """Store the pyramid on the workout's stream row. Does not commit."""
+        if workout.stream is not None:
+            workout.stream.pyramid = self.build(streams, smoothed_altitude)
+
+    def get_series(
+        self,
+        db: Session,
+        stream: models.WorkoutStream,
+        channels: Sequence[str],
+        points: int,
+    ) -> Dict[str, Dict[str, List[Optional[float]]]]:
+        """
+        Downsampled series for the requested API channels.
+
+        Args:
+            db: Database session (to store a missing pyramid)
+            stream: The workout's stream row
+            channels: API channel names (keys of CHART_CHANNELS)
+            points: Maximum points per channel
+
+        Returns:
+            API channel -> {"t": seconds, "v": values}; channels without
+            data are omitted
+        """
+        if stream.pyramid is None:
+            # Streams stored before pyramids existed: build once, keep it
+            stream.pyramid = self.build(workout_stream_service.decode(stream.data))
+            db.commit()
+        if stream.pyramid is None:
+            return {}
+
+        level = next((lvl for lvl in PYRAMID_LEVELS if lvl >= points), PYRAMID_LEVELS[-1])
+        result = {}
+        with np.load(io.BytesIO(stream.pyramid)) as archive:
+            for name in channels:
+                source = CHART_CHANNELS[name]
+                key = f"{level}_{source}"
+                if f"{key}_t" not in archive.files:
+                    continue
+                t = archive[f"{key}_t"].astype(float)
+                v = archive[f"{key}_v"].astype(float)
+                if len(t) > points:
+                    keep = lttb(t, v, points)
+                    t, v = t[keep], v[keep]
+                if name == "pace":
+                    with np.errstate(divide="ignore"):
+                        v = np.where(v >= MIN_PACE_SPEED, 1000 / v, np.nan)
+                result[name] = {
+                    "t": [round(float(x), 1) for x in t],
+                    "v": [None if not np.isfinite(y) else round(float(y), 2) for y in v],
+                }
+        return result
+
+
+# Singleton
+stream_pyramid_service = StreamPyramidService()
@@ -0,0 +1,229 @@
+"""
+track_service.py - GPS tracks as encoded polylines plus bounding boxes
+
+- encode_polyline() / decode_polyline(): Google encoded polyline format
+  (precision 5, ~1 m), the format map libraries consume directly
+- douglas_peucker(): point reduction within a distance tolerance
+- apply(): at ingest, stores the full-resolution polyline, one simplified
+  polyline per SIMPLIFY_ZOOMS level and the workout's bounding box
+- polyline_for_zoom() / in_area(): read paths for map views and
+  "runs in this area" queries (bounding boxes are indexed on workouts)
+
+Simplification tolerance per zoom is one Web Mercator pixel at the track's
+latitude, so a simplified track is indistinguishable from the full one at
+that zoom.
+"""
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+# Map zoom levels with a stored simplified track (coarsest last)
+SIMPLIFY_ZOOMS = (16, 13, 10)
+
+# Web Mercator ground resolution at zoom 0 on the equator (m/px, 256 px tiles)
+METERS_PER_PIXEL_Z0 = 156543.03392
+
+# Polyline precision (decimal digits of degrees)
+POLYLINE_PRECISION = 5
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def encode_polyline(lat: np.ndarray, lon: np.ndarray, precision: int = POLYLINE_PRECISION) -> str:
+    """
+    Encode a track with the Google polyline algorithm.
+
+    Deltas, zig-zag signs and the 5-bit chunking are computed with NumPy for
+    all values at once; only the final bytes-to-str conversion is Python.
+    """
+    if len(lat) == 0:
+        return ""
+    factor = 10 ** precision
+    points = np.column_stack((lat, lon))
+    scaled = np.round(points * factor).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    # Up to 7 chunks of 5 bits cover any 32-bit delta
+    chunks = (values[:, None] >> (5 * np.arange(7))) & 0x1F
+    counts = 1 + (values[:, None] >= 32 ** np.arange(1, 7)).sum(axis=1)
+    used = np.arange(7) < counts[:, None]
+    more = np.arange(7) < (counts - 1)[:, None]
+    encoded = (chunks | np.where(more, 0x20, 0)) + 63
+    return encoded[used].astype(np.uint8).tobytes().decode("ascii")
+
+
+def decode_polyline(polyline: str, precision: int = POLYLINE_PRECISION) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode a Google encoded polyline into (lat, lon) arrays."""
+    values = []
+    value = shift = 0
+    for char in polyline.encode("ascii"):
+        chunk = char - 63
+        value |= (chunk & 0x1F) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    coords = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return coords[:, 0], coords[:, 1]
+
+
+def _local_meters(lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Equirectangular projection around the track's mean latitude."""
+    lat0 = math.radians(float(np.mean(lat)))
+    x = np.radians(lon) * math.cos(lat0) * EARTH_RADIUS_M
+    y = np.radians(lat) * EARTH_RADIUS_M
+    return x, y
+
+
+def douglas_peucker(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Boolean mask of the points kept by Douglas-Peucker.
+
+    Iterative (explicit stack) so long tracks don't hit the recursion
+    limit; distances to each chord are computed vectorized.
+    """
+    n = len(x)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        length = math.hypot(dx, dy)
+        if length > 0:
+            distances = np.abs(dx * py - dy * px) / length
+        else:
+            distances = np.hypot(px, py)
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+def zoom_tolerance(zoom: int, latitude: float) -> float:
+    """Ground size (m) of one map pixel at a zoom level and latitude."""
+    return METERS_PER_PIXEL_Z0 * math.cos(math.radians(latitude)) / 2 ** zoom
+
+
+def track_points(streams: Dict[str, np.ndarray]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    if not streams or "lat" not in streams or "lon" not in streams:
+        return None
+    lat, lon = streams["lat"], streams["lon"]
+    # Devices report 0,0 (or nothing) before the GPS fix
+    valid = np.isfinite(lat) & np.isfinite(lon) & ((lat != 0) | (lon != 0))
+    if valid.sum() < 2:
+        return None
+    return lat[valid], lon[valid]
+
+
+class TrackService:
+    """Stores and serves workout GPS tracks."""
+
+    # ===== Write path =====
+
+    def compute(self, streams: Dict[str, np.ndarray]) -> Optional[Dict[str, Any]]:
+        """
+        Polylines and bounding box for a workout's lat/lon streams.
+
+        Returns:
+            Dict with polyline, point_count, simplified ({zoom: polyline})
+            and bbox (min_lat, min_lon, max_lat, max_lon), or None without
+            at least two GPS fixes
+        """
+        points = track_points(streams)
+        if points is None:
+            return None
+        lat, lon = points
+        x, y = _local_meters(lat, lon)
+        center = float(np.mean(lat))
+
+        simplified = {}
+        for zoom in SIMPLIFY_ZOOMS:
+            keep = douglas_peucker(x, y, zoom_tolerance(zoom, center))
+            simplified[str(zoom)] = encode_polyline(lat[keep], lon[keep])
+
+        return {
+            "polyline": encode_polyline(lat, lon),
+            "point_count": len(lat),
+            "simplified": simplified,
+            "bbox": (float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())),
+        }
+
+    def apply(self, workout: models.Workout, streams: Dict[str, np.ndarray]) -> Optional[models.WorkoutTrack]:
+        """Store the track and bounding box on a new workout. Does not commit."""
+        result = self.compute(streams)
+        if result is None:
+            return None
+        workout.min_lat, workout.min_lon, workout.max_lat, workout.max_lon = result["bbox"]
+        workout.track = models.WorkoutTrack(
+            point_count=result["point_count"],
+            polyline=result["polyline"],
+            simplified=result["simplified"],
+        )
+        return workout.track
+
+    # ===== Read path =====
+
+    def polyline_for_zoom(self, track: models.WorkoutTrack, zoom: Optional[int] = None) -> Tuple[str, Optional[int]]:
+        """
+        Coarsest stored polyline that still looks exact at a zoom level.
+
+        Returns:
+            (polyline, zoom of the simplification used or None for full
+            resolution)
+        """
+        if zoom is not None:
+            for level in reversed(SIMPLIFY_ZOOMS):
+                if level >= zoom and str(level) in (track.simplified or {}):
+                    return track.simplified[str(level)], level
+        return track.polyline, None
+
+    def in_area(
+        self,
+        db: Session,
+        user_id: int,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        limit: int = 100,
+    ) -> List[models.Workout]:
+        """
+        User's workouts whose bounding box intersects an area, newest first.
+
+        A box-overlap test on the indexed bbox columns; tracks are not read.
+        """
+        return (
+            db.query(models.Workout)
+            .filter(
+                models.Workout.user_id == user_id,
+                models.Workout.min_lat <= max_lat,
+                models.Workout.max_lat >= min_lat,
+                models.Workout.min_lon <= max_lon,
+                models.Workout.max_lon >= min_lon,
+            )
+            .order_by(models.Workout.start_time.desc())
+            .limit(limit)
+            .all()
+        )
+
+
+# Singleton
+track_service = TrackService()
@@ -0,0 +1,417 @@
+"""
+training_load_service.py - Training stress and fitness/fatigue (CTL/ATL/TSB) model
+
+Per workout:
+- hrTSS: Banister TRIMP normalized so one hour at lactate threshold ~= 100
+- rTSS: pace-based fallback for runs without heart rate
+- Duration-based estimate when neither is available
+
+Per user and day (TrainingLoadDay):
+- load: sum of workout stress scores
+- ctl: chronic training load (fitness), EWMA with 42-day time constant
+- atl: acute training load (fatigue), EWMA with 7-day time constant
+- tsb: training stress balance (form) = previous day's ctl - atl
+
+Adding or removing a workout only recomputes the series from the affected day
+onwards, seeded with the previous day's state. A full rebuild is a single
+vectorized pass (daily loads via bincount, EWMA in fixed-size chunks).
+"""
+import logging
+import math
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import func, inspect
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+CTL_DAYS = 42
+ATL_DAYS = 7
+
+# Chunk length for the vectorized EWMA. Within a chunk the recurrence is
+# evaluated as a scaled cumulative sum; (1 - 1/7)^-128 ~= 4e8 keeps the
+# scaling factors well inside float64 precision.
+EWMA_CHUNK_DAYS = 128
+
+# Fallbacks when the athlete profile is incomplete
+DEFAULT_MAX_HR = 190
+DEFAULT_RESTING_HR = 60
+DEFAULT_THRESHOLD_PACE = 300.0  # seconds per km (5:00/km)
+LTHR_FRACTION_OF_MAX = 0.89
+THRESHOLD_FRACTION_OF_VVO2MAX = 0.88
+DURATION_ONLY_TSS_PER_HOUR = 50.0
+
+
+def ewma(values: np.ndarray, alpha: float, initial: Any = 0.0) -> np.ndarray:
+    """
+    Vectorized y[t] = y[t-1] + alpha * (x[t] - y[t-1]), seeded with `initial`.
+
+    Runs along the last axis, so a 2-D array is one series per row (initial
+    is then a scalar or one value per row).
+
+    Evaluated chunk by chunk as y[t] = d^(t+1) * y0 + alpha * d^t * cumsum(x[j] / d^j)
+    with d = 1 - alpha, carrying the last value into the next chunk.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.empty_like(values)
+    decay = 1.0 - alpha
+    previous = np.asarray(initial, dtype=float)[..., None]
+    days = values.shape[-1]
+
+    for start in range(0, days, EWMA_CHUNK_DAYS):
+        chunk = values[..., start:start + EWMA_CHUNK_DAYS]
+        length = chunk.shape[-1]
+        powers = decay ** np.arange(length)
+        out[..., start:start + length] = (
+            decay * powers * previous + alpha * powers * np.cumsum(chunk / powers, axis=-1)
+        )
+        previous = out[..., start + length - 1:start + length]
+
+    return out
+
+
+class TrainingLoadService:
+    """Computes workout stress scores and maintains the CTL/ATL/TSB series."""
+
+    CTL_ALPHA = 1 / CTL_DAYS
+    ATL_ALPHA = 1 / ATL_DAYS
+
+    # ===== Stress scores =====
+
+    def calculate_stress_score(
+        self, workout: models.Workout, user: Optional[models.User] = None
+    ) -> Optional[float]:
+        """
+        Training stress score for a single workout.
+
+        Args:
+            workout: Workout with duration and optional HR / distance
+            user: Owner, used for max/resting HR, gender and VO2max
+
+        Returns:
+            Stress score (1 hour at threshold ~= 100), or None without duration
+        """
+        if not workout.duration_seconds or workout.duration_seconds <= 0:
+            return None
+
+        hours = workout.duration_seconds / 3600
+
+        if workout.avg_heart_rate:
+            max_hr = self._max_hr(user)
+            resting_hr = (user.resting_heart_rate if user else None) or DEFAULT_RESTING_HR
+            if max_hr > resting_hr:
+                return round(self._hr_tss(workout.avg_heart_rate, hours, max_hr, resting_hr, user), 1)
+
+        sport = (workout.sport_type or "").lower()
+        if "run" in sport and workout.distance_meters and workout.distance_meters > 0:
+            speed = workout.distance_meters / workout.duration_seconds  # m/s
+            threshold_speed = self.threshold_speed(user)
+            intensity = speed / threshold_speed
+            return round(hours * intensity ** 2 * 100, 1)
+
+        return round(hours * DURATION_ONLY_TSS_PER_HOUR, 1)
+
+    def _hr_tss(
+        self,
+        avg_hr: float,
+        hours: float,
+        max_hr: float,
+        resting_hr: float,
+        user: Optional[models.User],
+    ) -> float:
+        """Banister TRIMP scaled by the TRIMP of one hour at LTHR."""
+        if user is not None and (user.gender or "").lower() == "female":
+            a, b = 0.86, 1.67
+        else:
+            a, b = 0.64, 1.92
+
+        def trimp(hr: float, minutes: float) -> float:
+            reserve = min(max((hr - resting_hr) / (max_hr - resting_hr), 0.0), 1.0)
+            return minutes * reserve * a * math.exp(b * reserve)
+
+        threshold_trimp = trimp(max_hr * LTHR_FRACTION_OF_MAX, 60)
+        if threshold_trimp <= 0:
+            return 0.0
+        return trimp(avg_hr, hours * 60) / threshold_trimp * 100
+
+    @staticmethod
+    def _max_hr(user: Optional[models.User]) -> int:
+        if user is None:
+            return DEFAULT_MAX_HR
+        if user.max_heart_rate:
+            return user.max_heart_rate
+        if user.birth_date:
+            age = (date.today() - user.birth_date).days // 365
+            return 220 - age
+        return DEFAULT_MAX_HR
+
+    @staticmethod
+    def threshold_speed(user: Optional[models.User]) -> float:
+        """Threshold running speed (m/s), from VO2max via Daniels' oxygen cost curve."""
+        vo2_max = user.vo2_max if user is not None else None
+        if vo2_max and vo2_max > 0:
+            # VO2 = -4.60 + 0.182258 v + 0.000104 v^2  (v in m/min)
+            a, b, c = 0.000104, 0.182258, -4.60 - vo2_max
+            v_vo2max = (-b + math.sqrt(b * b - 4 * a * c)) / (2 * a)
+            return v_vo2max * THRESHOLD_FRACTION_OF_VVO2MAX / 60
+        return 1000 / DEFAULT_THRESHOLD_PACE
+
+    # ===== Write path =====
+
+    def process_workouts(
+        self, db: Session, user_id: int, workouts: Iterable[models.Workout]
+    ) -> None:
+        """
+        Score new or changed workouts and update the user's load series.
+
+        Call after adding or editing the workouts and before flushing them
+        (an edited start_time is read from the attribute history). The caller
+        owns the transaction.
+
+        Args:
+            db: Database session
+            user_id: Owner of the workouts
+            workouts: Workouts that were inserted or updated
+        """
+        workouts = [w for w in workouts if w is not None and w.start_time is not None]
+        if not workouts:
+            return
+
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        changed_days: List[date] = []
+        for workout in workouts:
+            score = self.calculate_stress_score(workout, user)
+            moved_from = self._previous_day(workout)
+            if workout.id is None or score != workout.training_stress_score or moved_from:
+                workout.training_stress_score = score
+                changed_days.append(workout.start_time.date())
+            if moved_from:
+                # The old day loses this workout's load
+                changed_days.append(moved_from)
+
+        if changed_days:
+            db.flush()
+            self._recompute_from(db, user_id, min(changed_days))
+
+    def process_workout(self, db: Session, workout: models.Workout) -> None:
+        """Score a single new or changed workout (see process_workouts)."""
+        self.process_workouts(db, workout.user_id, [workout])
+
+    @staticmethod
+    def _previous_day(workout: models.Workout) -> Optional[date]:
+        """Day the workout was stored on, if an unflushed edit moved it to another day."""
+        old = inspect(workout).attrs.start_time.history.deleted
+        if old and old[0] is not None and old[0].date() != workout.start_time.date():
+            return old[0].date()
+        return None
+
+    def remove_workout(self, db: Session, workout: models.Workout) -> None:
+        """
+        Delete a workout and roll its load out of the series.
+
+        The caller commits.
+        """
+        user_id = workout.user_id
+        day = workout.start_time.date() if workout.start_time else None
+        had_load = bool(workout.training_stress_score)
+        db.delete(workout)
+        db.flush()
+        if day is not None and had_load:
+            self._recompute_from(db, user_id, day)
+
+    def rebuild(self, db: Session, user_id: int) -> int:
+        """
+        Recompute the user's full series in one vectorized pass.
+
+        Returns:
+            Number of daily rows written
+        """
+        db.query(models.TrainingLoadDay).filter(
+            models.TrainingLoadDay.user_id == user_id
+        ).delete(synchronize_session=False)
+
+        first_day, loads = self._daily_loads(db, user_id)
+        if first_day is None:
+            return 0
+
+        ctl = ewma(loads, self.CTL_ALPHA)
+        atl = ewma(loads, self.ATL_ALPHA)
+        tsb = np.concatenate(([0.0], (ctl - atl)[:-1]))
+
+        db.bulk_insert_mappings(
+            models.TrainingLoadDay,
+            [
+                {
+                    "user_id": user_id,
+                    "date": first_day + timedelta(days=i),
+                    "load": float(loads[i]),
+                    "ctl": float(ctl[i]),
+                    "atl": float(atl[i]),
+                    "tsb": float(tsb[i]),
+                }
+                for i in range(len(loads))
+            ],
+        )
+        logger.info(f"[TRAINING LOAD] Rebuilt {len(loads)} days for user {user_id}")
+        return len(loads)
+
+    def _daily_loads(
+        self, db: Session, user_id: int, since: Optional[date] = None
+    ) -> tuple:
+        """Dense daily load array from `since` (default: first workout) to the last workout."""
+        query = db.query(
+            models.Workout.start_time, models.Workout.training_stress_score
+        ).filter(
+            models.Workout.user_id == user_id,
+            models.Workout.training_stress_score.isnot(None),
+        )
+        if since is not None:
+            query = query.filter(
+                models.Workout.start_time >= datetime.combine(since, datetime.min.time())
+            )
+        rows = query.all()
+        if not rows:
+            return since, np.zeros(0)
+
+        ordinals = np.fromiter((r[0].date().toordinal() for r in rows), dtype=np.int64, count=len(rows))
+        scores = np.fromiter((r[1] for r in rows), dtype=float, count=len(rows))
+        first = since.toordinal() if since is not None else int(ordinals.min())
+        loads = np.bincount(ordinals - first, weights=scores)
+        return date.fromordinal(first), loads
+
+    def _recompute_from(self, db: Session, user_id: int, day: date) -> None:
+        """Recompute stored rows from `day` onwards, seeded with the day before."""
+        first_stored = (
+            db.query(func.min(models.TrainingLoadDay.date))
+            .filter(models.TrainingLoadDay.user_id == user_id)
+            .scalar()
+        )
+        if first_stored is None or day <= first_stored:
+            self.rebuild(db, user_id)
+            return
+
+        seed = (
+            db.query(models.TrainingLoadDay)
+            .filter(
+                models.TrainingLoadDay.user_id == user_id,
+                models.TrainingLoadDay.date < day,
+            )
+            .order_by(models.TrainingLoadDay.date.desc())
+            .first()
+        )
+        # Rows are dense, so the seed is the day before unless `day` lies past
+        # the stored range; extend the series across the gap in that case.
+        start = seed.date + timedelta(days=1)
+
+        _, loads = self._daily_loads(db, user_id, since=start)
+        existing = (
+            db.query(models.TrainingLoadDay)
+            .filter(
+                models.TrainingLoadDay.user_id == user_id,
+                models.TrainingLoadDay.date >= start,
+            )
+            .order_by(models.TrainingLoadDay.date.asc())
+            .all()
+        )
+        # Keep trailing rows that now carry no load (e.g. last workout removed)
+        length = max(len(loads), len(existing))
+        loads = np.pad(loads, (0, length - len(loads)))
+
+        ctl = ewma(loads, self.CTL_ALPHA, seed.ctl)
+        atl = ewma(loads, self.ATL_ALPHA, seed.atl)
+        tsb = np.concatenate(([seed.ctl - seed.atl], (ctl - atl)[:-1]))
+
+        for i in range(length):
+            values = {
+                "load": float(loads[i]),
+                "ctl": float(ctl[i]),
+                "atl": float(atl[i]),
+                "tsb": float(tsb[i]),
+            }
+            if i < len(existing):
+                row = existing[i]
+                for key, value in values.items():
+                    setattr(row, key, value)
+            else:
+                db.add(models.TrainingLoadDay(
+                    user_id=user_id, date=start + timedelta(days=i), **values
+                ))
+
+    # ===== Read path =====
+
+    def get_series(
+        self, db: Session, user_id: int, start_date: date, end_date: date
+    ) -> List[Dict[str, Any]]:
+        """
+        Daily load/CTL/ATL/TSB between two dates (inclusive).
+
+        Days after the last stored row are projected forward with zero load;
+        days before the first workout are zero.
+        """
+        rows = (
+            db.query(models.TrainingLoadDay)
+            .filter(
+                models.TrainingLoadDay.user_id == user_id,
+                models.TrainingLoadDay.date >= start_date,
+                models.TrainingLoadDay.date <= end_date,
+            )
+            .order_by(models.TrainingLoadDay.date.asc())
+            .all()
+        )
+        by_date = {row.date: row for row in rows}
+
+        last = rows[-1] if rows else None
+        if last is None or last.date < end_date:
+            last = (
+                db.query(models.TrainingLoadDay)
+                .filter(
+                    models.TrainingLoadDay.user_id == user_id,
+                    models.TrainingLoadDay.date <= end_date,
+                )
+                .order_by(models.TrainingLoadDay.date.desc())
+                .first()
+            )
+
+        series = []
+        day = start_date
+        while day <= end_date:
+            row = by_date.get(day)
+            if row is not None:
+                point = {"load": row.load, "ctl": row.ctl, "atl": row.atl, "tsb": row.tsb}
+            elif last is not None and day > last.date:
+                gap = (day - last.date).days
+                ctl = last.ctl * (1 - self.CTL_ALPHA) ** gap
+                atl = last.atl * (1 - self.ATL_ALPHA) ** gap
+                ctl_prev = last.ctl * (1 - self.CTL_ALPHA) ** (gap - 1)
+                atl_prev = last.atl * (1 - self.ATL_ALPHA) ** (gap - 1)
+                point = {"load": 0.0, "ctl": ctl, "atl": atl, "tsb": ctl_prev - atl_prev}
+            else:
+                point = {"load": 0.0, "ctl": 0.0, "atl": 0.0, "tsb": 0.0}
+
+            series.append({
+                "date": day,
+                **{key: round(value, 2) for key, value in point.items()},
+            })
+            day += timedelta(days=1)
+
+        return series
+
+    def get_current(
+        self, db: Session, user_id: int, as_of: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Load state for a single day (default today), with acute:chronic ratio."""
+        as_of = as_of or datetime.utcnow().date()
+        point = self.get_series(db, user_id, as_of, as_of)[0]
+        point["acute_chronic_ratio"] = (
+            round(point["atl"] / point["ctl"], 2) if point["ctl"] > 0 else None
+        )
+        return point
+
+
+# Singleton
+training_load_service = TrainingLoadService()
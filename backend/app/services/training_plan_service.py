@@ -2,6 +2,7 @@
 Training Plan Generator
 AI-powered personalized training plan creation using Groq/Llama
 """
+import json
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
@@ -9,6 +10,7 @@ from groq import Groq
 
 from .. import models
 from ..core.config import settings
+from .llm_scheduler_service import LLMOverloadedError, Priority, llm_scheduler
 
 
 class TrainingPlanService:
@@ -16,7 +18,7 @@ class TrainingPlanService:
     
     def __init__(self):
         self.client = Groq(api_key=settings.groq_api_key)
-        self.model = "llama-3.3-70b-versatile"
+        self.model = settings.llm_model
     
     def generate_plan(
         self,
@@ -97,8 +99,11 @@ FORMATO (JSON):
 Genera el plan completo en JSON:"""
 
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
+            completion = llm_scheduler.complete(
+                self.client,
+                user.id,
+                Priority.BACKGROUND,
+                self.model,
                 messages=[
                     {
                         "role": "system",
@@ -113,7 +118,6 @@ Genera el plan completo en JSON:"""
                 max_tokens=4000
             )
             
-            import json
             plan_text = completion.choices[0].message.content
             
             # Extract JSON (might be wrapped in markdown)
@@ -148,6 +152,8 @@ Genera el plan completo en JSON:"""
             
             return plan_data
             
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             raise Exception(f"Error generating plan: {str(e)}")
     
@@ -194,39 +200,57 @@ PREFERENCIAS:
         db: Session,
         user: models.User,
         plan_data: Dict[str, Any],
-        actual_workouts: List[models.Workout]
+        compliance: Dict[str, Any],
+        feedback: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Adapt training plan based on actual performance.
+        Adapt training plan based on actual performance and user feedback.
         
         Args:
             db: Database session
             user: User model
             plan_data: Current plan
-            actual_workouts: Recent completed workouts
+            compliance: Per-week compliance (plan_compliance_service.summary)
+            feedback: Athlete's feedback on the plan (fatigue, injuries, etc.)
             
         Returns:
             Adapted plan for upcoming weeks
         """
-        # Calculate adherence
-        planned_workouts = []
-        for week in plan_data.get('weeks', []):
-            planned_workouts.extend(week.get('workouts', []))
-        
-        adherence = len(actual_workouts) / len(planned_workouts) if planned_workouts else 0
+        totals = compliance['totals']
+        adherence = totals['adherence'] or 0
         
         # Analyze performance vs plan
         performance_context = f"""ADHERENCIA AL PLAN:
-- Entrenamientos completados: {len(actual_workouts)} de {len(planned_workouts)} ({adherence*100:.0f}%)
-
-AJUSTES NECESARIOS:
+- Entrenamientos completados: {totals['completed_sessions']} de {totals['planned_sessions']} ({adherence*100:.0f}%)
+- Volumen: {totals['actual_km']:.1f} km de {totals['planned_km']:.1f} km planificados
 """
+        for week in compliance['weeks']:
+            line = (
+                f"- Semana {week['week']}: {week['completed_sessions']}/{week['planned_sessions']} sesiones, "
+                f"{week['actual_km']:.1f}/{week['planned_km']:.1f} km"
+            )
+            if week['intensity_delta'] is not None:
+                line += f", ritmo {week['intensity_delta']*100:+.0f}% vs objetivo"
+            if week['in_progress']:
+                line += " (en curso)"
+            performance_context += line + "\n"
+        
+        performance_context += "\nAJUSTES NECESARIOS:\n"
         
         if adherence < 0.7:
             performance_context += "- Reducir volumen (baja adherencia)\n"
         elif adherence > 0.95:
             performance_context += "- Puede aumentar intensidad (excelente adherencia)\n"
         
+        intensity = totals['intensity_delta']
+        if intensity is not None and intensity < -0.05:
+            performance_context += "- Ritmos objetivo demasiado exigentes (más lento de lo planificado)\n"
+        elif intensity is not None and intensity > 0.05:
+            performance_context += "- Controlar intensidad (más rápido de lo planificado)\n"
+        
+        if feedback and feedback.strip():
+            performance_context += f"\nFEEDBACK DEL ATLETA:\n{feedback.strip()}\n"
+        
         # Build adaptation prompt
         prompt = f"""{performance_context}
 
@@ -234,13 +258,17 @@ PLAN ACTUAL:
 {json.dumps(plan_data, indent=2)}
 
 Adapta las próximas 4 semanas del plan basándote en el progreso real.
-Mantén el objetivo pero ajusta volumen e intensidad según adherencia y rendimiento.
+Mantén el objetivo pero ajusta volumen e intensidad según adherencia, rendimiento y el feedback del atleta.
 
 Responde en JSON con las semanas actualizadas."""
 
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
+            # The user waits on POST /training-plans/{id}/adapt, so not BACKGROUND
+            completion = llm_scheduler.complete(
+                self.client,
+                user.id,
+                Priority.STANDARD,
+                self.model,
                 messages=[
                     {"role": "system", "content": "Eres un entrenador que adapta planes según progreso real."},
                     {"role": "user", "content": prompt}
@@ -249,7 +277,6 @@ Responde en JSON con las semanas actualizadas."""
                 max_tokens=3000
             )
             
-            import json
             adapted_text = completion.choices[0].message.content
             
             if "```json" in adapted_text:
@@ -261,9 +288,25 @@ Responde en JSON con las semanas actualizadas."""
             
             return adapted_data
             
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             raise Exception(f"Error adapting plan: {str(e)}")
     
+    def create_provisional_plan(
+        self,
+        user: models.User,
+        goal: Dict[str, Any],
+        weeks: int
+    ) -> Dict[str, Any]:
+        """Deterministic template plan shown instantly while the AI plan is generating."""
+        plan = self._create_fallback_plan(goal, weeks)
+        plan['provisional'] = True
+        plan['created_at'] = datetime.utcnow().isoformat()
+        plan['user_id'] = user.id
+        plan['goal'] = goal
+        return plan
+
     def _create_fallback_plan(self, goal: Dict[str, Any], weeks: int) -> Dict[str, Any]:
         """Create a basic fallback training plan when AI generation fails."""
         goal_type = goal.get('type', 'general')
@@ -10,6 +10,8 @@ from enum import Enum
 import math
 
 from .. import models
+from .plan_risk_service import plan_risk_service, session_namespaces
+from .training_load_service import training_load_service
 
 
 class TrainingPhase(str, Enum):
@@ -113,12 +115,14 @@ class TrainingRecommendationsService:
             target_race_date: Optional race date for taper logic
             
         Returns:
-            Dict with weekly plan and recommendations
+            Dict with weekly plan, recommendations and simulated load risk
         """
-        # Adjust training load based on readiness
+        # Adjust training load based on readiness and current form (TSB)
+        training_load = training_load_service.get_current(db, user_id)
         load_adjustment = self._calculate_load_adjustment(
             fatigue_score,
-            readiness_score
+            readiness_score,
+            form_tsb=training_load["tsb"] if training_load["ctl"] > 0 else None,
         )
         
         # Get base weekly load for phase
@@ -165,32 +169,57 @@ class TrainingRecommendationsService:
                 "fatigue_score": round(fatigue_score, 1),
                 "readiness_score": round(readiness_score, 1),
                 "status": self._determine_athlete_status(fatigue_score, readiness_score),
+                "training_load": training_load,
             },
             "recommendations": recommendations,
             "injury_prevention": injury_prevention,
             "weekly_metrics": {
                 "total_duration": round(total_load / 60, 1),  # in hours
                 "sessions_per_week": len(daily_workouts),
-                "intensity_distribution": self._calculate_intensity_distribution(daily_workouts),
+                "intensity_distribution": self._generate_intensity_distribution(daily_workouts),
             },
             "next_adjustments": self._suggest_next_adjustments(
                 fatigue_score,
                 readiness_score,
                 phase,
             ),
+            "risk": self._simulate_risk(db, user_id, daily_workouts),
             "generated_at": datetime.utcnow().isoformat(),
         }
     
+    def _simulate_risk(
+        self,
+        db: Session,
+        user_id: int,
+        daily_workouts: List[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """Monte Carlo ACWR / form risk of the week, starting today."""
+        user = db.get(models.User, user_id)
+        if user is None:
+            return None
+        sessions = session_namespaces(
+            {
+                "week": 1,
+                "day": w["day"],
+                "workout_type": w["type"],
+                "duration_minutes": w["duration_minutes"],
+            }
+            for w in daily_workouts
+        )
+        return plan_risk_service.assess(db, user, sessions, datetime.utcnow().date())
+    
     def _calculate_load_adjustment(
         self,
         fatigue_score: float,
         readiness_score: float,
+        form_tsb: Optional[float] = None,
     ) -> float:
         """
         Calculate training load adjustment factor (0-1.2).
         
         High readiness → increase volume
         High fatigue → decrease volume
+        Deeply negative form (TSB from the load model) → decrease volume
         """
         # Readiness boost: 1.0 at 50%, up to 1.2 at 100%
         readiness_factor = 1.0 + (readiness_score - 50) * 0.004
@@ -201,6 +230,15 @@ class TrainingRecommendationsService:
         # Combined adjustment
         adjustment = (readiness_factor * fatigue_factor) * 0.95 + 0.05  # Ensure not below 0.5
         
+        # Form penalty: accumulated load the athlete has not absorbed yet
+        if form_tsb is not None:
+            if form_tsb < -30:
+                adjustment *= 0.8
+            elif form_tsb < -10:
+                adjustment *= 0.9
+            elif form_tsb > 15:
+                adjustment *= 1.05
+        
         return max(0.5, min(adjustment, 1.2))  # Clamp between 0.5 and 1.2
     
     def _generate_daily_workouts(
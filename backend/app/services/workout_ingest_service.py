@@ -0,0 +1,112 @@
+"""
+workout_ingest_service.py - Derived data computed once when a workout is stored
+
+Every workout source (manual entry, file upload, Garmin, Strava) calls
+process_workout() after adding the workout to the session. It updates:
+- Training load (TSS and the CTL/ATL/TSB series)
+- Workout streams (when the source provides per-sample data)
+- Smoothed elevation gain, graded distance and grade-adjusted pace
+- The best-effort index used by race predictions
+- Time in HR / pace / power zones
+- Per-km / per-mile / per-lap splits
+- Downsampled chart series (LTTB pyramid)
+- GPS track polylines and bounding box
+- Repeated-route assignment from the track fingerprint
+- The athlete-context version (coach prompts rebuild their snapshot)
+- Compliance of the active training-plan week the workout falls in
+
+None of these commit; the caller commits together with the workout.
+"""
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.athlete_context_service import athlete_context_service
+from app.services.best_effort_service import best_effort_service
+from app.services.grade_service import grade_service
+from app.services.plan_compliance_service import plan_compliance_service
+from app.services.route_service import route_service
+from app.services.stream_pyramid_service import stream_pyramid_service
+from app.services.track_service import track_service
+from app.services.training_load_service import training_load_service
+from app.services.workout_split_service import workout_split_service
+from app.services.workout_stream_service import workout_stream_service
+from app.services.zone_time_service import zone_time_service
+
+logger = logging.getLogger(__name__)
+
+
+class WorkoutIngestService:
+    """Runs the per-workout ingest pipeline."""
+
+    def process_workout(
+        self,
+        db: Session,
+        workout: models.Workout,
+        streams: Optional[Dict[str, np.ndarray]] = None,
+    ) -> None:
+        """
+        Compute derived data for one new workout. Does not commit.
+
+        Args:
+            db: Database session (workout already added)
+            workout: The new workout
+            streams: Per-sample channels from workout_stream_service, if any
+        """
+        training_load_service.process_workout(db, workout)
+        self._process_streams(db, workout, streams)
+        athlete_context_service.invalidate(db, workout.user_id)
+        plan_compliance_service.record_workouts(db, workout.user_id, [workout.start_time.date()])
+
+    def process_workouts(
+        self,
+        db: Session,
+        user_id: int,
+        workouts: List[models.Workout],
+    ) -> None:
+        """
+        Batch variant for summary-only syncs: one training load recompute
+        for all workouts (no streams).
+        """
+        if not workouts:
+            return
+        training_load_service.process_workouts(db, user_id, workouts)
+        athlete_context_service.invalidate(db, user_id)
+        plan_compliance_service.record_workouts(db, user_id, {w.start_time.date() for w in workouts})
+
+    def _process_streams(
+        self,
+        db: Session,
+        workout: models.Workout,
+        streams: Optional[Dict[str, np.ndarray]],
+    ) -> None:
+        if not streams:
+            return
+        workout_stream_service.save(db, workout, streams)
+        grade = grade_service.apply(workout, streams)
+        efforts = best_effort_service.index_workout(
+            db, workout, streams,
+            graded_distance=grade["cumulative_graded_distance"] if grade else None,
+        )
+        zone_time_service.apply(db, workout, streams)
+        # Splits report climbing from the smoothed profile, not raw GPS noise
+        workout_split_service.apply(
+            db, workout,
+            {**streams, "altitude": grade["smoothed_altitude"]} if grade else streams,
+        )
+        stream_pyramid_service.apply(
+            workout, streams, grade["smoothed_altitude"] if grade else None
+        )
+        track_service.apply(workout, streams)
+        route_service.apply(db, workout, streams)
+        logger.info(
+            f"[INGEST] Stored {len(streams['time'])} samples, "
+            f"{len(efforts)} best efforts for workout {workout.id}"
+        )
+
+
+# Singleton
+workout_ingest_service = WorkoutIngestService()
@@ -0,0 +1,190 @@
+"""
+workout_split_service.py - Per-km, per-mile and per-lap splits from streams
+
+- compute(): splits for a workout's streams, vectorized (crossing times by
+  interpolation, per-split sums with np.bincount)
+- apply(): stores them in Workout.splits at ingest
+- as_rows(): expands the stored columns into one dict per split for the API
+  and the coach prompt
+
+Workout.splits is columnar to stay compact:
+{"km": {"distance_meters": [...], "elapsed_seconds": [...], ...},
+ "mile": {...}, "laps": {...}}
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.workout_stream_service import LAP_STARTS
+
+logger = logging.getLogger(__name__)
+
+
+# Split kind -> split length in meters
+SPLIT_DISTANCES = {
+    "km": 1000.0,
+    "mile": 1609.344,
+}
+
+# Columns stored per split
+SPLIT_COLUMNS = (
+    "distance_meters",
+    "elapsed_seconds",
+    "pace_seconds_per_km",
+    "avg_heart_rate",
+    "avg_cadence",
+    "elevation_gain",
+    "elevation_loss",
+)
+
+# Trailing partial splits shorter than this are dropped (meters)
+MIN_PARTIAL_SPLIT = 50.0
+
+
+def _round(values: np.ndarray, digits: int) -> List[Optional[float]]:
+    return [None if not np.isfinite(v) else round(float(v), digits) for v in values]
+
+
+def segment_stats(streams: Dict[str, np.ndarray], bounds: np.ndarray) -> Dict[str, list]:
+    """
+    Stats for consecutive segments delimited by time bounds.
+
+    Each sample interval is assigned to the segment containing its closing
+    sample; HR and cadence are time-weighted means, elevation gain/loss the
+    sums of positive/negative altitude steps.
+
+    Args:
+        streams: Channel arrays (time required, distance/heart_rate/cadence/
+            altitude optional)
+        bounds: Segment boundaries in seconds (n + 1 values for n segments)
+
+    Returns:
+        SPLIT_COLUMNS -> list of n values (None where no data)
+    """
+    time = streams["time"]
+    count = len(bounds) - 1
+    # Interval (t[i-1], t[i]] belongs to segment k when b[k] < t[i] <= b[k+1]
+    segment = np.searchsorted(bounds, time[1:], side="left") - 1
+    inside = (segment >= 0) & (segment < count)
+    deltas = np.diff(time)
+    elapsed = np.diff(bounds)
+
+    if "distance" in streams:
+        distance = np.diff(np.interp(bounds, time, streams["distance"]))
+    else:
+        distance = np.full(count, np.nan)
+
+    def weighted_mean(channel: str) -> np.ndarray:
+        if channel not in streams:
+            return np.full(count, np.nan)
+        values = streams[channel][1:]
+        valid = inside & np.isfinite(values) & (values > 0)
+        weight = np.bincount(segment[valid], weights=deltas[valid], minlength=count)
+        total = np.bincount(segment[valid], weights=deltas[valid] * values[valid], minlength=count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(weight > 0, total / weight, np.nan)
+
+    if "altitude" in streams:
+        steps = np.diff(streams["altitude"])
+        valid = inside & np.isfinite(steps)
+        gain = np.bincount(segment[valid], weights=np.clip(steps[valid], 0, None), minlength=count)
+        loss = np.bincount(segment[valid], weights=np.clip(-steps[valid], 0, None), minlength=count)
+    else:
+        gain = loss = np.full(count, np.nan)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pace = np.where(distance > 0, elapsed / (distance / 1000), np.nan)
+
+    return {
+        "distance_meters": _round(distance, 1),
+        "elapsed_seconds": _round(elapsed, 1),
+        "pace_seconds_per_km": _round(pace, 1),
+        "avg_heart_rate": _round(weighted_mean("heart_rate"), 0),
+        "avg_cadence": _round(weighted_mean("cadence"), 0),
+        "elevation_gain": _round(gain, 1),
+        "elevation_loss": _round(loss, 1),
+    }
+
+
+def distance_crossings(time: np.ndarray, distance: np.ndarray, marks: np.ndarray) -> np.ndarray:
+    """Interpolated times at which cumulative distance reaches each mark."""
+    idx = np.clip(np.searchsorted(distance, marks, side="left"), 1, len(distance) - 1)
+    d0, d1 = distance[idx - 1], distance[idx]
+    t0, t1 = time[idx - 1], time[idx]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.where(d1 > d0, (marks - d0) / (d1 - d0), 1.0)
+    return t0 + np.clip(fraction, 0, 1) * (t1 - t0)
+
+
+class WorkoutSplitService:
+    """Computes, stores and formats workout splits."""
+
+    def compute(self, streams: Dict[str, np.ndarray]) -> Optional[Dict[str, Dict[str, list]]]:
+        """
+        Distance splits (km, mile) and device laps for one workout.
+
+        Returns:
+            Columnar splits per kind, or None without usable samples
+        """
+        if not streams or "time" not in streams or len(streams["time"]) < 2:
+            return None
+
+        time = streams["time"]
+        result = {}
+
+        if "distance" in streams:
+            valid = np.isfinite(streams["distance"])
+            distance = np.maximum.accumulate(
+                np.where(valid, streams["distance"], -np.inf)
+            )
+            distance = np.where(np.isfinite(distance), distance, 0.0)
+            clean = {**streams, "distance": distance}
+            total = distance[-1] - distance[0]
+
+            for kind, length in SPLIT_DISTANCES.items():
+                full_splits = int(total // length)
+                marks = distance[0] + np.arange(1, full_splits + 1) * length
+                crossings = distance_crossings(time, distance, marks)
+                # Trailing partial split, unless it is only a few meters
+                if total - full_splits * length >= MIN_PARTIAL_SPLIT:
+                    crossings = np.append(crossings, time[-1])
+                if len(crossings):
+                    result[kind] = segment_stats(
+                        clean, np.concatenate(([time[0]], crossings))
+                    )
+        else:
+            clean = streams
+
+        # Device laps (only when there is more than one)
+        lap_starts = np.unique(streams.get(LAP_STARTS, []))
+        inner = lap_starts[(lap_starts > time[0]) & (lap_starts < time[-1])]
+        if len(inner):
+            bounds = np.concatenate(([time[0]], inner, [time[-1]]))
+            result["laps"] = segment_stats(clean, bounds)
+
+        return result or None
+
+    def apply(self, db: Session, workout: models.Workout, streams: Dict[str, np.ndarray]) -> None:
+        """Store splits for a new workout. Does not commit."""
+        workout.splits = self.compute(streams)
+
+    def as_rows(self, splits: Optional[Dict[str, Dict[str, list]]], kind: str) -> List[Dict[str, Any]]:
+        """
+        One dict per split (with a 1-based `index`) from the stored columns.
+        """
+        columns = (splits or {}).get(kind)
+        if not columns:
+            return []
+        rows = []
+        for i in range(len(columns["elapsed_seconds"])):
+            row = {"index": i + 1}
+            row.update({name: columns[name][i] for name in SPLIT_COLUMNS})
+            rows.append(row)
+        return rows
+
+
+# Singleton
+workout_split_service = WorkoutSplitService()
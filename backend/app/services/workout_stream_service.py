@@ -0,0 +1,329 @@
+"""
+workout_stream_service.py - Per-sample workout streams (time, distance, HR, ...)
+
+- from_records(): builds channel arrays from FIT-style record dicts (Garmin
+  sync, uploaded FIT files)
+- extract_from_file(): reads streams from an uploaded FIT, GPX or TCX file
+- save() / load(): stores channels in WorkoutStream as one compressed NumPy
+  archive per workout
+
+Every channel is a float array of the same length; missing samples are NaN.
+`time` is seconds since the first sample and `distance` is cumulative meters.
+Device lap start times (same clock as `time`) travel alongside the channels
+under LAP_STARTS.
+"""
+import io
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+# Channel name -> storage dtype (lat/lon need float64 for ~1 cm precision)
+CHANNELS = {
+    "time": np.float32,
+    "distance": np.float32,
+    "heart_rate": np.float32,
+    "speed": np.float32,
+    "cadence": np.float32,
+    "altitude": np.float32,
+    "power": np.float32,
+    "lat": np.float64,
+    "lon": np.float64,
+}
+
+# FIT record field -> channel, in order of preference per channel
+FIT_RECORD_FIELDS = {
+    "distance": ("distance",),
+    "heart_rate": ("heart_rate",),
+    "speed": ("enhanced_speed", "speed"),
+    "cadence": ("cadence",),
+    "altitude": ("enhanced_altitude", "altitude"),
+    "power": ("power",),
+    "lat": ("position_lat",),
+    "lon": ("position_long",),
+}
+
+# Non-sample array: device lap start offsets in seconds
+LAP_STARTS = "lap_starts"
+
+SEMICIRCLES_TO_DEGREES = 180.0 / 2 ** 31
+EARTH_RADIUS_M = 6371000
+
+GPX_NS = {
+    "gpx": "http://www.topografix.com/GPX/1/1",
+    "gpxtpx": "http://www.garmin.com/xmlschemas/TrackPointExtension/v1",
+}
+TCX_NS = {"tcx": "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2"}
+
+Streams = Dict[str, np.ndarray]
+
+
+def cumulative_distance(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Cumulative haversine distance (m) along a lat/lon track, vectorized."""
+    lat_r = np.radians(lat)
+    lon_r = np.radians(lon)
+    dlat = np.diff(lat_r)
+    dlon = np.diff(lon_r)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_r[:-1]) * np.cos(lat_r[1:]) * np.sin(dlon / 2) ** 2
+    steps = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    return np.concatenate(([0.0], np.cumsum(np.nan_to_num(steps))))
+
+
+def _parse_time(text: Optional[str]) -> Optional[datetime]:
+    if not text:
+        return None
+    return datetime.fromisoformat(text.strip().replace("Z", "+00:00"))
+
+
+def _to_float(text: Optional[str]) -> float:
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class WorkoutStreamService:
+    """Extracts, stores and loads per-sample workout streams."""
+
+    # ===== Extraction =====
+
+    def from_records(
+        self,
+        records: Iterable[Dict[str, Any]],
+        lap_starts: Optional[Iterable[datetime]] = None,
+    ) -> Optional[Streams]:
+        """
+        Build streams from FIT-style record dicts.
+
+        Args:
+            records: Dicts with a `timestamp` plus any FIT record fields
+                (distance, heart_rate, enhanced_speed, position_lat, ...)
+            lap_starts: Start time of each device lap, if known
+
+        Returns:
+            Channel arrays, or None if there are fewer than two timed samples
+        """
+        records = [r for r in records if r.get("timestamp") is not None]
+        if len(records) < 2:
+            return None
+
+        start = records[0]["timestamp"]
+        streams: Streams = {
+            "time": np.array(
+                [(r["timestamp"] - start).total_seconds() for r in records], dtype=float
+            )
+        }
+        for channel, fields in FIT_RECORD_FIELDS.items():
+            values = []
+            for record in records:
+                value = next(
+                    (record[f] for f in fields if record.get(f) is not None), None
+                )
+                values.append(np.nan if value is None else float(value))
+            column = np.array(values, dtype=float)
+            if not np.isnan(column).all():
+                streams[channel] = column
+
+        for channel in ("lat", "lon"):
+            if channel in streams:
+                streams[channel] = streams[channel] * SEMICIRCLES_TO_DEGREES
+
+        if "distance" not in streams and "lat" in streams and "lon" in streams:
+            streams["distance"] = cumulative_distance(streams["lat"], streams["lon"])
+
+        laps = [(t - start).total_seconds() for t in lap_starts or [] if t is not None]
+        if laps:
+            streams[LAP_STARTS] = np.array(laps, dtype=float)
+
+        return streams
+
+    def extract_fit(self, fit_source: Any) -> Optional[Streams]:
+        """Streams from a FIT file (path, bytes or fitparse.FitFile)."""
+        from fitparse import FitFile
+
+        fitfile = fit_source if isinstance(fit_source, FitFile) else FitFile(fit_source)
+        wanted = {"timestamp"} | {f for fields in FIT_RECORD_FIELDS.values() for f in fields}
+        records = []
+        for message in fitfile.get_messages("record"):
+            records.append(
+                {field.name: field.value for field in message if field.name in wanted}
+            )
+        lap_starts = [message.get_value("start_time") for message in fitfile.get_messages("lap")]
+        return self.from_records(records, lap_starts)
+
+    def extract_gpx(self, file_path: str) -> Optional[Streams]:
+        """Streams from a GPX track (distance derived from coordinates)."""
+        root = ET.parse(file_path).getroot()
+        ns = GPX_NS if root.tag.endswith("gpx") else {}
+        trkpts = root.findall(".//gpx:trkpt", ns) or root.findall(".//trkpt")
+
+        def find(element, *paths):
+            for path in paths:
+                try:
+                    found = element.find(path, ns)
+                except SyntaxError:
+                    continue
+                if found is not None:
+                    return found.text
+            return None
+
+        rows = []
+        for trkpt in trkpts:
+            timestamp = _parse_time(find(trkpt, "gpx:time", "time"))
+            if timestamp is None:
+                continue
+            rows.append((
+                timestamp,
+                _to_float(trkpt.get("lat")),
+                _to_float(trkpt.get("lon")),
+                _to_float(find(trkpt, "gpx:ele", "ele")),
+                _to_float(find(trkpt, ".//gpxtpx:hr", ".//gpx:hr", ".//hr")),
+                _to_float(find(trkpt, ".//gpxtpx:cad", ".//cad", ".//cadence")),
+            ))
+        if len(rows) < 2:
+            return None
+
+        start = rows[0][0]
+        columns = np.array([row[1:] for row in rows], dtype=float).T
+        streams: Streams = {
+            "time": np.array([(row[0] - start).total_seconds() for row in rows]),
+            "lat": columns[0],
+            "lon": columns[1],
+        }
+        for channel, column in zip(("altitude", "heart_rate", "cadence"), columns[2:]):
+            if not np.isnan(column).all():
+                streams[channel] = column
+        streams["distance"] = cumulative_distance(streams["lat"], streams["lon"])
+        return streams
+
+    def extract_tcx(self, file_path: str) -> Optional[Streams]:
+        """Streams from TCX trackpoints."""
+        root = ET.parse(file_path).getroot()
+        lap_starts = [
+            _parse_time(lap.get("StartTime")) for lap in root.iterfind(".//tcx:Lap", TCX_NS)
+        ]
+        rows = []
+        for point in root.iterfind(".//tcx:Trackpoint", TCX_NS):
+            time_elem = point.find("tcx:Time", TCX_NS)
+            timestamp = _parse_time(time_elem.text if time_elem is not None else None)
+            if timestamp is None:
+                continue
+
+            def value(path):
+                elem = point.find(path, TCX_NS)
+                return _to_float(elem.text if elem is not None else None)
+
+            rows.append((
+                timestamp,
+                value("tcx:DistanceMeters"),
+                value("tcx:HeartRateBpm/tcx:Value"),
+                value("tcx:Cadence"),
+                value("tcx:AltitudeMeters"),
+                value("tcx:Position/tcx:LatitudeDegrees"),
+                value("tcx:Position/tcx:LongitudeDegrees"),
+            ))
+        if len(rows) < 2:
+            return None
+
+        start = rows[0][0]
+        columns = np.array([row[1:] for row in rows], dtype=float).T
+        streams: Streams = {
+            "time": np.array([(row[0] - start).total_seconds() for row in rows])
+        }
+        names = ("distance", "heart_rate", "cadence", "altitude", "lat", "lon")
+        for channel, column in zip(names, columns):
+            if not np.isnan(column).all():
+                streams[channel] = column
+        if "distance" not in streams and "lat" in streams and "lon" in streams:
+            streams["distance"] = cumulative_distance(streams["lat"], streams["lon"])
+        laps = [(t - start).total_seconds() for t in lap_starts if t is not None]
+        if laps:
+            streams[LAP_STARTS] = np.array(laps, dtype=float)
+        return streams
+
+    def extract_from_file(self, file_path: str, filename: str) -> Optional[Streams]:
+        """
+        Streams from an uploaded workout file, by extension.
+
+        Returns None (and logs) when the file has no usable samples, so a
+        stream problem never blocks the workout upload itself.
+        """
+        ext = Path(filename).suffix.lower()
+        extractors = {".fit": self.extract_fit, ".gpx": self.extract_gpx, ".tcx": self.extract_tcx}
+        if ext not in extractors:
+            return None
+        try:
+            return extractors[ext](file_path)
+        except Exception as e:
+            logger.warning(f"[STREAMS] Could not extract streams from {filename}: {e}")
+            return None
+
+    # ===== Storage =====
+
+    def encode(self, streams: Streams) -> bytes:
+        """Compressed archive of the known channels (and lap starts)."""
+        arrays = {
+            name: np.asarray(streams[name], dtype=dtype)
+            for name, dtype in CHANNELS.items()
+            if name in streams
+        }
+        if LAP_STARTS in streams:
+            arrays[LAP_STARTS] = np.asarray(streams[LAP_STARTS], dtype=np.float32)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
+
+    def decode(self, data: bytes) -> Streams:
+        """Inverse of encode(); arrays are returned as float64."""
+        with np.load(io.BytesIO(data)) as archive:
+            return {name: archive[name].astype(float) for name in archive.files}
+
+    def save(self, db: Session, workout: models.Workout, streams: Streams) -> models.WorkoutStream:
+        """
+        Store (or replace) the workout's streams. Does not commit.
+
+        Replacing bumps the row's version (so cached chart responses are
+        revalidated) and drops its pyramid until it is rebuilt.
+
+        Args:
+            db: Database session
+            workout: Workout the samples belong to (must be flushed or added)
+            streams: Channel arrays, all of equal length
+
+        Returns:
+            The WorkoutStream row
+        """
+        channels: List[str] = [name for name in CHANNELS if name in streams]
+        row = workout.stream
+        if row is None:
+            row = models.WorkoutStream(version=1)
+        else:
+            row.version = (row.version or 0) + 1
+            row.pyramid = None
+        row.sample_count = len(streams["time"])
+        row.channels = channels
+        row.data = self.encode(streams)
+        workout.stream = row
+        return row
+
+    def load(self, db: Session, workout_id: int) -> Optional[Streams]:
+        """Stored streams for a workout, or None if it has none."""
+        row = (
+            db.query(models.WorkoutStream)
+            .filter(models.WorkoutStream.workout_id == workout_id)
+            .first()
+        )
+        return self.decode(row.data) if row is not None else None
+
+
+# Singleton
+workout_stream_service = WorkoutStreamService()
@@ -0,0 +1,197 @@
+"""
+zone_time_service.py - Persisted time in HR / pace / power zones per workout
+
+- compute(): seconds per zone for each channel of a workout's streams
+- apply(): stores the result in Workout.time_in_zones (called at ingest)
+- recompute_for_user(): bulk refresh of a user's history after their zones
+  change (hr_zones_calculator.auto_calculate_and_save_zones, Garmin sync)
+- sum_zone_times(): intensity distribution as a plain sum over workouts
+
+Workout.time_in_zones layout: {"heart_rate": {"1": 812.0, ...}, "pace": {...},
+"power": {...}}, seconds per zone number; channels without data are omitted.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.hr_zones_calculator import generate_hr_zones, time_in_zones_array
+from app.services.similar_workout_service import similar_workout_service
+from app.services.training_load_service import training_load_service
+from app.services.workout_stream_service import workout_stream_service
+
+logger = logging.getLogger(__name__)
+
+
+# Workouts whose streams are decoded per recompute batch (bounds memory)
+RECOMPUTE_CHUNK = 200
+
+# Pace zones as fractions of threshold speed (zone, name, lower, upper)
+PACE_ZONE_FRACTIONS = (
+    (1, "Recovery", 0.0, 0.78),
+    (2, "Endurance", 0.78, 0.88),
+    (3, "Tempo", 0.88, 0.95),
+    (4, "Threshold", 0.95, 1.02),
+    (5, "VO2 Max", 1.02, 2.0),
+)
+
+
+def generate_pace_zones(threshold_speed: float) -> List[Dict]:
+    """
+    5 pace zones expressed as speed (m/s) bounds.
+
+    Args:
+        threshold_speed: Threshold running speed in m/s
+
+    Returns:
+        Zone dicts with 'zone', 'name', 'min' and 'max' in m/s
+    """
+    return [
+        {
+            "zone": zone,
+            "name": name,
+            "min": round(threshold_speed * lower, 3),
+            "max": round(threshold_speed * upper, 3),
+        }
+        for zone, name, lower, upper in PACE_ZONE_FRACTIONS
+    ]
+
+
+def sum_zone_times(
+    workouts: Iterable[models.Workout], channel: str = "heart_rate"
+) -> Dict[str, float]:
+    """
+    Total seconds per zone across workouts for one channel.
+
+    Returns:
+        Zone number (as str) -> seconds; empty if no workout has zone data
+    """
+    totals: Dict[str, float] = {}
+    for workout in workouts:
+        for zone, seconds in ((workout.time_in_zones or {}).get(channel) or {}).items():
+            totals[zone] = totals.get(zone, 0.0) + seconds
+    return totals
+
+
+class ZoneTimeService:
+    """Computes and stores time in zone for workouts with streams."""
+
+    def zones_for(self, user: models.User) -> Dict[str, List[Dict]]:
+        """
+        Zone definitions per stream channel for a user.
+
+        HR zones come from the profile (or are generated from max HR), pace
+        zones from the threshold speed and power zones from the profile.
+        """
+        zones = {}
+        if user.hr_zones:
+            zones["heart_rate"] = user.hr_zones
+        elif user.max_heart_rate:
+            zones["heart_rate"] = generate_hr_zones(user.max_heart_rate)
+        zones["pace"] = generate_pace_zones(training_load_service.threshold_speed(user))
+        if user.power_zones:
+            zones["power"] = user.power_zones
+        return zones
+
+    def compute(
+        self,
+        streams: Dict[str, np.ndarray],
+        zones: Dict[str, List[Dict]],
+        sport_type: Optional[str] = None,
+    ) -> Optional[Dict[str, Dict[str, float]]]:
+        """
+        Seconds per zone for every channel that has samples and zones.
+
+        Pace zones only apply to runs; speed is derived from distance when the
+        stream has no speed channel.
+
+        Returns:
+            time_in_zones dict, or None without usable samples
+        """
+        if not streams or "time" not in streams:
+            return None
+
+        values = {"heart_rate": streams.get("heart_rate"), "power": streams.get("power")}
+        if "run" in (sport_type or "").lower():
+            speed = streams.get("speed")
+            if speed is None and "distance" in streams:
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    speed = np.concatenate(
+                        ([np.nan], np.diff(streams["distance"]) / np.diff(streams["time"]))
+                    )
+            values["pace"] = speed
+
+        result = {}
+        for channel, samples in values.items():
+            if samples is None or channel not in zones or np.isnan(samples).all():
+                continue
+            seconds = time_in_zones_array(streams["time"], samples, zones[channel])
+            result[channel] = {str(zone): round(total, 1) for zone, total in seconds.items()}
+        return result or None
+
+    def apply(
+        self,
+        db: Session,
+        workout: models.Workout,
+        streams: Dict[str, np.ndarray],
+        user: Optional[models.User] = None,
+    ) -> None:
+        """Store time in zone for a new workout. Does not commit."""
+        user = user or db.get(models.User, workout.user_id)
+        if user is None:
+            return
+        workout.time_in_zones = self.compute(streams, self.zones_for(user), workout.sport_type)
+
+    def recompute_for_user(self, db: Session, user: models.User) -> int:
+        """
+        Recompute time in zone for every workout of the user with streams.
+
+        Streams are read in id order, RECOMPUTE_CHUNK workouts at a time,
+        and each chunk is written back with one bulk UPDATE, so only one
+        chunk of stream blobs is in memory. Does not commit.
+
+        Returns:
+            Number of workouts updated
+        """
+        zones = self.zones_for(user)
+        db.flush()
+        updated = 0
+        last_id = 0
+        while True:
+            rows = (
+                db.query(models.Workout.id, models.Workout.sport_type, models.WorkoutStream.data)
+                .join(models.WorkoutStream, models.WorkoutStream.workout_id == models.Workout.id)
+                .filter(models.Workout.user_id == user.id, models.Workout.id > last_id)
+                .order_by(models.Workout.id)
+                .limit(RECOMPUTE_CHUNK)
+                .all()
+            )
+            if not rows:
+                break
+            db.execute(
+                update(models.Workout),
+                [
+                    {
+                        "id": workout_id,
+                        "time_in_zones": self.compute(
+                            workout_stream_service.decode(data), zones, sport_type
+                        ),
+                    }
+                    for workout_id, sport_type, data in rows
+                ],
+            )
+            updated += len(rows)
+            last_id = rows[-1][0]
+
+        if updated:
+            # Zone shares are similarity features
+            similar_workout_service.invalidate(user.id)
+            logger.info(f"[ZONES] Recomputed time in zone for {updated} workouts of user {user.id}")
+        return updated
+
+
+# Singleton
+zone_time_service = ZoneTimeService()
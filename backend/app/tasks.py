@@ -11,9 +11,15 @@ from .database import SessionLocal
 from .models import User
 from . import models
 from .services.garmin_health_service import GarminHealthService
+from .services.daily_snapshot_service import daily_snapshot_service
+from .services.plan_job_service import MAX_ATTEMPTS, plan_job_service
+from .services.training_plan_service import get_training_plan_service
 
 logger = logging.getLogger(__name__)
 
+# Users loaded per batch by the snapshot job
+SNAPSHOT_BATCH_SIZE = 100
+
 
 @celery_app.task(name="app.tasks.sync_all_users_garmin_health")
 def sync_all_users_garmin_health():
@@ -151,3 +157,126 @@ def sync_single_user_garmin_health(user_id: int, days: int = 7):
         raise
     finally:
         db.close()
+
+
+@celery_app.task(name="app.tasks.compute_daily_snapshots")
+def compute_daily_snapshots(batch_size: int = SNAPSHOT_BATCH_SIZE):
+    """
+    Compute today's readiness / overtraining / HRV snapshot for all active users.
+    Runs nightly via Celery Beat. Users are processed in id-ordered batches;
+    users without any snapshot history are backfilled first.
+
+    Returns:
+        dict: Summary of the run (success/failure counts)
+    """
+    logger.info("Starting daily snapshot computation for all active users")
+
+    db: Session = SessionLocal()
+    success_count = 0
+    error_count = 0
+    backfilled_count = 0
+    last_id = 0
+
+    try:
+        while True:
+            users = (
+                db.query(User)
+                .filter(User.is_active.is_(True), User.id > last_id)
+                .order_by(User.id.asc())
+                .limit(batch_size)
+                .all()
+            )
+            if not users:
+                break
+
+            for user in users:
+                try:
+                    if not daily_snapshot_service.has_history(db, user.id):
+                        daily_snapshot_service.backfill(db, user.id)
+                        backfilled_count += 1
+
+                    daily_snapshot_service.refresh(db, user)
+                    success_count += 1
+
+                except Exception as e:
+                    logger.error(f"Error computing snapshot for user {user.id}: {str(e)}")
+                    error_count += 1
+                    db.rollback()
+                    continue
+
+            last_id = users[-1].id
+            # Keep the identity map bounded across batches
+            db.expunge_all()
+
+        summary = {
+            "status": "completed",
+            "timestamp": datetime.utcnow().isoformat(),
+            "successful": success_count,
+            "errors": error_count,
+            "backfilled": backfilled_count,
+        }
+
+        logger.info(f"Daily snapshot computation completed: {summary}")
+        return summary
+
+    except Exception as e:
+        logger.error(f"Fatal error in compute_daily_snapshots: {str(e)}")
+        return {
+            "status": "failed",
+            "error": str(e),
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.backfill_user_snapshots")
+def backfill_user_snapshots(user_id: int, days: int = 365):
+    """
+    Backfill historical readiness / HRV snapshots for a specific user.
+
+    Args:
+        user_id: Database ID of the user
+        days: Number of past days to backfill (default: 365)
+
+    Returns:
+        dict: Number of snapshot rows written
+    """
+    logger.info(f"Starting snapshot backfill for user {user_id}, days={days}")
+
+    db: Session = SessionLocal()
+
+    try:
+        written = daily_snapshot_service.backfill(db, user_id, days)
+        return {"snapshots_written": written}
+    except Exception as e:
+        logger.error(f"Error backfilling snapshots for user {user_id}: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(
+    name="app.tasks.generate_training_plan_job",
+    bind=True,
+    max_retries=MAX_ATTEMPTS,
+    ignore_result=True,  # state lives in the PlanGenerationJob row
+)
+def generate_training_plan_job(self, job_id: int):
+    """
+    Generate the AI training plan of a PlanGenerationJob.
+    Queued by POST /training-plans/generate; retried later while the LLM
+    is overloaded.
+
+    Args:
+        job_id: PlanGenerationJob id
+    """
+    db: Session = SessionLocal()
+    try:
+        retry_in = plan_job_service.run(db, job_id, get_training_plan_service())
+    finally:
+        db.close()
+
+    if retry_in is not None:
+        raise self.retry(countdown=retry_in)
@@ -0,0 +1,39 @@
+"""
+backfill_event_coordinates.py - Fill in coordinates of stored events
+Run: python backfill_event_coordinates.py
+
+Resolves latitude / longitude / geo_cell from the bundled gazetteer for
+every event that has none (after migration 018, or after adding towns to
+app/data/gazetteer_es.csv). Safe to re-run.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.database import SessionLocal
+from app.services.event_geo_service import event_geo_service
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def backfill_event_coordinates():
+    """Resolve missing event coordinates and report how many were filled."""
+    db = SessionLocal()
+    try:
+        filled = event_geo_service.backfill(db)
+        logger.info(f"✅ {filled} events placed on the map")
+    except Exception as e:
+        logger.error(f"❌ Error backfilling event coordinates: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    backfill_event_coordinates()
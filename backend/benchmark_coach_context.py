@@ -0,0 +1,154 @@
+"""
+benchmark_coach_context.py - Coach chat prompt size and latency, before/after
+Run: python benchmark_coach_context.py [--turns 30] [--workouts 10] [--live]
+
+Builds a synthetic athlete in an in-memory database and compares:
+- legacy: full build_athlete_context text + last 10 messages verbatim
+- budgeted: coach_context_service (compact sections, retrieved history,
+  rolling summary)
+
+Reports estimated prompt tokens and prompt assembly time. With --live (and
+GROQ_API_KEY set) it also sends both prompts to Groq and reports the real
+prompt tokens and end-to-end latency.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.database import Base
+from app.services.coach_context_service import coach_context_service, estimate_tokens
+from app.services.coach_service import CHAT_INSTRUCTIONS, CoachService
+
+MESSAGE = "¿Cómo debería plantear el rodaje largo del domingo?"
+
+
+def build_fixture(turns: int, workouts: int):
+    """Session with one athlete, workouts and a chat history."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+
+    user = models.User(
+        name="Benchmark", email="bench@example.com", hashed_password="x",
+        max_heart_rate=188, running_level="intermediate",
+        goals=[{"name": "Maratón de Valencia", "target_value": "3:30", "deadline": "2026-12-06"}],
+        injuries=[{"injury_type": "fascitis plantar", "description": "leve", "recovered": False}],
+        preferences={"time_of_day": "mañana", "terrain_preference": "asfalto"},
+    )
+    db.add(user)
+    db.commit()
+
+    start = datetime(2026, 9, 1, 7)
+    for i in range(workouts):
+        db.add(models.Workout(
+            user_id=user.id, sport_type="running", start_time=start - timedelta(days=i),
+            duration_seconds=3000 + 60 * i, distance_meters=9000 + 150 * i,
+            avg_pace=330 + i, avg_heart_rate=140 + i % 15,
+        ))
+    for i in range(turns):
+        db.add(models.ChatMessage(
+            user_id=user.id, role="user", created_at=start + timedelta(hours=i),
+            content=f"Ayer hice {8 + i % 5} km y noté cargado el gemelo. ¿Ajusto la semana?",
+        ))
+        db.add(models.ChatMessage(
+            user_id=user.id, role="assistant", created_at=start + timedelta(hours=i, minutes=1),
+            content="Buena pregunta. " + "Reduce el volumen un 10%, mantén los rodajes en Z2 "
+            "y añade movilidad de tobillo tras cada sesión. " * 6,
+        ))
+    db.commit()
+    return db, user
+
+
+def legacy_messages(coach: CoachService, db, user, workouts):
+    """Prompt as chat_with_coach built it before the context budget."""
+    history = list(reversed(
+        db.query(models.ChatMessage)
+        .filter(models.ChatMessage.user_id == user.id)
+        .order_by(models.ChatMessage.created_at.desc())
+        .limit(20)
+        .all()
+    ))
+    context = coach.build_athlete_context(user, workouts, user.goals or [])
+    system = f"""{coach.get_coaching_style_prompt("balanced")}
+
+CONTEXTO DEL ATLETA:
+{context}
+
+{CHAT_INSTRUCTIONS}"""
+    messages = [{"role": "system", "content": system}]
+    messages += [{"role": m.role, "content": m.content} for m in history[-10:]]
+    messages.append({"role": "user", "content": MESSAGE})
+    return messages
+
+
+def budgeted_messages(coach: CoachService, db, user, workouts):
+    messages, _ = coach_context_service.assemble_chat(
+        db, user,
+        system_prompt=coach.get_coaching_style_prompt("balanced"),
+        profile_lines=coach.build_compact_profile(user),
+        training_lines=coach.build_compact_training(workouts),
+        user_message=MESSAGE,
+        instructions=CHAT_INSTRUCTIONS,
+    )
+    db.commit()  # as the chat endpoint does; later turns reuse the summary
+    return messages
+
+
+def prompt_tokens(messages) -> int:
+    return sum(estimate_tokens(m["content"]) + 4 for m in messages)
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--turns", type=int, default=30, help="past user/coach turns")
+    parser.add_argument("--workouts", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--live", action="store_true", help="call Groq (needs GROQ_API_KEY)")
+    args = parser.parse_args()
+
+    db, user = build_fixture(args.turns, args.workouts)
+    workouts = (
+        db.query(models.Workout).order_by(models.Workout.start_time.desc()).limit(10).all()
+    )
+    # Prompt building needs no API client
+    coach = CoachService() if args.live else object.__new__(CoachService)
+
+    print(f"{'variant':<10} {'est. tokens':>12} {'assembly ms':>12} {'real tokens':>12} {'e2e ms':>10}")
+    for name, build in (("legacy", legacy_messages), ("budgeted", budgeted_messages)):
+        messages, assembly_ms = timed(lambda: build(coach, db, user, workouts), args.repeat)
+        real, e2e = "-", "-"
+        if args.live:
+            start = time.perf_counter()
+            completion = coach.client.chat.completions.create(
+                model=coach.model, messages=messages, temperature=0.8, max_tokens=500
+            )
+            e2e = f"{(time.perf_counter() - start) * 1000 + assembly_ms:.0f}"
+            real = completion.usage.prompt_tokens
+        print(f"{name:<10} {prompt_tokens(messages):>12} {assembly_ms:>12.2f} {real:>12} {e2e:>10}")
+
+
+if __name__ == "__main__":
+    main()
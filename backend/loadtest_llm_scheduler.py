@@ -0,0 +1,198 @@
+"""
+loadtest_llm_scheduler.py - Burst of coach LLM requests against a fake Groq server
+Run: python loadtest_llm_scheduler.py [--users 20] [--spread 3] [--minute 6] [--seed 1]
+
+Starts a local HTTP server that speaks the Groq chat completions API and
+enforces Groq-like limits (per-model concurrency and tokens per minute,
+429 + Retry-After when exceeded; latency grows with output tokens). Bursty
+chat, analysis and plan traffic from many users (random arrivals over
+--spread minutes) is then sent:
+- direct: straight to the client, as CoachService did before the scheduler
+- scheduled: through LLMScheduler (priorities, caps, TPM budget, fallback)
+
+Time is compressed: one "minute" of rate limiting lasts --minute seconds
+and latencies are scaled by the same factor.
+"""
+
+import argparse
+import json
+import logging
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from groq import Groq
+
+from app.core.config import settings
+from app.services.llm_scheduler_service import LLMOverloadedError, LLMScheduler, Priority
+
+PRIMARY, FALLBACK = settings.llm_model, settings.llm_fallback_model
+
+# Fake Groq limits and speed per model
+SERVER_LIMITS = {
+    PRIMARY: {"concurrency": 6, "tpm": settings.llm_tokens_per_minute, "tokens_per_s": 250},
+    FALLBACK: {"concurrency": 12, "tpm": settings.llm_fallback_tokens_per_minute, "tokens_per_s": 750},
+}
+
+# Request mix: (priority, max_tokens, prompt chars, share)
+REQUEST_MIX = (
+    (Priority.INTERACTIVE, 500, 3500, 0.6),
+    (Priority.STANDARD, 800, 5000, 0.25),
+    (Priority.BACKGROUND, 3000, 6000, 0.15),
+)
+
+
+class FakeGroq:
+    """Rate-limited chat completions endpoint."""
+
+    def __init__(self, minute: float):
+        self.minute = minute
+        self.scale = minute / 60
+        self.lock = threading.Lock()
+        self.active = {model: 0 for model in SERVER_LIMITS}
+        self.usage = {model: [] for model in SERVER_LIMITS}
+
+    def handle(self, body):
+        model = body["model"]
+        limits = SERVER_LIMITS[model]
+        prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+        completion_tokens = body.get("max_tokens", 500) // 2
+        total = prompt_tokens + completion_tokens
+        with self.lock:
+            now = time.monotonic()
+            window = [(t, n) for t, n in self.usage[model] if t > now - self.minute]
+            self.usage[model] = window
+            used = sum(n for _, n in window)
+            if self.active[model] >= limits["concurrency"] or used + total > limits["tpm"]:
+                retry_after = window[0][0] + self.minute - now if window else self.scale
+                return 429, {"error": {"message": "Rate limit reached", "type": "tokens"}}, max(retry_after, 0.1)
+            self.active[model] += 1
+            self.usage[model].append((now, total))
+        try:
+            time.sleep((0.2 + completion_tokens / limits["tokens_per_s"]) * self.scale)
+        finally:
+            with self.lock:
+                self.active[model] -= 1
+        return 200, {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "ok " * completion_tokens}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": total},
+        }, None
+
+    def serve(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status, payload, retry_after = fake.handle(body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if retry_after is not None:
+                    self.send_header("retry-after", f"{retry_after:.2f}")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def build_requests(users: int, spread: float, seed: int):
+    """(arrival in minutes, user_id, priority, max_tokens, prompt) per request."""
+    rng = random.Random(seed)
+    requests = []
+    for user_id in range(1, users + 1):
+        for _ in range(rng.randint(1, 3)):
+            priority, max_tokens, chars, _ = rng.choices(REQUEST_MIX, weights=[m[3] for m in REQUEST_MIX])[0]
+            requests.append((rng.uniform(0, spread), user_id, priority, max_tokens, "x" * chars))
+    return sorted(requests)
+
+
+def run(mode: str, client: Groq, requests, minute: float):
+    scale = minute / 60
+    scheduler = LLMScheduler(
+        max_concurrency=settings.llm_max_concurrency,
+        max_per_user=settings.llm_max_concurrency_per_user,
+        tokens_per_minute={PRIMARY: settings.llm_tokens_per_minute, FALLBACK: settings.llm_fallback_tokens_per_minute},
+        fallback_model=FALLBACK,
+        fallback_queue_depth=settings.llm_fallback_queue_depth,
+        queue_timeout=settings.llm_queue_timeout_seconds * scale,
+        window_seconds=minute,
+    )
+
+    t0 = time.perf_counter()
+
+    def one(request):
+        arrival, user_id, priority, max_tokens, prompt = request
+        time.sleep(max(0.0, t0 + arrival * minute - time.perf_counter()))
+        messages = [{"role": "user", "content": prompt}]
+        start = time.perf_counter()
+        try:
+            if mode == "direct":
+                completion = client.chat.completions.create(model=PRIMARY, messages=messages, max_tokens=max_tokens)
+            else:
+                completion = scheduler.complete(client, user_id, priority, PRIMARY, messages, max_tokens=max_tokens)
+            outcome = "fallback" if completion.model == FALLBACK else "ok"
+        except LLMOverloadedError as e:
+            outcome = "upstream_429" if e.reason == "upstream rate limit" else "rejected_429"
+        except Exception as e:
+            outcome = "upstream_429" if getattr(e, "status_code", None) == 429 else "error"
+        # Report latency in real-API seconds
+        return priority, outcome, (time.perf_counter() - start) / scale
+
+    with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+        results = list(pool.map(one, requests))
+
+    print(f"\n{mode}: {len(requests)} requests")
+    print(f"{'class':<12} {'ok':>4} {'fallback':>9} {'429 ours':>9} {'429 groq':>9} {'p50 s':>7} {'p95 s':>7}")
+    for priority in Priority:
+        rows = [r for r in results if r[0] == priority]
+        if not rows:
+            continue
+        count = {o: sum(r[1] == o for r in rows) for o in ("ok", "fallback", "rejected_429", "upstream_429")}
+        served = sorted(r[2] for r in rows if r[1] in ("ok", "fallback")) or [0.0]
+        p95 = served[min(len(served) - 1, int(0.95 * len(served)))]
+        print(
+            f"{priority.name.lower():<12} {count['ok']:>4} {count['fallback']:>9} "
+            f"{count['rejected_429']:>9} {count['upstream_429']:>9} "
+            f"{statistics.median(served):>7.1f} {p95:>7.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--spread", type=float, default=3.0, help="arrival window (simulated minutes)")
+    parser.add_argument("--minute", type=float, default=6.0, help="seconds per simulated minute")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # one rejection warning per request otherwise
+
+    requests = build_requests(args.users, args.spread, args.seed)
+    for mode in ("direct", "scheduled"):
+        server = FakeGroq(args.minute).serve()
+        client = Groq(api_key="fake", base_url=f"http://127.0.0.1:{server.server_port}", max_retries=0)
+        run(mode, client, requests, args.minute)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
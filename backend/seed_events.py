@@ -11,7 +11,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from app.database import SessionLocal
 from app.models import Event
-from datetime import datetime
+from app.services.event_import_service import event_import_service
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -650,43 +650,17 @@ EVENTS_DATA = [
 
 
 def seed_events():
-    """Seed events to database."""
+    """Seed events to database (upsert on external_id, safe to re-run)."""
     db = SessionLocal()
 
     try:
-        # Check if events already exist
-        existing_count = db.query(Event).count()
-        if existing_count > 0:
-            logger.info(f"⚠️  Database already has {existing_count} events.")
-            response = input("Delete all and reseed? (yes/no): ")
-            if response.lower() != "yes":
-                logger.info("Aborted.")
-                return
-
-            # Delete all existing events
-            db.query(Event).delete()
-            db.commit()
-            logger.info("✅ Deleted all existing events")
-
-        # Insert new events
-        for event_data in EVENTS_DATA:
-            event = Event(
-                external_id=event_data["external_id"],
-                name=event_data["name"],
-                location=event_data["location"],
-                region=event_data.get("region"),
-                country=event_data["country"],
-                date=datetime.strptime(event_data["date"], "%Y-%m-%d").date(),
-                distance_km=event_data["distance_km"],
-                elevation_m=event_data.get("elevation_m"),
-                participants_estimate=event_data.get("participants_estimate"),
-                source=event_data["source"],
-                verified=True,
-            )
-            db.add(event)
-
-        db.commit()
-        logger.info(f"✅ Successfully seeded {len(EVENTS_DATA)} events!")
+        report = event_import_service.import_rows(db, EVENTS_DATA, verified=True)
+        logger.info(
+            f"✅ Seeded events: {report['inserted']} inserted, {report['updated']} updated, "
+            f"{report['unchanged']} unchanged, {report['skipped']} skipped"
+        )
+        for error in report["errors"]:
+            logger.warning(f"⚠️  Row {error['row']} ({error['external_id']}): {error['error']}")
 
         # Show summary
         marathons = db.query(Event).filter(Event.distance_km >= 42).count()
@@ -3,6 +3,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
+from app import crud, models, schemas
 from app.database import Base
 from app.main import app
 from fastapi.testclient import TestClient
@@ -89,3 +90,42 @@ def another_registered_user(test_client: TestClient, another_user_data: dict):
     response = test_client.post("/api/v1/auth/register", json=another_user_data)
     assert response.status_code == 201
     return response.json()
+
+
+# ============================================================================
+# FIXTURES - Atleta y entrenamientos para tests de servicios
+# ============================================================================
+
+@pytest.fixture
+def user(test_db: Session) -> models.User:
+    """Usuario persistido directamente en la BD (sin pasar por la API).
+
+    Los tests que necesitan un perfil concreto (FC máxima, objetivos...)
+    redefinen `user` pidiendo este mismo fixture y ajustando sus campos.
+    """
+    user = models.User(name="Runner", email="runner@example.com", hashed_password="x")
+    test_db.add(user)
+    test_db.commit()
+    return user
+
+
+@pytest.fixture
+def make_workout(test_db: Session, user: models.User):
+    """Factory de entrenamientos de `user` creados con crud.create_workout.
+
+    make_workout(start_time, km, seconds, streams=None, owner=None, **campos)
+    crea una carrera (sport_type="running" salvo que se indique otro) de
+    `km` kilómetros y `seconds` segundos; los campos extra van a
+    schemas.WorkoutCreate y `owner` cambia el usuario propietario.
+    """
+    def make(start_time, km, seconds, streams=None, owner=None, **fields):
+        fields.setdefault("sport_type", "running")
+        workout_data = schemas.WorkoutCreate(
+            start_time=start_time,
+            duration_seconds=int(round(seconds)),
+            distance_meters=km * 1000.0,
+            **fields,
+        )
+        return crud.create_workout(test_db, (owner or user).id, workout_data, streams=streams)
+
+    return make
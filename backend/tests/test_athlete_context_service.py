@@ -0,0 +1,98 @@
+"""
+Tests for cached athlete-context snapshots (athlete_context_service).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.services.athlete_context_service import AthleteContextService, training_stats
+from app.services.coach_service import CoachService
+
+
+@pytest.fixture
+def user(user, test_db):
+    """Runner with a max HR and one goal."""
+    user.max_heart_rate = 185
+    user.goals = [{"name": "10K sub 45", "target_value": "44:59"}]
+    test_db.commit()
+    return user
+
+
+@pytest.fixture
+def formatter():
+    """CoachService used only for formatting (no Groq client)."""
+    return object.__new__(CoachService)
+
+
+@pytest.fixture
+def run(make_workout):
+    """Run at 5:30/km, `day` days after 1 Sep 2026."""
+    def make(day, km=10.0):
+        start = datetime(2026, 9, 1, 7) + timedelta(days=day)
+        return make_workout(start, km, km * 330, avg_heart_rate=150, avg_pace=330)
+    return make
+
+
+class TestAthleteContextService:
+    """Lazy rebuild on version change."""
+
+    @pytest.fixture
+    def service(self):
+        return AthleteContextService()
+
+    def test_snapshot_reused_until_data_changes(self, service, test_db, user, formatter, run):
+        # Given a snapshot built from two workouts
+        run(0)
+        run(1)
+        first = service.get(test_db, user, formatter)
+        built_at = first.built_at
+
+        # When the context is read again without changes
+        again = service.get(test_db, user, formatter)
+
+        # Then the stored snapshot is served as is
+        assert again.id == first.id
+        assert again.built_at == built_at
+        assert again.training_stats["workout_count"] == 2
+        assert "10K sub 45" in again.context
+
+    def test_workout_insert_triggers_rebuild(self, service, test_db, user, formatter, run):
+        # Given a snapshot built before a new workout is stored
+        run(0)
+        version = service.get(test_db, user, formatter).version
+
+        # When a workout is ingested
+        run(1, km=21.1)
+        snapshot = service.get(test_db, user, formatter)
+
+        # Then the snapshot is rebuilt with it
+        assert snapshot.version > version
+        assert snapshot.training_stats["workout_count"] == 2
+        assert any("21.1km" in line for line in snapshot.training_lines)
+
+    def test_profile_change_after_invalidate(self, service, test_db, user, formatter):
+        # Given a current snapshot
+        service.get(test_db, user, formatter)
+
+        # When the goals change and the snapshot is invalidated
+        user.goals = [{"name": "Maratón sub 3:30", "target_value": "3:29:59"}]
+        service.invalidate(test_db, user.id)
+        test_db.commit()
+        snapshot = service.get(test_db, user, formatter)
+
+        # Then the new goal is in the context and the old one is gone
+        assert "Maratón sub 3:30" in snapshot.context
+        assert "10K sub 45" not in snapshot.context
+        assert snapshot.version == user.context_version
+
+    def test_weekly_km_counts_same_week_number_of_different_years(self):
+        # Given two runs in ISO week 1 of consecutive years
+        runs = [
+            models.Workout(start_time=datetime(2026, 1, 1, 7), distance_meters=10000),
+            models.Workout(start_time=datetime(2025, 1, 1, 7), distance_meters=10000),
+        ]
+
+        # Then they count as two weeks
+        assert training_stats(runs)["weekly_km"] == 10.0
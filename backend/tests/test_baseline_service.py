@@ -0,0 +1,85 @@
+"""
+Tests for incremental rolling baselines (baseline_service).
+"""
+
+import statistics
+from datetime import date, timedelta
+
+import pytest
+
+from app import models
+from app.services.baseline_service import BaselineService
+
+
+def _add_metric(db, user, day, hrv=None, rhr=None):
+    metric = models.HealthMetric(user_id=user.id, date=day, hrv_ms=hrv, resting_hr_bpm=rhr)
+    db.add(metric)
+    return metric
+
+
+class TestBaselineService:
+    """Incremental updates must match a from-scratch computation."""
+
+    @pytest.fixture
+    def service(self):
+        return BaselineService()
+
+    def test_incremental_matches_rebuild(self, service, test_db, user):
+        # Given 90 days of HRV inserted one day at a time
+        start = date(2026, 1, 1)
+        for i in range(90):
+            metric = _add_metric(test_db, user, start + timedelta(days=i), hrv=50 + (i % 9))
+            service.update_for_metrics(test_db, user.id, [metric])
+        test_db.commit()
+        incremental = service.get_baseline(test_db, user.id, "hrv_ms")
+
+        # When rebuilding from history
+        service.rebuild(test_db, user.id, "hrv_ms")
+        rebuilt = service.get_baseline(test_db, user.id, "hrv_ms")
+
+        # Then both states agree
+        for key in ("ewma", "mean_7d", "std_7d", "mean_28d", "mean_60d", "count_60d"):
+            assert incremental[key] == pytest.approx(rebuilt[key])
+
+        last7 = [50 + (i % 9) for i in range(83, 90)]
+        before = [50 + (i % 9) for i in range(30, 83)]
+        assert incremental["mean_7d"] == pytest.approx(statistics.fmean(last7))
+        assert incremental["mean_60d"] == pytest.approx(statistics.fmean(before))
+        assert incremental["count_60d"] == 53
+
+    def test_update_inside_window_replays_ewma(self, service, test_db, user):
+        # Given 10 days of data
+        start = date(2026, 3, 1)
+        metrics = [
+            _add_metric(test_db, user, start + timedelta(days=i), hrv=60) for i in range(10)
+        ]
+        service.update_for_metrics(test_db, user.id, metrics)
+
+        # When a past day inside the window is corrected
+        metrics[5].hrv_ms = 30
+        service.update_for_metrics(test_db, user.id, [metrics[5]])
+        updated = service.get_baseline(test_db, user.id, "hrv_ms")
+
+        # Then stats equal a full rebuild
+        service.rebuild(test_db, user.id, "hrv_ms")
+        rebuilt = service.get_baseline(test_db, user.id, "hrv_ms")
+        assert updated["ewma"] == pytest.approx(rebuilt["ewma"])
+        assert updated["mean_28d"] == pytest.approx((9 * 60 + 30) / 10)
+
+    def test_row_baseline_written_and_stale_windows_age_out(self, service, test_db, user):
+        # Given a week of resting HR
+        start = date(2026, 5, 1)
+        metrics = [
+            _add_metric(test_db, user, start + timedelta(days=i), rhr=50 + i) for i in range(7)
+        ]
+        service.update_for_metrics(test_db, user.id, metrics)
+
+        # Then the newest row carries the 7-day baseline
+        assert metrics[-1].resting_hr_baseline_bpm == 53
+
+        # And reading 30 days later leaves the 7-day window empty
+        later = service.get_baseline(
+            test_db, user.id, "resting_hr_bpm", as_of=start + timedelta(days=36)
+        )
+        assert later["count_7d"] == 0
+        assert later["count_60d"] == 7
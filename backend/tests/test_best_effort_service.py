@@ -0,0 +1,129 @@
+"""
+Tests for the best-effort index (best_effort_service) and workout streams.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import crud
+from app.services.best_effort_service import BestEffortService, fastest_segments
+from app.services.race_predictor_service import RacePredictorService
+from app.services.workout_stream_service import workout_stream_service
+
+
+def _brute_force(time, distance, target):
+    """Reference: fastest window by checking every start sample."""
+    best = None
+    for i in range(len(distance)):
+        for j in range(i + 1, len(distance)):
+            if distance[j] - distance[i] >= target:
+                d0, d1 = distance[j - 1], distance[j]
+                crossing = time[j - 1] + (distance[i] + target - d0) / (d1 - d0) * (time[j] - time[j - 1])
+                elapsed = crossing - time[i]
+                best = elapsed if best is None else min(best, elapsed)
+                break
+    return best
+
+
+def _run_streams(seconds=3600, fast_from=1200, fast_to=1500):
+    """1 Hz run at 3 m/s with a 4.5 m/s surge."""
+    time = np.arange(seconds, dtype=float)
+    speed = np.where((time >= fast_from) & (time < fast_to), 4.5, 3.0)
+    distance = np.concatenate(([0.0], np.cumsum(speed[:-1])))
+    return {"time": time, "distance": distance}
+
+
+class TestFastestSegments:
+    """Vectorized sliding window."""
+
+    def test_matches_brute_force_on_noisy_stream(self):
+        # Given an irregularly sampled stream with variable speed
+        rng = np.random.default_rng(3)
+        time = np.cumsum(rng.uniform(0.5, 3.0, 600))
+        distance = np.cumsum(rng.uniform(0.5, 12.0, 600))
+
+        # When searching the fastest 400m and 1K
+        result = fastest_segments(time, distance, {"400m": 400.0, "1K": 1000.0})
+
+        # Then both equal the exhaustive search
+        assert result["400m"][0] == pytest.approx(_brute_force(time, distance, 400.0))
+        assert result["1K"][0] == pytest.approx(_brute_force(time, distance, 1000.0))
+
+    def test_finds_surge_and_skips_uncovered_distances(self):
+        # Given a ~11 km run with a 300 s surge
+        streams = _run_streams()
+
+        # When indexed
+        result = fastest_segments(streams["time"], streams["distance"])
+
+        # Then the 1K comes from the surge and longer distances are absent
+        elapsed, offset = result["1K"]
+        assert elapsed == pytest.approx(1000 / 4.5, abs=0.01)
+        assert 1200 <= offset <= 1300
+        assert "10K" in result and "Half Marathon" not in result
+
+    def test_ignores_gps_jumps(self):
+        # Given a stream with a 500 m teleport in one second
+        streams = _run_streams(seconds=600)
+        streams["distance"][300:] += 500
+
+        # When indexed
+        result = fastest_segments(streams["time"], streams["distance"], {"400m": 400.0})
+
+        # Then the implausible segment is not the best effort
+        assert result["400m"][0] > 400 / 11
+
+
+class TestBestEffortIndex:
+    """Ingest and predictions served from the index."""
+
+    @pytest.fixture
+    def service(self):
+        return BestEffortService()
+
+    def _create(self, make_workout, days_ago, streams):
+        return make_workout(
+            datetime.utcnow() - timedelta(days=days_ago),
+            float(streams["distance"][-1]) / 1000,
+            int(streams["time"][-1]),
+            streams=streams,
+        )
+
+    def test_ingest_stores_streams_and_efforts(self, service, test_db, user, make_workout):
+        # Given a workout created with streams
+        streams = _run_streams()
+        workout = self._create(make_workout, 1, streams)
+
+        # Then the streams round-trip and efforts are indexed
+        loaded = workout_stream_service.load(test_db, workout.id)
+        assert np.allclose(loaded["distance"], streams["distance"], atol=0.01)
+        names = {e.name for e in workout.best_efforts}
+        assert names == {"400m", "1K", "5K", "10K"}
+
+        # When the workout is deleted, its efforts go with it
+        crud.delete_workout(test_db, workout)
+        assert not service.has_efforts(test_db, user.id)
+
+    def test_personal_bests_and_prediction_base(self, service, test_db, user, make_workout):
+        # Given an old fast run and a recent slower one
+        self._create(make_workout, 200, _run_streams(fast_to=3000))
+        self._create(make_workout, 10, _run_streams())
+
+        # When reading all-time and recent bests
+        all_time = {e.name: e for e in service.personal_bests(test_db, user.id)}
+        recent = {
+            e.name: e
+            for e in service.personal_bests(
+                test_db, user.id, since=datetime.utcnow() - timedelta(days=90)
+            )
+        }
+
+        # Then all-time bests come from the old run and predictions from the recent one
+        assert all_time["5K"].elapsed_seconds < recent["5K"].elapsed_seconds
+        distance_m, minutes, achieved_at = RacePredictorService()._find_best_performance(
+            test_db, user.id
+        )
+        assert distance_m in (5000.0, 10000.0)
+        assert achieved_at == recent["5K"].achieved_at
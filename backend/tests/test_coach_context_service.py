@@ -0,0 +1,123 @@
+"""
+Tests for token-budgeted coach prompt assembly (coach_context_service).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.services.coach_context_service import (
+    CONTEXT_BUDGET,
+    MAX_UNSUMMARIZED,
+    CoachContextService,
+    estimate_tokens,
+)
+from app.services.retrieval_service import retrieval_service
+
+
+def _chat(db, user, turns, start=datetime(2026, 9, 1)):
+    """Store alternating user/coach messages with long coach replies."""
+    for i in range(turns):
+        db.add(models.ChatMessage(
+            user_id=user.id, role="user", content=f"Pregunta {i} sobre mi rodaje largo. ¿Voy bien?",
+            created_at=start + timedelta(hours=i),
+        ))
+        db.add(models.ChatMessage(
+            user_id=user.id, role="assistant",
+            content=f"Respuesta {i}: mantén el ritmo suave. " + "Detalle del plan semanal. " * 30,
+            created_at=start + timedelta(hours=i, minutes=1),
+        ))
+    db.commit()
+
+
+class TestCoachContextService:
+    """Budgeting and history compaction."""
+
+    @pytest.fixture
+    def service(self):
+        return CoachContextService()
+
+    def _assemble(self, service, db, user, message="¿Qué hago mañana?"):
+        return service.assemble_chat(
+            db, user,
+            system_prompt="Eres un coach.",
+            profile_lines=["Runner, nivel intermediate"],
+            training_lines=[f"{i:02d}/09 running 10.0km 55min" for i in range(200)],
+            user_message=message,
+        )
+
+    def test_prompt_stays_within_budget(self, service, test_db, user):
+        # Given a long conversation and a long training history
+        _chat(test_db, user, turns=20)
+
+        # When the prompt is assembled
+        messages, stats = self._assemble(service, test_db, user)
+
+        # Then every section respects its budget and history starts with a user turn
+        assert stats["sections"]["training"] <= CONTEXT_BUDGET["training"]
+        assert stats["prompt_tokens"] <= sum(CONTEXT_BUDGET.values()) + 100
+        assert messages[1]["role"] == "user"
+        assert messages[-1] == {"role": "user", "content": "¿Qué hago mañana?"}
+        assert stats["conversation_length"] == 40
+
+    def test_older_turns_are_folded_once(self, service, test_db, user):
+        # Given a conversation too long to send verbatim
+        _chat(test_db, user, turns=20)
+        messages, stats = self._assemble(service, test_db, user)
+        test_db.commit()
+
+        # Then older turns live in the capped summary, newest ones stay verbatim
+        summary = test_db.query(models.ChatSummary).filter_by(user_id=user.id).one()
+        assert "Atleta: Pregunta 15 sobre mi rodaje largo." in summary.content
+        assert "Pregunta 0 " not in summary.content
+        assert "CONVERSACIÓN ANTERIOR" in messages[0]["content"]
+        assert summary.message_count + stats["history_messages"] == 40
+        assert estimate_tokens(summary.content) <= CONTEXT_BUDGET["summary"]
+
+        # And the next turn only reads messages newer than the summary
+        folded_until = summary.last_message_id
+        _chat(test_db, user, turns=1, start=datetime(2026, 9, 3))
+        _, stats = self._assemble(service, test_db, user)
+        assert summary.last_message_id >= folded_until
+        assert stats["conversation_length"] == 42
+
+    def test_messages_beyond_the_read_limit_are_folded(self, service, test_db, user):
+        # Given more unsummarized messages than a turn reads
+        _chat(test_db, user, turns=MAX_UNSUMMARIZED)
+        first_id = test_db.query(models.ChatMessage).order_by(models.ChatMessage.id).first().id
+
+        # When the prompt is assembled
+        _, stats = self._assemble(service, test_db, user)
+        test_db.commit()
+
+        # Then the older overflow is folded too, none of it is skipped
+        summary = test_db.query(models.ChatSummary).filter_by(user_id=user.id).one()
+        assert stats["conversation_length"] == 2 * MAX_UNSUMMARIZED
+        assert summary.message_count + stats["history_messages"] == 2 * MAX_UNSUMMARIZED
+        unsummarized = test_db.query(models.ChatMessage).filter(
+            models.ChatMessage.id > summary.last_message_id
+        ).count()
+        assert unsummarized == stats["history_messages"]
+        assert summary.last_message_id >= first_id + MAX_UNSUMMARIZED
+
+        # And the next turn counts the whole conversation
+        _chat(test_db, user, turns=1, start=datetime(2026, 9, 5))
+        _, stats = self._assemble(service, test_db, user)
+        assert stats["conversation_length"] == 2 * MAX_UNSUMMARIZED + 2
+
+    def test_relevant_old_message_is_retrieved(self, service, test_db, user):
+        # Given an early message buried under a long conversation
+        retrieval_service.invalidate(user.id)
+        test_db.add(models.ChatMessage(
+            user_id=user.id, role="user", content="Mi objetivo es el maratón de Sevilla en febrero.",
+            created_at=datetime(2026, 8, 1),
+        ))
+        _chat(test_db, user, turns=20)
+
+        # When the new message asks about it
+        messages, stats = self._assemble(service, test_db, user, message="¿Llego bien a Sevilla?")
+
+        # Then it is brought back within the retrieval budget
+        assert "RELEVANTE DEL HISTORIAL:\n- 01/08/2026 Atleta: Mi objetivo es el maratón de Sevilla" in messages[0]["content"]
+        assert 0 < stats["sections"]["retrieved"] <= CONTEXT_BUDGET["retrieved"]
@@ -0,0 +1,133 @@
+"""
+Tests for precomputed daily snapshots (daily_snapshot_service).
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import models
+from app.services.athlete_context_service import athlete_context_service
+from app.services.coach_service import calculate_readiness_score
+from app.services.daily_snapshot_service import (
+    DailySnapshotService,
+    READINESS_COLUMNS,
+    readiness_scores,
+)
+
+
+def _random_metric(rng, day):
+    """HealthMetric with a random subset of readiness inputs populated."""
+    def maybe(value):
+        return value if rng.random() < 0.6 else None
+
+    return models.HealthMetric(
+        date=day,
+        body_battery=maybe(rng.randint(5, 100)),
+        readiness_score=maybe(rng.randint(5, 100)),
+        sleep_score=maybe(rng.randint(20, 100)),
+        sleep_duration_minutes=maybe(rng.randint(240, 600)),
+        hrv_ms=maybe(rng.uniform(20, 90)),
+        hrv_baseline_ms=maybe(rng.uniform(30, 70)),
+        resting_hr_bpm=maybe(rng.randint(40, 70)),
+        resting_hr_baseline_bpm=maybe(rng.randint(42, 60)),
+        stress_level=maybe(rng.randint(0, 100)),
+        energy_level=maybe(rng.randint(1, 5)),
+    )
+
+
+class TestReadinessVectorized:
+    """Vectorized readiness must match the per-day scalar implementation."""
+
+    def test_matches_scalar_score(self):
+        # Given many days with random missing inputs
+        rng = random.Random(7)
+        metrics = [_random_metric(rng, date(2026, 1, 1) + timedelta(days=i)) for i in range(500)]
+
+        # When scored column-wise
+        columns = {
+            name: np.array(
+                [np.nan if getattr(m, name) is None else getattr(m, name) for m in metrics],
+                dtype=float,
+            )
+            for name in READINESS_COLUMNS
+        }
+        result = readiness_scores(columns)
+
+        # Then every day matches calculate_readiness_score
+        for i, metric in enumerate(metrics):
+            expected = calculate_readiness_score(metric, None)
+            assert result["score"][i] == expected["readiness_score"]
+            assert result["confidence"][i] == expected["confidence"]
+
+
+class TestDailySnapshotService:
+    """Snapshot freshness and backfill."""
+
+    @pytest.fixture
+    def service(self):
+        return DailySnapshotService()
+
+    def test_get_current_recomputes_only_on_new_data(self, service, test_db, user):
+        # Given today's snapshot
+        first = service.get_current(test_db, user)
+        computed_at = first.computed_at
+
+        # When read again without new data
+        again = service.get_current(test_db, user)
+
+        # Then the stored snapshot is reused
+        assert again.id == first.id
+        assert again.computed_at == computed_at
+        assert again.readiness["readiness_score"] == 50
+
+        # When a health metric arrives
+        test_db.add(models.HealthMetric(
+            user_id=user.id, date=date.today(), body_battery=90, sleep_score=80,
+            created_at=datetime.utcnow() + timedelta(seconds=1),
+        ))
+        test_db.commit()
+        updated = service.get_current(test_db, user)
+
+        # Then the snapshot is recomputed in place
+        assert updated.id == first.id
+        assert updated.readiness_score == 85
+        assert set(updated.overtraining) == {"14", "30"}
+
+        # When only the profile changes (e.g. a new max HR)
+        version, computed_at = updated.data_version, updated.computed_at
+        user.max_heart_rate = 188
+        athlete_context_service.invalidate(test_db, user.id)
+        test_db.commit()
+        edited = service.get_current(test_db, user)
+
+        # Then it is recomputed as well
+        assert edited.id == first.id
+        assert edited.data_version != version
+        assert edited.computed_at > computed_at
+
+    def test_backfill_writes_history(self, service, test_db, user):
+        # Given 10 past days of health data
+        for i in range(1, 11):
+            test_db.add(models.HealthMetric(
+                user_id=user.id, date=date.today() - timedelta(days=i),
+                body_battery=60, hrv_ms=45.0, hrv_baseline_ms=50.0,
+            ))
+        test_db.commit()
+
+        # When backfilling
+        written = service.backfill(test_db, user.id, days=30)
+
+        # Then each day has readiness and HRV status
+        history = service.get_history(
+            test_db, user.id, date.today() - timedelta(days=30), date.today()
+        )
+        assert written == 10
+        assert len(history) == 10
+        expected = calculate_readiness_score(
+            models.HealthMetric(body_battery=60, hrv_ms=45.0, hrv_baseline_ms=50.0), user
+        )
+        assert history[0].readiness_score == expected["readiness_score"]
+        assert history[0].hrv_status == {"recovery_status": "good", "vs_baseline_percent": 90.0}
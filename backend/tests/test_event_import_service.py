@@ -0,0 +1,160 @@
+"""
+Tests for bulk race calendar import (event_import_service).
+"""
+
+import json
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from app import models
+from app.dependencies.auth import get_current_user
+from app.main import app
+from app.services import event_import_service as module
+from app.services.event_import_service import EventImportService, parse_calendar
+from app.services.events_service import EventsService
+from app.services.race_autocomplete_service import RaceAutocompleteService
+
+SOON = (date.today() + timedelta(days=40)).isoformat()
+
+CSV = f"""external_id,name,location,region,date,distance_km,participants_estimate,verified
+mad10k,10K Villa de Madrid,Madrid,Madrid,{SOON},10,3000,true
+sev,Maratón de Sevilla,Sevilla,Andalucía,{SOON},42.195,,true
+bad,Sin distancia,Soria,,{SOON},,,true
+nodate,Sin fecha,Lugo,,,5,,true
+"""
+
+
+def events(db):
+    return {event.external_id: event for event in db.query(models.Event).all()}
+
+
+class TestEventImportService:
+    """Parsing, validation, upsert counts and index refresh."""
+
+    @pytest.fixture
+    def service(self):
+        return EventImportService()
+
+    def test_csv_import_reports_counts_and_errors(self, service, test_db):
+        # Given a CSV with two valid rows and two invalid ones
+        report = service.import_rows(test_db, parse_calendar(CSV.encode(), "csv"))
+
+        # Then valid rows are inserted and invalid ones reported by row number
+        assert (report["inserted"], report["updated"], report["skipped"]) == (2, 0, 2)
+        assert [(e["row"], e["external_id"]) for e in report["errors"]] == [(3, "bad"), (4, "nodate")]
+        assert "distance_km" in report["errors"][0]["error"]
+        stored = events(test_db)
+        assert stored["sev"].participants_estimate is None
+        assert stored["sev"].date == date.fromisoformat(SOON)
+        assert stored["sev"].search_text == "maraton de sevilla | sevilla | andalucia"
+
+    def test_reimport_is_idempotent_and_updates_only_given_columns(self, service, test_db):
+        # Given an imported calendar with a description set later by hand
+        service.import_rows(test_db, parse_calendar(CSV.encode(), "csv"))
+        sev = events(test_db)["sev"]
+        sev.description = "Llana y rápida"
+        test_db.commit()
+
+        # When the same file is imported again
+        again = service.import_rows(test_db, parse_calendar(CSV.encode(), "csv"))
+
+        # Then nothing changes
+        assert (again["inserted"], again["updated"], again["unchanged"]) == (0, 0, 2)
+
+        # When a JSON calendar renames one race (without a description)
+        rows = [{"external_id": "sev", "name": "Zurich Maratón de Sevilla", "location": "Sevilla",
+                 "date": SOON, "distance_km": 42.195}]
+        report = service.import_rows(test_db, parse_calendar(json.dumps({"events": rows}).encode(), "json"))
+
+        # Then only the given columns and the search columns are updated
+        assert (report["inserted"], report["updated"]) == (0, 1)
+        test_db.expire_all()
+        sev = events(test_db)["sev"]
+        assert sev.name == "Zurich Maratón de Sevilla"
+        assert sev.description == "Llana y rápida"
+        assert sev.region == "Andalucía" and sev.verified is True
+        assert sev.search_text.startswith("zurich maraton de sevilla |")
+
+    def test_duplicate_ids_keep_the_last_row(self, service, test_db):
+        # Given a file listing the same race twice
+        rows = [
+            {"external_id": "x", "name": "Primera", "location": "Ávila", "date": SOON, "distance_km": 10},
+            {"external_id": "x", "name": "Segunda", "location": "Ávila", "date": SOON, "distance_km": 10},
+        ]
+        report = service.import_rows(test_db, rows)
+
+        # Then the later row wins and the earlier is skipped
+        assert (report["inserted"], report["skipped"]) == (1, 1)
+        assert report["errors"][0]["row"] == 1
+        assert events(test_db)["x"].name == "Segunda"
+
+    def test_search_and_autocomplete_see_imported_races(self, service, test_db, monkeypatch):
+        # Given a loaded autocomplete index
+        autocomplete = RaceAutocompleteService()
+        monkeypatch.setattr(module, "race_autocomplete_service", autocomplete)
+        autocomplete.load(test_db)
+
+        # When races are imported (core statements, no ORM events)
+        service.import_rows(test_db, parse_calendar(CSV.encode(), "csv"))
+
+        # Then the text index and the autocomplete index include them
+        assert [r["id"] for r in EventsService(test_db).search_races(query="maraton de sev")] == ["sev"]
+        assert [r["id"] for r in autocomplete.suggest(test_db, "sevil")] == ["sev"]
+
+    def test_large_calendar_in_batches(self, service, test_db, monkeypatch):
+        # Given a 5,000-race calendar and a counter on executed statements
+        monkeypatch.setattr(module, "BATCH_SIZE", 1000)
+        rows = [
+            {"external_id": f"r{i}", "name": f"Carrera {i}", "location": f"Pueblo {i % 700}",
+             "date": SOON, "distance_km": 10, "verified": "true"}
+            for i in range(5000)
+        ]
+        statements = []
+        original = test_db.execute
+
+        def counted(statement, *args, **kwargs):
+            statements.append(statement)
+            return original(statement, *args, **kwargs)
+
+        monkeypatch.setattr(test_db, "execute", counted)
+
+        # When it is imported
+        started = time.perf_counter()
+        report = service.import_rows(test_db, rows)
+        elapsed = time.perf_counter() - started
+
+        # Then it takes one lookup and one insert per batch
+        assert report["inserted"] == 5000
+        assert len(statements) == 10
+        assert elapsed < 5
+        assert test_db.query(models.Event).count() == 5000
+
+    def test_malformed_files_are_rejected(self):
+        # Then unreadable files raise ValueError (400 in the API)
+        with pytest.raises(ValueError):
+            parse_calendar(b"{not json", "json")
+        with pytest.raises(ValueError):
+            parse_calendar(b'{"foo": 1}', "json")
+        with pytest.raises(ValueError):
+            parse_calendar(b"\xff\xfe", "csv")
+        with pytest.raises(ValueError):
+            parse_calendar(b"a,b", "xml")
+
+    def test_oversized_upload_is_rejected(self, test_client, test_db, monkeypatch):
+        # Given an admin and a calendar larger than the import limit
+        admin = models.User(name="Admin", email="admin@example.com", hashed_password="x", role="admin")
+        test_db.add(admin)
+        test_db.commit()
+        app.dependency_overrides[get_current_user] = lambda: admin
+        monkeypatch.setattr("app.routers.events.MAX_IMPORT_BYTES", len(CSV.encode()) - 1)
+
+        # When it is uploaded, and then a small enough one
+        big = test_client.post("/api/v1/events/admin/races/import", files={"file": ("cal.csv", CSV)})
+        monkeypatch.setattr("app.routers.events.MAX_IMPORT_BYTES", len(CSV.encode()))
+        fits = test_client.post("/api/v1/events/admin/races/import", files={"file": ("cal.csv", CSV)})
+
+        # Then the first is refused without importing anything, the second imported
+        assert big.status_code == 413
+        assert fits.status_code == 200 and fits.json()["inserted"] == 2
@@ -0,0 +1,205 @@
+"""
+Tests for event coordinates and radius search (event_geo_service,
+EventsService.search_nearby).
+"""
+
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import models
+from app.services import event_geo_service as module
+from app.services.event_geo_service import EventGeoService, covering_cells, haversine_km
+from app.services.event_import_service import EventImportService
+from app.services.events_service import EventsService
+from app.services.route_service import geohash_encode
+
+TODAY = date.today()
+SOON = TODAY + timedelta(days=30)
+MADRID = (40.4168, -3.7038)
+
+
+def add_event(db, external_id, location, region=None, **fields):
+    event = models.Event(
+        external_id=external_id, name=fields.pop("name", f"Carrera {external_id}"), location=location,
+        region=region, date=fields.pop("date", SOON), distance_km=fields.pop("distance_km", 10), **fields,
+    )
+    db.add(event)
+    db.commit()
+    return event
+
+
+def ids(races):
+    return [race["id"] for race in races]
+
+
+class TestEventCoordinates:
+    """Gazetteer resolution and the geo columns kept on write."""
+
+    @pytest.fixture
+    def service(self):
+        return EventGeoService()
+
+    def test_resolve_place_names(self, service):
+        # Then names resolve ignoring accents, case and extra detail
+        assert service.resolve("Málaga") == (36.7213, -4.4214)
+        assert service.resolve("MALAGA") == (36.7213, -4.4214)
+        assert service.resolve("Madrid (Casa de Campo)") == MADRID
+        assert service.resolve("Getafe, Madrid") == (40.3083, -3.7327)
+        assert service.resolve("Donostia") == service.resolve("San Sebastián")
+        assert service.resolve("Pueblo Perdido") is None
+        assert service.resolve("Madrid", country="Portugal") is None
+
+    def test_columns_filled_on_insert_and_move(self, test_db):
+        # Given a race placed by name only, and one with explicit coordinates
+        sevilla = add_event(test_db, "sev", "Sevilla", "Andalucía")
+        trail = add_event(test_db, "trail", "Sierra de Guadarrama", latitude=40.78, longitude=-4.01)
+
+        # Then the first is resolved from the gazetteer, the second kept
+        assert (sevilla.latitude, sevilla.longitude) == (37.3891, -5.9845)
+        assert sevilla.geo_cell == geohash_encode([37.3891], [-5.9845], module.GEO_PRECISION)[0]
+        assert (trail.latitude, trail.longitude) == (40.78, -4.01)
+        assert trail.geo_cell is not None
+
+        # When the race moves to another town, its coordinates follow
+        sevilla.location = "Dos Hermanas"
+        test_db.commit()
+        assert (sevilla.latitude, sevilla.longitude) == (37.2865, -5.9209)
+
+        # When it moves somewhere unknown, they are cleared
+        sevilla.location = "Pueblo Perdido"
+        test_db.commit()
+        assert (sevilla.latitude, sevilla.longitude, sevilla.geo_cell) == (None, None, None)
+
+    def test_import_fills_coordinates(self, test_db):
+        # Given a calendar imported with core statements
+        rows = [
+            {"external_id": "bil", "name": "Bilbao Night", "location": "Bilbao", "date": SOON.isoformat(), "distance_km": 10},
+            {"external_id": "gps", "name": "Trail", "location": "Monte", "date": SOON.isoformat(), "distance_km": 20,
+             "latitude": 43.1, "longitude": -2.9},
+        ]
+        EventImportService().import_rows(test_db, rows)
+
+        # When one race is moved by a later import
+        EventImportService().import_rows(test_db, [dict(rows[0], location="Getxo")])
+
+        # Then coordinates were resolved, given and re-resolved
+        stored = {event.external_id: event for event in test_db.query(models.Event).all()}
+        assert (stored["bil"].latitude, stored["bil"].longitude) == (43.3569, -3.0113)
+        assert (stored["gps"].latitude, stored["gps"].longitude) == (43.1, -2.9)
+        assert all(event.geo_cell for event in stored.values())
+
+    def test_backfill_fills_events_without_coordinates(self, service, test_db, monkeypatch):
+        # Given events stored before the columns existed, one in an unknown place
+        now = datetime.utcnow()
+        test_db.execute(models.Event.__table__.insert(), [
+            {
+                "external_id": external_id, "name": external_id, "location": location, "country": "España",
+                "date": SOON, "distance_km": 10, "source": "official", "verified": True,
+                "created_at": now, "updated_at": now,
+            }
+            for external_id, location in (("a", "Sevilla"), ("b", "Pueblo Perdido"), ("c", "Bilbao"), ("d", "Toledo"))
+        ])
+        test_db.commit()
+        monkeypatch.setattr(module, "BACKFILL_CHUNK", 2)
+
+        # When they are backfilled, twice
+        filled = service.backfill(test_db)
+        again = service.backfill(test_db)
+
+        # Then known places got coordinates once and the unknown one stays empty
+        stored = {event.external_id: event for event in test_db.query(models.Event).all()}
+        assert (filled, again) == (3, 0)
+        assert (stored["a"].latitude, stored["a"].longitude) == (37.3891, -5.9845)
+        assert stored["c"].geo_cell == geohash_encode([43.263], [-2.935], module.GEO_PRECISION)[0]
+        assert stored["b"].geo_cell is None and stored["d"].geo_cell is not None
+
+    def test_covering_cells_contain_the_circle(self):
+        # Given points sampled on and inside a 60 km circle
+        rng = np.random.default_rng(0)
+        bearings = rng.uniform(0, 2 * np.pi, 2000)
+        reach = 60 * np.sqrt(rng.uniform(0, 1, 2000)) / 6371.0
+        lat = np.degrees(np.radians(MADRID[0]) + reach * np.cos(bearings))
+        lon = MADRID[1] + np.degrees(reach * np.sin(bearings) / np.cos(np.radians(lat)))
+
+        # Then every point within 60 km lies in a covering cell
+        inside = haversine_km(*MADRID, lat, lon) <= 60
+        cells = set(covering_cells(*MADRID, 60, module.GEO_PRECISION))
+        assert set(np.array(geohash_encode(lat, lon, module.GEO_PRECISION))[inside]) <= cells
+
+
+class TestSearchNearby:
+    """Radius and date window, distance ranking, latency."""
+
+    @pytest.fixture
+    def service(self, test_db):
+        return EventsService(test_db)
+
+    @pytest.fixture
+    def events(self, test_db):
+        add_event(test_db, "madrid", "Madrid", "Madrid")
+        add_event(test_db, "getafe", "Getafe", "Comunidad de Madrid")
+        add_event(test_db, "getafe_later", "Getafe", date=SOON + timedelta(days=60))
+        add_event(test_db, "toledo", "Toledo")
+        add_event(test_db, "sevilla", "Sevilla", "Andalucía")
+        add_event(test_db, "past", "Madrid", date=TODAY - timedelta(days=1))
+        add_event(test_db, "unverified", "Madrid", verified=False)
+        add_event(test_db, "nowhere", "Pueblo Perdido")
+
+    def test_ranked_by_distance_within_radius(self, service, events):
+        # When searching 50 km around Madrid
+        races = service.search_nearby(*MADRID, radius_km=50)
+
+        # Then upcoming verified races inside the circle come nearest first
+        assert ids(races) == ["madrid", "getafe", "getafe_later"]
+        assert races[0]["distance_from_center_km"] == 0.0
+        assert races[1]["distance_from_center_km"] == pytest.approx(12.5, abs=0.5)
+
+        # When the radius reaches Toledo (~67 km) but not Sevilla
+        assert ids(service.search_nearby(*MADRID, radius_km=100)) == ["madrid", "getafe", "getafe_later", "toledo"]
+
+        # Then a wide radius falls back to coarse cells and still ranks exactly
+        wide = service.search_nearby(*MADRID, radius_km=300, limit=2)
+        assert ids(wide) == ["madrid", "getafe"]
+        assert ids(service.search_nearby(*MADRID, radius_km=400))[-1] == "sevilla"
+
+    def test_date_window_and_distance_filters(self, service, events):
+        # Then the date window and race distance filters apply
+        window = service.search_nearby(*MADRID, radius_km=50, date_from=SOON + timedelta(days=1))
+        assert ids(window) == ["getafe_later"]
+        assert ids(service.search_nearby(*MADRID, radius_km=50, date_to=SOON)) == ["madrid", "getafe"]
+        assert service.search_nearby(*MADRID, radius_km=50, min_distance=21) == []
+
+    def test_latency_over_full_calendar(self, service, test_db):
+        # Given 20,000 upcoming races spread over mainland Spain
+        rng = np.random.default_rng(1)
+        lats = rng.uniform(36.0, 43.7, 20000)
+        lons = rng.uniform(-9.2, 3.3, 20000)
+        cells = geohash_encode(lats, lons, module.GEO_PRECISION)
+        now = datetime.utcnow()
+        test_db.execute(models.Event.__table__.insert(), [
+            {
+                "external_id": f"r{i}", "name": f"Carrera {i}", "location": f"Pueblo {i}", "country": "España",
+                "date": SOON + timedelta(days=i % 300), "distance_km": 10, "source": "official",
+                "verified": True, "latitude": float(lats[i]), "longitude": float(lons[i]),
+                "geo_cell": cells[i], "created_at": now, "updated_at": now,
+            }
+            for i in range(20000)
+        ])
+        test_db.commit()
+
+        # When searching 50 km and 250 km around Madrid
+        started = time.perf_counter()
+        near = service.search_nearby(*MADRID, radius_km=50, limit=100)
+        elapsed = time.perf_counter() - started
+        wide = service.search_nearby(*MADRID, radius_km=250, limit=10)
+
+        # Then results match a full scan and come back fast
+        distances = haversine_km(*MADRID, lats, lons)
+        expected = np.argsort(distances)[: min(100, int((distances <= 50).sum()))]
+        assert ids(near) == [f"r{i}" for i in expected]
+        assert ids(wide) == [f"r{i}" for i in np.argsort(distances)[:10]]
+        assert elapsed < 0.05
+
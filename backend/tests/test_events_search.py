@@ -0,0 +1,106 @@
+"""
+Tests for indexed race search (EventsService.search_races on the folded
+search columns and the SQLite FTS5 index).
+"""
+
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import models
+from app.services.events_service import EventsService
+
+SOON = date.today() + timedelta(days=30)
+
+
+def add_event(db, external_id, name, location, region=None, **fields):
+    event = models.Event(
+        external_id=external_id, name=name, location=location, region=region,
+        date=fields.pop("date", SOON), distance_km=fields.pop("distance_km", 10), **fields,
+    )
+    db.add(event)
+    db.commit()
+    return event
+
+
+def ids(races):
+    return [race["id"] for race in races]
+
+
+class TestEventsSearch:
+    """Folded columns, accent-insensitive matching and index sync."""
+
+    @pytest.fixture
+    def service(self, test_db):
+        return EventsService(test_db)
+
+    @pytest.fixture
+    def events(self, test_db):
+        add_event(test_db, "malaga", "Maratón de Málaga", "Málaga", "Andalucía", distance_km=42.195)
+        add_event(test_db, "sansil", "San Silvestre Vallecana", "Madrid", "Madrid")
+        add_event(test_db, "leon", 'Carrera "10%" León', "León")
+
+    def test_search_columns_are_folded_on_write(self, test_db):
+        # Given a new event
+        event = add_event(test_db, "x", "Trail Peñalara", "Rascafría", "Madrid")
+
+        # Then its search columns are folded
+        assert event.search_text == "trail penalara | rascafria | madrid"
+        assert event.search_location == "rascafria | madrid"
+
+        # When it is renamed, they follow
+        event.name = "Carrera de Montaña"
+        test_db.commit()
+        assert event.search_text.startswith("carrera de montana |")
+
+    def test_accent_and_case_insensitive(self, service, events):
+        # Then queries ignore accents and case, on every field
+        assert ids(service.search_races(query="MARATON malaga")) == []  # Not a substring
+        assert ids(service.search_races(query="maratón de MÁLAGA")) == ["malaga"]
+        assert ids(service.search_races(query="andalu")) == ["malaga"]
+        assert ids(service.search_races(query="vallecana", location="madrid")) == ["sansil"]
+        assert ids(service.search_races(location="andalucia")) == ["malaga"]
+
+    def test_short_and_special_queries(self, service, events):
+        # Then queries shorter than a trigram and quote / wildcard characters work
+        assert ids(service.search_races(query="ón")) == ["malaga", "leon"]
+        assert ids(service.search_races(query='"10%"')) == ["leon"]
+        assert ids(service.search_races(query="%")) == ["leon"]
+        assert len(service.search_races(query="   ")) == 3
+
+    def test_index_follows_updates_and_deletes(self, service, test_db, events):
+        # Given an event moved to another city, and one deleted
+        moved = test_db.query(models.Event).filter_by(external_id="sansil").one()
+        moved.location, moved.region = "Getafe", "Comunidad de Madrid"
+        test_db.delete(test_db.query(models.Event).filter_by(external_id="malaga").one())
+        test_db.commit()
+
+        # Then the index reflects both
+        assert ids(service.search_races(location="getafe")) == ["sansil"]
+        assert ids(service.search_races(query="malaga")) == []
+
+    def test_search_latency_stays_flat(self, service, test_db):
+        # Given a calendar of 20,000 races
+        now = datetime.utcnow()
+        test_db.execute(models.Event.__table__.insert(), [
+            {
+                "external_id": f"r{i}", "name": f"Carrera Popular {i}", "location": f"Pueblo {i % 3000}",
+                "region": "Castilla", "country": "España", "date": SOON + timedelta(days=i % 300),
+                "distance_km": 10, "source": "official", "verified": True,
+                "search_text": f"carrera popular {i} | pueblo {i % 3000} | castilla",
+                "search_location": f"pueblo {i % 3000} | castilla",
+                "created_at": now, "updated_at": now,
+            }
+            for i in range(20000)
+        ])
+        test_db.commit()
+
+        # When searching for a rare term
+        started = time.perf_counter()
+        races = service.search_races(query="popular 12345")
+        elapsed = time.perf_counter() - started
+
+        # Then the index answers without scanning the calendar
+        assert ids(races) == ["r12345"]
+        assert elapsed < 0.05
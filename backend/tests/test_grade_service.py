@@ -0,0 +1,71 @@
+"""
+Tests for elevation smoothing and grade-adjusted pace (grade_service).
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.grade_service import GradeService, running_cost, smooth_altitude
+from app.services.race_predictor_service import RacePredictorService
+
+
+def _streams(altitude_fn, seconds=1800, speed=3.0):
+    time = np.arange(seconds, dtype=float)
+    distance = time * speed
+    return {"time": time, "distance": distance, "altitude": altitude_fn(distance)}
+
+
+class TestGradeService:
+    """Smoothing, grade and GAP."""
+
+    @pytest.fixture
+    def service(self):
+        return GradeService()
+
+    def test_smoothing_removes_gps_noise(self, service):
+        # Given a flat route with +-3 m GPS altitude noise
+        rng = np.random.default_rng(1)
+        streams = _streams(lambda d: 100 + rng.uniform(-3, 3, len(d)))
+
+        # When processed
+        result = service.compute(streams)
+
+        # Then climbing drops by more than an order of magnitude
+        raw_gain = np.clip(np.diff(streams["altitude"]), 0, None).sum()
+        assert result["elevation_gain"] < raw_gain / 10
+        assert result["grade_adjusted_pace"] == pytest.approx(1000 / 3, rel=0.02)
+
+    def test_uphill_gap_is_faster_than_actual_pace(self, service):
+        # Given a steady 5% climb at 3 m/s
+        streams = _streams(lambda d: 100 + 0.05 * d)
+
+        # When processed
+        result = service.compute(streams)
+
+        # Then graded distance reflects the extra cost of climbing
+        factor = running_cost(np.array(0.05)) / running_cost(np.array(0.0))
+        assert result["graded_distance_meters"] == pytest.approx(5400 * factor, rel=0.01)
+        assert result["grade_adjusted_pace"] < 1000 / 3
+        assert result["elevation_gain"] == pytest.approx(270, rel=0.02)
+
+    def test_smooth_altitude_preserves_linear_profile(self):
+        # Given a straight ramp
+        distance = np.arange(0, 1000, 2.0)
+        altitude = distance * 0.1
+
+        # Then the interior is unchanged by the moving average
+        smoothed = smooth_altitude(distance, altitude)
+        assert np.allclose(smoothed[50:-50], altitude[50:-50])
+
+    def test_hilly_effort_predicts_on_flat_equivalent_time(self, test_db, user, make_workout):
+        # Given a 5.4 km uphill run ingested with streams
+        streams = _streams(lambda d: 100 + 0.05 * d)
+        workout = make_workout(datetime.utcnow() - timedelta(days=3), 5.397, 1799, streams=streams)
+
+        # Then the workout has GAP and the prediction base is faster than raw time
+        assert workout.grade_adjusted_pace < 1000 / 3
+        distance_m, minutes, _ = RacePredictorService()._find_best_performance(test_db, user.id)
+        assert distance_m == 5000.0
+        assert minutes < 5000 / 3 / 60
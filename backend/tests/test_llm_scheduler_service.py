@@ -0,0 +1,157 @@
+"""
+Tests for the LLM request scheduler (llm_scheduler_service).
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.llm_scheduler_service import LLMOverloadedError, LLMScheduler, Priority
+
+MESSAGES = [{"role": "user", "content": "hola"}]
+
+
+class FakeClient:
+    """Groq-shaped client whose calls block until released."""
+
+    def __init__(self, block=True, error=None):
+        self.calls = []
+        self.gate = threading.Event()
+        if not block:
+            self.gate.set()
+        self.error = error
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_tokens, **kwargs):
+        self.calls.append((kwargs.get("tag"), model))
+        if self.error:
+            raise self.error
+        assert self.gate.wait(5)
+        return SimpleNamespace(usage=SimpleNamespace(total_tokens=max_tokens))
+
+
+def _submit(scheduler, client, user_id, priority, tag, results, model="big"):
+    def run():
+        try:
+            scheduler.complete(client, user_id, priority, model, MESSAGES, max_tokens=10, tag=tag)
+            results[tag] = "ok"
+        except LLMOverloadedError as e:
+            results[tag] = e
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+class TestLLMScheduler:
+    """Priorities, caps, backpressure and token budget."""
+
+    def _scheduler(self, **overrides):
+        options = dict(
+            max_concurrency=1, max_per_user=5, tokens_per_minute={},
+            fallback_model="small", fallback_queue_depth=2, queue_timeout=5,
+        )
+        options.update(overrides)
+        return LLMScheduler(**options)
+
+    def test_interactive_overtakes_background(self):
+        # Given the only slot busy and a background request queued first
+        scheduler, client, results = self._scheduler(), FakeClient(), {}
+        threads = [_submit(scheduler, client, 1, Priority.STANDARD, "running", results)]
+        _wait_for(lambda: len(client.calls) == 1)
+        threads.append(_submit(scheduler, client, 2, Priority.BACKGROUND, "plan", results))
+        _wait_for(lambda: scheduler.stats()["queued"]["background"] == 1)
+        threads.append(_submit(scheduler, client, 3, Priority.INTERACTIVE, "chat", results))
+        _wait_for(lambda: scheduler.stats()["queued"]["interactive"] == 1)
+
+        # When the slot frees up
+        client.gate.set()
+        for thread in threads:
+            thread.join(5)
+
+        # Then chat runs before the plan
+        assert [tag for tag, _ in client.calls] == ["running", "chat", "plan"]
+        assert set(results.values()) == {"ok"}
+
+    def test_per_user_cap_does_not_block_other_users(self):
+        # Given user 1 at its cap with another request queued
+        scheduler = self._scheduler(max_concurrency=2, max_per_user=1)
+        client, results = FakeClient(), {}
+        threads = [_submit(scheduler, client, 1, Priority.INTERACTIVE, "u1-a", results)]
+        _wait_for(lambda: len(client.calls) == 1)
+        threads.append(_submit(scheduler, client, 1, Priority.INTERACTIVE, "u1-b", results))
+        _wait_for(lambda: scheduler.stats()["queued"]["interactive"] == 1)
+
+        # When another user asks, it starts on the free slot
+        threads.append(_submit(scheduler, client, 2, Priority.INTERACTIVE, "u2", results))
+        _wait_for(lambda: len(client.calls) == 2)
+        assert client.calls[1][0] == "u2"
+
+        client.gate.set()
+        for thread in threads:
+            thread.join(5)
+        assert [tag for tag, _ in client.calls][2] == "u1-b"
+
+    def test_deep_queue_falls_back_then_rejects(self):
+        # Given a busy slot and background requests piling up
+        scheduler, client, results = self._scheduler(), FakeClient(), {}
+        threads = [_submit(scheduler, client, 0, Priority.STANDARD, "busy", results)]
+        _wait_for(lambda: len(client.calls) == 1)
+        for i in range(4):
+            threads.append(_submit(scheduler, client, 10 + i, Priority.BACKGROUND, f"plan{i}", results))
+            _wait_for(lambda: scheduler.stats()["queued"]["background"] == i + 1)
+
+        # Then requests queued behind fallback_queue_depth use the small model
+        assert [t.model for t in scheduler._waiting] == ["big", "big", "small", "small"]
+
+        # And one more background request is rejected with a Retry-After
+        with pytest.raises(LLMOverloadedError) as error:
+            scheduler.complete(client, 99, Priority.BACKGROUND, "big", MESSAGES, max_tokens=10)
+        assert error.value.retry_after >= 1
+        assert error.value.reason == "queue full"
+
+        # While interactive requests are still admitted
+        threads.append(_submit(scheduler, client, 98, Priority.INTERACTIVE, "chat", results))
+        _wait_for(lambda: scheduler.stats()["queued"]["interactive"] == 1)
+
+        client.gate.set()
+        for thread in threads:
+            thread.join(5)
+        assert set(results.values()) == {"ok"}
+
+    def test_token_budget_delays_next_request(self):
+        # Given a budget that fits one request per window
+        scheduler = self._scheduler(
+            max_concurrency=4, tokens_per_minute={"big": 20}, fallback_model=None,
+            window_seconds=0.3,
+        )
+        client = FakeClient(block=False)
+        scheduler.complete(client, 1, Priority.INTERACTIVE, "big", MESSAGES, max_tokens=12)
+
+        # When a second request arrives right away
+        start = time.monotonic()
+        scheduler.complete(client, 2, Priority.INTERACTIVE, "big", MESSAGES, max_tokens=12)
+
+        # Then it waits for the window to slide
+        assert time.monotonic() - start >= 0.2
+
+    def test_upstream_rate_limit_is_overloaded(self):
+        # Given Groq answering 429 with a Retry-After header
+        error = Exception("rate limited")
+        error.status_code = 429
+        error.response = SimpleNamespace(headers={"retry-after": "7"})
+        scheduler = self._scheduler()
+
+        # Then the caller gets LLMOverloadedError and the slot is released
+        with pytest.raises(LLMOverloadedError) as raised:
+            scheduler.complete(FakeClient(error=error), 1, Priority.INTERACTIVE, "big", MESSAGES, max_tokens=10)
+        assert raised.value.retry_after == 7
+        assert scheduler.stats()["active"] == 0
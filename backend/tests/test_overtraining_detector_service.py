@@ -0,0 +1,75 @@
+"""
+Tests for the resting HR / HRV trend factors of the overtraining detector
+(read from the rolling baselines of baseline_service).
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from app import models
+from app.services.baseline_service import baseline_service
+from app.services.overtraining_detector_service import OvertreaningDetectorService
+
+
+def _add_days(db, user, days_ago, rhr, hrv):
+    metrics = [
+        models.HealthMetric(user_id=user.id, date=date.today() - timedelta(days=ago), resting_hr_bpm=rhr, hrv_ms=hrv)
+        for ago in days_ago
+    ]
+    db.add_all(metrics)
+    baseline_service.update_for_metrics(db, user.id, metrics)
+    db.commit()
+
+
+class TestOvertrainingDetectorTrends:
+    """Last 7 days against the 60-day rolling baseline before them."""
+
+    @pytest.fixture
+    def service(self):
+        return OvertreaningDetectorService()
+
+    def test_baseline_is_the_60_days_before_the_recent_week(self, service, test_db, user):
+        # Given an old block outside the 60-day window, a steady block and a recent week
+        _add_days(test_db, user, range(90, 70, -1), rhr=80, hrv=20)
+        _add_days(test_db, user, range(50, 6, -1), rhr=50, hrv=60)
+        _add_days(test_db, user, range(6, -1, -1), rhr=55, hrv=48)
+
+        # When the trends are analyzed
+        rhr = service._analyze_resting_hr_trend(user.id, test_db)
+        hrv = service._analyze_hrv_trend(user.id, test_db)
+
+        # Then readings older than 60 days are ignored and the recent week is
+        # compared against the steady block only
+        assert rhr["baseline_bpm"] == 50
+        assert rhr["recent_bpm"] == 55
+        assert hrv["baseline_ms"] == 60
+        assert hrv["recent_ms"] == 48
+        assert rhr["risk_factor"] > 0 and hrv["risk_factor"] > 0
+
+    def test_insufficient_data_without_a_recent_week(self, service, test_db, user):
+        # Given readings that all lie more than a week ago
+        _add_days(test_db, user, range(40, 20, -1), rhr=50, hrv=60)
+
+        # Then no trend is reported
+        assert service._analyze_resting_hr_trend(user.id, test_db)["status"] == "insufficient_data"
+        assert service._analyze_hrv_trend(user.id, test_db)["status"] == "insufficient_data"
+
+    def test_missing_baseline_is_rebuilt_from_history(self, service, test_db, user):
+        # Given history synced before baselines existed (no state rows)
+        test_db.add_all(
+            models.HealthMetric(
+                user_id=user.id, date=date.today() - timedelta(days=ago),
+                resting_hr_bpm=55 if ago < 7 else 50, hrv_ms=60,
+            )
+            for ago in range(30, -1, -1)
+        )
+        test_db.commit()
+
+        # When the trends are analyzed
+        rhr = service._analyze_resting_hr_trend(user.id, test_db)
+
+        # Then the baseline is rebuilt on the fly and kept
+        assert rhr["status"] == "analyzed"
+        assert (rhr["baseline_bpm"], rhr["recent_bpm"]) == (50, 55)
+        assert test_db.query(models.MetricBaseline).filter_by(user_id=user.id).count() == 1
@@ -0,0 +1,126 @@
+"""
+Tests for incremental plan compliance (plan_compliance_service).
+"""
+
+import copy
+from datetime import date, datetime
+
+import pytest
+
+from app import crud, models
+from app.services.plan_compliance_service import PlanComplianceService, target_pace
+from app.services.plan_store_service import plan_store_service
+
+PLAN = {
+    "plan_id": "plan_a",
+    "plan_name": "Plan 10K",
+    "status": "active",
+    "start_date": "2026-10-05T08:00:00+00:00",  # Monday
+    "weeks": [
+        {"week": 1, "focus": "Base", "total_km": 15, "workouts": [
+            {"day": 1, "type": "easy_run", "name": "Rodaje", "distance_km": 6,
+             "pace_target": "5:30-6:00 min/km"},
+            {"day": 3, "type": "tempo_run", "name": "Tempo", "distance_km": 8.5},
+            {"day": 4, "type": "rest", "name": "Descanso"},
+        ]},
+        {"week": 2, "focus": "Volumen", "total_km": 14, "workouts": [
+            {"day": 7, "type": "long_run", "name": "Tirada larga", "distance_km": 14},
+        ]},
+    ],
+}
+
+WEEK_1_DAY_4 = date(2026, 10, 8)
+
+
+@pytest.fixture
+def plan(test_db, user):
+    plan = plan_store_service.create(test_db, user.id, copy.deepcopy(PLAN))
+    test_db.commit()
+    return plan
+
+
+@pytest.fixture
+def add_workout(make_workout):
+    def make(start, km, minutes, sport="running"):
+        return make_workout(start, km, minutes * 60, sport_type=sport)
+    return make
+
+
+def sessions(db, plan):
+    return (
+        db.query(models.PlannedWorkout)
+        .filter(models.PlannedWorkout.plan_id == plan.id)
+        .order_by(models.PlannedWorkout.week, models.PlannedWorkout.day)
+        .all()
+    )
+
+
+class TestPlanComplianceService:
+    """Matching, weekly deltas and incremental refresh."""
+
+    @pytest.fixture
+    def service(self):
+        return PlanComplianceService()
+
+    def test_ingested_workouts_are_matched(self, service, test_db, plan, add_workout):
+        # Given runs on the planned day, one day late, and a bike ride
+        easy = add_workout(datetime(2026, 10, 5, 7), 6, 33)  # 5:30/km
+        tempo = add_workout(datetime(2026, 10, 8, 18), 8, 40)
+        add_workout(datetime(2026, 10, 6, 18), 30, 60, sport="cycling")
+
+        # When the summary is read mid week 1
+        summary = service.summary(test_db, plan, today=WEEK_1_DAY_4)
+
+        # Then both sessions are matched and only week 1 has started
+        assert [s.workout_id for s in sessions(test_db, plan)] == [easy.id, tempo.id, None, None]
+        assert summary["current_week"] == 1 and len(summary["weeks"]) == 1
+        week = summary["weeks"][0]
+        assert week["in_progress"] is True
+        assert week["planned_sessions"] == 2 and week["completed_sessions"] == 2
+        assert week["adherence"] == 1.0
+        assert week["planned_km"] == 14.5 and week["actual_km"] == 14.0
+        assert week["volume_delta"] == round((14.0 - 14.5) / 14.5, 3)
+        # 5:30/km against a 5:45/km target
+        assert week["intensity_delta"] == round((345 - 330) / 345, 3)
+        assert summary["totals"]["adherence"] == 1.0
+
+    def test_deleted_workout_is_unmatched(self, service, test_db, plan, add_workout):
+        # Given a matched run
+        workout = add_workout(datetime(2026, 10, 5, 7), 6, 36)
+
+        # When it is deleted
+        crud.delete_workout(test_db, workout)
+
+        # Then the week no longer counts it
+        week = service.summary(test_db, plan, today=WEEK_1_DAY_4)["weeks"][0]
+        assert week["completed_sessions"] == 0 and week["actual_km"] == 0
+        assert week["intensity_delta"] is None
+        assert all(s.workout_id is None for s in sessions(test_db, plan))
+
+    def test_weeks_never_computed_are_built_on_read(self, service, test_db, user, add_workout):
+        # Given runs logged before the plan was stored
+        add_workout(datetime(2026, 10, 11, 9), 15, 90)  # week 1 Sunday
+        add_workout(datetime(2026, 10, 18, 9), 14, 84)  # week 2 long run
+        test_db.commit()
+        plan = plan_store_service.create(test_db, user.id, copy.deepcopy(PLAN))
+        test_db.commit()
+
+        # When the summary is read after week 2
+        summary = service.summary(test_db, plan, today=date(2026, 10, 20))
+
+        # Then both weeks are computed from the stored runs
+        first, second = summary["weeks"]
+        assert first["completed_sessions"] == 0 and first["actual_km"] == 15.0
+        assert second["completed_sessions"] == 1 and second["in_progress"] is False
+        assert summary["totals"]["adherence"] == round(1 / 3, 3)
+
+    def test_target_pace_formats(self):
+        # Given the pace formats of both plan generators
+        ranged = models.PlannedWorkout(pace_target="4:30-5:00 min/km", details={})
+        coach = models.PlannedWorkout(details={"pace_min_per_km": 6.2})
+        none = models.PlannedWorkout(details={"heart_rate_zone": 2})
+
+        # Then ranges use the midpoint and decimal minutes are converted
+        assert target_pace(ranged) == 285
+        assert target_pace(coach) == pytest.approx(372)
+        assert target_pace(none) is None
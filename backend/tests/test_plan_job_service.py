@@ -0,0 +1,130 @@
+"""
+Tests for background training-plan generation jobs (plan_job_service).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.llm_scheduler_service import LLMOverloadedError
+from app.services.plan_job_service import MAX_ATTEMPTS, STALE_AFTER, PlanJobService
+from app.services.plan_store_service import plan_store_service
+from app.services.training_plan_service import TrainingPlanService
+
+GOAL = {"type": "10k", "date": "2027-03-01T00:00:00", "current_weekly_km": 30, "notes": None}
+
+
+class FakePlanner(TrainingPlanService):
+    """Real provisional plan; generate_plan returns a canned plan or raises."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def generate_plan(self, db, user, goal, weeks=12):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return {"plan_id": f"plan_ai_{self.calls}", "plan_name": "Plan IA", "weeks": [], "goal": goal}
+
+
+class TestPlanJobService:
+    """Submission, dedup and worker execution."""
+
+    @pytest.fixture
+    def service(self):
+        return PlanJobService()
+
+    def test_submit_returns_provisional_plan_and_dedups(self, service, test_db, user):
+        # Given a submitted job
+        planner = FakePlanner()
+        job, created = service.submit(test_db, user, GOAL, 8, planner)
+
+        # When the identical request is submitted again, and a different one
+        again, created_again = service.submit(test_db, user, GOAL, 8, planner)
+        other, created_other = service.submit(test_db, user, GOAL, 10, planner)
+
+        # Then the first is queued with the template plan and reused once
+        assert created and job.status == "queued" and job.progress == 0
+        assert job.provisional_plan["provisional"] is True
+        assert len(job.provisional_plan["weeks"]) == 8
+        assert not created_again and again.id == job.id
+        assert created_other and other.id != job.id
+        assert planner.calls == 0
+
+    def test_run_stores_plan_and_finishes(self, service, test_db, user):
+        # Given a queued job
+        planner = FakePlanner()
+        job, _ = service.submit(test_db, user, GOAL, 8, planner)
+
+        # When a worker runs it
+        retry_in = service.run(test_db, job.id, planner)
+
+        # Then the AI plan is stored and the job succeeded
+        test_db.refresh(job)
+        assert retry_in is None
+        assert job.status == "succeeded" and job.progress == 100
+        assert job.plan_id == "plan_ai_1" and job.active_key is None
+        plans = plan_store_service.list_plans(test_db, user.id)
+        assert [p.external_id for p in plans] == ["plan_ai_1"]
+        assert plans[0].status == "active"
+
+        # And an identical request shortly after returns the finished job
+        again, created = service.submit(test_db, user, GOAL, 8, planner)
+        assert not created and again.id == job.id
+
+        # And a duplicate delivery of the task does nothing
+        assert service.run(test_db, job.id, planner) is None
+        assert planner.calls == 1
+
+    def test_overload_requeues_then_fails(self, service, test_db, user):
+        # Given an LLM that stays overloaded
+        planner = FakePlanner(error=LLMOverloadedError(7, "queue full"))
+        job, _ = service.submit(test_db, user, GOAL, 8, planner)
+
+        # When the job is run until it gives up
+        waits = [service.run(test_db, job.id, planner) for _ in range(MAX_ATTEMPTS)]
+
+        # Then it was requeued with the advised delay and finally failed
+        test_db.refresh(job)
+        assert waits == [7] * (MAX_ATTEMPTS - 1) + [None]
+        assert job.status == "failed" and job.attempts == MAX_ATTEMPTS
+        assert job.active_key is None
+        assert plan_store_service.list_plans(test_db, user.id) == []
+
+    def test_stale_job_is_replaced(self, service, test_db, user):
+        # Given a running job whose worker stopped sending heartbeats
+        planner = FakePlanner()
+        stale, _ = service.submit(test_db, user, GOAL, 8, planner)
+        stale.status = "running"
+        stale.started_at = stale.heartbeat_at = datetime.utcnow() - STALE_AFTER - timedelta(minutes=1)
+        test_db.commit()
+
+        # When the same request is submitted
+        job, created = service.submit(test_db, user, GOAL, 8, planner)
+
+        # Then the stale job is failed and a new one created
+        test_db.refresh(stale)
+        assert created and job.id != stale.id
+        assert stale.status == "failed"
+
+    def test_old_queued_or_alive_jobs_are_reused(self, service, test_db, user):
+        # Given a job submitted long ago that is still queued (waiting out a retry)
+        planner = FakePlanner()
+        queued, _ = service.submit(test_db, user, GOAL, 8, planner)
+        queued.created_at = datetime.utcnow() - STALE_AFTER * 3
+        test_db.commit()
+
+        # Then an identical request attaches to it
+        again, created = service.submit(test_db, user, GOAL, 8, planner)
+        assert not created and again.id == queued.id
+
+        # When it has been running for long but its worker beat recently
+        queued.status = "running"
+        queued.started_at = datetime.utcnow() - STALE_AFTER * 2
+        queued.heartbeat_at = datetime.utcnow()
+        test_db.commit()
+
+        # Then it is still reused
+        again, created = service.submit(test_db, user, GOAL, 8, planner)
+        assert not created and again.id == queued.id and again.status == "running"
@@ -0,0 +1,108 @@
+"""
+Tests for the Monte Carlo plan-risk simulator (plan_risk_service).
+"""
+
+import copy
+import time
+
+import numpy as np
+import pytest
+
+from app.services.plan_risk_service import PlanRiskService, session_namespaces, session_stress
+from app.services.plan_store_service import plan_store_service
+from app.services.training_load_service import ewma
+
+PLAN = {
+    "plan_id": "plan_a",
+    "plan_name": "Plan 10K",
+    "start_date": "2026-10-05T08:00:00+00:00",
+    "weeks": [
+        {"week": 1, "workouts": [
+            {"day": 1, "type": "easy_run", "name": "Rodaje", "distance_km": 6,
+             "pace_target": "5:30-6:00 min/km"},
+            {"day": 2, "type": "rest", "name": "Descanso", "duration_minutes": 60},
+        ]},
+        {"week": 2, "workouts": [
+            {"day": 7, "type": "long_run", "name": "Tirada larga", "duration_minutes": 90},
+        ]},
+    ],
+}
+
+
+def weeks_of(*daily_loads):
+    """Daily load array with one constant value per week."""
+    return np.repeat(np.array(daily_loads, dtype=float), 7)
+
+
+class TestPlanRiskService:
+    """Session stress, simulation and risk summary."""
+
+    @pytest.fixture
+    def service(self):
+        return PlanRiskService()
+
+    def test_ewma_runs_per_row(self):
+        # Given independent series in the rows of one array
+        rng = np.random.default_rng(1)
+        loads = rng.random((3, 300)) * 100
+
+        # When smoothed together with one seed per row
+        together = ewma(loads, 1 / 7, np.array([0.0, 20.0, 50.0]))
+
+        # Then each row equals its own 1-D run
+        for row, initial in zip(range(3), (0.0, 20.0, 50.0)):
+            assert np.allclose(together[row], ewma(loads[row], 1 / 7, initial))
+
+    def test_load_jump_is_flagged(self, service):
+        # Given a steady plan and one that jumps to 2.5x the load in week 4
+        steady = service.simulate(weeks_of(40, 40, 40, 40), ctl=40, atl=40, adherence=0.95, seed=1)
+        jump = service.simulate(weeks_of(40, 40, 40, 100), ctl=40, atl=40, adherence=0.95, seed=1)
+
+        # Then only the jump week crosses ACWR 1.5 in most scenarios
+        assert steady["overall"]["acwr_risk"] < 0.05
+        assert jump["weeks"][3]["acwr_risk"] > 0.5
+        assert jump["weeks"][2]["acwr_risk"] < 0.05
+        week = jump["weeks"][3]
+        assert week["peak_acwr"]["p10"] <= week["peak_acwr"]["p50"] <= week["peak_acwr"]["p90"]
+        assert week["planned_load"] == 700.0
+
+    def test_twenty_week_plan_is_fast_and_reproducible(self, service):
+        # Given a 20-week plan of five sessions a week
+        loads = np.tile([60, 0, 80, 50, 0, 120, 40], 20).astype(float)
+
+        # When it is simulated twice with the same seed
+        started = time.perf_counter()
+        first = service.simulate(loads, ctl=30, atl=30, seed=7)
+        elapsed = time.perf_counter() - started
+        second = service.simulate(loads, ctl=30, atl=30, seed=7)
+
+        # Then it runs well under a second and gives the same answer
+        assert elapsed < 0.5
+        assert len(first["weeks"]) == 20
+        assert first == second
+
+    def test_stored_plan_loads(self, service, test_db, user):
+        # Given a stored plan with a paced run, a rest day and a timed long run
+        plan = plan_store_service.create(test_db, user.id, copy.deepcopy(PLAN))
+        test_db.commit()
+
+        # When its risk is assessed
+        result = service.assess_plan(test_db, user, plan, seed=1)
+
+        # Then the paced run is scored like rTSS and the rest day is free
+        easy = 6 * 345 / 3600 * (300 / 345) ** 2 * 100
+        long_run = 1.5 * 0.78 ** 2 * 100
+        assert [w["planned_load"] for w in result["weeks"]] == [round(easy, 1), round(long_run, 1)]
+        assert result["start_date"] == "2026-10-05"
+        assert result["initial"] == {"ctl": 0.0, "atl": 0.0}
+
+    def test_type_intensity_without_pace(self):
+        # Given weekly-plan sessions with only a type and duration
+        interval, recovery = session_namespaces([
+            {"week": 1, "day": 2, "workout_type": "interval", "duration_minutes": 60},
+            {"week": 1, "day": 3, "workout_type": "recovery", "duration_minutes": 60},
+        ])
+
+        # Then the type sets the intensity factor
+        assert session_stress(interval, 1000 / 300) == pytest.approx(100)
+        assert session_stress(recovery, 1000 / 300) == pytest.approx(42.25)
@@ -0,0 +1,124 @@
+"""
+Tests for normalized training-plan storage (plan_store_service).
+"""
+
+import pytest
+
+from app import models
+from app.services.plan_store_service import PlanStoreService
+
+AI_PLAN = {
+    "plan_id": "plan_a",
+    "plan_name": "Plan 10K",
+    "status": "active",
+    "current_week": 1,
+    "start_date": "2026-10-05T08:00:00+00:00",
+    "created_at": "2026-10-05T08:00:00",
+    "goal": {"type": "10k", "date": "2027-01-10T00:00:00"},
+    "nutrition_tips": ["Hidrátate"],
+    "weeks": [
+        {"week": 1, "focus": "Base", "total_km": 30, "workouts": [
+            {"day": 1, "type": "easy_run", "name": "Rodaje", "distance_km": 6,
+             "pace_target": "5:30-6:00 min/km", "notes": "Suave"},
+            {"day": 3, "type": "tempo_run", "name": "Tempo", "distance_km": 8.5},
+        ]},
+        {"week": 2, "focus": "Volumen", "total_km": 34, "workouts": [
+            {"day": 7, "type": "long_run", "name": "Tirada larga", "distance_km": 14},
+        ]},
+    ],
+}
+
+COACH_PLAN = {
+    "id": "plan_c",
+    "plan_id": "plan_c",
+    "name": "Plan de 1 semanas - marathon",
+    "plan_name": "MARATHON Plan",
+    "start_date": "2026-10-05",
+    "training_method": "heart_rate_based",
+    "weeks": [
+        {"week_number": 1, "total_km": 12.5, "days": [
+            {"day": "Miércoles", "type": "Easy Run", "description": "Suave",
+             "heart_rate_zone": 2, "duration_minutes": 45},
+        ]},
+    ],
+}
+
+
+class TestPlanStoreService:
+    """Round trips and row-level access."""
+
+    @pytest.fixture
+    def service(self):
+        return PlanStoreService()
+
+    def test_plans_round_trip_in_their_layout(self, service, test_db, user):
+        # Given one plan of each generator
+        service.create(test_db, user.id, dict(AI_PLAN))
+        service.create(test_db, user.id, dict(COACH_PLAN))
+        test_db.commit()
+
+        # When they are read back
+        ai, coach = service.serialize(test_db, service.list_plans(test_db, user.id))
+
+        # Then each keeps its shape, extras and values
+        assert ai["plan_id"] == "plan_a" and ai["goal_type"] == "10k"
+        assert ai["nutrition_tips"] == ["Hidrátate"]
+        assert ai["weeks"][0]["workouts"][0] == AI_PLAN["weeks"][0]["workouts"][0]
+        assert ai["weeks"][1] == AI_PLAN["weeks"][1]
+        assert coach["weeks"] == COACH_PLAN["weeks"]
+        assert coach["id"] == "plan_c" and coach["training_method"] == "heart_rate_based"
+
+    def test_session_lookup_by_week_and_day(self, service, test_db, user):
+        # Given stored plans
+        ai = service.create(test_db, user.id, dict(AI_PLAN))
+        coach = service.create(test_db, user.id, dict(COACH_PLAN))
+        test_db.commit()
+
+        # When single sessions are fetched
+        tempo = service.get_session(test_db, ai, 1, 3)
+        wednesday = service.get_session(test_db, coach, 1, 3)
+
+        # Then only the addressed rows are returned
+        assert tempo["name"] == "Tempo" and tempo["distance_km"] == 8.5
+        assert wednesday["day"] == "Miércoles"
+        assert service.get_session(test_db, ai, 1, 2) is None
+        assert service.has_week(test_db, ai, 2) and not service.has_week(test_db, ai, 3)
+
+    def test_replace_and_delete(self, service, test_db, user):
+        # Given a stored plan
+        plan = service.create(test_db, user.id, dict(AI_PLAN))
+        test_db.commit()
+
+        # When it is rewritten with one week
+        data = service.to_dict(test_db, plan)
+        data["weeks"] = data["weeks"][:1]
+        data["adaptation_count"] = 1
+        service.replace(test_db, plan, data)
+        test_db.commit()
+
+        # Then the old rows are gone and the id is kept
+        again = service.to_dict(test_db, service.get_plan(test_db, user.id, "plan_a"))
+        assert len(again["weeks"]) == 1 and again["adaptation_count"] == 1
+        assert test_db.query(models.PlannedWorkout).count() == 2
+
+        # And deleting removes every row
+        service.delete(test_db, plan)
+        test_db.commit()
+        assert service.get_plan(test_db, user.id, "plan_a") is None
+        assert test_db.query(models.TrainingPlanWeek).count() == 0
+        assert test_db.query(models.PlannedWorkout).count() == 0
+
+    def test_duplicate_plan_id_is_replaced(self, service, test_db, user):
+        # Given a stored plan
+        service.create(test_db, user.id, dict(COACH_PLAN))
+        test_db.commit()
+
+        # When a plan with the same id is stored
+        duplicate = dict(COACH_PLAN)
+        row = service.create(test_db, user.id, duplicate)
+        test_db.commit()
+
+        # Then it gets a fresh id, reflected in the dict
+        assert row.external_id != "plan_c"
+        assert duplicate["plan_id"] == row.external_id
+        assert len(service.list_plans(test_db, user.id)) == 2
@@ -0,0 +1,121 @@
+"""
+Tests for the in-memory race autocomplete index (race_autocomplete_service).
+"""
+
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import models
+from app.services import race_autocomplete_service as module
+from app.services.race_autocomplete_service import RaceAutocompleteService, race_keys
+
+TODAY = date.today()
+
+
+def add_event(db, external_id, name, location, days_ahead=30, participants=None, **fields):
+    event = models.Event(
+        external_id=external_id, name=name, location=location,
+        date=TODAY + timedelta(days=days_ahead), distance_km=fields.pop("distance_km", 10),
+        participants_estimate=participants, **fields,
+    )
+    db.add(event)
+    db.commit()
+    return event
+
+
+def ids(races):
+    return [race["id"] for race in races]
+
+
+class TestRaceAutocompleteService:
+    """Prefix keys, ranking and refresh."""
+
+    @pytest.fixture
+    def service(self):
+        return RaceAutocompleteService()
+
+    def test_keys_start_at_every_word(self):
+        # Then later words are keys too, except stop words
+        assert race_keys("Maratón de Málaga", "Málaga", "Andalucía") == [
+            "maraton de malaga", "malaga", "andalucia",
+        ]
+
+    def test_prefix_matches_ranked_by_popularity_and_date(self, service, test_db):
+        # Given races of different size and date
+        add_event(test_db, "big", "Maratón de Madrid", "Madrid", days_ahead=60, participants=20000)
+        add_event(test_db, "small", "Carrera Popular Majadahonda", "Majadahonda", days_ahead=5, participants=300)
+        add_event(test_db, "tiny_far", "Milla de Mahón", "Mahón", days_ahead=300, participants=100)
+        add_event(test_db, "past", "Media de Madrid", "Madrid", days_ahead=-1, participants=9000)
+        add_event(test_db, "unverified", "Madrid Trail", "Madrid", participants=9000, verified=False)
+
+        # When typing "ma"
+        races = service.suggest(test_db, "Ma")
+
+        # Then upcoming verified races match, the big one first, the far small one last
+        assert ids(races) == ["big", "small", "tiny_far"]
+        assert races[0]["date"] == (TODAY + timedelta(days=60)).isoformat()
+        assert ids(service.suggest(test_db, "mahon")) == ["tiny_far"]
+        assert ids(service.suggest(test_db, "popular  maja")) == ["small"]
+        assert ids(service.suggest(test_db, "ma", limit=1)) == ["big"]
+        assert service.suggest(test_db, "xyz") == []
+        assert service.suggest(test_db, "  ") == []
+
+    def test_index_refreshes_when_events_change(self, service, test_db):
+        # Given a built index
+        event = add_event(test_db, "a", "Trail Peñalara", "Rascafría")
+        assert ids(service.suggest(test_db, "pena")) == ["a"]
+
+        # When the race is renamed and another added
+        event.name = "Trail Sierra"
+        test_db.commit()
+        add_event(test_db, "b", "Peñíscola 10K", "Peñíscola")
+
+        # Then the next lookup sees both changes
+        assert ids(service.suggest(test_db, "pen")) == ["b"]
+        assert ids(service.suggest(test_db, "sierra")) == ["a"]
+
+    def test_changes_from_other_workers_are_picked_up(self, service, test_db, monkeypatch):
+        # Given a built index and a race inserted without the ORM (another worker)
+        add_event(test_db, "a", "Cursa de Nadal", "Barcelona")
+        service.suggest(test_db, "cursa")
+        now = datetime.utcnow()
+        test_db.execute(models.Event.__table__.insert().values(
+            external_id="b", name="Cursa dels Nassos", location="Barcelona", country="España",
+            date=TODAY + timedelta(days=10), distance_km=10, source="official", verified=True,
+            created_at=now, updated_at=now,
+        ))
+        test_db.commit()
+
+        # Then it shows up once the table check is due
+        assert ids(service.suggest(test_db, "cursa")) == ["a"]
+        monkeypatch.setattr(module, "CHECK_SECONDS", 0.0)
+        assert ids(service.suggest(test_db, "cursa")) == ["b", "a"]
+
+    def test_lookup_is_sub_millisecond(self, service, test_db):
+        # Given 20,000 upcoming races
+        now = datetime.utcnow()
+        test_db.execute(models.Event.__table__.insert(), [
+            {
+                "external_id": f"r{i}", "name": f"Carrera Popular de Villa {i}", "location": f"Pueblo {i % 3000}",
+                "region": "Castilla", "country": "España", "date": TODAY + timedelta(days=i % 300),
+                "distance_km": 10, "participants_estimate": i % 5000, "source": "official",
+                "verified": True, "created_at": now, "updated_at": now,
+            }
+            for i in range(20000)
+        ])
+        test_db.commit()
+        service.load(test_db)
+
+        # When suggesting for a prefix matching every race, and a rare one
+        started = time.perf_counter()
+        for _ in range(100):
+            broad = service.suggest(test_db, "c")
+            rare = service.suggest(test_db, "villa 1234")
+        elapsed = (time.perf_counter() - started) / 200
+
+        # Then each lookup takes well under a millisecond
+        assert elapsed < 0.001
+        assert len(broad) == 8
+        assert len(rare) == 8 and all(race["id"].startswith("r1234") for race in rare)
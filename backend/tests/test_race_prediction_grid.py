@@ -0,0 +1,104 @@
+"""
+Tests for batch condition-grid race predictions (RacePredictionEnhancedService.predict_grid).
+"""
+
+import itertools
+
+import pytest
+
+from app.services import race_prediction_enhanced_service as module
+from app.services.race_prediction_enhanced_service import RacePredictionEnhancedService, TerrainType
+
+DISTANCES = [5, 21.0975]
+TEMPERATURES = [4, 12, 22]
+HUMIDITIES = [30, 50, 85]
+ALTITUDES = [0, 2200]
+TERRAINS = [TerrainType.FLAT, TerrainType.MOUNTAIN]
+
+
+class TestRacePredictionGrid:
+    """Vectorized grid vs the per-scenario prediction."""
+
+    @pytest.fixture
+    def service(self):
+        return RacePredictionEnhancedService()
+
+    def test_grid_matches_single_predictions(self, service, test_db):
+        # Given a grid over every condition axis
+        grid = service.predict_grid(
+            test_db, 1, 45, 10, DISTANCES, TEMPERATURES, HUMIDITIES, ALTITUDES, TERRAINS,
+            wind_kmh=20, condition="fair",
+        )
+
+        # Then every cell equals the one-scenario prediction
+        assert grid["shape"] == [2, 3, 3, 2, 2]
+        for (d, dist), (t, temp), (h, hum), (a, alt), (r, terrain) in itertools.product(
+            *(enumerate(axis) for axis in (DISTANCES, TEMPERATURES, HUMIDITIES, ALTITUDES, TERRAINS))
+        ):
+            single = service.predict_with_conditions(
+                test_db, 1, 45, 10, dist,
+                weather={"temp_c": temp, "humidity_pct": hum, "wind_kmh": 20, "condition": "fair"},
+                terrain=terrain, altitude_m=alt,
+            )
+            assert grid["minutes"][d][t][h][a][r] == single["prediction"]["adjusted_prediction_minutes"]
+            assert grid["confidence"][d][t][h][a][r] == single["confidence"]["score"]
+
+        ranges = grid["range_by_distance"]
+        assert [r["distance_km"] for r in ranges] == DISTANCES
+        assert ranges[0]["min_minutes"] < ranges[0]["max_minutes"] < ranges[1]["min_minutes"]
+
+    def test_scenarios_come_from_one_grid(self, service, test_db, monkeypatch):
+        # Given a counter on the grid prediction
+        calls = []
+        predict_grid = service.predict_grid
+
+        def counted(*args, **kwargs):
+            calls.append(kwargs)
+            return predict_grid(*args, **kwargs)
+
+        monkeypatch.setattr(service, "predict_grid", counted)
+
+        # When the scenarios of a marathon are compared
+        result = service.compare_scenarios(test_db, 1, 45, 10, 42.195)
+
+        # Then one grid covers them and each equals its single prediction
+        assert len(calls) == 1
+        for name, conditions in service.SCENARIOS.items():
+            single = service.predict_with_conditions(
+                test_db, 1, 45, 10, 42.195,
+                weather={"temp_c": conditions["temp_c"], "humidity_pct": conditions["humidity_pct"]},
+                terrain=conditions["terrain"], altitude_m=conditions["altitude_m"],
+            )
+            scenario = result["scenarios"][name]
+            assert scenario["prediction_minutes"] == single["prediction"]["adjusted_prediction_minutes"]
+            assert scenario["formatted_time"] == single["prediction"]["formatted_time"]
+        assert result["range"]["min_minutes"] < result["scenarios"]["realistic_case"]["prediction_minutes"]
+        assert result["range"]["max_minutes"] == result["scenarios"]["worst_case"]["prediction_minutes"]
+
+    def test_best_effort_is_looked_up_once(self, service, test_db, monkeypatch):
+        # Given a best recent effort of 10 km in 50 min
+        calls = []
+
+        def best(db, user_id):
+            calls.append(user_id)
+            return 10000, 50.0, None
+
+        monkeypatch.setattr(module.race_predictor_service, "_find_best_performance", best)
+        monkeypatch.setattr(module.race_predictor_service, "_best_cache", {})
+
+        # When a grid is predicted without a base race
+        grid = service.predict_grid(test_db, 7, None, None, [10], TEMPERATURES, [50], [0], [TerrainType.ROLLING])
+
+        # Then the base is shared by every cell
+        assert calls == [7]
+        assert grid["base_performance"]["source"] == "best_recent_effort"
+        assert grid["base_predictions_minutes"] == [50.0]
+        assert grid["minutes"][0][1][0][0][0] == 50.0  # 12°C, 50%, sea level, rolling
+
+    def test_grid_size_is_capped(self, service, test_db):
+        # Given a grid larger than the cap
+        temperatures = list(range(service.MAX_GRID_CELLS // 2 + 1))
+
+        # Then it is rejected before any work
+        with pytest.raises(ValueError):
+            service.predict_grid(test_db, 1, 45, 10, [10], temperatures, [50, 60], [0], [TerrainType.FLAT])
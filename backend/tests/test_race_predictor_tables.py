@@ -0,0 +1,122 @@
+"""
+Tests for the VDOT lookup tables, batch predictions and the per-user
+best-performance cache (race_predictor_service).
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import crud, models
+from app.services.race_predictor_service import RacePredictorService, vdot_values
+
+
+@pytest.fixture
+def add_run(make_workout):
+    def make(days_ago, km, minutes):
+        start = datetime.utcnow() - timedelta(days=days_ago)
+        return make_workout(start, km, minutes * 60, avg_pace=minutes * 60 / km)
+    return make
+
+
+class TestRacePredictorTables:
+    """Tables vs closed form, batch API and caching."""
+
+    @pytest.fixture
+    def service(self):
+        return RacePredictorService()
+
+    def test_tables_invert_the_vdot_formula(self, service):
+        # Given VDOTs between the grid points
+        vdots = np.linspace(30.05, 84.95, 97)
+
+        # When their equivalent times are read from the tables
+        batch = service.predict_for_vdots(vdots)
+
+        # Then each time gives back its VDOT
+        for name, distance_m in service.RACE_DISTANCES.items():
+            exact = np.array([service.equivalent_time(vdot, name) for vdot in vdots])
+            assert np.allclose(vdot_values(distance_m / 1000, exact), vdots, atol=0.01)
+            assert batch["times_minutes"][name] == np.round(exact, 2).tolist()
+
+    def test_batch_matches_single_vdot_paces(self, service):
+        # Given VDOTs in and out of the supported range
+        batch = service.predict_for_vdots([25, 42.7, 60])
+
+        # Then they are clamped and the paces equal the per-VDOT ones
+        assert batch["vdots"] == [30.0, 42.7, 60.0]
+        for i, vdot in enumerate((30.0, 42.7, 60.0)):
+            single = service.get_training_paces(vdot)
+            for zone, values in single.items():
+                assert batch["training_paces_min_km"][zone.lower()][i] == round(values["pace_min_km"], 3)
+            assert batch["times_minutes"]["10K"][i] == round(service.equivalent_time(vdot, "10K"), 2)
+        assert batch["times_minutes"]["5K"][0] > batch["times_minutes"]["5K"][2]
+
+    def test_race_times_match_the_vdot_tables(self, service, test_db, user):
+        # Given a manual 10K in 48:30
+        result = service.predict_race_times(test_db, user.id, base_race=(10000, 48.5))
+
+        # Then every distance is the table equivalent time of its VDOT
+        vdot = service._calculate_vdot(10, 48.5)
+        batch = service.predict_for_vdots([vdot])
+        for name in service.RACE_DISTANCES:
+            predicted = result["predictions"][name]["predicted_time_minutes"]
+            assert predicted == round(service.equivalent_time(vdot, name), 2)
+            assert predicted == batch["times_minutes"][name][0]
+        assert result["predictions"]["10K"]["predicted_time_minutes"] == pytest.approx(48.5, abs=0.05)
+
+    def test_best_performance_is_cached_until_workouts_change(self, service, test_db, user, add_run, monkeypatch):
+        # Given a recent 10K and a counter on the best-effort lookup
+        add_run(3, 10, 50)
+        test_db.commit()
+        calls = []
+        lookup = service._find_best_performance
+
+        def counted(db, user_id):
+            calls.append(user_id)
+            return lookup(db, user_id)
+
+        monkeypatch.setattr(service, "_find_best_performance", counted)
+
+        # When predictions are requested twice
+        first = service.get_current_vdot(test_db, user.id)
+        service.predict_race_times(test_db, user.id)
+
+        # Then the best effort is looked up once
+        assert calls == [user.id]
+
+        # When a faster run is added
+        add_run(1, 10, 45)
+        test_db.commit()
+
+        # Then the cache is invalidated and the VDOT improves
+        assert service.get_current_vdot(test_db, user.id) > first
+        assert calls == [user.id, user.id]
+
+        # When only the profile changes, the cached value is kept
+        user.weight_kg = 70
+        user.context_version = (user.context_version or 0) + 1
+        test_db.commit()
+        service.get_current_vdot(test_db, user.id)
+        assert calls == [user.id, user.id]
+
+        # When the newest run is deleted, it is looked up again
+        latest = test_db.query(models.Workout).order_by(models.Workout.id.desc()).first()
+        crud.delete_workout(test_db, latest)
+        assert service.get_current_vdot(test_db, user.id) == first
+        assert len(calls) == 3
+
+    def test_trail_runs_invalidate_the_cache(self, service, test_db, user, add_run, make_workout):
+        # Given a cached best performance from a road 10K
+        add_run(3, 10, 50)
+        test_db.commit()
+        first = service.get_current_vdot(test_db, user.id)
+
+        # When a faster trail run is added
+        start = datetime.utcnow() - timedelta(days=1)
+        make_workout(start, 10, 45 * 60, avg_pace=270, sport_type="Trail Running")
+        test_db.commit()
+
+        # Then it is indexed and picked up like any other run
+        assert service.get_current_vdot(test_db, user.id) > first
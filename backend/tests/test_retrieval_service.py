@@ -0,0 +1,123 @@
+"""
+Tests for local BM25 retrieval over chat history and workouts (retrieval_service).
+"""
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from app import models
+from app.services import retrieval_service as module
+from app.services.retrieval_service import RetrievalService, hash_token, tokenize
+
+
+@pytest.fixture
+def run(make_workout):
+    """Run at 5:30/km."""
+    def make(start, km):
+        return make_workout(start, km, km * 330, avg_pace=330)
+    return make
+
+
+class TestTokenize:
+    """Normalization shared by documents and queries."""
+
+    def test_accents_plurals_and_stopwords(self):
+        assert tokenize("¿Cómo fueron mis Tiradas LARGAS de marzo?") == [
+            "fueron", "tirada", "larga", "marzo",
+        ]
+        assert hash_token("marzo") == hash_token("marzo")
+
+    def test_short_plurals_match_their_singular(self):
+        assert tokenize("runs rides días") == tokenize("run ride día") == ["run", "ride", "dia"]
+        assert tokenize("boss") == ["boss"]
+
+
+class TestRetrievalService:
+    """BM25 ranking and incremental index maintenance."""
+
+    @pytest.fixture
+    def service(self):
+        return RetrievalService()
+
+    def test_month_and_long_run_question(self, service, test_db, user, run):
+        # Given short and long runs across several months
+        for month in (2, 3, 4):
+            for day, km in ((3, 8), (9, 21), (15, 6)):
+                run(datetime(2026, month, day, 7), km)
+        test_db.add(models.ChatMessage(
+            user_id=user.id, role="user", content="Me duele la rodilla después del fartlek",
+            created_at=datetime(2026, 4, 20),
+        ))
+        test_db.commit()
+
+        # When asking about the March long runs (in English)
+        hits = service.search(test_db, user.id, "How did my March long runs go?", k=3)
+
+        # Then the March long run ranks first
+        assert hits[0].kind == "workout"
+        assert hits[0].line.startswith("- 09/03/2026 running 21.0km")
+
+        # And a Spanish question finds the chat message
+        hits = service.search(test_db, user.id, "¿Qué te dije de mi rodilla?", k=1)
+        assert hits[0].kind == "message"
+        assert "rodilla" in hits[0].line
+
+    def test_incremental_and_rebuild_after_delete(self, service, test_db, user):
+        # Given an index built from one message
+        first = models.ChatMessage(user_id=user.id, role="user", content="Objetivo: maratón de Sevilla")
+        test_db.add(first)
+        test_db.commit()
+        assert service.search(test_db, user.id, "Sevilla")[0].ref_id == first.id
+
+        # When a new message arrives, it is appended without a rebuild
+        index = service._indexes[user.id]
+        second = models.ChatMessage(user_id=user.id, role="assistant", content="El maratón de Valencia es llano")
+        test_db.add(second)
+        test_db.commit()
+        assert service.search(test_db, user.id, "Valencia")[0].ref_id == second.id
+        assert service._indexes[user.id] is index
+
+        # And excluded messages are skipped
+        assert service.search(test_db, user.id, "Valencia", exclude_message_ids=[second.id]) == []
+
+        # When the history is deleted, the index is rebuilt without it
+        test_db.query(models.ChatMessage).filter(models.ChatMessage.user_id == user.id).delete()
+        test_db.commit()
+        assert service.search(test_db, user.id, "Sevilla") == []
+        assert service._indexes[user.id] is not index
+
+    def test_indexes_are_capped_lru(self, service, test_db, user, monkeypatch):
+        # Given room for two users' indexes
+        monkeypatch.setattr(module, "MAX_CACHED_USERS", 2)
+        others = [models.User(name=f"R{i}", email=f"r{i}@example.com", hashed_password="x") for i in range(2)]
+        test_db.add_all(others)
+        test_db.commit()
+
+        # When three users search, the first one again before the third
+        service.search(test_db, user.id, "sevilla")
+        service.search(test_db, others[0].id, "sevilla")
+        service.search(test_db, user.id, "sevilla")
+        service.search(test_db, others[1].id, "sevilla")
+
+        # Then the least recently used index was dropped
+        assert list(service._indexes) == [user.id, others[1].id]
+
+    def test_one_users_lock_does_not_block_another(self, service, test_db, user, run):
+        # Given another user's index locked (e.g. mid-update)
+        other = models.User(name="Other", email="other@example.com", hashed_password="x")
+        test_db.add(other)
+        test_db.commit()
+        service.search(test_db, other.id, "sevilla")
+        run(datetime(2026, 3, 9, 7), 21)
+        test_db.commit()
+
+        # Then this user's search still completes
+        with service._indexes[other.id].lock:
+            result = []
+            thread = threading.Thread(target=lambda: result.extend(service.search(test_db, user.id, "long run")))
+            thread.start()
+            thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert result and result[0].kind == "workout"
@@ -0,0 +1,148 @@
+"""
+Tests for the nearest-neighbour similar-workout index (similar_workout_service).
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import crud, models
+from app.services import similar_workout_service as module
+from app.services.similar_workout_service import KDTree, SimilarWorkoutService
+
+
+@pytest.fixture
+def workout(make_workout):
+    """Session `days_ago` days before 1 Oct 2026."""
+    def make(km, minutes, hr, days_ago=1, sport="running"):
+        start = datetime(2026, 10, 1) - timedelta(days=days_ago)
+        return make_workout(start, km, minutes * 60, sport_type=sport, avg_heart_rate=hr)
+    return make
+
+
+class TestKDTree:
+    """Tree search matches brute force."""
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        points = rng.normal(size=(500, 10))
+        tree = KDTree(points)
+
+        for query in rng.normal(size=(20, 10)):
+            expected = np.argsort(((points - query) ** 2).sum(axis=1))[:5]
+            assert [i for _, i in tree.query(query, 5)] == list(expected)
+
+
+class TestSimilarWorkoutService:
+    """Index maintenance and lookup."""
+
+    @pytest.fixture
+    def service(self):
+        return SimilarWorkoutService()
+
+    def test_returns_most_comparable_sessions(self, service, test_db, workout):
+        # Given easy 10 km runs, a 5 km tempo and a long run
+        target = workout(10, 55, 145, days_ago=0)
+        easy = workout(10.2, 56, 146, days_ago=7)
+        workout(5, 22, 172, days_ago=5)
+        workout(21, 120, 150, days_ago=3)
+        workout(10, 30, 150, days_ago=2, sport="cycling")
+
+        # When the nearest sessions are requested
+        result = service.similar(test_db, target, k=2)
+
+        # Then the similar easy run comes first and other sports are excluded
+        assert [w.id for w, _ in result][0] == easy.id
+        assert len(result) == 2
+        assert all(w.sport_type == "running" for w, _ in result)
+
+    def test_new_workouts_are_inserted_incrementally(self, service, test_db, workout):
+        # Given an index built from existing history
+        target = workout(10, 55, 145, days_ago=0)
+        for i in range(30):
+            workout(5 + i * 0.5, 30 + i * 3, 140 + i, days_ago=10 + i)
+        service.similar(test_db, target, k=3)
+        index = next(iter(service._indexes.values()))
+        tree = index.tree
+
+        # When a closer match is stored afterwards
+        twin = workout(10, 55, 145, days_ago=1)
+        result = service.similar(test_db, target, k=3)
+
+        # Then it is found through the pending buffer without a rebuild
+        assert result[0][0].id == twin.id
+        assert index.tree is tree
+        assert index.pending_ids == [twin.id]
+
+        # And deleting it rebuilds the index
+        test_db.delete(twin)
+        test_db.commit()
+        assert twin.id not in [w.id for w, _ in service.similar(test_db, target, k=3)]
+
+    def test_delete_then_insert_with_same_count_is_detected(self, service, test_db, workout):
+        # Given an index over a few runs
+        target = workout(10, 55, 145, days_ago=0)
+        old_twin = workout(10, 55, 145, days_ago=30)
+        workout(21, 120, 150, days_ago=3)
+        assert service.similar(test_db, target, k=1)[0][0].id == old_twin.id
+
+        # When an old run is deleted and an unrelated one added (count unchanged)
+        crud.delete_workout(test_db, old_twin)
+        workout(5, 22, 172, days_ago=2)
+
+        # Then the deleted run is no longer returned
+        assert old_twin.id not in [w.id for w, _ in service.similar(test_db, target, k=3)]
+
+    def test_reused_id_is_detected(self, service, test_db, workout):
+        # Given an index whose newest run is then deleted
+        target = workout(10, 55, 145, days_ago=0)
+        newest = workout(10, 55, 145, days_ago=1)
+        service.similar(test_db, target, k=1)
+        newest_id = newest.id
+        crud.delete_workout(test_db, newest)
+
+        # When a different run is stored under the same id (SQLite reuses the max rowid)
+        replacement = workout(42.2, 200, 160, days_ago=1)
+        assert replacement.id == newest_id
+
+        # Then the index is rebuilt with the new values
+        result = service.similar(test_db, target, k=2)
+        assert result[0][0].id == replacement.id
+        assert result[0][1] > 1
+
+    def test_indexes_are_capped_lru(self, service, test_db, workout, monkeypatch):
+        # Given room for two indexes
+        monkeypatch.setattr(module, "MAX_CACHED_INDEXES", 2)
+        run = workout(10, 55, 145)
+        ride = workout(40, 90, 130, sport="cycling")
+        swim = workout(2, 45, 120, sport="swimming")
+
+        # When three sports are looked up, running again before the third
+        service.similar(test_db, run)
+        service.similar(test_db, ride)
+        service.similar(test_db, run)
+        service.similar(test_db, swim)
+
+        # Then the least recently used index was dropped
+        assert list(service._indexes) == [(run.user_id, "running"), (swim.user_id, "swimming")]
+
+    def test_one_users_lock_does_not_block_another(self, service, test_db, workout, make_workout):
+        # Given another user's index locked (e.g. mid-update)
+        other = models.User(name="Other", email="other@example.com", hashed_password="x")
+        test_db.add(other)
+        test_db.commit()
+        theirs = make_workout(datetime(2026, 9, 1), 10, 3300, owner=other, avg_heart_rate=145)
+        service.similar(test_db, theirs)
+        target = workout(10, 55, 145, days_ago=0)
+        twin = workout(10, 55, 146, days_ago=3)
+
+        # Then this user's lookup still completes
+        with service._indexes[(other.id, "running")].lock:
+            result = []
+            thread = threading.Thread(target=lambda: result.extend(service.similar(test_db, target, k=1)))
+            thread.start()
+            thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert result[0][0].id == twin.id
@@ -0,0 +1,96 @@
+"""
+Tests for LTTB chart downsampling (stream_pyramid_service).
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.services.stream_pyramid_service import StreamPyramidService, lttb
+from app.services.workout_stream_service import workout_stream_service
+
+
+def _streams(seconds=3600):
+    """1 Hz run at 3 m/s with a single HR spike at 1800 s."""
+    time = np.arange(seconds, dtype=float)
+    heart_rate = 140 + 5 * np.sin(time / 60)
+    heart_rate[1800] = 190
+    return {
+        "time": time,
+        "distance": time * 3.0,
+        "heart_rate": heart_rate,
+        "speed": np.full(seconds, 3.0),
+        "altitude": 100 + time / 100,
+    }
+
+
+class TestLttb:
+    """Point selection."""
+
+    def test_keeps_endpoints_and_spikes(self):
+        # Given a 1 Hz series with one spike
+        streams = _streams()
+
+        # When reduced to 100 points
+        keep = lttb(streams["time"], streams["heart_rate"], 100)
+
+        # Then the count is exact and the ends and spike survive
+        assert len(keep) == 100
+        assert keep[0] == 0 and keep[-1] == 3599
+        assert 1800 in keep
+        assert np.all(np.diff(keep) > 0)
+
+    def test_short_series_is_unchanged(self):
+        x = np.arange(5, dtype=float)
+        assert list(lttb(x, x, 10)) == [0, 1, 2, 3, 4]
+
+
+class TestStreamPyramidService:
+    """Pyramid storage and read path."""
+
+    @pytest.fixture
+    def service(self):
+        return StreamPyramidService()
+
+    def test_ingest_builds_pyramid_and_reads_requested_points(self, service, test_db, make_workout):
+        # Given a workout ingested with streams
+        workout = make_workout(datetime(2026, 10, 1, 7, 0), 10.797, 3599, streams=_streams())
+        assert workout.stream.pyramid is not None
+
+        # When 300 points are requested
+        series = service.get_series(test_db, workout.stream, ["hr", "pace", "power"], 300)
+
+        # Then each channel with data has 300 points and pace is in s/km
+        assert set(series) == {"hr", "pace"}
+        assert len(series["hr"]["t"]) == len(series["hr"]["v"]) == 300
+        assert max(series["hr"]["v"]) == 190
+        assert series["pace"]["v"][0] == pytest.approx(333.33, abs=0.01)
+
+    def test_missing_pyramid_is_built_on_read(self, service, test_db, make_workout):
+        # Given a stream stored before pyramids existed
+        workout = make_workout(datetime(2026, 10, 1, 7, 0), 10.797, 3599, streams=_streams())
+        workout.stream.pyramid = None
+        test_db.commit()
+
+        # When read
+        series = service.get_series(test_db, workout.stream, ["alt"], 200)
+
+        # Then it is rebuilt and kept
+        assert len(series["alt"]["v"]) == 200
+        assert workout.stream.pyramid is not None
+
+    def test_replacing_streams_bumps_the_version(self, service, test_db, make_workout):
+        # Given a workout ingested with streams
+        workout = make_workout(datetime(2026, 10, 1, 7, 0), 10.797, 3599, streams=_streams())
+        assert workout.stream.version == 1
+
+        # When its samples are replaced
+        shorter = {name: values[:1800] for name, values in _streams().items()}
+        workout_stream_service.save(test_db, workout, shorter)
+        test_db.commit()
+
+        # Then the version changes and the chart series come from the new samples
+        assert workout.stream.version == 2
+        series = service.get_series(test_db, workout.stream, ["hr"], 200)
+        assert series["hr"]["t"][-1] == 1799
@@ -0,0 +1,79 @@
+"""
+Tests for GPS track storage (track_service).
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.services.track_service import (
+    TrackService,
+    decode_polyline,
+    douglas_peucker,
+    encode_polyline,
+)
+
+
+def _streams(seconds=1800):
+    """1 Hz out-and-back loop around Madrid with GPS jitter and no fix at first."""
+    time = np.arange(seconds, dtype=float)
+    angle = time / seconds * 2 * np.pi
+    rng = np.random.default_rng(3)
+    lat = 40.4168 + 0.01 * np.sin(angle) + rng.normal(0, 2e-6, seconds)
+    lon = -3.7038 + 0.015 * (1 - np.cos(angle)) + rng.normal(0, 2e-6, seconds)
+    lat[:5] = lon[:5] = 0.0
+    return {"time": time, "lat": lat, "lon": lon}
+
+
+class TestPolyline:
+    """Encoding and simplification."""
+
+    def test_encodes_reference_example(self):
+        # Google's documented example
+        lat = np.array([38.5, 40.7, 43.252])
+        lon = np.array([-120.2, -120.95, -126.453])
+        assert encode_polyline(lat, lon) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+    def test_round_trip(self):
+        streams = _streams()
+        lat, lon = streams["lat"][5:], streams["lon"][5:]
+        decoded_lat, decoded_lon = decode_polyline(encode_polyline(lat, lon))
+        assert np.allclose(decoded_lat, lat, atol=6e-6)
+        assert np.allclose(decoded_lon, lon, atol=6e-6)
+
+    def test_douglas_peucker_drops_collinear_points(self):
+        # Given a tent: two straight legs meeting at x=50
+        x = np.arange(100, dtype=float)
+        y = np.where(x <= 50, x, 100 - x)
+        keep = douglas_peucker(x, y, tolerance=1.0)
+        assert list(np.nonzero(keep)[0]) == [0, 50, 99]
+
+
+class TestTrackService:
+    """Ingest and read paths."""
+
+    @pytest.fixture
+    def service(self):
+        return TrackService()
+
+    def test_ingest_stores_track_and_bbox(self, service, test_db, user, make_workout):
+        # Given a workout ingested with GPS streams
+        workout = make_workout(datetime(2026, 10, 1, 7, 0), 6.0, 1799, streams=_streams())
+
+        # Then the pre-fix 0,0 samples are excluded from track and box
+        track = workout.track
+        assert track.point_count == 1795
+        assert workout.min_lat == pytest.approx(40.4068, abs=1e-4)
+        assert workout.max_lon == pytest.approx(-3.6738, abs=1e-4)
+
+        # And coarser zooms use fewer points
+        sizes = [len(decode_polyline(service.polyline_for_zoom(track, z)[0])[0]) for z in (17, 16, 13, 10)]
+        assert sizes[0] == 1795
+        assert sizes == sorted(sizes, reverse=True)
+        assert sizes[-1] < 100
+        assert service.polyline_for_zoom(track, 12)[1] == 13
+
+        # And area queries find it only when the boxes overlap
+        assert service.in_area(test_db, user.id, 40.40, -3.70, 40.41, -3.69) == [workout]
+        assert service.in_area(test_db, user.id, 41.0, -3.70, 41.1, -3.69) == []
@@ -0,0 +1,148 @@
+"""
+Tests for the CTL/ATL/TSB training load model (training_load_service).
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import models
+from app.services.training_load_service import TrainingLoadService, ewma
+
+
+@pytest.fixture
+def user(user, test_db):
+    """Runner with a known HR profile."""
+    user.max_heart_rate = 190
+    user.resting_heart_rate = 50
+    test_db.commit()
+    return user
+
+
+def _workout(user, day, minutes=60, avg_hr=150):
+    return models.Workout(
+        user_id=user.id,
+        sport_type="running",
+        start_time=datetime.combine(day, datetime.min.time()) + timedelta(hours=7),
+        duration_seconds=minutes * 60,
+        distance_meters=minutes * 200.0,
+        avg_heart_rate=avg_hr,
+    )
+
+
+def _loop_series(loads):
+    """Reference implementation: the plain day-by-day recurrence."""
+    ctl = atl = 0.0
+    out = []
+    for load in loads:
+        tsb = ctl - atl
+        ctl += (load - ctl) / 42
+        atl += (load - atl) / 7
+        out.append((ctl, atl, tsb))
+    return out
+
+
+class TestEwma:
+    """Chunked vectorized EWMA must equal the scalar recurrence."""
+
+    def test_matches_recurrence_over_five_years(self):
+        # Given ~5 years of sparse daily loads
+        rng = np.random.default_rng(42)
+        loads = rng.uniform(0, 150, 1830) * (rng.random(1830) < 0.7)
+
+        # When evaluated vectorized
+        ctl = ewma(loads, 1 / 42)
+
+        # Then it matches the loop within float tolerance
+        expected = [point[0] for point in _loop_series(loads)]
+        assert np.allclose(ctl, expected, rtol=1e-9, atol=1e-9)
+
+
+class TestTrainingLoadService:
+    """Stress scores and incremental series maintenance."""
+
+    @pytest.fixture
+    def service(self):
+        return TrainingLoadService()
+
+    def test_one_hour_at_threshold_is_about_100(self, service, user):
+        # Given one hour at LTHR (~89% of max HR)
+        workout = _workout(user, date(2026, 1, 1), minutes=60, avg_hr=round(190 * 0.89))
+
+        # Then hrTSS is close to 100
+        assert service.calculate_stress_score(workout, user) == pytest.approx(100, abs=3)
+
+    def test_pace_fallback_without_heart_rate(self, service, user):
+        # Given a run at the default threshold pace with no HR
+        workout = _workout(user, date(2026, 1, 1), minutes=60, avg_hr=None)
+        workout.distance_meters = 12000.0  # 5:00/km
+
+        # Then rTSS is 100
+        assert service.calculate_stress_score(workout, user) == pytest.approx(100)
+
+    def test_incremental_add_and_remove_match_rebuild(self, service, test_db, user):
+        # Given workouts added one at a time, out of order
+        start = date(2026, 1, 1)
+        days = [0, 3, 10, 4, 30, 2]
+        workouts = []
+        for offset in days:
+            workout = _workout(user, start + timedelta(days=offset))
+            test_db.add(workout)
+            service.process_workout(test_db, workout)
+            workouts.append(workout)
+
+        # When one workout in the middle is removed
+        service.remove_workout(test_db, workouts[3])
+        test_db.flush()
+        incremental = service.get_series(test_db, user.id, start, start + timedelta(days=40))
+
+        # Then the series equals a full rebuild and the reference loop
+        service.rebuild(test_db, user.id)
+        test_db.flush()
+        rebuilt = service.get_series(test_db, user.id, start, start + timedelta(days=40))
+        assert incremental == rebuilt
+
+        score = workouts[0].training_stress_score
+        loads = [score if i in (0, 3, 10, 30, 2) else 0.0 for i in range(41)]
+        for point, (ctl, atl, tsb) in zip(rebuilt, _loop_series(loads)):
+            assert point["ctl"] == pytest.approx(ctl, abs=0.01)
+            assert point["atl"] == pytest.approx(atl, abs=0.01)
+            assert point["tsb"] == pytest.approx(tsb, abs=0.01)
+
+    def test_moving_a_workout_recomputes_its_old_day(self, service, test_db, user):
+        # Given workouts on three days
+        start = date(2026, 3, 1)
+        workouts = [_workout(user, start + timedelta(days=offset)) for offset in (0, 5, 12)]
+        test_db.add_all(workouts)
+        service.process_workouts(test_db, user.id, workouts)
+        test_db.flush()
+
+        # When the middle one is edited to a later day (same score)
+        workouts[1].start_time += timedelta(days=4)
+        service.process_workout(test_db, workouts[1])
+        test_db.flush()
+        incremental = service.get_series(test_db, user.id, start, start + timedelta(days=20))
+
+        # Then the old day has no load left and the series equals a rebuild
+        assert incremental[5]["load"] == 0.0
+        assert incremental[9]["load"] == workouts[1].training_stress_score
+        service.rebuild(test_db, user.id)
+        test_db.flush()
+        assert incremental == service.get_series(test_db, user.id, start, start + timedelta(days=20))
+
+    def test_current_projects_decay_past_last_workout(self, service, test_db, user):
+        # Given a single workout
+        day = date(2026, 2, 1)
+        workout = _workout(user, day)
+        test_db.add(workout)
+        service.process_workout(test_db, workout)
+
+        # When reading a week later
+        current = service.get_current(test_db, user.id, as_of=day + timedelta(days=7))
+
+        # Then fatigue has decayed faster than fitness
+        score = workout.training_stress_score
+        assert current["atl"] == pytest.approx(score / 7 * (6 / 7) ** 7, abs=0.01)
+        assert current["ctl"] == pytest.approx(score / 42 * (41 / 42) ** 7, abs=0.01)
+        assert current["load"] == 0.0
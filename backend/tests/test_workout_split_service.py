@@ -0,0 +1,63 @@
+"""
+Tests for per-km / per-mile / per-lap splits (workout_split_service).
+"""
+
+import numpy as np
+import pytest
+
+from app.services.workout_split_service import WorkoutSplitService
+from app.services.workout_stream_service import LAP_STARTS, workout_stream_service
+
+
+def _streams(seconds=1500):
+    """1 Hz run: 4 m/s for the first 600 s then 3 m/s, HR 140 then 160, climbing 1 m/10 s."""
+    time = np.arange(seconds, dtype=float)
+    speed = np.where(time < 600, 4.0, 3.0)
+    return {
+        "time": time,
+        "distance": np.concatenate(([0.0], np.cumsum(speed[:-1]))),
+        "heart_rate": np.where(time < 600, 140.0, 160.0),
+        "altitude": 100 + time / 10,
+    }
+
+
+class TestWorkoutSplitService:
+    """Splits computed from streams."""
+
+    @pytest.fixture
+    def service(self):
+        return WorkoutSplitService()
+
+    def test_km_splits(self, service):
+        # Given a 5.1 km run
+        splits = service.compute(_streams())
+
+        # When expanded
+        rows = service.as_rows(splits, "km")
+
+        # Then there are 5 full km plus the trailing 97 m
+        assert [row["index"] for row in rows] == [1, 2, 3, 4, 5, 6]
+        assert rows[0]["elapsed_seconds"] == pytest.approx(250)
+        assert rows[0]["pace_seconds_per_km"] == pytest.approx(250)
+        assert rows[0]["avg_heart_rate"] == 140
+        assert rows[3]["pace_seconds_per_km"] == pytest.approx(333.3, abs=0.1)
+        assert rows[3]["avg_heart_rate"] == 160
+        assert rows[0]["elevation_gain"] == pytest.approx(25, abs=0.2)
+        assert rows[-1]["distance_meters"] == pytest.approx(97, abs=0.5)
+        assert sum(row["elapsed_seconds"] for row in rows) == pytest.approx(1499, abs=0.5)
+
+    def test_device_laps(self, service):
+        # Given two device laps split at 600 s
+        streams = _streams()
+        streams[LAP_STARTS] = np.array([0.0, 600.0])
+
+        # When computed after a storage round-trip
+        decoded = workout_stream_service.decode(workout_stream_service.encode(streams))
+        rows = service.as_rows(service.compute(decoded), "laps")
+
+        # Then each lap has its own pace and HR
+        assert len(rows) == 2
+        assert rows[0]["distance_meters"] == pytest.approx(2400)
+        assert rows[0]["avg_heart_rate"] == 140
+        assert rows[1]["avg_heart_rate"] == 160
+        assert rows[1]["pace_seconds_per_km"] == pytest.approx(333.3, abs=0.1)
@@ -0,0 +1,113 @@
+"""
+Tests for vectorized time in zone (hr_zones_calculator, zone_time_service).
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.hr_zones_calculator import (
+    auto_calculate_and_save_zones,
+    generate_hr_zones,
+    get_zone_for_hr,
+    time_in_zones_array,
+)
+from app.services import zone_time_service as module
+from app.services.zone_time_service import ZoneTimeService
+
+
+@pytest.fixture
+def user(user, test_db):
+    """Runner with a known max HR."""
+    user.max_heart_rate = 190
+    test_db.commit()
+    return user
+
+
+def _loop_time_in_zones(time, hr, zones):
+    """Reference: per-sample loop using get_zone_for_hr."""
+    totals = {zone["zone"]: 0.0 for zone in zones}
+    for i in range(1, len(time)):
+        if np.isnan(hr[i]) or not hr[i]:
+            continue
+        zone = get_zone_for_hr(hr[i], zones)
+        if zone:
+            totals[zone] += time[i] - time[i - 1]
+    return totals
+
+
+class TestTimeInZonesArray:
+    """searchsorted zone lookup must match the per-sample loop."""
+
+    def test_matches_loop_including_boundaries_and_gaps(self):
+        # Given HR samples covering every integer bpm, boundaries and missing values
+        rng = np.random.default_rng(5)
+        zones = generate_hr_zones(190)
+        hr = rng.integers(60, 200, 5000).astype(float)
+        hr[rng.random(5000) < 0.05] = np.nan
+        time = np.cumsum(rng.uniform(0.5, 2.0, 5000))
+
+        # When computed vectorized
+        result = time_in_zones_array(time, hr, zones)
+
+        # Then it equals the loop
+        expected = _loop_time_in_zones(time, hr, zones)
+        assert result == pytest.approx(expected)
+
+
+class TestZoneTimeService:
+    """Persisted time in zone and bulk recompute."""
+
+    @pytest.fixture
+    def service(self):
+        return ZoneTimeService()
+
+    def _create(self, make_workout, hr_value):
+        time = np.arange(600, dtype=float)
+        streams = {
+            "time": time,
+            "distance": time * 3.0,
+            "heart_rate": np.full(600, hr_value, dtype=float),
+        }
+        return make_workout(datetime.utcnow() - timedelta(days=1), 1.8, 600, streams=streams)
+
+    def test_ingest_stores_hr_and_pace_zones(self, service, test_db, make_workout):
+        # Given a 10 min run at 160 bpm (zone 4 of max 190: 152-171)
+        workout = self._create(make_workout, 160)
+
+        # Then HR and pace time in zone are stored
+        assert workout.time_in_zones["heart_rate"]["4"] == pytest.approx(599)
+        assert sum(workout.time_in_zones["pace"].values()) == pytest.approx(599)
+
+    def test_zone_change_recomputes_history(self, service, test_db, user, make_workout):
+        # Given a stored workout
+        workout = self._create(make_workout, 160)
+
+        # When zones are regenerated from a lower observed max HR
+        user.max_heart_rate = None
+        workout.max_heart_rate = 160
+        test_db.commit()
+        auto_calculate_and_save_zones(test_db, user.id)
+        test_db.refresh(workout)
+
+        # Then the same samples now fall in zone 5 (144-160)
+        assert workout.time_in_zones["heart_rate"]["5"] == pytest.approx(599)
+        assert workout.time_in_zones["heart_rate"]["4"] == 0
+
+    def test_recompute_reads_streams_in_chunks(self, service, test_db, user, make_workout, monkeypatch):
+        # Given five workouts with streams and chunks of two
+        workouts = [self._create(make_workout, 160) for _ in range(5)]
+        monkeypatch.setattr(module, "RECOMPUTE_CHUNK", 2)
+        user.max_heart_rate = 165
+        test_db.commit()
+
+        # When the history is recomputed
+        updated = service.recompute_for_user(test_db, user)
+        test_db.commit()
+
+        # Then every workout is updated (160 bpm is zone 5 of max 165)
+        assert updated == 5
+        for workout in workouts:
+            test_db.refresh(workout)
+            assert workout.time_in_zones["heart_rate"]["5"] == pytest.approx(599)